@@ -0,0 +1,84 @@
+"""
+Contact Lookup Cache Benchmark
+
+Measures 'phone <username>' style lookups against an on-disk contact store
+(tasks/contact_store.py) with and without the LRU CachedStore in front of it.
+Lookups follow a Zipfian distribution: the contact of popularity rank k is
+looked up with probability proportional to 1 / k**s, so a few hot contacts
+take most of the traffic, as in a real address book.
+
+For each cache capacity it reports lookups per second, the speedup over the
+uncached store and the cache's hit rate and evictions.
+
+Usage:
+    python benchmarks/bench_cache.py [--contacts 100000] [--lookups 200000]
+                                     [--capacities 0,100,1000,10000] [--skew 1.1]
+                                     [--backend sqlite] [--seed 1]
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tasks"))
+from contact_phones import pack_phones  # noqa: E402
+from contact_store import BACKENDS, CachedStore, open_store  # noqa: E402
+
+
+def zipf_names(contacts: int, lookups: int, skew: float, seed: int) -> list:
+    """Draw lookup names with Zipfian popularity over randomly ranked contacts."""
+    rng = random.Random(seed)
+    ranked = [f"User{i}" for i in range(contacts)]
+    rng.shuffle(ranked)
+    cumulative = list(itertools.accumulate(1 / rank**skew for rank in range(1, contacts + 1)))
+    return rng.choices(ranked, cum_weights=cumulative, k=lookups)
+
+
+def run(store, names: list) -> float:
+    """Look every name up once and return the elapsed seconds."""
+    get = store.get
+    started = time.perf_counter()
+    for name in names:
+        get(name)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    """Parse options, fill a store and benchmark each cache capacity."""
+    parser = argparse.ArgumentParser(description="Contact lookup cache benchmark.")
+    parser.add_argument("--contacts", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--capacities", default="0,100,1000,10000", help="Comma-separated cache sizes, 0 for none")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent s")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="sqlite")
+    parser.add_argument("--seed", type=int, default=1)
+    options = parser.parse_args()
+
+    names = zipf_names(options.contacts, options.lookups, options.skew, options.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        store = open_store(os.path.join(directory, "contacts"), options.backend)
+        store.bulk_update((f"User{i}", pack_phones([str(1000000000 + i)])) for i in range(options.contacts))
+        store.flush()
+
+        print(f"{options.lookups} lookups over {options.contacts} contacts ({options.backend}, zipf s={options.skew})")
+        print(f"  {'capacity':>9} {'lookups/s':>11} {'speedup':>8} {'hit rate':>9} {'evictions':>10}")
+        baseline = None
+        for capacity in (int(size) for size in options.capacities.split(",")):
+            cached = CachedStore(store, capacity) if capacity else store
+            elapsed = run(cached, names)
+            baseline = baseline or elapsed
+            stats = cached.stats() if capacity else {"hit_rate": 0.0, "evictions": 0}
+            print(
+                f"  {capacity:>9} {len(names) / elapsed:>11.0f} {baseline / elapsed:>7.1f}x "
+                f"{stats['hit_rate']:>9.1%} {stats['evictions']:>10}"
+            )
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
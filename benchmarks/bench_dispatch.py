@@ -0,0 +1,158 @@
+"""
+Contact Bot Dispatch Benchmark
+
+Feeds a synthetic mix of 'add', 'change', 'phone' and 'all' commands through
+the bot's dispatch path (tasks/task_4.py): parse_input, the COMMANDS table,
+the handler and the terminal renderer, printing into a captured stdout. The
+run is repeated for growing contact books and reports, per command:
+
+- latency percentiles from time.perf_counter_ns around the whole path
+- allocations from a second, tracemalloc-instrumented pass: the mean peak
+  of memory allocated while the command ran and the mean memory it kept
+
+Usage:
+    python benchmarks/bench_dispatch.py [--books 1000,10000,100000] [--commands 20000]
+                                        [--mix add=0.2,change=0.2,phone=0.5,all=0.1]
+                                        [--page-size 20] [--seed 1]
+"""
+
+import argparse
+import io
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import redirect_stdout
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tasks"))
+import task_4  # noqa: E402
+from contact_index import NameIndex, PhoneIndex  # noqa: E402
+from contact_phones import pack_phones  # noqa: E402
+from contact_store import MemoryStore  # noqa: E402
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Return the value below which the given fraction of samples fall."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def parse_mix(text: str) -> dict:
+    """Parse "add=0.2,phone=0.8" into a {command: weight} dict."""
+    mix = {}
+    for part in text.split(","):
+        command, _, weight = part.partition("=")
+        mix[command.strip()] = float(weight)
+    return mix
+
+
+def command_lines(book: int, commands: int, mix: dict, page_size: int, seed: int) -> list:
+    """Generate command lines against a book of User0..User{book-1}."""
+    rng = random.Random(seed)
+    names, weights = zip(*mix.items())
+    added = book
+    lines = []
+    for command in rng.choices(names, weights, k=commands):
+        if command == "add":
+            lines.append(f"add User{added} {1000000000 + added}")
+            added += 1
+        elif command == "change":
+            user = rng.randrange(added)
+            lines.append(f"change User{user} {2000000000 + user}")
+        elif command == "phone":
+            lines.append(f"phone User{rng.randrange(added)}")
+        elif command == "all":
+            lines.append(f"all {page_size} User{rng.randrange(added)}")
+        else:
+            lines.append(command)
+    return lines
+
+
+def load_book(book: int) -> None:
+    """Replace the bot's store with a fresh book of contacts and build its indexes."""
+    task_4.USERS = MemoryStore()
+    task_4.USERS.bulk_update((f"User{i}", pack_phones([str(1000000000 + i)])) for i in range(book))
+    task_4.USERS.index_for(NameIndex)
+    task_4.USERS.index_for(PhoneIndex)
+
+
+def run_timed(lines: list) -> dict:
+    """Run the lines once and return {command: [latency ns]}."""
+    latencies = defaultdict(list)
+    parse_input, commands, render = task_4.parse_input, task_4.COMMANDS, task_4.render_terminal
+    clock = time.perf_counter_ns
+    with redirect_stdout(io.StringIO()):
+        for line in lines:
+            started = clock()
+            command, args = parse_input(line)
+            text = render(commands[command](args))
+            if text:
+                print(text)
+            latencies[command].append(clock() - started)
+    return latencies
+
+
+def run_traced(lines: list) -> dict:
+    """Run the lines under tracemalloc and return {command: [(peak, kept) bytes]}."""
+    allocations = defaultdict(list)
+    tracemalloc.start()
+    try:
+        with redirect_stdout(io.StringIO()):
+            for line in lines:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                command, args = task_4.parse_input(line)
+                text = task_4.render_terminal(task_4.COMMANDS[command](args))
+                if text:
+                    print(text)
+                current, peak = tracemalloc.get_traced_memory()
+                allocations[command].append((peak - before, current - before))
+    finally:
+        tracemalloc.stop()
+    return allocations
+
+
+def report(book: int, latencies: dict, allocations: dict) -> None:
+    """Print one table row per command."""
+    print(f"\nbook of {book} contacts")
+    print(f"  {'command':<8} {'count':>7} {'p50 us':>9} {'p90 us':>9} {'p99 us':>9} {'max us':>9} "
+          f"{'peak B':>9} {'kept B':>9}")
+    for command in sorted(latencies):
+        samples = sorted(latencies[command])
+        traced = allocations.get(command, [])
+        peak = sum(item[0] for item in traced) / max(1, len(traced))
+        kept = sum(item[1] for item in traced) / max(1, len(traced))
+        print(
+            f"  {command:<8} {len(samples):>7} {percentile(samples, 0.5) / 1000:>9.2f} "
+            f"{percentile(samples, 0.9) / 1000:>9.2f} {percentile(samples, 0.99) / 1000:>9.2f} "
+            f"{samples[-1] / 1000:>9.2f} {peak:>9.0f} {kept:>9.0f}"
+        )
+
+
+def main() -> None:
+    """Parse options and benchmark each book size."""
+    parser = argparse.ArgumentParser(description="Contact bot dispatch benchmark.")
+    parser.add_argument("--books", default="1000,10000,100000", help="Comma-separated contact book sizes")
+    parser.add_argument("--commands", type=int, default=20000)
+    parser.add_argument("--mix", default="add=0.2,change=0.2,phone=0.5,all=0.1")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    options = parser.parse_args()
+
+    task_4.set_colors(False)
+    mix = parse_mix(options.mix)
+    for book in (int(size) for size in options.books.split(",")):
+        lines = command_lines(book, options.commands, mix, options.page_size, options.seed)
+        load_book(book)
+        latencies = run_timed(lines)
+        load_book(book)
+        allocations = run_traced(lines)
+        report(book, latencies, allocations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+File Result Cache Benchmark
+
+Compares reading a salary file with total_salary (tasks/task_1.py) on every
+call against cached_total_salary, which keeps the result until the file's
+fingerprint changes (tasks/file_cache.py). For each file size it reports
+calls/s of:
+
+- uncached: total_salary parsing the file every time
+- memory hit: one stat() and a dict lookup
+- disk hit: a fresh cache answered from its pickle directory, as after a
+  restart
+
+Usage:
+    python benchmarks/bench_file_cache.py [--rows 100,10000,1000000] [--calls 2000]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tasks"))
+from file_cache import FileCache  # noqa: E402
+from task_1 import total_salary  # noqa: E402
+
+
+def rate(function, path, calls: int) -> float:
+    """Return calls/s of function(path), at least one call."""
+    calls = max(1, calls)
+    started = time.perf_counter()
+    for _ in range(calls):
+        function(path)
+    return calls / (time.perf_counter() - started)
+
+
+def main() -> None:
+    """Parse options and benchmark each file size."""
+    parser = argparse.ArgumentParser(description="File result cache benchmark.")
+    parser.add_argument("--rows", default="100,10000,1000000", help="Comma-separated row counts")
+    parser.add_argument("--calls", type=int, default=2000, help="Calls per measurement")
+    options = parser.parse_args()
+
+    print(f"  {'rows':>9} {'uncached/s':>11} {'memory hit/s':>13} {'disk hit/s':>11} {'speedup':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in (int(count) for count in options.rows.split(",")):
+            path = Path(directory) / f"salaries-{rows}.csv"
+            path.write_text("".join(f"Employee {i},{1000 + i % 5000}\n" for i in range(rows)))
+            # Parsing a big file thousands of times takes too long; scale its calls down
+            uncached = rate(total_salary, path, options.calls * 100 // max(rows, 100))
+
+            pickles = Path(directory) / f"cache-{rows}"
+            FileCache(total_salary, directory=pickles).get(path)
+            memory = rate(FileCache(total_salary, directory=pickles), path, options.calls)
+            disk = rate(lambda file: FileCache(total_salary, directory=pickles).get(file), path, options.calls)
+            print(f"  {rows:>9} {uncached:>11.0f} {memory:>13.0f} {disk:>11.0f} {memory / uncached:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
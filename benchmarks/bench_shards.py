@@ -0,0 +1,109 @@
+"""
+Sharded Contact Store Benchmark
+
+Measures how imports and lookups scale when a contact book is split across
+worker processes with a ShardedStore (tasks/contact_shards.py). For each
+shard count it reports:
+
+- import: contacts/s of one bulk update, each shard writing its part of the
+  book to its own store in parallel
+- batched lookups: lookups/s of get_many() batches, each batch answered by
+  all shards at once
+- threaded lookups: lookups/s of single lookups from several threads, as a
+  threaded server would make them; requests to different shards overlap
+
+Shard count 0 is the unsharded store in this process, for reference; 1
+shard shows the cost of the pipe alone. Scaling needs as many free cores as
+shards, so the machine's core count is printed too.
+
+Usage:
+    python benchmarks/bench_shards.py [--contacts 200000] [--lookups 100000]
+                                      [--shards 0,1,2,4] [--batch 1000]
+                                      [--threads 8] [--backend sqlite] [--seed 1]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tasks"))
+from contact_phones import pack_phones  # noqa: E402
+from contact_shards import ShardedStore  # noqa: E402
+from contact_store import BACKENDS, open_store  # noqa: E402
+
+
+def open_book(path: str, shards: int, backend: str):
+    """Open the store under test: unsharded for 0 shards, else a ShardedStore."""
+    return ShardedStore(shards, path, backend) if shards else open_store(path, backend)
+
+
+def batched_lookups(store, names: list, batch: int) -> float:
+    """Look the names up in batches and return the elapsed seconds."""
+    get_many = getattr(store, "get_many", None) or (lambda chunk: [store.get(name) for name in chunk])
+    started = time.perf_counter()
+    for start in range(0, len(names), batch):
+        get_many(names[start:start + batch])
+    return time.perf_counter() - started
+
+
+def threaded_lookups(store, names: list, threads: int) -> float:
+    """Look the names up one by one from several threads and return the elapsed seconds."""
+    chunks = [names[thread::threads] for thread in range(threads)]
+
+    def look_up(chunk):
+        for name in chunk:
+            store.get(name)
+
+    workers = [threading.Thread(target=look_up, args=(chunk,)) for chunk in chunks]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    """Parse options and benchmark each shard count."""
+    parser = argparse.ArgumentParser(description="Sharded contact store benchmark.")
+    parser.add_argument("--contacts", type=int, default=200_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--shards", default="0,1,2,4", help="Comma-separated shard counts, 0 for unsharded")
+    parser.add_argument("--batch", type=int, default=1000, help="Names per get_many() call")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="sqlite")
+    parser.add_argument("--seed", type=int, default=1)
+    options = parser.parse_args()
+
+    book = [(f"User{i}", pack_phones([str(1000000000 + i)])) for i in range(options.contacts)]
+    rng = random.Random(options.seed)
+    names = [f"User{rng.randrange(options.contacts)}" for _ in range(options.lookups)]
+
+    rows = []
+    for shards in (int(count) for count in options.shards.split(",")):
+        with tempfile.TemporaryDirectory() as directory:
+            store = open_book(os.path.join(directory, "contacts"), shards, options.backend)
+            started = time.perf_counter()
+            store.bulk_update(book)
+            store.flush()
+            imported = time.perf_counter() - started
+            batched = batched_lookups(store, names, options.batch)
+            threaded = threaded_lookups(store, names, options.threads)
+            store.close()
+        rows.append((shards, len(book) / imported, len(names) / batched, len(names) / threaded))
+
+    baseline = next((row for row in rows if row[0] == 1), rows[0])
+    print(f"{options.contacts} contacts, {options.lookups} lookups ({options.backend}, {os.cpu_count()} cores)")
+    print(f"  {'shards':>6} {'import/s':>10} {'batched/s':>10} {'threaded/s':>11} {'speedup over ' + str(baseline[0]):>26}")
+    for shards, *rates in rows:
+        speedups = " ".join(f"{rate / base:>7.1f}x" for rate, base in zip(rates, baseline[1:]))
+        print(f"  {shards:>6} {rates[0]:>10.0f} {rates[1]:>10.0f} {rates[2]:>11.0f}   {speedups}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Contact Snapshot Benchmark
+
+Compares the binary snapshot (tasks/contact_snapshot.py) with pickle and
+JSON as the file a contact book is saved to and started from. For each
+format it reports the file size, the time to save the book, and the cold
+start: the time until the first lookup is answered and the time for a batch
+of random lookups after that. pickle and JSON have to read the whole file
+before the first lookup; the snapshot is memory-mapped and only touches the
+pages the lookups land on.
+
+Usage:
+    python benchmarks/bench_snapshot.py [--contacts 1000000] [--phones 2]
+                                        [--lookups 1000] [--seed 1]
+"""
+
+import argparse
+import json
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tasks"))
+from contact_phones import pack_phones  # noqa: E402
+from contact_store import SnapshotStore, save_snapshot  # noqa: E402
+
+
+def build_book(contacts: int, phones: int) -> dict:
+    """Return {name: packed phones} for User0..User{contacts-1}."""
+    return {
+        f"User{i}": pack_phones([str(1000000000 + i * phones + k) for k in range(phones)])
+        for i in range(contacts)
+    }
+
+
+def save_pickle(path, book: dict) -> None:
+    """Save the book as one pickled dict."""
+    with open(path, "wb") as file:
+        pickle.dump(book, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def open_pickle(path):
+    """Load a pickled book."""
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+def save_json(path, book: dict) -> None:
+    """Save the book as one JSON object of packed phone lists."""
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({name: phones.tolist() for name, phones in book.items()}, file)
+
+
+def open_json(path):
+    """Load a JSON book."""
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+FORMATS = {
+    "snapshot": (lambda path, book: save_snapshot(path, book.items()), lambda path: SnapshotStore(path, autosave=False)),
+    "pickle": (save_pickle, open_pickle),
+    "json": (save_json, open_json),
+}
+
+
+def measure(name: str, path: str, book: dict, names: list) -> tuple:
+    """Return (size, save s, first lookup s, lookups s) for one format."""
+    save, load = FORMATS[name]
+    started = time.perf_counter()
+    save(path, book)
+    saved = time.perf_counter() - started
+
+    started = time.perf_counter()
+    store = load(path)
+    store.get(names[0])
+    first = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for contact in names:
+        store.get(contact)
+    lookups = time.perf_counter() - started
+    if hasattr(store, "close"):
+        store.close()
+    return os.path.getsize(path), saved, first, lookups
+
+
+def main() -> None:
+    """Parse options and compare the formats."""
+    parser = argparse.ArgumentParser(description="Contact snapshot benchmark.")
+    parser.add_argument("--contacts", type=int, default=1_000_000)
+    parser.add_argument("--phones", type=int, default=2, help="Phones per contact")
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    options = parser.parse_args()
+
+    book = build_book(options.contacts, options.phones)
+    rng = random.Random(options.seed)
+    names = [f"User{rng.randrange(options.contacts)}" for _ in range(options.lookups)]
+
+    print(f"{options.contacts} contacts with {options.phones} phones, {options.lookups} lookups")
+    print(f"  {'format':<9} {'size MiB':>9} {'save s':>8} {'first lookup ms':>16} {'lookup us':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name in FORMATS:
+            size, saved, first, lookups = measure(name, os.path.join(directory, f"contacts.{name}"), book, names)
+            print(
+                f"  {name:<9} {size / 2**20:>9.1f} {saved:>8.2f} {first * 1000:>16.2f} "
+                f"{lookups / len(names) * 1e6:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
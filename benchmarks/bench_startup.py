@@ -0,0 +1,141 @@
+"""
+Command-Line Startup Benchmark
+
+The tools in tasks/ are spawned thousands of times from scripts, so their
+startup time matters more than most of their commands. For each module this
+benchmark runs fresh interpreters and reports:
+
+- import time of the module, from `python -X importtime`, with the modules
+  that take longest to import on their own
+- time to first prompt: wall time from spawning `python task_4.py` until it
+  asks for the first command
+- time to run a one-line --batch script, as scripts do
+- the interpreter's own startup (`python -c pass`) for reference
+
+It also guards startup: the run fails (exit code 1) if a median import
+time exceeds --budget-ms, or if importing a module loads one of the modules
+it should only import on first use (FORBIDDEN, overridden per module with
+--forbid).
+
+Usage:
+    python benchmarks/bench_startup.py [--modules task_4,task_3] [--runs 20]
+                                       [--budget-ms 15] [--top 8]
+                                       [--forbid task_3=argparse,ctypes ...]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+TASKS = Path(__file__).resolve().parent.parent / "tasks"
+PROMPT = b"Enter a command:"
+
+# Modules that importing each tool must not load
+FORBIDDEN = {
+    "task_4": "re,json,csv,sqlite3,argparse,colorama,cProfile,tracemalloc,pathlib,multiprocessing,unicodedata",
+    "task_3": "argparse,ctypes,select,struct,shlex,heapq,colorama",
+}
+
+
+def import_times(module: str) -> dict:
+    """Import a module in a fresh interpreter and return {module: (self us, cumulative us)}."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=TASKS,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def loaded_modules(module: str, candidates: list) -> list:
+    """Return the candidate modules that importing a module loads."""
+    code = f"import sys, {module}; print(','.join(m for m in {candidates!r} if m in sys.modules))"
+    completed = subprocess.run([sys.executable, "-c", code], cwd=TASKS, capture_output=True, text=True, check=True)
+    return [name for name in completed.stdout.strip().split(",") if name]
+
+
+def wall_time(command: list, stdin: bytes = b"", until: bytes = None) -> float:
+    """Run a command and return the seconds until it exits, or until it prints `until`."""
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=TASKS, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    if until is None:
+        process.communicate(stdin)
+        return time.perf_counter() - started
+    output = b""
+    while until not in output:
+        chunk = os.read(process.stdout.fileno(), 4096)
+        if not chunk:
+            break
+        output += chunk
+    elapsed = time.perf_counter() - started
+    process.communicate(stdin)
+    return elapsed
+
+
+def median_ms(function, runs: int) -> float:
+    """Return the median of runs calls of a function returning seconds, in ms."""
+    return statistics.median(function() for _ in range(runs)) * 1000
+
+
+def main() -> int:
+    """Parse options, measure each module and apply the guards."""
+    parser = argparse.ArgumentParser(description="Command-line startup benchmark.")
+    parser.add_argument("--modules", default="task_4,task_3", help="Comma-separated modules in tasks/")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=15.0, help="Maximum median import time")
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports to list")
+    parser.add_argument(
+        "--forbid",
+        action="append",
+        default=[],
+        metavar="MODULE=NAMES",
+        help="Comma-separated modules that importing MODULE must not load, replacing its FORBIDDEN entry",
+    )
+    options = parser.parse_args()
+    forbidden = dict(FORBIDDEN)
+    for entry in options.forbid:
+        module, _, names = entry.partition("=")
+        forbidden[module] = names
+
+    subprocess.run([sys.executable, "-m", "compileall", "-q", "-f", str(TASKS)], check=True)
+    interpreter = median_ms(lambda: wall_time([sys.executable, "-c", "pass"]), options.runs)
+    print(f"interpreter startup: {interpreter:.1f} ms")
+
+    failed = False
+    for module in options.modules.split(","):
+        samples = [import_times(module) for _ in range(options.runs)]
+        median = statistics.median(sample[module][1] for sample in samples) / 1000
+        print(f"\n{module}: import {median:.2f} ms (median of {options.runs})")
+        slowest = sorted(samples[-1].items(), key=lambda item: item[1][0], reverse=True)[: options.top]
+        for name, (own, cumulative) in slowest:
+            print(f"  {name:<28} {own / 1000:>7.2f} ms self {cumulative / 1000:>7.2f} ms total")
+        if median > options.budget_ms:
+            print(f"  FAIL: import takes {median:.2f} ms, budget is {options.budget_ms:.2f} ms")
+            failed = True
+        loaded = loaded_modules(module, [name for name in forbidden.get(module, "").split(",") if name])
+        if loaded:
+            print(f"  FAIL: importing {module} loads {', '.join(loaded)}")
+            failed = True
+        if module == "task_4":
+            script = [sys.executable, "task_4.py"]
+            prompt = median_ms(lambda: wall_time(script, b"exit\n", until=PROMPT), options.runs)
+            batch = median_ms(lambda: wall_time(script + ["--batch"], b"hello\n"), options.runs)
+            print(f"  time to first prompt:  {prompt:.1f} ms ({prompt - interpreter:+.1f} ms over the interpreter)")
+            print(f"  one-line batch script: {batch:.1f} ms ({batch - interpreter:+.1f} ms over the interpreter)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
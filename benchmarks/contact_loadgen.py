@@ -0,0 +1,142 @@
+"""
+Contact Service Load Generator
+
+Opens many concurrent connections to the contact service
+(tasks/contact_server.py), pipelines requests on each of them and reports
+throughput and latency percentiles. The request mix is mostly 'phone'
+lookups with some 'change' updates over a preloaded set of contacts.
+
+Without --port a local server is started for the duration of the run.
+
+Usage:
+    python benchmarks/contact_loadgen.py [--host HOST] [--port PORT] [--clients 100]
+                                         [--requests 1000] [--depth 16] [--contacts 10000]
+                                         [--write-ratio 0.1]
+"""
+
+import argparse
+import asyncio
+import random
+import subprocess
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+SERVER = Path(__file__).resolve().parent.parent / "tasks" / "contact_server.py"
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Return the value below which the given fraction of samples fall."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def preload(host: str, port: int, contacts: int) -> None:
+    """Add the contacts the benchmark looks up, pipelined on one connection."""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.writelines(f"add User{i} {1000000000 + i}\n".encode() for i in range(contacts))
+    await writer.drain()
+    for _ in range(contacts):
+        await reader.readline()
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_client(host: str, port: int, requests: int, depth: int, contacts: int,
+                     write_ratio: float, latencies: list, seed: int) -> int:
+    """
+    Send requests with up to depth of them in flight and record latencies.
+
+    Returns:
+        int: Number of failed requests.
+    """
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    in_flight = asyncio.Semaphore(depth)
+    sent_at = deque()
+    failures = 0
+
+    async def send() -> None:
+        for _ in range(requests):
+            await in_flight.acquire()
+            user = rng.randrange(contacts)
+            if rng.random() < write_ratio:
+                line = f"change User{user} {2000000000 + rng.randrange(10**9)}\n"
+            else:
+                line = f"phone User{user}\n"
+            sent_at.append(time.perf_counter())
+            writer.write(line.encode())
+            await writer.drain()
+
+    sender = asyncio.create_task(send())
+    for _ in range(requests):
+        reply = await reader.readline()
+        latencies.append(time.perf_counter() - sent_at.popleft())
+        in_flight.release()
+        if b'"ok": true' not in reply:
+            failures += 1
+    await sender
+    writer.close()
+    await writer.wait_closed()
+    return failures
+
+
+async def run(options) -> None:
+    """Preload contacts, run all clients concurrently and print the report."""
+    await preload(options.host, options.port, options.contacts)
+    latencies = []
+    started = time.perf_counter()
+    failures = await asyncio.gather(*(
+        run_client(options.host, options.port, options.requests, options.depth,
+                   options.contacts, options.write_ratio, latencies, seed)
+        for seed in range(options.clients)
+    ))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"Clients: {options.clients}, requests: {total}, pipeline depth: {options.depth}")
+    print(f"Throughput: {total / elapsed:,.0f} requests/s over {elapsed:.2f}s")
+    print(
+        "Latency ms: "
+        f"p50 {percentile(latencies, 0.50) * 1000:.2f}, "
+        f"p90 {percentile(latencies, 0.90) * 1000:.2f}, "
+        f"p99 {percentile(latencies, 0.99) * 1000:.2f}, "
+        f"max {latencies[-1] * 1000 if latencies else 0:.2f}"
+    )
+    print(f"Failed requests: {sum(failures)}")
+
+
+def main() -> None:
+    """Parse options, start a local server if needed and run the benchmark."""
+    parser = argparse.ArgumentParser(description="Load generator for the contact service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per client")
+    parser.add_argument("--depth", type=int, default=16, help="pipelined requests per connection")
+    parser.add_argument("--contacts", type=int, default=10000)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    options = parser.parse_args()
+
+    server = None
+    if options.port is None:
+        server = subprocess.Popen(
+            [sys.executable, str(SERVER), "--host", options.host, "--port", "0"],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        options.port = int(server.stdout.readline().rsplit(":", 1)[1])
+    try:
+        asyncio.run(run(options))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
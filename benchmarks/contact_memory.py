@@ -0,0 +1,50 @@
+"""
+Contact Phone Memory Benchmark
+
+Compares the memory taken by a contact book whose phones are lists of
+strings with one whose phones are packed into an array('Q') per contact
+(tasks/contact_phones.py), as the bot stores them.
+
+Usage:
+    python benchmarks/contact_memory.py [--contacts 1000000] [--phones 2]
+"""
+
+import argparse
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tasks"))
+from contact_phones import pack_phones  # noqa: E402
+
+
+def measure(build, contacts: int, phones: int) -> int:
+    """Return the bytes allocated for a book built with build(phone strings)."""
+    tracemalloc.start()
+    book = {
+        f"User{i}": build([str(1000000000 + i * phones + k) for k in range(phones)])
+        for i in range(contacts)
+    }
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del book
+    return size
+
+
+def main() -> None:
+    """Parse options and print the memory taken by both layouts."""
+    parser = argparse.ArgumentParser(description="Contact phone memory benchmark.")
+    parser.add_argument("--contacts", type=int, default=1_000_000)
+    parser.add_argument("--phones", type=int, default=2, help="Phones per contact")
+    options = parser.parse_args()
+
+    strings = measure(list, options.contacts, options.phones)
+    packed = measure(pack_phones, options.contacts, options.phones)
+    print(f"{options.contacts} contacts with {options.phones} phones each")
+    print(f"  list of str:  {strings / 2**20:8.1f} MiB  ({strings / options.contacts:.0f} B/contact)")
+    print(f"  array('Q'):   {packed / 2**20:8.1f} MiB  ({packed / options.contacts:.0f} B/contact)")
+    print(f"  packed/str:   {packed / strings:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
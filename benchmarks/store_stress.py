@@ -0,0 +1,108 @@
+"""
+Contact Store Thread Stress Benchmark
+
+Runs a mixed workload against a contact store (tasks/contact_store.py) from
+1, 2, 4, ... threads and reports throughput for each thread count. Each
+thread inserts its own contacts with insert_if_absent, changes them with
+update_if_present, and spends the rest of its operations on lookups. All
+threads also race to insert one shared set of names.
+
+After every run the store is checked for lost updates: each of the thread's
+own contacts must hold its last phone, and each shared name must have
+exactly one winner.
+
+Usage:
+    python benchmarks/store_stress.py [--backend {memory,sqlite,log}] [--threads 8]
+                                      [--ops 20000] [--read-ratio 0.8]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tasks"))
+from contact_store import open_store  # noqa: E402
+
+SHARED_NAMES = 1000
+
+
+def worker(store, number: int, ops: int, read_ratio: float, start: threading.Barrier, wins: list) -> None:
+    """Run one thread's share of the workload."""
+    rng = random.Random(number)
+    own = []
+    start.wait()
+    for i in range(ops):
+        roll = rng.random()
+        if roll < read_ratio and own:
+            store.get(rng.choice(own))
+        elif roll < read_ratio + (1 - read_ratio) / 2 or not own:
+            name = f"T{number}U{len(own)}"
+            store.insert_if_absent(name, f"1{number:03d}{len(own):08d}")
+            own.append(name)
+        else:
+            index = rng.randrange(len(own))
+            store.update_if_present(own[index], f"2{number:03d}{index:08d}")
+        if i < SHARED_NAMES and store.insert_if_absent(f"Shared{i}", str(number)) is None:
+            wins[number] += 1
+    for index, name in enumerate(own):
+        if store.get(name) not in (f"1{number:03d}{index:08d}", f"2{number:03d}{index:08d}"):
+            raise AssertionError(f"lost update for {name}")
+
+
+def run(backend: str, threads: int, ops: int, read_ratio: float) -> float:
+    """Run the workload with a number of threads and return operations per second."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = None if backend == "memory" else os.path.join(directory, "contacts.db")
+        store = open_store(path, backend if path else "sqlite")
+        try:
+            start = threading.Barrier(threads + 1)
+            wins = [0] * threads
+            pool = [
+                threading.Thread(target=worker, args=(store, number, ops, read_ratio, start, wins))
+                for number in range(threads)
+            ]
+            for thread in pool:
+                thread.start()
+            start.wait()
+            began = time.perf_counter()
+            for thread in pool:
+                thread.join()
+            elapsed = time.perf_counter() - began
+            if sum(wins) != min(ops, SHARED_NAMES):
+                raise AssertionError(f"{sum(wins)} winners for {min(ops, SHARED_NAMES)} shared names")
+        finally:
+            store.close()
+    return threads * ops / elapsed
+
+
+def main() -> None:
+    """Parse options and print throughput for each thread count."""
+    parser = argparse.ArgumentParser(description="Contact store thread stress benchmark.")
+    parser.add_argument("--backend", choices=["memory", "sqlite", "log"], default="memory")
+    parser.add_argument("--threads", type=int, default=8, help="Largest thread count")
+    parser.add_argument("--ops", type=int, default=20000, help="Operations per thread")
+    parser.add_argument("--read-ratio", type=float, default=0.8)
+    options = parser.parse_args()
+
+    counts = []
+    threads = 1
+    while threads < options.threads:
+        counts.append(threads)
+        threads *= 2
+    counts.append(options.threads)
+
+    print(f"{options.backend} store, {options.ops} ops per thread, {options.read_ratio:.0%} reads")
+    baseline = None
+    for threads in counts:
+        throughput = run(options.backend, threads, options.ops, options.read_ratio)
+        baseline = baseline or throughput
+        print(f"{threads:>3} threads: {throughput:>12,.0f} ops/s  ({throughput / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
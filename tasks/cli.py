@@ -0,0 +1,379 @@
+"""
+Unified Command-Line Interface
+
+One entry point for all the tasks, as subcommands:
+
+    salary    total and average salary of CSV files (task_1)
+    cats      cat records of CSV files (task_2)
+    tree      directory tree (task_3)
+    contacts  the contact management bot (task_4)
+
+Subcommands separated by "::" form a pipeline. The stages run in one
+process and pass records to each other as generators, so no stage waits
+for the one before it to finish and nothing goes through temp files:
+
+    python cli.py tree data --pattern "*.csv" :: salary --jobs 4
+    python cli.py tree data --pattern "cats*.csv" :: cats
+    python cli.py tree exports --pattern "*.csv" :: contacts --db book.db
+
+salary, cats and tree read paths: their own arguments, the files of a tree
+stage before them, or lines of stdin for "-". salary sums every file in a
+pool of worker processes and reports the files in input order, then the
+total of all of them. contacts takes the bot's own options; alone it starts
+the bot, after another stage it imports every file it gets, as an 'import'
+command in --batch mode.
+
+The last stage prints its records, one per line. Errors go to stderr and
+make the exit code 1; malformed lines of salary and cats files are warned
+about on stderr with their file, and skipped. --metrics-file and --metrics-port, given before the
+first stage, export what the stages measured (see metrics.py); salary
+workers send their metrics back to be added up.
+
+Usage:
+    python cli.py [--metrics-file FILE] [--metrics-port PORT]
+                  {salary,cats,tree,contacts} [options] [:: stage [options]]...
+"""
+
+import os
+import sys
+from collections import deque, namedtuple
+from itertools import islice
+
+PIPE = "::"
+
+TreeEntry = namedtuple("TreeEntry", "path name depth is_dir")
+SalaryReport = namedtuple("SalaryReport", "path total average count")
+
+
+class PipelineError(Exception):
+    """Raised when records reach a stage that cannot read them."""
+
+
+def _input_paths(records, stage: str):
+    """Turn upstream records into paths: files of a tree stage, or text lines."""
+    for record in records:
+        if isinstance(record, TreeEntry):
+            if not record.is_dir:
+                yield record.path
+        elif isinstance(record, str):
+            line = record.strip()
+            if line:
+                yield line
+        else:
+            raise PipelineError(f"{stage} reads paths, not {type(record).__name__} records")
+
+
+def _paths(options, records, stage: str):
+    """Return the paths a stage works on: its arguments, with "-" for stdin lines, or upstream records."""
+    if records is not None:
+        if options.paths:
+            raise PipelineError(f"{stage} takes its paths either from arguments or from the stage before it")
+        return _input_paths(records, stage)
+    if not options.paths:
+        raise PipelineError(f"{stage} needs paths, '-' for stdin, or a stage before it")
+    return _expand_stdin(options.paths)
+
+
+def _expand_stdin(paths: list):
+    """Yield paths, replacing "-" with the lines of stdin."""
+    for path in paths:
+        if path == "-":
+            yield from _input_paths(sys.stdin, "stdin")
+        else:
+            yield path
+
+
+def _report(errors: list, message: str) -> None:
+    """Print an error to stderr and remember it for the exit code."""
+    errors.append(message)
+    print(f"Error: {message}", file=sys.stderr)
+
+
+def _malformed_warner(path):
+    """Return an on_malformed hook for task_1/task_2 that warns about a file's lines on stderr."""
+
+    def warn(line_number: int) -> None:
+        print(f"Warning: {path}: line {line_number} is malformed, skipped", file=sys.stderr)
+
+    return warn
+
+
+def ordered_map(function, items, jobs: int):
+    """
+    Apply a function to items in worker processes, yielding in input order.
+
+    Items are read lazily and at most 4 * jobs calls are in flight, so a
+    long or endless input neither waits to be read in full nor piles up in
+    memory. With one job the calls run in this process.
+
+    Args:
+        function: Picklable function of one argument.
+        items: Iterable of arguments.
+        jobs (int): Number of worker processes.
+
+    Yields:
+        tuple: (item, result, error), error being the exception the call
+               raised or None.
+    """
+    if jobs <= 1:
+        for item in items:
+            try:
+                yield item, function(item), None
+            except Exception as error:
+                yield item, None, error
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        items = iter(items)
+        while True:
+            for item in islice(items, 4 * jobs - len(pending)):
+                pending.append((item, pool.submit(function, item)))
+            if not pending:
+                return
+            item, future = pending.popleft()
+            error = future.exception()
+            yield item, None if error else future.result(), error
+
+
+def _salary_stats(path):
+    """Run salary_stats, warning about malformed lines on stderr (module level so it pickles)."""
+    from task_1 import salary_stats
+
+    return salary_stats(path, _malformed_warner(path))
+
+
+def _measured_salary_stats(path):
+    """Run salary_stats in a worker process, returning its metrics too, for the parent to merge."""
+    from metrics import METRICS
+
+    METRICS.reset()
+    METRICS.enabled = True
+    return _salary_stats(path), METRICS.snapshot()
+
+
+def run_salary(options, records, errors: list):
+    """Stage: yield a SalaryReport per file, then one for all of them (path None)."""
+    from metrics import METRICS
+    from task_1 import _format_number
+
+    measured = METRICS.enabled and options.jobs > 1
+    function = _measured_salary_stats if measured else _salary_stats
+    total = 0
+    count = 0
+    for path, stats, error in ordered_map(function, _paths(options, records, "salary"), options.jobs):
+        if error is not None:
+            _report(errors, f"{path}: {error.strerror if isinstance(error, OSError) else error}")
+            continue
+        if measured:
+            stats, snapshot = stats
+            METRICS.merge(snapshot)
+        file_total, file_count = stats
+        total += file_total
+        count += file_count
+        if not options.total_only:
+            yield SalaryReport(path, _format_number(file_total), _average(file_total, file_count), file_count)
+    yield SalaryReport(None, _format_number(total), _average(total, count), count)
+
+
+def _average(total, count):
+    """Return the rounded average salary, 0.00 for no employees."""
+    from task_1 import _format_number
+
+    return _format_number(total / count if count else 0)
+
+
+def run_cats(options, records, errors: list):
+    """Stage: yield the cat records of every file, one at a time."""
+    from task_2 import iter_cats
+
+    for path in _paths(options, records, "cats"):
+        try:
+            yield from iter_cats(path, _malformed_warner(path))
+        except OSError as error:
+            _report(errors, f"{path}: {error.strerror}")
+
+
+def run_tree(options, records, errors: list):
+    """Stage: yield a TreeEntry for every directory and file under each root."""
+    from fnmatch import fnmatch
+    from task_3 import walk_tree
+
+    roots = _paths(options, records, "tree") if records is not None or options.paths else ["."]
+    for root in roots:
+        skipped = []
+        try:
+            for entry in map(TreeEntry._make, walk_tree(root, skipped)):
+                if entry.is_dir or options.pattern is None or fnmatch(entry.name, options.pattern):
+                    yield entry
+        except OSError as error:
+            _report(errors, f"{root}: {error.strerror}")
+        for path, error in skipped:
+            _report(errors, f"skipped {path}: {error.strerror or error}")
+
+
+def run_contacts(options, records, errors: list):
+    """Stage: import the files of the stage before into the contact bot, or run the bot alone."""
+    import task_4
+
+    commands = None if records is None else _import_commands(records, errors)
+    if task_4.main(options.args, commands=commands):
+        _report(errors, "some contact commands failed")
+    yield from ()
+
+
+def _import_commands(records, errors: list):
+    """Yield an 'import' bot command for every upstream path."""
+    for path in _input_paths(records, "contacts"):
+        if len(path.split()) != 1:
+            _report(errors, f"{path}: contacts cannot import paths with spaces")
+        else:
+            yield f"import {path}"
+
+
+def format_record(record, colors: bool = False) -> str:
+    """
+    Render a record as one line of output.
+
+    Args:
+        record: Record of the last stage.
+        colors (bool, optional): Color tree entries like task_3. Defaults to False.
+
+    Returns:
+        str: The line, without a newline.
+    """
+    if isinstance(record, TreeEntry):
+        line = f"{'.' * record.depth}  {record.name}"
+        if not colors:
+            return line
+        from console_colors import GREEN, RED, RESET
+
+        return f"{GREEN if record.is_dir else RED}{line}{RESET}"
+    if isinstance(record, SalaryReport):
+        label = "Total of all files" if record.path is None else record.path
+        return f"{label}: total {record.total}, average {record.average} ({record.count} employees)"
+    if isinstance(record, dict):
+        return ",".join(str(value) for value in record.values())
+    return str(record)
+
+
+STAGES = {"salary": run_salary, "cats": run_cats, "tree": run_tree, "contacts": run_contacts}
+
+
+def build_parser():
+    """Return the parser of one pipeline stage."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Run a task, or a pipeline of tasks separated by '::'.",
+        epilog='Example: cli.py tree data --pattern "*.csv" :: salary --jobs 4',
+    )
+    from metrics import add_arguments as add_metrics_arguments
+
+    add_metrics_arguments(parser)
+    stages = parser.add_subparsers(dest="stage", required=True)
+
+    salary = stages.add_parser("salary", help="Total and average salary of CSV files")
+    salary.add_argument("paths", nargs="*", help="CSV files, '-' to read paths from stdin")
+    salary.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    salary.add_argument("--total-only", action="store_true", help="Only report the total of all files")
+
+    cats = stages.add_parser("cats", help="Cat records of CSV files")
+    cats.add_argument("paths", nargs="*", help="CSV files, '-' to read paths from stdin")
+
+    tree = stages.add_parser("tree", help="Directory tree")
+    tree.add_argument("paths", nargs="*", help="Directories, the current one by default")
+    tree.add_argument("--pattern", default=None, help="Only list files matching this glob, e.g. '*.csv'")
+
+    contacts = stages.add_parser("contacts", help="Contact management bot; run 'contacts -h' for its options")
+    contacts.add_argument("args", nargs="*", help="Options of the contact bot")
+    return parser
+
+
+def split_stages(argv: list) -> list:
+    """Split command-line arguments into the argument lists of the stages."""
+    stages = [[]]
+    for argument in argv:
+        if argument == PIPE:
+            stages.append([])
+        else:
+            stages[-1].append(argument)
+    return stages
+
+
+def _parse_stage(parser, arguments: list):
+    """Parse the arguments of one stage; those of contacts go to the bot unparsed."""
+    if arguments[:1] == ["contacts"]:
+        import argparse
+
+        return argparse.Namespace(stage="contacts", args=arguments[1:])
+    return parser.parse_args(arguments)
+
+
+def run_pipeline(stages: list, output=None) -> int:
+    """
+    Run parsed stages as one pipeline and print the records of the last.
+
+    Args:
+        stages (list): Parsed options of each stage, first stage first.
+        output (optional): Stream to print to. Defaults to sys.stdout.
+
+    Returns:
+        int: Exit code, 1 if any stage reported an error.
+    """
+    from console_colors import init_console
+
+    output = output or sys.stdout
+    colors = init_console(output)
+    errors = []
+    records = None
+    for options in stages:
+        records = STAGES[options.stage](options, records, errors)
+    try:
+        for record in records:
+            print(format_record(record, colors), file=output)
+    except PipelineError as error:
+        _report(errors, str(error))
+    return 1 if errors else 0
+
+
+def main(argv=None) -> int:
+    """
+    Parse the stages of a pipeline and run it.
+
+    Args:
+        argv (list, optional): Command-line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: Exit code: 0 on success, 1 if a stage failed, 2 for bad usage.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    parser = build_parser()
+    stages = [_parse_stage(parser, arguments) for arguments in split_stages(argv)]
+    for position, options in enumerate(stages):
+        if options.stage == "contacts" and position != len(stages) - 1:
+            parser.error("contacts prints its own output and must be the last stage")
+        if getattr(options, "jobs", 1) < 1:
+            parser.error("--jobs should be at least 1")
+    from metrics import export as export_metrics
+
+    metrics_file = next((stage.metrics_file for stage in stages if getattr(stage, "metrics_file", None)), None)
+    metrics_port = next(
+        (stage.metrics_port for stage in stages if getattr(stage, "metrics_port", None) is not None), None
+    )
+    try:
+        with export_metrics(metrics_file, metrics_port):
+            return run_pipeline(stages)
+    except BrokenPipeError:
+        # The reader went away, e.g. "| head"; keep Python from complaining at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
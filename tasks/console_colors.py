@@ -0,0 +1,41 @@
+"""
+Console Colors
+
+ANSI color codes for the command-line tools, as plain string constants so
+that printing in color does not require importing colorama. colorama is only
+needed to make old Windows consoles understand these codes, and init_console
+loads it for that alone, when output actually goes to a terminal.
+"""
+
+import sys
+
+RED = "\033[31m"
+GREEN = "\033[32m"
+YELLOW = "\033[33m"
+CYAN = "\033[36m"
+LIGHTGREEN = "\033[92m"
+RESET = "\033[0m"
+
+
+def init_console(stream=None) -> bool:
+    """
+    Prepare a stream for colored output.
+
+    Args:
+        stream (optional): Output stream. Defaults to sys.stdout.
+
+    Returns:
+        bool: True if the stream is a terminal and colors should be used.
+    """
+    stream = sys.stdout if stream is None else stream
+    try:
+        is_terminal = stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+    if is_terminal and sys.platform == "win32":
+        try:
+            from colorama import just_fix_windows_console
+        except ImportError:
+            return is_terminal
+        just_fix_windows_console()
+    return is_terminal
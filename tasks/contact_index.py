@@ -0,0 +1,412 @@
+"""
+Contact Search Indexes
+
+Secondary indexes over a contact store (see contact_store.py). An index is
+attached to a store once, built from its current contents, and then kept up
+to date incrementally through the store's change notifications:
+
+    rebuild(items)            - load all (name, phone) pairs
+    on_set(name, old, phone)  - a contact was added or changed
+    on_delete(name, old)      - a contact was removed
+    on_clear()                - every contact was removed
+
+NameIndex answers prefix queries from a sorted array and typo-tolerant
+queries from a trigram index, both over name keys (see contact_names.py).
+KeyIndex finds the stored spelling of a name from any other spelling.
+PhoneIndex maps packed phone numbers (see contact_phones.py) back to the
+names that use them.
+
+Stores may answer some index classes from their own data instead (see
+SQLiteStore.index_for and ShardedStore.index_for); such stand-ins provide
+the same query methods.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from contact_names import name_key
+from contact_phones import normalize_phone, pack_phone, phone_codes
+
+
+def levenshtein(a: str, b: str, limit: int) -> int:
+    """
+    Compute the edit distance between two strings, giving up past a limit.
+
+    Args:
+        a (str): First string.
+        b (str): Second string.
+        limit (int): Largest distance of interest.
+
+    Returns:
+        int: The edit distance, or limit + 1 if it is larger than limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _trigrams(word: str) -> set:
+    """Return the padded trigrams of a word; a word of length n has n + 1."""
+    padded = f"\0\0{word}\1"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrigramIndex:
+    """
+    Inverted index from trigrams to the words that contain them.
+
+    One edit changes at most three trigrams of a word, so a word within d
+    edits of the query shares at least all but 3 * d of the query's distinct
+    trigrams with it. Counting shared trigrams over the posting lists
+    narrows the words that need an exact edit distance check to a small
+    candidate set.
+    """
+
+    def __init__(self) -> None:
+        self._postings = {}
+
+    def add(self, word: str) -> None:
+        """Index a word."""
+        for gram in _trigrams(word):
+            self._postings.setdefault(gram, set()).add(word)
+
+    def discard(self, word: str) -> None:
+        """Remove a word from the index."""
+        for gram in _trigrams(word):
+            words = self._postings.get(gram)
+            if words is not None:
+                words.discard(word)
+                if not words:
+                    del self._postings[gram]
+
+    def search(self, word: str, max_distance: int) -> list:
+        """
+        Find indexed words within max_distance edits.
+
+        The distance is lowered for short words so that the trigram filter
+        still applies: 0 edits up to 2 characters, 1 edit up to 5.
+
+        Returns:
+            list: (distance, word) tuples, unordered.
+        """
+        max_distance = min(max_distance, len(word) // 3)
+        grams = _trigrams(word)
+        # Repeated trigrams count once, so the bound uses the distinct ones
+        required = len(grams) - 3 * max_distance
+        counts = Counter()
+        if required <= 0:
+            # Too few trigrams to filter on: every word is a candidate
+            for words in self._postings.values():
+                counts.update(dict.fromkeys(words, 0))
+        for gram in grams:
+            words = self._postings.get(gram)
+            if words:
+                counts.update(words)
+        found = []
+        for candidate, shared in counts.items():
+            if shared < required or abs(len(candidate) - len(word)) > max_distance:
+                continue
+            distance = levenshtein(word, candidate, max_distance)
+            if distance <= max_distance:
+                found.append((distance, candidate))
+        return found
+
+
+class NameIndex:
+    """
+    Prefix and fuzzy search over contact names.
+
+    Names are matched by their keys, so case and Unicode spelling do not
+    matter. Prefix queries use binary search in a sorted array of (name key,
+    name) pairs, so they cost O(log n) plus the number of results. Fuzzy
+    queries count shared trigrams to pick a few candidates and only compute
+    the edit distance for those; the trigram index is built on the first
+    fuzzy query, so paging and prefix queries never pay for it.
+    """
+
+    def __init__(self) -> None:
+        self._sorted = []
+        self._names = {}
+        self._trigrams = None
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    def rebuild(self, items) -> None:
+        """Load the index from (name, phone) pairs."""
+        self.on_clear()
+        names = [name for name, _ in items]
+        self._sorted = sorted((name_key(name), name) for name in names)
+        for folded, name in self._sorted:
+            self._names.setdefault(folded, set()).add(name)
+
+    def on_set(self, name: str, old, phone) -> None:
+        """Index a newly added name; phone changes need no work."""
+        if old is None:
+            self._add(name)
+
+    def on_delete(self, name: str, old) -> None:
+        """Remove a name from the index."""
+        folded = name_key(name)
+        position = bisect_left(self._sorted, (folded, name))
+        if position < len(self._sorted) and self._sorted[position] == (folded, name):
+            del self._sorted[position]
+        names = self._names.get(folded)
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del self._names[folded]
+                if self._trigrams is not None:
+                    self._trigrams.discard(folded)
+
+    def on_clear(self) -> None:
+        """Drop every indexed name."""
+        self._sorted = []
+        self._names = {}
+        self._trigrams = None
+
+    def _add(self, name: str) -> None:
+        folded = name_key(name)
+        insort(self._sorted, (folded, name))
+        names = self._names.setdefault(folded, set())
+        if not names and self._trigrams is not None:
+            self._trigrams.add(folded)
+        names.add(name)
+
+    def prefix(self, prefix: str, limit: int = 10) -> list:
+        """
+        Find names starting with a prefix.
+
+        Args:
+            prefix (str): Case-insensitive name prefix.
+            limit (int, optional): Maximum number of names. Defaults to 10.
+
+        Returns:
+            list: Matching names in alphabetical order.
+        """
+        folded = name_key(prefix)
+        position = bisect_left(self._sorted, (folded,))
+        found = []
+        for key, name in self._sorted[position:position + limit]:
+            if not key.startswith(folded):
+                break
+            found.append(name)
+        return found
+
+    def page(self, after=None, limit: int = 50) -> list:
+        """
+        List names in index order, starting after a cursor.
+
+        Args:
+            after (str, optional): Last name of the previous page. Defaults
+                                   to None, which starts from the beginning.
+            limit (int, optional): Maximum number of names. Defaults to 50.
+
+        Returns:
+            list: Up to limit names, in alphabetical order of their keys.
+        """
+        position = 0
+        if after is not None:
+            position = bisect_right(self._sorted, (name_key(after), after))
+        return [name for _, name in self._sorted[position:position + limit]]
+
+    def fuzzy(self, query: str, max_distance: int = 2, limit: int = 10) -> list:
+        """
+        Find names within a number of typos of the query.
+
+        Args:
+            query (str): Case-insensitive name to look for.
+            max_distance (int, optional): Allowed edits, lowered for names
+                                          shorter than 6 characters. Defaults to 2.
+            limit (int, optional): Maximum number of names. Defaults to 10.
+
+        Returns:
+            list: Matching names, closest first.
+        """
+        return [key[-1] for key in self._fuzzy_keys(query, max_distance)[:limit]]
+
+    def _fuzzy_keys(self, query: str, max_distance: int) -> list:
+        """Return (1, distance, name key, name) of the fuzzy matches, closest first."""
+        if self._trigrams is None:
+            self._trigrams = _TrigramIndex()
+            for folded in self._names:
+                self._trigrams.add(folded)
+        keys = []
+        for distance, folded in sorted(self._trigrams.search(name_key(query), max_distance)):
+            keys.extend((1, distance, folded, name) for name in sorted(self._names.get(folded, ())))
+        return keys
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """
+        Find names by prefix, then fill up with fuzzy matches.
+
+        Args:
+            query (str): Case-insensitive name or name prefix.
+            limit (int, optional): Maximum number of names. Defaults to 10.
+
+        Returns:
+            list: Prefix matches first, then typo matches closest first.
+        """
+        return [key[-1] for key in self.ranked_search(query, limit)]
+
+    def ranked_search(self, query: str, limit: int = 10) -> list:
+        """
+        Search like search(), returning a sort key per match.
+
+        The keys order matches the way search() does, so the results of
+        several indexes over disjoint names (such as the shards of a
+        ShardedStore) merge into one search by sorting their keys.
+
+        Args:
+            query (str): Case-insensitive name or name prefix.
+            limit (int, optional): Maximum number of names. Defaults to 10.
+
+        Returns:
+            list: Sort keys in search order; the last item of a key is the name.
+        """
+        found = [(0, 0, name_key(name), name) for name in self.prefix(query, limit)]
+        if len(found) < limit:
+            seen = {key[-1] for key in found}
+            for key in self._fuzzy_keys(query, 2)[:limit]:
+                if key[-1] not in seen:
+                    found.append(key)
+                    if len(found) == limit:
+                        break
+        return found
+
+
+class KeyIndex:
+    """
+    Lookup of stored contact names by name key.
+
+    Any spelling of a name (see contact_names.py) finds the contact, and the
+    key of each stored name is computed once, when the contact is added, not
+    on every lookup. Should a book hold several names with one key, written
+    before names were keyed, the first one is found.
+    """
+
+    def __init__(self) -> None:
+        self._names = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def rebuild(self, items) -> None:
+        """Load the index from (name, phone) pairs."""
+        self._names = {}
+        for name, _ in items:
+            self._names.setdefault(name_key(name), name)
+
+    def on_set(self, name: str, old, phone) -> None:
+        """Index a newly added name; phone changes need no work."""
+        if old is None:
+            self._names.setdefault(name_key(name), name)
+
+    def on_delete(self, name: str, old) -> None:
+        """Forget a removed name."""
+        key = name_key(name)
+        if self._names.get(key) == name:
+            del self._names[key]
+
+    def on_clear(self) -> None:
+        """Drop every indexed name."""
+        self._names = {}
+
+    def find(self, name: str):
+        """
+        Find the stored spelling of a name.
+
+        Args:
+            name (str): Contact name in any spelling.
+
+        Returns:
+            str: The name the contact is stored under, or None if there is
+                 no such contact.
+        """
+        return self._names.get(name_key(name))
+
+
+def phone_keys(value):
+    """Return the index keys of a stored value: packed numbers, or the normalized string."""
+    try:
+        return phone_codes(value)
+    except ValueError:
+        return (normalize_phone(value),)
+
+
+def phone_key(phone: str):
+    """Return the index key of a phone number as typed, as phone_keys() would store it."""
+    try:
+        return pack_phone(phone)
+    except ValueError:
+        return normalize_phone(phone)
+
+
+class PhoneIndex:
+    """
+    Reverse lookup from phone numbers to contact names.
+
+    Numbers are keyed by their packed integer, so differently formatted
+    spellings of one number share a key, and lookups and duplicate checks
+    are a single dict access. A contact is listed under each of its phones.
+    """
+
+    def __init__(self) -> None:
+        self._owners = {}
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+    def rebuild(self, items) -> None:
+        """Load the index from (name, phones) pairs."""
+        self._owners = {}
+        for name, phones in items:
+            for key in phone_keys(phones):
+                self._owners.setdefault(key, set()).add(name)
+
+    def on_set(self, name: str, old, phones) -> None:
+        """Move a contact from its old numbers to the new ones."""
+        if old is not None:
+            self.on_delete(name, old)
+        for key in phone_keys(phones):
+            self._owners.setdefault(key, set()).add(name)
+
+    def on_delete(self, name: str, old) -> None:
+        """Forget a contact's numbers."""
+        for key in phone_keys(old):
+            names = self._owners.get(key)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._owners[key]
+
+    def on_clear(self) -> None:
+        """Drop every indexed number."""
+        self._owners = {}
+
+    def owners(self, phone: str) -> list:
+        """
+        Find the contacts that use a phone number.
+
+        Args:
+            phone (str): Phone number in any supported formatting.
+
+        Returns:
+            list: Names sorted alphabetically, empty if nobody uses it.
+        """
+        return sorted(self._owners.get(phone_key(phone), ()))
@@ -0,0 +1,190 @@
+"""
+Contact Change Journal
+
+Undo/redo history for a contact store (see contact_store.py). A ChangeJournal
+is attached to a store like a secondary index (contact_index.py) and records
+every change the store reports, as (step, name, before, after), where before
+or after is None when the contact did not exist. Changes made inside one
+step() block, such as all the contacts of an import, share a step and are
+undone together; any other change is a step of its own.
+
+The journal is a pair of deques holding at most capacity changes, so its
+memory is capped, and undoing or redoing a change is one pop and one store
+write. Whole steps fall off the old end once capacity is reached, so a step
+is always undone completely or not at all. A single step with more changes
+than capacity is not kept: the journal drops it and everything before it,
+and reports that it overflowed until the history starts over. A new change
+clears the redo side. Clearing the store, or a bulk write the store cannot
+report change by change, starts the history over.
+"""
+
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_CAPACITY = 1000
+
+
+class ChangeJournal:
+    """
+    Bounded undo/redo journal of contact changes.
+
+    Notifications arrive under the store's writer lock, so changes are
+    journaled in the order they were made. undo() and redo() take the same
+    lock while they write the recorded values back.
+
+    Args:
+        capacity (int, optional): Maximum number of changes kept for undo, and
+                                  for redo. Defaults to DEFAULT_CAPACITY.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        if capacity < 1:
+            raise ValueError("Journal capacity should be at least 1")
+        self.capacity = capacity
+        self._done = deque()
+        self._undone = deque()
+        self._dropped_step = None
+        self._steps = 0
+        self._open_step = None
+        self._step_owner = None
+        self._replaying = False
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def reset(self) -> None:
+        """Forget every change; nothing can be undone or redone afterwards."""
+        self._done.clear()
+        self._undone.clear()
+        self._dropped_step = None
+
+    @property
+    def overflowed(self) -> bool:
+        """Whether a step too large to keep was dropped since the history started."""
+        return self._dropped_step is not None
+
+    def rebuild(self, items) -> None:
+        """Start the history over; the store's contents are not journaled."""
+        self.reset()
+
+    def on_set(self, name: str, old, phones) -> None:
+        self._record(name, old, phones)
+
+    def on_delete(self, name: str, old) -> None:
+        self._record(name, old, None)
+
+    def on_clear(self) -> None:
+        self.reset()
+
+    def _record(self, name: str, before, after) -> None:
+        if self._replaying:
+            return
+        if self._open_step is not None and self._step_owner == threading.get_ident():
+            step = self._open_step
+        else:
+            self._steps += 1
+            step = self._steps
+        self._undone.clear()
+        if step == self._dropped_step:
+            return
+        self._done.append((step, name, before, after))
+        if len(self._done) > self.capacity:
+            self._drop_oldest_steps()
+
+    def _drop_oldest_steps(self) -> None:
+        """Drop whole steps from the old end until capacity is respected."""
+        while len(self._done) > self.capacity:
+            oldest = self._done[0][0]
+            if oldest == self._done[-1][0]:
+                # One step holds more changes than the journal keeps
+                self._done.clear()
+                self._dropped_step = oldest
+                return
+            while self._done[0][0] == oldest:
+                self._done.popleft()
+
+    @contextmanager
+    def step(self):
+        """Journal the changes this thread makes in a with block as one step."""
+        self._steps += 1
+        self._open_step, self._step_owner = self._steps, threading.get_ident()
+        try:
+            yield
+        finally:
+            self._open_step = self._step_owner = None
+
+    def undo(self, store, steps: int = 1) -> list:
+        """
+        Revert the most recent steps.
+
+        Args:
+            store: The store the journal is attached to.
+            steps (int, optional): Number of steps to revert. Defaults to 1.
+
+        Returns:
+            list: (name, before, after) of each reverted change, most recent
+                  first; empty if there was nothing to undo.
+        """
+        return self._replay(store, self._done, self._undone, steps, undo=True)
+
+    def redo(self, store, steps: int = 1) -> list:
+        """
+        Reapply the most recently undone steps.
+
+        Args:
+            store: The store the journal is attached to.
+            steps (int, optional): Number of steps to reapply. Defaults to 1.
+
+        Returns:
+            list: (name, before, after) of each reapplied change, in the order
+                  they are reapplied; empty if there was nothing to redo.
+        """
+        return self._replay(store, self._undone, self._done, steps, undo=False)
+
+    def _replay(self, store, source: deque, target: deque, steps: int, undo: bool) -> list:
+        """Move the last steps from source to target, writing their values to the store."""
+        changes = []
+        with store.locked():
+            self._replaying = True
+            try:
+                for _ in range(steps):
+                    if not source:
+                        break
+                    step = source[-1][0]
+                    while source and source[-1][0] == step:
+                        entry = source.pop()
+                        _, name, before, after = entry
+                        value = before if undo else after
+                        if value is None:
+                            store.pop(name, None)
+                        else:
+                            store[name] = value
+                        target.append(entry)
+                        changes.append((name, before, after))
+            finally:
+                self._replaying = False
+        return changes
+
+    def history(self, name: str, limit: int = None) -> list:
+        """
+        List the journaled changes of one contact, most recent first.
+
+        Args:
+            name (str): Contact name.
+            limit (int, optional): Maximum number of changes. Defaults to all.
+
+        Returns:
+            list: (step, before, after) tuples.
+        """
+        changes = []
+        for step, changed, before, after in reversed(self._done):
+            if changed == name:
+                changes.append((step, before, after))
+                if limit is not None and len(changes) >= limit:
+                    break
+        return changes
+
+    def stats(self) -> dict:
+        """Return the number of changes that can be undone and redone, and the capacity."""
+        return {"undo": len(self._done), "redo": len(self._undone), "capacity": self.capacity}
@@ -0,0 +1,62 @@
+"""
+Contact Names
+
+Usernames are matched by a canonical key and shown by a display name.
+
+The key is the name in Unicode NFKC normalization, case-folded and then
+normalized again, because case folding can undo NFKC. Every way of writing
+a name that a reader would take for the same name gets one key: "McDonald"
+and "MCDONALD", "Straße" and "STRASSE", a precomposed "é" and "e" with a
+combining accent, full-width letters and ligatures such as "ﬁ".
+
+The display name is the name as first entered, NFKC-normalized, so
+"McDonald" and "O'Brien" keep their capitals; a name typed all in lower
+case gets a capital first letter.
+
+Keys are cached and interned: a name that was keyed before costs one dict
+lookup instead of two normalizations, and equal keys are one string object,
+so they compare by identity in the indexes that hold them (see KeyIndex in
+contact_index.py). ASCII names skip unicodedata altogether.
+"""
+
+import sys
+from functools import lru_cache
+
+KEY_CACHE_SIZE = 65_536
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def name_key(name: str) -> str:
+    """
+    Return the canonical key of a name.
+
+    Args:
+        name (str): Contact name in any spelling.
+
+    Returns:
+        str: Interned NFKC case-folded name; names with equal keys are the
+             same contact.
+    """
+    if name.isascii():
+        return sys.intern(name.lower())
+    from unicodedata import normalize
+
+    return sys.intern(normalize("NFKC", normalize("NFKC", name).casefold()))
+
+
+def display_name(name: str) -> str:
+    """
+    Return the form a new contact's name is stored and shown in.
+
+    Args:
+        name (str): Contact name as entered.
+
+    Returns:
+        str: The NFKC-normalized name, with its first letter capitalized if
+             the name is all lower case.
+    """
+    if not name.isascii():
+        from unicodedata import normalize
+
+        name = normalize("NFKC", name)
+    return name[:1].title() + name[1:] if name.islower() else name
@@ -0,0 +1,120 @@
+"""
+Packed Phone Numbers
+
+Compact representation of the phones of a contact. A valid phone number has
+at most 15 digits once formatting is stripped, and 10**15 < 2**50, so one
+number fits in an unsigned 64-bit integer: the digit count goes in the bits
+above LENGTH_SHIFT and the digits' value in the bits below it, which keeps
+leading zeros. A contact's phones are an array('Q') of such codes, stored
+inline instead of as a list of str objects.
+
+Stores (contact_store.py) keep these arrays as their values and persist them
+with encode_phones/decode_phones; values that are plain strings are treated
+as a single phone.
+"""
+
+import sys
+from array import array
+
+# Formatting characters allowed in phone numbers, removed in one C-level pass.
+PHONE_FORMATTING = str.maketrans("", "", " \t\n\r\f\v\u00a0-()+.")
+
+MAX_DIGITS = 15
+LENGTH_SHIFT = 50
+VALUE_MASK = (1 << LENGTH_SHIFT) - 1
+
+
+def normalize_phone(phone: str) -> str:
+    """
+    Strip formatting characters from a phone number.
+
+    Args:
+        phone (str): Phone number as entered, e.g. "+1 (234) 567-8900".
+
+    Returns:
+        str: The number without spaces, hyphens, parentheses, plus signs
+             and periods, e.g. "12345678900".
+    """
+    return phone.translate(PHONE_FORMATTING)
+
+
+def pack_phone(phone: str) -> int:
+    """
+    Pack a phone number into one integer.
+
+    Args:
+        phone (str): Phone number in any supported formatting.
+
+    Returns:
+        int: Digit count << LENGTH_SHIFT | digits.
+
+    Raises:
+        ValueError: If the number has no digits, other characters, or more
+                    than MAX_DIGITS digits.
+    """
+    digits = normalize_phone(phone)
+    if not digits.isdecimal() or len(digits) > MAX_DIGITS:
+        raise ValueError(f"Cannot pack phone number {phone!r}")
+    return len(digits) << LENGTH_SHIFT | int(digits)
+
+
+def unpack_phone(code: int) -> str:
+    """Return the digits of a packed phone number."""
+    return str(code & VALUE_MASK).zfill(code >> LENGTH_SHIFT)
+
+
+def pack_phones(phones) -> array:
+    """
+    Pack phone numbers into a contact's phone array.
+
+    Args:
+        phones: Iterable of phone numbers as strings.
+
+    Returns:
+        array: array('Q') of packed numbers, in the given order.
+    """
+    return array("Q", map(pack_phone, phones))
+
+
+def phone_codes(value):
+    """Return the packed numbers of a stored value, packing a plain string."""
+    if isinstance(value, str):
+        return (pack_phone(value),)
+    return value
+
+
+def unpack_phones(value) -> list:
+    """
+    List the phone numbers of a stored value.
+
+    Args:
+        value: array('Q') of packed numbers, or a single phone string.
+
+    Returns:
+        list: Phone numbers as digit strings; a string value is returned as is.
+    """
+    if isinstance(value, str):
+        return [value]
+    return [unpack_phone(code) for code in value]
+
+
+def format_phones(value, separator: str = "; ") -> str:
+    """Join the phone numbers of a stored value for display."""
+    return separator.join(unpack_phones(value))
+
+
+def encode_phones(phones: array) -> bytes:
+    """Serialize a phone array as little-endian bytes, 8 per number."""
+    if sys.byteorder == "big":
+        phones = array("Q", phones)
+        phones.byteswap()
+    return phones.tobytes()
+
+
+def decode_phones(data: bytes) -> array:
+    """Rebuild a phone array from encode_phones output."""
+    phones = array("Q")
+    phones.frombytes(data)
+    if sys.byteorder == "big":
+        phones.byteswap()
+    return phones
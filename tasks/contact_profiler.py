@@ -0,0 +1,125 @@
+"""
+Command Profiler
+
+Runtime profiling for the contact bot (task_4). While a Profiler is running,
+every dispatched command goes through it:
+
+- "cpu" mode runs the handlers under cProfile and reports the functions with
+  the most cumulative time.
+- "memory" mode traces allocations with tracemalloc and reports the source
+  lines whose memory grew the most since profiling started.
+
+When no profile is running, dispatch only pays for one attribute check, and
+cProfile and tracemalloc are not even imported until a profile starts.
+"""
+
+import os
+import time
+
+MODES = ("cpu", "memory")
+
+
+class Profiler:
+    """
+    Profile bot commands between start() and stop().
+
+    Attributes:
+        mode (str): "cpu" or "memory" while running, None otherwise
+        commands (int): Number of commands run since start()
+    """
+
+    def __init__(self) -> None:
+        self.mode = None
+        self.commands = 0
+        self._profile = None
+        self._baseline = None
+        self._started = 0.0
+
+    def start(self, mode: str = "cpu") -> None:
+        """
+        Start profiling the following commands.
+
+        Args:
+            mode (str, optional): "cpu" or "memory". Defaults to "cpu".
+
+        Raises:
+            ValueError: If the mode is unknown.
+            RuntimeError: If a profile is already running.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode '{mode}'")
+        if self.mode is not None:
+            raise RuntimeError(f"A {self.mode} profile is already running")
+        if mode == "cpu":
+            import cProfile
+
+            self._profile = cProfile.Profile()
+        else:
+            import tracemalloc
+
+            tracemalloc.start()
+            self._baseline = tracemalloc.take_snapshot()
+        self.mode = mode
+        self.commands = 0
+        self._started = time.perf_counter()
+
+    def call(self, handler, args):
+        """Run one command handler, under cProfile in cpu mode."""
+        self.commands += 1
+        if self.mode == "cpu":
+            return self._profile.runcall(handler, args)
+        return handler(args)
+
+    def stop(self, limit: int = 15) -> list:
+        """
+        Stop profiling and summarize it.
+
+        Args:
+            limit (int, optional): Number of entries to report. Defaults to 15.
+
+        Returns:
+            list: (location, statistic) pairs, most expensive first.
+
+        Raises:
+            RuntimeError: If no profile is running.
+        """
+        if self.mode is None:
+            raise RuntimeError("No profile is running")
+        try:
+            if self.mode == "cpu":
+                return self._cpu_report(limit)
+            return self._memory_report(limit)
+        finally:
+            self.mode = None
+            self._profile = None
+            self._baseline = None
+
+    def elapsed(self) -> float:
+        """Return the seconds since start()."""
+        return time.perf_counter() - self._started
+
+    def _cpu_report(self, limit: int) -> list:
+        self._profile.create_stats()
+        entries = sorted(self._profile.stats.items(), key=lambda item: item[1][3], reverse=True)
+        rows = []
+        for (path, line, function), (_, calls, own, cumulative, _) in entries[:limit]:
+            location = f"{function} ({os.path.basename(path)}:{line})" if line else function
+            rows.append((location, f"{cumulative * 1000:.2f} ms total, {own * 1000:.2f} ms own, {calls} calls"))
+        return rows
+
+    def _memory_report(self, limit: int) -> list:
+        import tracemalloc
+
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        rows = []
+        for stat in snapshot.compare_to(self._baseline, "lineno")[:limit]:
+            frame = stat.traceback[0]
+            rows.append(
+                (
+                    f"{os.path.basename(frame.filename)}:{frame.lineno}",
+                    f"{stat.size_diff / 1024:+.1f} KiB in {stat.count_diff:+d} blocks, {stat.size / 1024:.1f} KiB now",
+                )
+            )
+        return rows
@@ -0,0 +1,160 @@
+"""
+Contact Service
+
+Serves the contact bot (task_4) over TCP with asyncio. The protocol is line
+based: a client sends one bot command per line, e.g. "phone alice", and gets
+one JSON object per line back, in request order:
+
+    {"ok": true, "code": "phone", "output": "Alice's phone is 1234567890"}
+
+Clients may pipeline any number of requests without waiting for replies.
+All connections share one event loop thread, and each command runs to
+completion without yielding to it, so access to the store is serialized
+without locks.
+
+Only commands that read or change contacts are served; file commands such as
+import and export stay local to the interactive bot.
+
+With --metrics-port, Prometheus can scrape the commands served and their
+latency from http://127.0.0.1:PORT/metrics (see metrics.py).
+
+Usage:
+    python contact_server.py [--host HOST] [--port PORT] [--db FILE]
+                             [--backend {sqlite,log,snapshot}] [--cache-size CONTACTS]
+                             [--shards N] [--metrics-port PORT] [--metrics-file FILE]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+import task_4
+from contact_store import BACKENDS, DEFAULT_CACHE_SIZE, open_store
+from metrics import add_arguments as add_metrics_arguments, export as export_metrics
+
+NETWORK_COMMANDS = frozenset(
+    ["hello", "add", "change", "addphone", "removephone", "phone", "who", "search", "all", "stats", "help"]
+)
+MAX_LINE_LENGTH = 64 * 1024
+
+
+def handle_line(line: str) -> dict:
+    """
+    Run one protocol line as a bot command.
+
+    Args:
+        line (str): Command line as sent by the client.
+
+    Returns:
+        dict: {"ok": bool, "code": str, "output": str} with the command's
+              result code and its plain text rendering.
+    """
+    command, args = task_4.parse_input(line)
+    if command not in NETWORK_COMMANDS:
+        return {"ok": False, "code": "invalid_command", "output": f"Invalid command '{command}'."}
+    result = task_4.dispatch(command, args)
+    return {"ok": result.ok, "code": result.code, "output": task_4.render_terminal(result)}
+
+
+async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """
+    Serve one connection until the client disconnects or sends 'exit'.
+
+    Replies are written as soon as each command finishes; drain() only waits
+    when the client stops reading and the transport buffer fills up.
+    """
+    try:
+        while True:
+            try:
+                raw = await reader.readline()
+            except (asyncio.LimitOverrunError, ValueError):
+                writer.write(b'{"ok": false, "output": "Request line too long."}\n')
+                break
+            if not raw:
+                break
+            line = raw.decode("utf-8", errors="replace").strip()
+            if not line:
+                continue
+            if line.lower() in ("exit", "close"):
+                break
+            writer.write(json.dumps(handle_line(line), ensure_ascii=False).encode("utf-8") + b"\n")
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def start_server(host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+    """
+    Start listening for clients.
+
+    Args:
+        host (str, optional): Interface to bind. Defaults to "127.0.0.1".
+        port (int, optional): Port to bind, 0 picks a free one. Defaults to 0.
+
+    Returns:
+        asyncio.AbstractServer: The running server.
+    """
+    task_4.set_colors(False)
+    return await asyncio.start_server(handle_client, host, port, limit=MAX_LINE_LENGTH, backlog=4096)
+
+
+async def serve(host: str, port: int) -> None:
+    """Run the server until cancelled, announcing the bound address on stdout."""
+    server = await start_server(host, port)
+    bound_host, bound_port = server.sockets[0].getsockname()[:2]
+    print(f"Listening on {bound_host}:{bound_port}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    """
+    Entry point for the contact service.
+
+    Command-line Arguments:
+        --host (str): Interface to bind, defaults to 127.0.0.1
+        --port (int): Port to bind, defaults to 8765; 0 picks a free port
+        --db (str): File to load contacts from and save them to
+        --backend (str): On-disk store format, "sqlite" (default), "log" or
+                         "snapshot"
+        --cache-size (int): Contacts kept in the LRU lookup cache in front
+                            of the on-disk store, 0 to disable it
+        --shards (int): Worker processes to split the contacts across, 1
+                        (the default) to keep them in this process
+        --metrics-port (int): Serve Prometheus metrics on this local port
+        --metrics-file (str): Write Prometheus metrics to this file on exit
+    """
+    parser = argparse.ArgumentParser(description="Contact service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default=None)
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="sqlite")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE)
+    parser.add_argument("--shards", type=int, default=1)
+    add_metrics_arguments(parser)
+    options = parser.parse_args(sys.argv[1:])
+    if options.shards < 1:
+        parser.error("--shards should be at least 1")
+
+    if options.db is not None or options.shards > 1:
+        task_4.USERS = open_store(
+            options.db, options.backend, cache_size=options.cache_size, shards=options.shards
+        )
+    try:
+        with export_metrics(options.metrics_file, options.metrics_port):
+            asyncio.run(serve(options.host, options.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        task_4.USERS.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+"""
+Sharded Contact Store
+
+For contact books too large for one process, ShardedStore hash-partitions
+usernames across worker processes. Each worker owns one ordinary store
+(contact_store.py) for its part of the book: an in-memory store, or on-disk
+files of its own named "<path>.<shard>-of-<shards>". The process that
+opens the ShardedStore is the router and talks to each worker over a pipe.
+
+- A name belongs to shard crc32(name_key(name)) % shards, the same in every
+  process and on every run, so lookups and changes of one contact, and every
+  spelling of its name (KeyIndex), go to one worker.
+- Listing, counting and searching fan out to every worker at once and merge
+  the replies: pages by name order, name searches by their rank keys
+  (NameIndex.ranked_search) and phone owners as a sorted union.
+- Bulk updates and get_many() partition their contacts and send each worker
+  its part in one message, so the workers store or look them up in
+  parallel.
+
+Requests to different shards may run concurrently from several threads;
+requests to one shard queue on its pipe. Writers are serialized by the
+router's lock, like in any other store, so the atomic check-then-set
+methods work unchanged. NameIndex, KeyIndex and PhoneIndex are kept by the
+workers next to their contacts; other indexes, such as the change journal, are kept
+by the router.
+
+A bulk update or replace_all() is atomic per shard, not across shards. Resharding is not
+supported: reopening a sharded book with another shard count is an error.
+"""
+
+import os
+import signal
+import threading
+from collections.abc import MutableMapping
+from itertools import chain
+from zlib import crc32
+
+from contact_index import KeyIndex, NameIndex, PhoneIndex
+from contact_names import name_key
+from contact_store import _IndexedStore, open_store
+
+ITEMS_BATCH = 1000
+
+
+def shard_of(name: str, shards: int) -> int:
+    """
+    Return the shard a name belongs to.
+
+    Every spelling of a name has the same name_key() and so the same shard.
+
+    Args:
+        name (str): Contact name.
+        shards (int): Number of shards.
+
+    Returns:
+        int: Shard number from 0 to shards - 1.
+    """
+    return crc32(name_key(name).encode("utf-8")) % shards
+
+
+def shard_path(path, shard: int, shards: int):
+    """Return the path of one shard's files, or None for in-memory shards."""
+    return None if path is None else f"{os.fspath(path)}.{shard}-of-{shards}"
+
+
+def _check_shard_count(path, shards: int) -> None:
+    """Refuse to open a book that was written with another shard count."""
+    import re
+
+    directory, base = os.path.split(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        return
+    pattern = re.compile(re.escape(base) + r"\.\d+-of-(\d+)")
+    for entry in os.listdir(directory or "."):
+        match = pattern.match(entry)
+        if match and int(match.group(1)) != shards:
+            raise ValueError(f"Contacts in {path} are split into {match.group(1)} shards, not {shards}")
+
+
+def _set(store, name, phone):
+    old = store.get(name)
+    store[name] = phone
+    return old
+
+
+def _index(store, index_class, options) -> None:
+    store.index_for(index_class, **options)
+
+
+_OPERATIONS = {
+    "get": lambda store, name: store.get(name),
+    "get_many": lambda store, names: [store.get(name) for name in names],
+    "set": _set,
+    "pop": lambda store, name: store.pop(name, None),
+    "len": len,
+    "page": lambda store, after, limit: store.page(after, limit),
+    "bulk_update": lambda store, items: store.bulk_update(items),
+    "replace_all": lambda store, items: store.replace_all(items),
+    "clear": lambda store: store.clear(),
+    "flush": lambda store: store.flush(),
+    "index": _index,
+    "query": lambda store, index_class, method, args: getattr(store.index_for(index_class), method)(*args),
+}
+
+
+def _serve(connection, path, backend: str, options: dict) -> None:
+    """
+    Worker process main loop: answer (operation, args) requests on a pipe.
+
+    The first reply reports whether the store opened: ("ok", persistent) or
+    ("error", exception). Every request is answered with ("ok", result) or
+    ("error", exception). The loop ends on "close" or when the router goes
+    away; the store is closed either way.
+    """
+    # Ctrl+C in the terminal reaches the whole process group; the router decides when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        store = open_store(path, backend, **options)
+    except Exception as error:
+        connection.send(("error", error))
+        return
+    connection.send(("ok", store.persistent))
+    try:
+        while True:
+            try:
+                operation, args = connection.recv()
+            except EOFError:
+                return
+            if operation == "close":
+                break
+            try:
+                reply = ("ok", _OPERATIONS[operation](store, *args))
+            except Exception as error:
+                reply = ("error", error)
+            connection.send(reply)
+    finally:
+        store.close()
+    connection.send(("ok", None))
+
+
+class ShardedStore(_IndexedStore, MutableMapping):
+    """
+    Contact store hash-partitioned across worker processes.
+
+    Args:
+        shards (int): Number of worker processes.
+        path (str, optional): Base path of the shards' files. Defaults to
+                              None, which keeps every shard in memory.
+        backend (str, optional): Store backend of each shard, as in
+                                 open_store. Defaults to "sqlite".
+        **options: Backend options passed to every shard.
+
+    Raises:
+        ValueError: If shards is less than 1, or the book at path was
+                    written with another number of shards.
+    """
+
+    def __init__(self, shards: int, path=None, backend: str = "sqlite", **options) -> None:
+        import multiprocessing
+
+        if shards < 1:
+            raise ValueError("A sharded store needs at least 1 shard")
+        if path is not None:
+            _check_shard_count(path, shards)
+        self.shards = shards
+        self._lock = threading.RLock()
+        self._indexes = []
+        self._sharded_indexes = {}
+        self._connections = []
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._processes = []
+        for shard in range(shards):
+            router_end, worker_end = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_serve,
+                args=(worker_end, shard_path(path, shard, shards), backend, options),
+                name=f"contact-shard-{shard}",
+                daemon=True,
+            )
+            process.start()
+            worker_end.close()
+            self._connections.append(router_end)
+            self._processes.append(process)
+        opened, error = [], None
+        for shard in range(shards):
+            try:
+                opened.append(self._receive(shard))
+            except Exception as failure:
+                error = error or failure
+        if error is not None:
+            self.close()
+            raise error
+        self.persistent = all(opened)
+
+    def _receive(self, shard: int):
+        """Wait for a shard's reply; re-raise the exception it reports."""
+        status, value = self._connections[shard].recv()
+        if status == "error":
+            raise value
+        return value
+
+    def _call(self, shard: int, operation: str, *args):
+        """Run one operation on one shard and return its result."""
+        with self._locks[shard]:
+            self._connections[shard].send((operation, args))
+            return self._receive(shard)
+
+    def _scatter(self, requests: dict) -> dict:
+        """
+        Send {shard: (operation, args)} requests at once and gather the results.
+
+        Every request is sent before the first reply is read, so the shards
+        work in parallel. Shard locks are taken in shard order.
+        """
+        shards = sorted(requests)
+        for shard in shards:
+            self._locks[shard].acquire()
+        try:
+            for shard in shards:
+                self._connections[shard].send(requests[shard])
+            results, error = {}, None
+            for shard in shards:
+                try:
+                    results[shard] = self._receive(shard)
+                except Exception as failure:
+                    error = error or failure
+            if error is not None:
+                raise error
+            return results
+        finally:
+            for shard in shards:
+                self._locks[shard].release()
+
+    def _fan_out(self, operation: str, *args) -> list:
+        """Run one operation on every shard; return the results in shard order."""
+        results = self._scatter({shard: (operation, args) for shard in range(self.shards)})
+        return [results[shard] for shard in range(self.shards)]
+
+    def index_for(self, index_class, **options):
+        """
+        Return the attached index of a class, attaching a new one if needed.
+
+        NameIndex, KeyIndex and PhoneIndex are attached in every shard and
+        returned as a proxy whose queries fan out; other indexes are kept by
+        the router.
+        """
+        if index_class not in SHARDED_INDEXES:
+            return super().index_for(index_class, **options)
+        with self._lock:
+            index = self._sharded_indexes.get(index_class)
+            if index is None:
+                self._fan_out("index", index_class, options)
+                index = self._sharded_indexes[index_class] = SHARDED_INDEXES[index_class](self, index_class)
+            return index
+
+    def __getitem__(self, name):
+        value = self._call(shard_of(name, self.shards), "get", name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name, phone) -> None:
+        with self._lock:
+            old = self._call(shard_of(name, self.shards), "set", name, phone)
+            for index in self._indexes:
+                index.on_set(name, old, phone)
+
+    def __delitem__(self, name) -> None:
+        with self._lock:
+            old = self._call(shard_of(name, self.shards), "pop", name)
+            if old is None:
+                raise KeyError(name)
+            for index in self._indexes:
+                index.on_delete(name, old)
+
+    def __contains__(self, name) -> bool:
+        return self._call(shard_of(name, self.shards), "get", name) is not None
+
+    def __iter__(self):
+        return (name for name, _ in self.items())
+
+    def __len__(self) -> int:
+        return sum(self._fan_out("len"))
+
+    def get_many(self, names) -> list:
+        """
+        Look many contacts up at once, in parallel across the shards.
+
+        Args:
+            names: Iterable of contact names.
+
+        Returns:
+            list: The phones of each name in order, None for unknown names.
+        """
+        names = list(names)
+        batches = {}
+        for position, name in enumerate(names):
+            batches.setdefault(shard_of(name, self.shards), []).append(position)
+        results = self._scatter(
+            {shard: ("get_many", ([names[position] for position in positions],)) for shard, positions in batches.items()}
+        )
+        values = [None] * len(names)
+        for shard, positions in batches.items():
+            for position, value in zip(positions, results[shard]):
+                values[position] = value
+        return values
+
+    def items(self):
+        """Yield every (name, phone) pair, shard by shard, one batch at a time."""
+        for shard in range(self.shards):
+            after = None
+            while True:
+                batch = self._call(shard, "page", after, ITEMS_BATCH)
+                yield from batch
+                if len(batch) < ITEMS_BATCH:
+                    break
+                after = batch[-1][0]
+
+    def page(self, after=None, limit: int = 50) -> list:
+        """
+        Return one page of contacts in name order.
+
+        Every shard returns its own next page; the merged page is the first
+        limit contacts of all of them.
+
+        Args:
+            after (str, optional): Last name of the previous page.
+            limit (int, optional): Maximum number of contacts. Defaults to 50.
+
+        Returns:
+            list: (name, phone) pairs.
+        """
+        pages = self._fan_out("page", after, limit)
+        return sorted(chain.from_iterable(pages), key=lambda item: (name_key(item[0]), item[0]))[:limit]
+
+    def bulk_update(self, items) -> int:
+        """
+        Store many contacts at once, each shard's part in parallel.
+
+        The items are partitioned first, so an exception raised while they
+        are produced leaves the store untouched. Indexes kept by the router
+        are told about each change afterwards, with the values replaced read
+        in one get_many() per shard; should a shard fail, they are rebuilt.
+
+        Args:
+            items: Iterable of (name, phone) pairs.
+
+        Returns:
+            int: Number of pairs read.
+        """
+        staged = list(items)
+        batches = {}
+        for name, phone in staged:
+            batches.setdefault(shard_of(name, self.shards), []).append((name, phone))
+        with self._lock:
+            current = {}
+            if self._indexes:
+                names = {shard: [name for name, _ in batch] for shard, batch in batches.items()}
+                found = self._scatter({shard: ("get_many", (names[shard],)) for shard in names})
+                for shard in names:
+                    current.update(zip(names[shard], found[shard]))
+            try:
+                self._scatter({shard: ("bulk_update", (batch,)) for shard, batch in batches.items()})
+            except BaseException:
+                for index in self._indexes:
+                    index.rebuild(self.items())
+                raise
+            for name, phone in staged:
+                old = current.get(name)
+                current[name] = phone
+                for index in self._indexes:
+                    index.on_set(name, old, phone)
+        return len(staged)
+
+    def replace_all(self, items) -> int:
+        """
+        Replace every contact with the given ones, each shard's part in parallel.
+
+        Every shard replaces its part in one step of its own store, so a
+        failure leaves each shard with either its old or its new contacts.
+        Indexes kept by the router are rebuilt afterwards.
+
+        Args:
+            items: Iterable of (name, phone) pairs.
+
+        Returns:
+            int: Number of pairs read.
+        """
+        batches = {shard: [] for shard in range(self.shards)}
+        count = 0
+        for name, phone in items:
+            batches[shard_of(name, self.shards)].append((name, phone))
+            count += 1
+        with self._lock:
+            try:
+                self._scatter({shard: ("replace_all", (batch,)) for shard, batch in batches.items()})
+            finally:
+                for index in self._indexes:
+                    index.rebuild(self.items())
+        return count
+
+    def clear(self) -> None:
+        with self._lock:
+            self._fan_out("clear")
+            for index in self._indexes:
+                index.on_clear()
+
+    def flush(self) -> None:
+        """Flush every shard's store."""
+        self._fan_out("flush")
+
+    def close(self) -> None:
+        """Close every shard's store and wait for the workers to exit."""
+        for shard, (connection, process) in enumerate(zip(self._connections, self._processes)):
+            with self._locks[shard]:
+                if connection.closed:
+                    continue
+                try:
+                    connection.send(("close", ()))
+                    self._receive(shard)
+                except (EOFError, OSError):
+                    pass
+                connection.close()
+            process.join()
+
+
+class _ShardedIndex:
+    """Index attached in every shard of a ShardedStore; queries fan out to all of them."""
+
+    def __init__(self, store: ShardedStore, index_class) -> None:
+        self._store = store
+        self._index_class = index_class
+
+    def _query(self, method: str, *args) -> list:
+        """Call a method of every shard's index; return the results in shard order."""
+        return self._store._fan_out("query", self._index_class, method, args)
+
+
+class ShardedNameIndex(_ShardedIndex):
+    """NameIndex queries over all the shards of a ShardedStore."""
+
+    def __len__(self) -> int:
+        return sum(self._query("__len__"))
+
+    def prefix(self, prefix: str, limit: int = 10) -> list:
+        """Find names starting with a prefix, in alphabetical order."""
+        names = chain.from_iterable(self._query("prefix", prefix, limit))
+        return sorted(names, key=lambda name: (name_key(name), name))[:limit]
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """Find names by prefix, then typo matches closest first."""
+        keys = sorted(chain.from_iterable(self._query("ranked_search", query, limit)))
+        return [key[-1] for key in keys[:limit]]
+
+
+class ShardedKeyIndex(_ShardedIndex):
+    """KeyIndex lookups over the shards of a ShardedStore."""
+
+    def __len__(self) -> int:
+        return sum(self._query("__len__"))
+
+    def find(self, name: str):
+        """Find the stored spelling of a name in the one shard that can hold it."""
+        shard = shard_of(name, self._store.shards)
+        return self._store._call(shard, "query", self._index_class, "find", (name,))
+
+
+class ShardedPhoneIndex(_ShardedIndex):
+    """PhoneIndex queries over all the shards of a ShardedStore."""
+
+    def owners(self, phone: str) -> list:
+        """Find the contacts that use a phone number, sorted alphabetically."""
+        return sorted(chain.from_iterable(self._query("owners", phone)))
+
+
+SHARDED_INDEXES = {NameIndex: ShardedNameIndex, KeyIndex: ShardedKeyIndex, PhoneIndex: ShardedPhoneIndex}
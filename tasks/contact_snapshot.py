@@ -0,0 +1,324 @@
+"""
+Contact Snapshots
+
+Compact binary snapshot format for contact books, designed to be memory
+mapped so that a book of millions of contacts can be opened without reading
+it: opening only parses the header, and each lookup binary-searches an
+offset table and decodes the one record it lands on. Lookups by name key
+and by phone binary-search two more tables the same way, so a store can
+answer KeyIndex and PhoneIndex queries without loading the book.
+
+File layout, all integers little-endian:
+
+    header     magic "CSNP", u16 version, u16 reserved, u64 count,
+               u64 offset of the table, u64 offset of the key table,
+               u64 offset of the phone table, u64 phone count
+    records    one per contact, sorted by UTF-8 name bytes:
+               u16 name length, u16 phone count, UTF-8 name,
+               u64 packed phones (see contact_phones.py)
+    table      count u64 record offsets in name order, 8-byte aligned
+    keys       one per contact, sorted by UTF-8 name key then name:
+               u64 record offset, u16 key length, UTF-8 name key
+               (see contact_names.py)
+    key table  count u64 offsets of the keys in that order, 8-byte aligned
+    phones     phone count pairs of u64 packed phone and u64 record
+               offset, sorted by phone then record offset
+
+Version 1 files have neither the last three header fields nor the key and
+phone tables; they are still read, without key and phone lookups.
+
+Snapshots are written in one pass by write_snapshot and read by Snapshot.
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+from contact_names import name_key
+from contact_phones import decode_phones, encode_phones, phone_codes
+
+MAGIC = b"CSNP"
+VERSION = 2
+VERSIONS = (1, 2)
+HEADER = struct.Struct("<4sHHQQ")
+TABLES = struct.Struct("<QQQ")
+RECORD = struct.Struct("<HH")
+KEY = struct.Struct("<QH")
+PHONE_SIZE = 8
+MAX_NAME_BYTES = 0xFFFF
+MAX_PHONES = 0xFFFF
+WRITE_CHUNK_SIZE = 1 << 20
+
+
+def _u64_bytes(values: array) -> bytes:
+    """Return an array('Q') as little-endian bytes."""
+    if sys.byteorder == "big":
+        values = array("Q", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _write_chunked(file, pieces, position: int) -> int:
+    """Write byte strings in large chunks, then pad to 8 bytes; return the end position."""
+    chunk = bytearray()
+    for piece in pieces:
+        chunk += piece
+        position += len(piece)
+        if len(chunk) >= WRITE_CHUNK_SIZE:
+            file.write(chunk)
+            chunk.clear()
+    padding = -position % PHONE_SIZE
+    chunk += bytes(padding)
+    file.write(chunk)
+    return position + padding
+
+
+def write_snapshot(file, items) -> int:
+    """
+    Write contacts to a binary file as a snapshot.
+
+    Args:
+        file: Binary file object opened for writing, positioned at its start.
+        items: Iterable of (name, phones) pairs; phones is an array('Q') of
+               packed numbers or a single phone string.
+
+    Returns:
+        int: Number of contacts written.
+
+    Raises:
+        ValueError: If a name or phone list is too long for the format, or a
+                    phone string cannot be packed.
+    """
+    entries = sorted((name.encode("utf-8"), value) for name, value in items)
+    start = HEADER.size + TABLES.size
+    file.write(bytes(start))
+    offsets = array("Q")
+    keys = []
+    codes = array("Q")
+    owners = array("Q")
+
+    def records():
+        position = start
+        for name, value in entries:
+            phones = value if isinstance(value, array) else array("Q", phone_codes(value))
+            key = name_key(name.decode("utf-8")).encode("utf-8")
+            if len(name) > MAX_NAME_BYTES or len(key) > MAX_NAME_BYTES or len(phones) > MAX_PHONES:
+                raise ValueError(f"Contact {name.decode('utf-8')!r} is too large for a snapshot")
+            offsets.append(position)
+            keys.append((key, name, position))
+            codes.extend(phones)
+            owners.extend([position] * len(phones))
+            record = RECORD.pack(len(name), len(phones)) + name + encode_phones(phones)
+            position += len(record)
+            yield record
+
+    table = _write_chunked(file, records(), start)
+    file.write(_u64_bytes(offsets))
+    keys.sort()
+    key_offsets = array("Q")
+
+    def key_entries():
+        position = table + len(offsets) * PHONE_SIZE
+        for key, _, record in keys:
+            key_offsets.append(position)
+            entry = KEY.pack(record, len(key)) + key
+            position += len(entry)
+            yield entry
+
+    key_table = _write_chunked(file, key_entries(), table + len(offsets) * PHONE_SIZE)
+    file.write(_u64_bytes(key_offsets))
+    phone_table = key_table + len(key_offsets) * PHONE_SIZE
+    phones = array("Q")
+    for index in sorted(range(len(codes)), key=codes.__getitem__):
+        phones.append(codes[index])
+        phones.append(owners[index])
+    file.write(_u64_bytes(phones))
+    file.seek(0)
+    file.write(HEADER.pack(MAGIC, VERSION, 0, len(entries), table) + TABLES.pack(key_table, phone_table, len(codes)))
+    file.seek(0, 2)
+    return len(entries)
+
+
+class Snapshot:
+    """
+    Read-only view of a snapshot file through a memory map.
+
+    Nothing but the header is read when the snapshot is opened; the pages of
+    the file are loaded by the OS as lookups touch them.
+
+    Args:
+        path: Snapshot file path.
+
+    Attributes:
+        indexed (bool): Whether the file has key and phone tables for
+                        find_key() and owners(), i.e. is not of version 1.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        ValueError: If the file is not a snapshot of a supported version.
+    """
+
+    def __init__(self, path) -> None:
+        with open(path, "rb") as file:
+            try:
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"{path} is not a contact snapshot") from None
+        if len(self._map) < HEADER.size:
+            self._map.close()
+            raise ValueError(f"{path} is not a contact snapshot")
+        magic, version, _, self._count, self._table = HEADER.unpack_from(self._map, 0)
+        self.indexed = version > 1
+        self._start = HEADER.size + (TABLES.size if self.indexed else 0)
+        key_table = phone_table = self._phone_count = 0
+        if self.indexed and self._start <= len(self._map):
+            key_table, phone_table, self._phone_count = TABLES.unpack_from(self._map, HEADER.size)
+        tables = [
+            (self._table, self._count),
+            (key_table, self._count if self.indexed else 0),
+            (phone_table, 2 * self._phone_count),
+        ]
+        if (
+            magic != MAGIC
+            or version not in VERSIONS
+            or self._start > len(self._map)
+            or any(offset + length * PHONE_SIZE > len(self._map) for offset, length in tables)
+        ):
+            self._map.close()
+            raise ValueError(f"{path} is not a contact snapshot of version {VERSION}")
+        self._views = []
+        self._offsets, self._keys, self._phones = [self._u64s(offset, length) for offset, length in tables]
+
+    def _u64s(self, offset: int, length: int):
+        """Return a sequence of length u64s at an offset, a view of the map on little-endian machines."""
+        view = memoryview(self._map)[offset:offset + length * PHONE_SIZE]
+        self._views.append(view)
+        if sys.byteorder == "little":
+            values = view.cast("Q")
+            self._views.append(values)
+        else:
+            values = array("Q", view.tobytes())
+            values.byteswap()
+        return values
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _find(self, key: bytes) -> int:
+        """Return the record offset of a UTF-8 name, or -1 if it is absent."""
+        data, offsets, unpack = self._map, self._offsets, RECORD.unpack_from
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            offset = offsets[middle]
+            start = offset + RECORD.size
+            if data[start:start + unpack(data, offset)[0]] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self._count:
+            return -1
+        offset = offsets[low]
+        start = offset + RECORD.size
+        return offset if data[start:start + unpack(data, offset)[0]] == key else -1
+
+    def get(self, name: str):
+        """
+        Look up one contact.
+
+        Args:
+            name (str): Contact name.
+
+        Returns:
+            array: The contact's packed phones, or None if it is absent.
+        """
+        offset = self._find(name.encode("utf-8"))
+        if offset < 0:
+            return None
+        name_length, phone_count = RECORD.unpack_from(self._map, offset)
+        start = offset + RECORD.size + name_length
+        return decode_phones(self._map[start:start + phone_count * PHONE_SIZE])
+
+    def __contains__(self, name) -> bool:
+        return isinstance(name, str) and self._find(name.encode("utf-8")) >= 0
+
+    def _name_at(self, offset: int) -> str:
+        """Return the name of the record at an offset."""
+        start = offset + RECORD.size
+        return self._map[start:start + RECORD.unpack_from(self._map, offset)[0]].decode("utf-8")
+
+    def find_key(self, key: str) -> list:
+        """
+        Look up the names stored under a name key.
+
+        Args:
+            key (str): Name key (see contact_names.name_key).
+
+        Returns:
+            list: The names, sorted by UTF-8 bytes; empty for version 1 files.
+        """
+        key = key.encode("utf-8")
+        data, entries, unpack = self._map, self._keys, KEY.unpack_from
+        low, high = 0, len(entries)
+        while low < high:
+            middle = (low + high) // 2
+            start = entries[middle] + KEY.size
+            if data[start:start + unpack(data, entries[middle])[1]] < key:
+                low = middle + 1
+            else:
+                high = middle
+        names = []
+        while low < len(entries):
+            record, length = unpack(data, entries[low])
+            start = entries[low] + KEY.size
+            if data[start:start + length] != key:
+                break
+            names.append(self._name_at(record))
+            low += 1
+        return names
+
+    def owners(self, code) -> list:
+        """
+        Look up the contacts that have a phone.
+
+        Args:
+            code: Packed phone number; other values have no owners.
+
+        Returns:
+            list: The names, sorted by UTF-8 bytes; empty for version 1 files.
+        """
+        if not isinstance(code, int):
+            return []
+        phones = self._phones
+        low, high = 0, self._phone_count
+        while low < high:
+            middle = (low + high) // 2
+            if phones[2 * middle] < code:
+                low = middle + 1
+            else:
+                high = middle
+        names = []
+        record = None
+        while low < self._phone_count and phones[2 * low] == code:
+            if phones[2 * low + 1] != record:
+                record = phones[2 * low + 1]
+                names.append(self._name_at(record))
+            low += 1
+        return names
+
+    def items(self):
+        """Yield (name, phones) pairs in UTF-8 name order, reading records sequentially."""
+        data, unpack = self._map, RECORD.unpack_from
+        offset = self._start
+        for _ in range(self._count):
+            name_length, phone_count = unpack(data, offset)
+            start = offset + RECORD.size
+            end = start + name_length + phone_count * PHONE_SIZE
+            yield data[start:start + name_length].decode("utf-8"), decode_phones(data[start + name_length:end])
+            offset = end
+
+    def close(self) -> None:
+        """Release the memory map."""
+        for view in reversed(self._views):
+            view.release()
+        self._map.close()
@@ -0,0 +1,1600 @@
+"""
+Contact Storage Backends
+
+Storage layer behind the contact management bot (task_4). Every backend is a
+mapping of username to phones, so the bot handlers work unchanged on top of
+any of them. The bot stores each contact's phones as an array('Q') of packed
+numbers (contact_phones.py); plain string values are kept as they are.
+Secondary indexes (contact_index.py) can be attached to any store and are
+kept up to date as contacts change.
+
+- MemoryStore keeps contacts in a plain dict and is lost on exit.
+- SQLiteStore keeps contacts in an on-disk SQLite table. Nothing is loaded at
+  startup; lookups go through the table's primary key index, name key and
+  phone lookups through indexes of their own, and writes are buffered and
+  committed in batches.
+- LogStore keeps contacts in memory and appends every change to a log file
+  that is fsynced on a group-commit interval, replayed on startup and
+  compacted into a snapshot in the background once it grows too large.
+- SnapshotStore memory-maps a binary snapshot (contact_snapshot.py) and
+  looks contacts up in it lazily; changes are kept in memory on top of it
+  and written back as a new snapshot.
+
+Any on-disk store can be wrapped in a CachedStore, a bounded LRU cache of
+recent lookups that is invalidated by every write. Books too large for one
+process can be split across worker processes with a ShardedStore
+(contact_shards.py).
+
+Modules only some backends need (sqlite3, json, pathlib) are imported when
+such a store is opened, which keeps importing this module cheap for the
+command-line tools.
+
+Every store may be shared between threads. Writers are serialized by a
+per-store lock, and insert_if_absent/update_if_present make the usual
+check-then-set sequences atomic; locked() holds the lock for any other.
+Reads from the in-memory stores take no lock at all; SQLiteStore readers share a readers-writer lock and only wait
+for a batch commit.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from array import array
+from itertools import islice
+from contact_index import KeyIndex, NameIndex, PhoneIndex, phone_key, phone_keys
+from contact_names import name_key
+from contact_phones import decode_phones, encode_phones
+from contact_snapshot import Snapshot, write_snapshot
+
+_DELETED = object()
+DEFAULT_CACHE_SIZE = 10_000
+
+
+class RWLock:
+    """
+    Readers-writer lock that lets any number of readers in at once.
+
+    Waiting writers take precedence over new readers, so a steady stream of
+    reads cannot starve them. The write side is reentrant, and the thread
+    holding it may also take the read side. Using the lock itself as a
+    context manager takes the write side.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._depth = 0
+        self._waiting_writers = 0
+
+    def acquire_read(self) -> None:
+        """Wait until no writer holds or waits for the lock, then share it."""
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._depth += 1
+                return
+            while self._writer is not None or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self) -> None:
+        """Release a shared hold."""
+        with self._cond:
+            if self._writer == threading.get_ident():
+                self._depth -= 1
+                return
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        """Wait until the lock is free, then hold it exclusively."""
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._depth += 1
+                return
+            self._waiting_writers += 1
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = me
+            self._depth = 1
+
+    def release_write(self) -> None:
+        """Release an exclusive hold."""
+        with self._cond:
+            self._depth -= 1
+            if not self._depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        """Hold the lock shared for the duration of a with block."""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    __enter__ = acquire_write
+
+    def __exit__(self, *exc_info) -> None:
+        self.release_write()
+
+
+class _IndexedStore:
+    """
+    Secondary index support shared by the stores.
+
+    Attached indexes (see contact_index.py) are notified of every change
+    made through the store's mapping methods. Stores set self._lock to the
+    lock that serializes their writers.
+
+    Stores that can look names up by key and contacts by phone in their own
+    data set self._stored_indexes to a dict and implement _find_key(key) and
+    _phone_owners(code); index_for() then returns the stand-ins of
+    STORED_INDEXES for KeyIndex and PhoneIndex instead of attaching them.
+    """
+
+    _stored_indexes = None
+
+    def attach(self, index):
+        """
+        Build an index from the current contents and keep it up to date.
+
+        Args:
+            index: Object with rebuild/on_set/on_delete/on_clear methods.
+
+        Returns:
+            The attached index.
+        """
+        with self._lock:
+            index.rebuild(self.items())
+            self._indexes.append(index)
+        return index
+
+    def index_for(self, index_class, **options):
+        """
+        Return the attached index of a class, attaching a new one if needed.
+
+        Args:
+            index_class: Index class.
+            **options: Arguments the class is instantiated with if no index
+                       of the class is attached yet.
+
+        Returns:
+            The attached index.
+        """
+        if self._stored_indexes is not None and index_class in STORED_INDEXES:
+            index = self._stored_indexes.get(index_class)
+            if index is None:
+                index = self._stored_indexes.setdefault(index_class, STORED_INDEXES[index_class](self))
+            return index
+        for index in self._indexes:
+            if type(index) is index_class:
+                return index
+        with self._lock:
+            for index in self._indexes:
+                if type(index) is index_class:
+                    return index
+            return self.attach(index_class(**options))
+
+    @contextmanager
+    def locked(self):
+        """
+        Hold the store's writer lock for the duration of a with block.
+
+        Other writers wait for the block to end, so a check and the writes
+        that depend on it are atomic, for sequences the check-then-set
+        methods below do not cover. The lock is reentrant: the store's own
+        methods may be called inside the block.
+
+        Yields:
+            The store.
+        """
+        with self._lock:
+            yield self
+
+    def insert_if_absent(self, name, phone):
+        """
+        Add a contact unless the name is already taken, atomically.
+
+        Args:
+            name (str): Contact name.
+            phone (str): Phone number to store.
+
+        Returns:
+            The phone already stored under the name, or None if the contact
+            was added.
+        """
+        with self._lock:
+            current = self.get(name)
+            if current is None:
+                self[name] = phone
+            return current
+
+    def update_if_present(self, name, phone):
+        """
+        Change a contact's phone only if the contact exists, atomically.
+
+        Args:
+            name (str): Contact name.
+            phone (str): New phone number.
+
+        Returns:
+            The phone that was replaced, or None if there is no such contact
+            and nothing was stored.
+        """
+        with self._lock:
+            current = self.get(name)
+            if current is not None:
+                self[name] = phone
+            return current
+
+    def compute_if_present(self, name, function):
+        """
+        Replace a contact's value with a function of it, atomically.
+
+        Args:
+            name (str): Contact name.
+            function: Called with the current value; returns the new value,
+                      or the current value itself to leave it unchanged.
+
+        Returns:
+            The value the function was called with, or None if there is no
+            such contact and the function was not called.
+        """
+        with self._lock:
+            current = self.get(name)
+            if current is not None:
+                new = function(current)
+                if new is not current:
+                    self[name] = new
+            return current
+
+
+class _StoredKeyIndex:
+    """KeyIndex lookups a store answers from its own data."""
+
+    def __init__(self, store) -> None:
+        self._store = store
+
+    def find(self, name: str):
+        """Find the stored spelling of a name, the first in name order if several share its key."""
+        return self._store._find_key(name_key(name))
+
+
+class _StoredPhoneIndex:
+    """PhoneIndex lookups a store answers from its own data."""
+
+    def __init__(self, store) -> None:
+        self._store = store
+
+    def owners(self, phone: str) -> list:
+        """Find the contacts that use a phone number, sorted alphabetically."""
+        return self._store._phone_owners(phone_key(phone))
+
+
+STORED_INDEXES = {KeyIndex: _StoredKeyIndex, PhoneIndex: _StoredPhoneIndex}
+
+
+class _ChangedKeys:
+    """
+    Name keys and phone keys of the contacts in a store's buffer of changes.
+
+    Lets key and phone lookups take changes that are not written yet into
+    account without scanning the buffer. Entries are only added, until the
+    buffer is emptied; each is checked against the buffer when it is used.
+    """
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        """Forget every change, once the buffer is written or dropped."""
+        self._names = {}
+        self._phones = {}
+
+    def add(self, name: str, value) -> None:
+        """Record a name set to value, or deleted if value is _DELETED."""
+        self._names.setdefault(name_key(name), set()).add(name)
+        if value is not _DELETED:
+            for code in phone_keys(value):
+                self._phones.setdefault(code, {})[name] = value
+
+    def find(self, key: str, stored, changes: dict):
+        """
+        Merge the names stored under a key with the buffered changes.
+
+        Args:
+            key (str): Name key.
+            stored: Names with the key as written, before the changes.
+            changes (dict): The buffer, name to value or _DELETED.
+
+        Returns:
+            str: The first name in name order, or None.
+        """
+        names = [name for name in stored if name not in changes]
+        names += [name for name in self._names.get(key, ()) if changes.get(name, _DELETED) is not _DELETED]
+        return min(names, default=None)
+
+    def owners(self, code, stored, changes: dict) -> list:
+        """Merge the names stored under a phone key with the buffered changes, sorted."""
+        names = {name for name in stored if name not in changes}
+        for name, value in self._phones.get(code, {}).items():
+            if changes.get(name) is value:
+                names.add(name)
+        return sorted(names)
+
+
+class MemoryStore(_IndexedStore, dict):
+    """
+    In-memory contact store.
+
+    A dict with the extra methods every backend provides. Writers hold a
+    reentrant lock so that they cannot interleave with the atomic check-then-
+    set methods or index updates; readers use the dict directly.
+    """
+
+    persistent = False
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._lock = threading.RLock()
+        super().__init__(*args, **kwargs)
+        self._indexes = []
+
+    def __setitem__(self, name, phone) -> None:
+        with self._lock:
+            if not self._indexes:
+                dict.__setitem__(self, name, phone)
+                return
+            old = dict.get(self, name)
+            dict.__setitem__(self, name, phone)
+            for index in self._indexes:
+                index.on_set(name, old, phone)
+
+    def __delitem__(self, name) -> None:
+        with self._lock:
+            old = dict.pop(self, name)
+            for index in self._indexes:
+                index.on_delete(name, old)
+
+    def pop(self, name, *default):
+        with self._lock:
+            if name not in self:
+                return dict.pop(self, name, *default)
+            old = self[name]
+            del self[name]
+            return old
+
+    def update(self, *args, **kwargs) -> None:
+        with self._lock:
+            if not self._indexes:
+                dict.update(self, *args, **kwargs)
+                return
+            for name, phone in dict(*args, **kwargs).items():
+                self[name] = phone
+
+    def setdefault(self, name, phone=None):
+        with self._lock:
+            if name not in self:
+                self[name] = phone
+            return self[name]
+
+    def clear(self) -> None:
+        with self._lock:
+            dict.clear(self)
+            for index in self._indexes:
+                index.on_clear()
+
+    def page(self, after=None, limit: int = 50) -> list:
+        """
+        Return one page of contacts in name order.
+
+        Uses the attached NameIndex (attached on first use), so each page
+        costs a binary search plus the page itself.
+
+        Args:
+            after (str, optional): Last name of the previous page.
+            limit (int, optional): Maximum number of contacts. Defaults to 50.
+
+        Returns:
+            list: (name, phone) pairs.
+        """
+        index = self.index_for(NameIndex)
+        with self._lock:
+            return [(name, dict.__getitem__(self, name)) for name in index.page(after, limit)]
+
+    def bulk_update(self, items) -> int:
+        """
+        Store many contacts at once, all or nothing.
+
+        The items are staged first, so an exception raised while they are
+        produced leaves the store untouched.
+
+        Args:
+            items: Iterable of (name, phone) pairs.
+
+        Returns:
+            int: Number of pairs read.
+        """
+        staged = {}
+        count = 0
+        for name, phone in items:
+            staged[name] = phone
+            count += 1
+        self.update(staged)
+        return count
+
+    def replace_all(self, items) -> int:
+        """
+        Replace every contact with the given ones, all or nothing.
+
+        Args:
+            items: Iterable of (name, phone) pairs.
+
+        Returns:
+            int: Number of pairs read.
+        """
+        staged = {}
+        count = 0
+        for name, phone in items:
+            staged[name] = phone
+            count += 1
+        with self._lock:
+            self.clear()
+            self.update(staged)
+        return count
+
+    def flush(self) -> None:
+        """Nothing to persist for the in-memory store."""
+
+    def close(self) -> None:
+        """Nothing to release for the in-memory store."""
+
+
+class SQLiteStore(_IndexedStore, MutableMapping):
+    """
+    On-disk contact store backed by SQLite.
+
+    Writes are kept in a pending buffer that is read through by lookups and
+    written in a single transaction once it reaches batch_size entries, when
+    the store is iterated or counted, and on flush()/close().
+
+    The connection is shared by all threads. Lookups hold an RWLock shared,
+    so they run alongside each other; writes and commits hold it exclusively.
+    Iteration reads the table in pages and releases the lock between them.
+
+    Every row also stores the name_key() of its name in a key column, indexed
+    together with the name, so pages come in the order NameIndex uses and
+    KeyIndex lookups are one index seek. A phones table lists the phone_keys()
+    of every contact for PhoneIndex lookups. Both lookups also see pending
+    writes, without committing them. Key and phones are plain data: other
+    programs can read and write the file, and rows they add or change with
+    the key set to NULL are indexed again the next time the store is opened,
+    as are the rows of files written before the key column or phones table
+    existed.
+
+    Args:
+        path (str): Database file path, created if missing.
+        batch_size (int, optional): Pending writes that trigger a commit.
+                                    Defaults to 1000.
+    """
+
+    _ITER_PAGE_SIZE = 1000
+    persistent = True
+
+    def __init__(self, path, batch_size: int = 1000) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self._pending = {}
+        self._changed = _ChangedKeys()
+        self._indexes = []
+        self._stored_indexes = {}
+        self._lock = RWLock()
+        import sqlite3
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS contacts (name TEXT PRIMARY KEY, phone TEXT NOT NULL, key TEXT) WITHOUT ROWID"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(contacts)")]
+        if "key" not in columns:
+            self._conn.execute("ALTER TABLE contacts ADD COLUMN key TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS contacts_by_key ON contacts (key, name)")
+        tables = [row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        if "phones" not in tables:
+            self._conn.execute(
+                "CREATE TABLE phones (code NOT NULL, name TEXT NOT NULL, PRIMARY KEY (code, name)) WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE INDEX phones_by_name ON phones (name)")
+            self._conn.execute("UPDATE contacts SET key = NULL")
+        self._fill_missing_keys()
+        self._conn.commit()
+
+    def _fill_missing_keys(self) -> None:
+        """Index every row whose key is NULL again, a page at a time."""
+        query = "SELECT name, phone FROM contacts WHERE key IS NULL LIMIT ?"
+        while True:
+            rows = [(name, _from_column(phone)) for name, phone in self._conn.execute(query, (self._ITER_PAGE_SIZE,))]
+            if not rows:
+                return
+            self._write(rows)
+
+    def _write(self, values) -> None:
+        """
+        Write contacts to the contacts and phones tables.
+
+        Must be called inside a transaction.
+
+        Args:
+            values: Sequence of (name, phone) pairs with distinct names; a
+                    phone of _DELETED removes the contact.
+        """
+        self._conn.executemany("DELETE FROM phones WHERE name = ?", [(name,) for name, _ in values])
+        upserts = [(name, phone) for name, phone in values if phone is not _DELETED]
+        deletes = [(name,) for name, phone in values if phone is _DELETED]
+        if upserts:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO contacts (name, phone, key) VALUES (?, ?, ?)",
+                [(name, _to_column(phone), name_key(name)) for name, phone in upserts],
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO phones (code, name) VALUES (?, ?)",
+                [(code, name) for name, phone in upserts for code in phone_keys(phone)],
+            )
+        if deletes:
+            self._conn.executemany("DELETE FROM contacts WHERE name = ?", deletes)
+
+    def _find_key(self, key: str):
+        """Answer KeyIndex.find through the (key, name) index and the pending writes."""
+        with self._lock.read():
+            stored = [name for name, in self._conn.execute("SELECT name FROM contacts WHERE key = ?", (key,))]
+            return self._changed.find(key, stored, self._pending)
+
+    def _phone_owners(self, code) -> list:
+        """Answer PhoneIndex.owners through the phones table and the pending writes."""
+        with self._lock.read():
+            stored = [name for name, in self._conn.execute("SELECT name FROM phones WHERE code = ?", (code,))]
+            return self._changed.owners(code, stored, self._pending)
+
+    def __getitem__(self, name):
+        with self._lock.read():
+            value = self._pending.get(name)
+            if value is None:
+                row = self._conn.execute("SELECT phone FROM contacts WHERE name = ?", (name,)).fetchone()
+                value = _DELETED if row is None else _from_column(row[0])
+        if value is _DELETED:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name, phone) -> None:
+        with self._lock:
+            if self._indexes:
+                old = self.get(name)
+                for index in self._indexes:
+                    index.on_set(name, old, phone)
+            self._pending[name] = phone
+            self._changed.add(name, phone)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def __delitem__(self, name) -> None:
+        with self._lock:
+            old = self[name]
+            for index in self._indexes:
+                index.on_delete(name, old)
+            self._pending[name] = _DELETED
+            self._changed.add(name, _DELETED)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def __contains__(self, name) -> bool:
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        for name, _ in self.items():
+            yield name
+
+    def __len__(self) -> int:
+        self.flush()
+        with self._lock.read():
+            return self._conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+    def items(self):
+        """Yield (name, phone) pairs ordered by name, one page query at a time."""
+        after = None
+        while True:
+            rows = self.page(after, self._ITER_PAGE_SIZE)
+            yield from rows
+            if len(rows) < self._ITER_PAGE_SIZE:
+                return
+            after = rows[-1][0]
+
+    def page(self, after=None, limit: int = 50) -> list:
+        """
+        Return one page of contacts in name order.
+
+        Seeks through the (key, name) index, so each page costs the same
+        however far into the table it is.
+
+        Args:
+            after (str, optional): Last name of the previous page.
+            limit (int, optional): Maximum number of contacts. Defaults to 50.
+
+        Returns:
+            list: (name, phone) pairs.
+        """
+        self.flush()
+        with self._lock.read():
+            if after is None:
+                query = self._conn.execute("SELECT name, phone FROM contacts ORDER BY key, name LIMIT ?", (limit,))
+            else:
+                # Spelled out rather than as a row value, which SQLite does not seek with
+                query = self._conn.execute(
+                    "SELECT name, phone FROM contacts WHERE key >= ?1 AND (key > ?1 OR name > ?2)"
+                    " ORDER BY key, name LIMIT ?3",
+                    (name_key(after), after, limit),
+                )
+            return [(name, _from_column(phone)) for name, phone in query]
+
+    def bulk_update(self, items) -> int:
+        """
+        Store many contacts in a single transaction.
+
+        Items are written a page at a time, so memory use does not grow with
+        their number. An exception raised while they are produced rolls the
+        whole transaction back. Attached indexes are told about each page of
+        changes as it is written, with the values it replaced, read in one
+        query per page and only when indexes are attached; if the transaction
+        is rolled back, they are rebuilt from the contacts left.
+
+        Args:
+            items: Iterable of (name, phone) pairs.
+
+        Returns:
+            int: Number of pairs written.
+        """
+        counter = _Counted(items)
+        with self._lock:
+            self.flush()
+            try:
+                with self._conn:
+                    for chunk in _chunks(counter, self._ITER_PAGE_SIZE):
+                        changes = self._changes_of(chunk) if self._indexes else ()
+                        self._write(list(dict(chunk).items()))
+                        for name, old, phone in changes:
+                            for index in self._indexes:
+                                index.on_set(name, old, phone)
+            except BaseException:
+                for index in self._indexes:
+                    index.rebuild(self.items())
+                raise
+        return counter.count
+
+    def _changes_of(self, chunk: list) -> list:
+        """List (name, old, phone) for a page of writes, reading the old values in one query."""
+        names = list(dict.fromkeys(name for name, _ in chunk))
+        query = f"SELECT name, phone FROM contacts WHERE name IN ({', '.join('?' * len(names))})"
+        current = {name: _from_column(phone) for name, phone in self._conn.execute(query, names)}
+        changes = []
+        for name, phone in chunk:
+            changes.append((name, current.get(name), phone))
+            current[name] = phone
+        return changes
+
+    def replace_all(self, items) -> int:
+        """
+        Replace every contact with the given ones in a single transaction.
+
+        The old contacts are deleted and the new ones written a page at a
+        time in the same transaction, so an exception raised while the
+        items are produced, or a crash, leaves the old contacts in place.
+        Attached indexes are rebuilt afterwards.
+
+        Args:
+            items: Iterable of (name, phone) pairs.
+
+        Returns:
+            int: Number of pairs written.
+        """
+        counter = _Counted(items)
+        with self._lock:
+            self.flush()
+            with self._conn:
+                self._conn.execute("DELETE FROM contacts")
+                self._conn.execute("DELETE FROM phones")
+                for chunk in _chunks(counter, self._ITER_PAGE_SIZE):
+                    self._write(list(dict(chunk).items()))
+            for index in self._indexes:
+                index.rebuild(self.items())
+        return counter.count
+
+    def clear(self) -> None:
+        """Remove every contact."""
+        with self._lock:
+            self._pending.clear()
+            self._changed.clear()
+            with self._conn:
+                self._conn.execute("DELETE FROM contacts")
+                self._conn.execute("DELETE FROM phones")
+            for index in self._indexes:
+                index.on_clear()
+
+    def flush(self) -> None:
+        """Commit all pending writes in one transaction."""
+        if not self._pending:
+            return
+        with self._lock:
+            with self._conn:
+                self._write(list(self._pending.items()))
+            self._pending.clear()
+            self._changed.clear()
+
+    def close(self) -> None:
+        """Flush pending writes and close the database."""
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+
+class LogStore(MemoryStore):
+    """
+    In-memory contact store made durable by an append-only log.
+
+    Every change is appended to "<path>.log" as one JSON line. The log is
+    fsynced after each write when sync_interval is 0, otherwise a background
+    thread fsyncs it every sync_interval seconds so concurrent writes share one
+    fsync (group commit) and at most one interval of writes can be lost.
+
+    Once the log passes compact_threshold characters it is rotated to
+    "<path>.log.old" and a background thread writes the current contents to
+    "<path>.snapshot" and removes the rotated log. Startup loads the snapshot
+    and replays the rotated log and the log on top of it; a torn last line
+    left by a crash is ignored. Should the snapshot fail to be written, the
+    error is kept in compact_error and the rotated log stays in place; the
+    next compaction appends the log to it and tries again.
+
+    Args:
+        path (str): Base path of the snapshot and log files.
+        sync_interval (float, optional): Seconds between fsyncs, 0 to fsync
+                                         every write. Defaults to 0.05.
+        compact_threshold (int, optional): Log size in characters that
+                                           triggers compaction. Defaults to 64 MiB.
+
+    Attributes:
+        compact_error (Exception): Why the last compaction failed, or None.
+    """
+
+    persistent = True
+
+    def __init__(self, path, sync_interval: float = 0.05, compact_threshold: int = 64 * 1024 * 1024) -> None:
+        from pathlib import Path
+
+        super().__init__()
+        base = Path(path)
+        self.snapshot_path = base.with_name(base.name + ".snapshot")
+        self.log_path = base.with_name(base.name + ".log")
+        self.old_log_path = base.with_name(base.name + ".log.old")
+        self.sync_interval = sync_interval
+        self.compact_threshold = compact_threshold
+        self._log_lock = threading.Lock()
+        self._dirty = False
+        self._compactor = None
+        self.compact_error = None
+        self._closed = threading.Event()
+
+        self._replay(self.snapshot_path)
+        self._replay(self.old_log_path)
+        self._replay(self.log_path)
+        if self.old_log_path.exists():
+            # A compaction was interrupted: everything replayed so far goes
+            # into a new snapshot before the logs are dropped.
+            self._write_snapshot(dict(self))
+            self.log_path.write_text("", encoding="utf-8")
+        self._log = open(self.log_path, "a", encoding="utf-8")
+        self._log_size = self._log.tell()
+
+        self._syncer = None
+        if sync_interval > 0:
+            self._syncer = threading.Thread(target=self._sync_loop, name="contact-log-sync", daemon=True)
+            self._syncer.start()
+
+    def _replay(self, path) -> None:
+        """Apply the records of a snapshot or log file, if it exists."""
+        try:
+            file = open(path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with file:
+            for line in file:
+                try:
+                    op, *args = _decode_record(line)
+                except ValueError:
+                    break  # torn write at the end of the file
+                if op == "set":
+                    dict.__setitem__(self, args[0], _from_json(args[1]))
+                elif op == "del":
+                    dict.pop(self, args[0], None)
+                elif op == "clear":
+                    dict.clear(self)
+                elif op == "replace":
+                    dict.clear(self)
+                    dict.update(self, ((name, _from_json(phone)) for name, phone in args[0]))
+
+    def _append(self, record: list) -> None:
+        """Append one record to the log, syncing as configured."""
+        self._append_lines([_encode_record(record)])
+
+    def _append_lines(self, lines: list) -> None:
+        """Append encoded records with a single write and at most one fsync."""
+        data = "".join(lines)
+        with self._log_lock:
+            self._log.write(data)
+            self._log_size += len(data)
+            if self.sync_interval > 0:
+                self._dirty = True
+            else:
+                self._log.flush()
+                os.fsync(self._log.fileno())
+
+    def _compact_if_large(self) -> None:
+        """
+        Start a compaction once the log passes the threshold.
+
+        Writers call this after applying their change to the mapping, so the
+        snapshot includes the records that made the log too large.
+        """
+        with self._log_lock:
+            if self._log_size >= self.compact_threshold and self._compactor is None:
+                self._rotate_and_compact()
+
+    def __setitem__(self, name, phone) -> None:
+        with self._lock:
+            self._append(["set", name, _to_json(phone)])
+            super().__setitem__(name, phone)
+            self._compact_if_large()
+
+    def __delitem__(self, name) -> None:
+        with self._lock:
+            if name not in self:
+                raise KeyError(name)
+            self._append(["del", name])
+            super().__delitem__(name)
+            self._compact_if_large()
+
+    def update(self, *args, **kwargs) -> None:
+        with self._lock:
+            for name, phone in dict(*args, **kwargs).items():
+                self[name] = phone
+
+    def bulk_update(self, items) -> int:
+        """
+        Store many contacts with one log write and one fsync.
+
+        Args:
+            items: Iterable of (name, phone) pairs.
+
+        Returns:
+            int: Number of pairs read.
+        """
+        staged = {}
+        count = 0
+        for name, phone in items:
+            staged[name] = phone
+            count += 1
+        lines = [_encode_record(["set", name, _to_json(phone)]) for name, phone in staged.items()]
+        with self._lock:
+            self._append_lines(lines)
+            if self._indexes:
+                for name, phone in staged.items():
+                    MemoryStore.__setitem__(self, name, phone)
+            else:
+                dict.update(self, staged)
+            self._compact_if_large()
+        return count
+
+    def replace_all(self, items) -> int:
+        """
+        Replace every contact with the given ones, all or nothing.
+
+        The new contacts are logged as a single record, so replay finds all
+        of them or, if a crash tore the record, none.
+
+        Args:
+            items: Iterable of (name, phone) pairs.
+
+        Returns:
+            int: Number of pairs read.
+        """
+        staged = {}
+        count = 0
+        for name, phone in items:
+            staged[name] = phone
+            count += 1
+        record = _encode_record(["replace", [[name, _to_json(phone)] for name, phone in staged.items()]])
+        with self._lock:
+            self._append_lines([record])
+            MemoryStore.clear(self)
+            if self._indexes:
+                for name, phone in staged.items():
+                    MemoryStore.__setitem__(self, name, phone)
+            else:
+                dict.update(self, staged)
+            self._compact_if_large()
+        return count
+
+    def clear(self) -> None:
+        with self._lock:
+            self._append(["clear"])
+            super().clear()
+            self._compact_if_large()
+
+    def _sync_loop(self) -> None:
+        """Group commit: fsync buffered writes once per interval."""
+        while not self._closed.wait(self.sync_interval):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered log records and fsync them."""
+        with self._log_lock:
+            if self._dirty and not self._log.closed:
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self._dirty = False
+
+    def _rotate_and_compact(self) -> None:
+        """
+        Move the log aside and write a snapshot of the current contents.
+
+        Must be called with the store and log locks held, after the change
+        being logged was applied. Records appended after the rotation go to
+        a fresh log, so writers only wait for the rename and the dict
+        copy, not for the snapshot to be written.
+
+        A rotated log left by a failed compaction holds records that are in
+        no snapshot yet, so the log is appended to it instead of replacing
+        it. A crash before the log is emptied replays its records twice,
+        which leaves the same contents.
+        """
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self._log.close()
+        if self.old_log_path.exists():
+            with open(self.log_path, "rb") as log, open(self.old_log_path, "ab") as old_log:
+                old_log.write(log.read())
+                old_log.flush()
+                os.fsync(old_log.fileno())
+            self._log = open(self.log_path, "w", encoding="utf-8")
+        else:
+            os.replace(self.log_path, self.old_log_path)
+            self._log = open(self.log_path, "a", encoding="utf-8")
+        self._log_size = 0
+        self._dirty = False
+        self._compactor = threading.Thread(
+            target=self._compact, args=(dict(self),), name="contact-log-compact", daemon=True
+        )
+        self._compactor.start()
+
+    def _compact(self, contents: dict) -> None:
+        """Compactor thread: write the snapshot, keeping any error in compact_error."""
+        try:
+            self._write_snapshot(contents)
+            self.compact_error = None
+        except Exception as error:
+            self.compact_error = error
+        finally:
+            self._compactor = None
+
+    def _write_snapshot(self, contents: dict) -> None:
+        """Atomically replace the snapshot, then drop the rotated log."""
+        tmp_path = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                for name, phone in contents.items():
+                    file.write(_encode_record(["set", name, _to_json(phone)]))
+                file.flush()
+                os.fsync(file.fileno())
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        os.replace(tmp_path, self.snapshot_path)
+        _fsync_dir(self.snapshot_path.parent)
+        self.old_log_path.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        """Stop background threads, fsync the log and close it."""
+        self._closed.set()
+        if self._syncer is not None:
+            self._syncer.join()
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        self._dirty = True
+        self.flush()
+        self._log.close()
+
+
+class SnapshotStore(_IndexedStore, MutableMapping):
+    """
+    Contact store backed by a memory-mapped binary snapshot.
+
+    Opening the store maps the snapshot file and reads only its header, so
+    startup costs the same for any number of contacts; lookups binary-search
+    the mapped file. Changes go to an in-memory overlay on top of the
+    snapshot, and save() writes the combined contents as a new snapshot,
+    which flush() and close() do when autosave is set. KeyIndex and
+    PhoneIndex lookups binary-search the snapshot's key and phone tables
+    and check the overlay, so they load nothing either; a version 1
+    snapshot, which has no such tables, gets in-memory indexes instead.
+
+    Writers hold a reentrant lock; readers take no lock, but for key and
+    phone lookups.
+
+    Args:
+        path (str): Snapshot file path. A missing file opens an empty store.
+        autosave (bool, optional): Write changes back to path on flush() and
+                                   close(). Defaults to True.
+
+    Raises:
+        ValueError: If the file exists but is not a contact snapshot.
+    """
+
+    def __init__(self, path, autosave: bool = True) -> None:
+        self.path = path
+        self.autosave = autosave
+        self._lock = threading.RLock()
+        self._indexes = []
+        self._changes = {}
+        self._added = 0
+        self._dirty = False
+        self._changed = _ChangedKeys()
+        try:
+            self._snapshot = Snapshot(path)
+        except FileNotFoundError:
+            self._snapshot = None
+        if self._snapshot is None or self._snapshot.indexed:
+            self._stored_indexes = {}
+
+    @property
+    def persistent(self) -> bool:
+        """Whether changes outlive the process, i.e. autosave is set."""
+        return self.autosave
+
+    def _base_get(self, name):
+        return None if self._snapshot is None else self._snapshot.get(name)
+
+    def _find_key(self, key: str):
+        """Answer KeyIndex.find through the snapshot's key table and the overlay."""
+        with self._lock:
+            stored = [] if self._snapshot is None else self._snapshot.find_key(key)
+            return self._changed.find(key, stored, self._changes)
+
+    def _phone_owners(self, code) -> list:
+        """Answer PhoneIndex.owners through the snapshot's phone table and the overlay."""
+        with self._lock:
+            stored = [] if self._snapshot is None else self._snapshot.owners(code)
+            return self._changed.owners(code, stored, self._changes)
+
+    def __getitem__(self, name):
+        value = self._changes.get(name)
+        if value is None:
+            value = self._base_get(name)
+            if value is None:
+                raise KeyError(name)
+        elif value is _DELETED:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name, phone) -> None:
+        with self._lock:
+            old = self.get(name)
+            self._changes[name] = phone
+            self._changed.add(name, phone)
+            self._dirty = True
+            if old is None:
+                self._added += 1
+            for index in self._indexes:
+                index.on_set(name, old, phone)
+
+    def __delitem__(self, name) -> None:
+        with self._lock:
+            old = self[name]
+            self._changes[name] = _DELETED
+            self._changed.add(name, _DELETED)
+            self._dirty = True
+            self._added -= 1
+            for index in self._indexes:
+                index.on_delete(name, old)
+
+    def __contains__(self, name) -> bool:
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return (0 if self._snapshot is None else len(self._snapshot)) + self._added
+
+    def __iter__(self):
+        for name, _ in self.items():
+            yield name
+
+    def items(self):
+        """Yield (name, phone) pairs: the snapshot's unchanged contacts, then changed ones."""
+        changes = dict(self._changes)
+        if self._snapshot is not None:
+            for name, phone in self._snapshot.items():
+                if name not in changes:
+                    yield name, phone
+        for name, phone in changes.items():
+            if phone is not _DELETED:
+                yield name, phone
+
+    def page(self, after=None, limit: int = 50) -> list:
+        """
+        Return one page of contacts in name order.
+
+        Uses the attached NameIndex (attached on first use, which reads every
+        name in the snapshot once).
+
+        Args:
+            after (str, optional): Last name of the previous page.
+            limit (int, optional): Maximum number of contacts. Defaults to 50.
+
+        Returns:
+            list: (name, phone) pairs.
+        """
+        index = self.index_for(NameIndex)
+        with self._lock:
+            return [(name, self[name]) for name in index.page(after, limit)]
+
+    def bulk_update(self, items) -> int:
+        """
+        Store many contacts at once, all or nothing.
+
+        Args:
+            items: Iterable of (name, phone) pairs.
+
+        Returns:
+            int: Number of pairs read.
+        """
+        staged = {}
+        count = 0
+        for name, phone in items:
+            staged[name] = phone
+            count += 1
+        with self._lock:
+            for name, phone in staged.items():
+                self[name] = phone
+        return count
+
+    def replace_all(self, items) -> int:
+        """
+        Replace every contact with the given ones, all or nothing.
+
+        Args:
+            items: Iterable of (name, phone) pairs.
+
+        Returns:
+            int: Number of pairs read.
+        """
+        staged = {}
+        count = 0
+        for name, phone in items:
+            staged[name] = phone
+            count += 1
+        with self._lock:
+            self.clear()
+            for name, phone in staged.items():
+                self[name] = phone
+        return count
+
+    def clear(self) -> None:
+        """Remove every contact."""
+        with self._lock:
+            self._snapshot = None
+            self._changes = {}
+            self._changed.clear()
+            self._added = 0
+            self._dirty = True
+            for index in self._indexes:
+                index.on_clear()
+
+    def save(self, path=None) -> int:
+        """
+        Write the current contents as a snapshot.
+
+        Saving to the store's own path maps the new file and empties the
+        overlay. The previous mapping is left to be released once unused, so
+        lock-free readers never see it closed.
+
+        Args:
+            path (str, optional): Destination. Defaults to the store's path.
+
+        Returns:
+            int: Number of contacts written.
+        """
+        path = self.path if path is None else path
+        with self._lock:
+            count = save_snapshot(path, self.items())
+            if os.path.abspath(path) == os.path.abspath(self.path):
+                self._snapshot = Snapshot(path)
+                self._changes = {}
+                self._changed.clear()
+                self._added = 0
+                self._dirty = False
+            return count
+
+    def flush(self) -> None:
+        """Save the changes made since the last save, if autosave is set."""
+        if self.autosave and self._dirty:
+            self.save()
+
+    def close(self) -> None:
+        """Flush and release the memory map."""
+        with self._lock:
+            self.flush()
+            if self._snapshot is not None:
+                self._snapshot.close()
+                self._snapshot = None
+
+
+class CachedStore(_IndexedStore, MutableMapping):
+    """
+    Bounded LRU cache of lookups in front of another store.
+
+    Lookups are answered from the cache when possible, including lookups of
+    names that do not exist; misses read the wrapped store and cache the
+    result, evicting the least recently used entry once capacity is reached.
+    Writes go straight to the wrapped store and invalidate the name's entry,
+    and bulk updates or clear() empty the cache. KeyIndex lookups, which
+    every command that names a contact makes, are cached the same way, by
+    name key, and a write invalidates its name's key. Listing, paging and
+    other indexes are served by the wrapped store directly.
+
+    Writers share the wrapped store's lock, so the atomic check-then-set
+    methods stay atomic. A separate lock guards the cache itself; a miss that
+    raced with a write is answered but not cached.
+
+    Args:
+        store: The store to cache lookups of.
+        capacity (int, optional): Maximum number of cached names. Defaults to
+                                  DEFAULT_CACHE_SIZE.
+
+    Attributes:
+        hits, misses, evictions, invalidations (int): Cache counters.
+    """
+
+    def __init__(self, store, capacity: int = DEFAULT_CACHE_SIZE) -> None:
+        if capacity < 1:
+            raise ValueError("Cache capacity should be at least 1")
+        self.store = store
+        self.capacity = capacity
+        self._lock = store._lock
+        self._cache = OrderedDict()
+        self._keys = OrderedDict()
+        self._key_index = _CachedKeyIndex(self)
+        self._cache_lock = threading.Lock()
+        self._generation = 0
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    @property
+    def persistent(self) -> bool:
+        """Whether the wrapped store outlives the process."""
+        return self.store.persistent
+
+    def attach(self, index):
+        return self.store.attach(index)
+
+    def index_for(self, index_class, **options):
+        if index_class is KeyIndex:
+            return self._key_index
+        return self.store.index_for(index_class, **options)
+
+    def _find_key(self, name: str):
+        """Answer KeyIndex.find from the key cache, asking the wrapped store on a miss."""
+        key = name_key(name)
+        with self._cache_lock:
+            found = self._keys.get(key)
+            if found is not None:
+                self._keys.move_to_end(key)
+                return None if found is _DELETED else found
+            generation = self._generation
+        found = self.store.index_for(KeyIndex).find(name)
+        with self._cache_lock:
+            if generation == self._generation:
+                self._keys[key] = _DELETED if found is None else found
+                if len(self._keys) > self.capacity:
+                    self._keys.popitem(last=False)
+        return found
+
+    def __getitem__(self, name):
+        with self._cache_lock:
+            value = self._cache.get(name)
+            if value is not None:
+                self._cache.move_to_end(name)
+                self.hits += 1
+                if value is _DELETED:
+                    raise KeyError(name)
+                return value
+            self.misses += 1
+            generation = self._generation
+        value = self.store.get(name)
+        with self._cache_lock:
+            if generation == self._generation:
+                self._cache[name] = _DELETED if value is None else value
+                if len(self._cache) > self.capacity:
+                    self._cache.popitem(last=False)
+                    self.evictions += 1
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def _invalidate(self, name=None) -> None:
+        """Drop one name and its key from the cache, or every entry if no name is given."""
+        with self._cache_lock:
+            self._generation += 1
+            if name is None:
+                self.invalidations += len(self._cache)
+                self._cache.clear()
+                self._keys.clear()
+            else:
+                if self._cache.pop(name, None) is not None:
+                    self.invalidations += 1
+                self._keys.pop(name_key(name), None)
+
+    def __setitem__(self, name, phone) -> None:
+        with self._lock:
+            self.store[name] = phone
+            self._invalidate(name)
+
+    def __delitem__(self, name) -> None:
+        with self._lock:
+            try:
+                del self.store[name]
+            finally:
+                self._invalidate(name)
+
+    def __contains__(self, name) -> bool:
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self.store)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def items(self):
+        """Yield the wrapped store's (name, phone) pairs, bypassing the cache."""
+        return self.store.items()
+
+    def page(self, after=None, limit: int = 50) -> list:
+        """Return one page of contacts in name order from the wrapped store."""
+        return self.store.page(after, limit)
+
+    def bulk_update(self, items) -> int:
+        """Store many contacts through the wrapped store and empty the cache."""
+        with self._lock:
+            try:
+                return self.store.bulk_update(items)
+            finally:
+                self._invalidate()
+
+    def replace_all(self, items) -> int:
+        """Replace every contact through the wrapped store and empty the cache."""
+        with self._lock:
+            try:
+                return self.store.replace_all(items)
+            finally:
+                self._invalidate()
+
+    def clear(self) -> None:
+        """Remove every contact and empty the cache."""
+        with self._lock:
+            self.store.clear()
+            self._invalidate()
+
+    def stats(self) -> dict:
+        """
+        Report the cache counters.
+
+        Returns:
+            dict: size, capacity, hits, misses, evictions, invalidations and
+                  hit_rate (hits per lookup, 0.0 before the first lookup).
+        """
+        with self._cache_lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def flush(self) -> None:
+        """Flush the wrapped store."""
+        self.store.flush()
+
+    def close(self) -> None:
+        """Close the wrapped store and empty the cache."""
+        self.store.close()
+        self._invalidate()
+
+
+class _CachedKeyIndex:
+    """KeyIndex lookups through a CachedStore's key cache."""
+
+    def __init__(self, store: CachedStore) -> None:
+        self._store = store
+
+    def find(self, name: str):
+        """Find the stored spelling of a name."""
+        return self._store._find_key(name)
+
+
+def _to_column(value):
+    """Encode a value for the phone column: phone arrays as BLOBs, strings as text."""
+    return encode_phones(value) if isinstance(value, array) else value
+
+
+def _from_column(value):
+    """Decode a phone column value written by _to_column."""
+    return decode_phones(value) if isinstance(value, bytes) else value
+
+
+def _to_json(value):
+    """Encode a value for a log record: phone arrays as lists of packed numbers."""
+    return value.tolist() if isinstance(value, array) else value
+
+
+def _from_json(value):
+    """Decode a log record value written by _to_json."""
+    return array("Q", value) if isinstance(value, list) else value
+
+
+def _encode_record(record: list) -> str:
+    """Encode a log record as one JSON line."""
+    import json
+
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def _decode_record(line: str) -> list:
+    """Decode a log line written by _encode_record; raises ValueError if it is torn."""
+    import json
+
+    return json.loads(line)
+
+
+def _chunks(items, size: int):
+    """Yield lists of up to size items from an iterator."""
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class _Counted:
+    """Iterator wrapper that counts the items it passes through."""
+
+    def __init__(self, items) -> None:
+        self._items = iter(items)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self._items)
+        self.count += 1
+        return item
+
+
+def save_snapshot(path, items) -> int:
+    """
+    Atomically write contacts to a binary snapshot file.
+
+    The snapshot is written to a temporary file, fsynced and renamed over
+    the destination, so readers that have the old file mapped keep seeing it.
+
+    Args:
+        path (str): Snapshot file path.
+        items: Iterable of (name, phone) pairs.
+
+    Returns:
+        int: Number of contacts written.
+
+    Raises:
+        ValueError: If a contact cannot be stored in a snapshot.
+    """
+    path = os.fspath(path)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as file:
+            count = write_snapshot(file, items)
+            file.flush()
+            os.fsync(file.fileno())
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    _fsync_dir(os.path.dirname(os.path.abspath(path)))
+    return count
+
+
+def _fsync_dir(path) -> None:
+    """Persist a rename by syncing its directory where the OS supports it."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+BACKENDS = {"sqlite": SQLiteStore, "log": LogStore, "snapshot": SnapshotStore}
+
+
+def open_store(path=None, backend: str = "sqlite", cache_size: int = 0, shards: int = 1, **options):
+    """
+    Open the contact store for a path.
+
+    Args:
+        path (str, optional): Database file (sqlite), base path of the
+                              snapshot and log files (log) or binary snapshot
+                              file (snapshot). Defaults to None, which opens
+                              an in-memory store.
+        backend (str, optional): "sqlite", "log" or "snapshot". Defaults to
+                                 "sqlite".
+        cache_size (int, optional): Capacity of an LRU lookup cache put in
+                                    front of an on-disk store, 0 for none.
+                                    Defaults to 0.
+        shards (int, optional): Number of worker processes to split the
+                                contacts across (see contact_shards.py), 1
+                                to keep them in this process. Defaults to 1.
+        **options: Backend options such as batch_size or sync_interval.
+
+    Returns:
+        MemoryStore, SQLiteStore, LogStore, SnapshotStore or ShardedStore,
+        wrapped in a CachedStore when cache_size is set
+
+    Raises:
+        ValueError: If the backend name is unknown.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown contact store backend '{backend}'")
+    if shards > 1:
+        from contact_shards import ShardedStore
+
+        store = ShardedStore(shards, path, backend, **options)
+    elif path is None:
+        return MemoryStore()
+    else:
+        store = BACKENDS[backend](path, **options)
+    return CachedStore(store, cache_size) if cache_size > 0 else store
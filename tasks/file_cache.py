@@ -0,0 +1,303 @@
+"""
+File Result Cache
+
+Memoizes what a loader function computes from a file, such as total_salary
+(task_1) or get_cats_info (task_2), for as long as the file is unchanged.
+
+A result is stored with the fingerprint of the file it came from: its
+absolute path, size, st_mtime_ns and inode. Every lookup stats the file and
+returns the cached result only if the fingerprint still matches, so a file
+that is rewritten, appended to, touched or replaced by a rename is loaded
+again; the cost of a hit is one stat() call. Each path has one entry, a
+stale one is replaced, and the least recently used entries are evicted
+beyond the capacity.
+
+With a directory, results are also pickled there, one file per path, so
+they survive restarts and are shared by processes that use the same
+directory. The directory is trusted like any pickle: only point it at a
+directory the user owns. The disk layer is bounded too, dropping the files
+least recently read.
+
+Files that do not exist are never cached: the loader is called and reports
+them as usual. A hit does not run the loader, so it prints nothing, not even
+the malformed-line warnings of the first load.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from metrics import METRICS
+
+DEFAULT_CAPACITY = 256
+DEFAULT_DISK_CAPACITY = 4096
+
+_LOOKUPS = METRICS.counter("tasks_file_cache_lookups_total", "File result cache lookups", ["cache", "result"])
+
+
+def fingerprint(path) -> tuple:
+    """
+    Identify a file's current contents without reading it.
+
+    Args:
+        path (str or Path): File to fingerprint.
+
+    Returns:
+        tuple: (absolute path, size, st_mtime_ns, inode).
+
+    Raises:
+        OSError: If the file cannot be stat()ed, e.g. FileNotFoundError.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    return path, stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+class FileCache:
+    """
+    Bounded LRU cache of a loader's results, keyed by file fingerprint.
+
+    Loaders run outside the cache lock, so slow loads of different files
+    overlap. A result is only cached if the file's fingerprint is the same
+    after the load as before it, so a file changed during the load is not
+    cached with the wrong contents.
+
+    Args:
+        loader: Function of a path whose result is cached.
+        capacity (int, optional): Maximum number of results kept in memory.
+                                  Defaults to DEFAULT_CAPACITY.
+        directory (str, optional): Directory to also keep results in, as
+                                   pickles. Defaults to None, memory only.
+        disk_capacity (int, optional): Maximum number of results kept in the
+                                       directory. Defaults to DEFAULT_DISK_CAPACITY.
+        copy (optional): Function applied to results on their way out, so
+                         callers that change a result do not change the
+                         cached one. Defaults to None, for immutable results.
+        name (str, optional): Cache name in the metrics. Defaults to the
+                              loader's name.
+
+    Attributes:
+        hits, disk_hits, misses, evictions, invalidations (int): Cache
+            counters; disk_hits are misses of the memory layer answered by
+            the directory, invalidations are entries found stale.
+    """
+
+    def __init__(
+        self,
+        loader,
+        capacity: int = DEFAULT_CAPACITY,
+        directory=None,
+        disk_capacity: int = DEFAULT_DISK_CAPACITY,
+        copy=None,
+        name=None,
+    ) -> None:
+        if capacity < 1 or disk_capacity < 1:
+            raise ValueError("Cache capacity should be at least 1")
+        self.loader = loader
+        self.capacity = capacity
+        self.directory = None if directory is None else os.fspath(directory)
+        self.disk_capacity = disk_capacity
+        self.copy = copy
+        self.name = name or loader.__name__
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = self.evictions = self.invalidations = 0
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, path):
+        """
+        Return the loader's result for a file, from the cache while it is unchanged.
+
+        Args:
+            path (str or Path): File to load.
+
+        Returns:
+            Whatever the loader returns for the file.
+        """
+        try:
+            before = fingerprint(path)
+        except OSError:
+            return self.loader(path)
+        key = before[0]
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                if entry[0] == before:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    self._count("hit")
+                    return self._out(entry[1])
+                del self._cache[key]
+                self.invalidations += 1
+
+        entry = self._read_disk(key, before)
+        if entry is not None:
+            self._remember(key, entry)
+            with self._lock:
+                self.disk_hits += 1
+            self._count("disk_hit")
+            return self._out(entry[1])
+
+        with self._lock:
+            self.misses += 1
+        self._count("miss")
+        result = self.loader(path)
+        try:
+            unchanged = fingerprint(path) == before
+        except OSError:
+            unchanged = False
+        if unchanged:
+            self._remember(key, (before, result))
+            self._write_disk(key, (before, result))
+        return self._out(result)
+
+    __call__ = get
+
+    def _out(self, result):
+        """Return a result as callers get it, copied if the cache has a copy function."""
+        return result if self.copy is None else self.copy(result)
+
+    def _count(self, result: str) -> None:
+        """Count a lookup in the metrics, if they are enabled."""
+        if METRICS.enabled:
+            _LOOKUPS.labels(self.name, result).inc()
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        """Keep an entry in memory, evicting the least recently used beyond capacity."""
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        """Return the pickle file of a path in the cache directory."""
+        digest = hashlib.sha256(f"{self.name}\0{key}".encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.pickle")
+
+    def _read_disk(self, key: str, current: tuple):
+        """Return the directory's entry for a path if it matches the fingerprint, else None."""
+        if self.directory is None:
+            return None
+        import pickle
+
+        disk_path = self._disk_path(key)
+        try:
+            with open(disk_path, "rb") as file:
+                entry = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            self._remove(disk_path)
+            return None
+        if entry[0] != current:
+            with self._lock:
+                self.invalidations += 1
+            self._remove(disk_path)
+            return None
+        try:
+            os.utime(disk_path)
+        except OSError:
+            pass
+        return entry
+
+    def _write_disk(self, key: str, entry: tuple) -> None:
+        """Pickle an entry into the directory, dropping the least recently read beyond capacity."""
+        if self.directory is None:
+            return
+        import pickle
+
+        disk_path = self._disk_path(key)
+        temporary = f"{disk_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporary, "wb") as file:
+                pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, disk_path)
+        except (OSError, pickle.PicklingError):
+            self._remove(temporary)
+            return
+        self._trim_disk()
+
+    def _trim_disk(self) -> None:
+        """Remove the least recently read pickles while the directory holds too many."""
+        try:
+            with os.scandir(self.directory) as iterator:
+                files = [entry for entry in iterator if entry.name.endswith(".pickle")]
+        except OSError:
+            return
+        excess = len(files) - self.disk_capacity
+        if excess <= 0:
+            return
+        files.sort(key=_modified)
+        for entry in files[:excess]:
+            self._remove(entry.path)
+            with self._lock:
+                self.evictions += 1
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        """Delete a file if it is still there."""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def invalidate(self, path=None) -> None:
+        """
+        Drop one file's result, or every result if no path is given.
+
+        Args:
+            path (str or Path, optional): File whose result to drop.
+        """
+        if path is None:
+            with self._lock:
+                self.invalidations += len(self._cache)
+                self._cache.clear()
+            if self.directory is not None:
+                with os.scandir(self.directory) as iterator:
+                    for entry in iterator:
+                        if entry.name.endswith(".pickle"):
+                            self._remove(entry.path)
+            return
+        key = os.path.abspath(path)
+        with self._lock:
+            if self._cache.pop(key, None) is not None:
+                self.invalidations += 1
+        if self.directory is not None:
+            self._remove(self._disk_path(key))
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters and size.
+
+        Returns:
+            dict: hits, disk_hits, misses, evictions, invalidations, size,
+                  capacity and hit_rate, the share of lookups answered
+                  without running the loader.
+        """
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._cache),
+                "capacity": self.capacity,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+def _modified(entry: os.DirEntry) -> int:
+    """Sort key for cache files, least recently read first."""
+    try:
+        return entry.stat().st_mtime_ns
+    except OSError:
+        return 0
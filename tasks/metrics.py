@@ -0,0 +1,484 @@
+"""
+Runtime Metrics
+
+A small metrics registry shared by the tasks: counters, histograms and
+timers (histograms of seconds), optionally split by labels, exported in the
+Prometheus text format to a file or over HTTP at /metrics.
+
+Metrics are declared once at import, on the shared METRICS registry, and
+bound to their label values up front where those are fixed:
+
+    ROWS = METRICS.counter("tasks_rows_parsed_total", "Rows read", ["task"]).labels("salary")
+
+Collection is off until a process asks for it (see export()). Instrumented
+code checks METRICS.enabled once per call and adds up what it measured, so
+a disabled registry costs one attribute check per file, walk or command,
+not per row. When enabled, each update takes a lock, so threads may share
+the metrics.
+
+Metrics recorded by the tasks:
+    tasks_rows_parsed_total{task}           lines read from CSV files
+    tasks_rows_malformed_total{task}        lines skipped as malformed
+    tasks_bytes_read_total{task}            bytes read from CSV files
+    tasks_file_read_seconds{task}           time to read one CSV file
+    tasks_tree_entries_total                directory entries walked
+    tasks_tree_directories_total            directories listed
+    tasks_tree_errors_total{error}          directories that could not be listed
+    tasks_tree_walk_seconds                 time of one tree walk
+    tasks_commands_total{command,outcome}   bot commands served, outcome ok/error
+    tasks_command_seconds{command}          latency of bot commands
+"""
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value) -> str:
+    """Format a sample value as Prometheus expects it."""
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: tuple, values: tuple) -> str:
+    """Return the {name="value",...} part of a sample, empty without labels."""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _CounterValue:
+    """Value of a counter for one set of label values."""
+
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1) -> None:
+        """
+        Add to the counter.
+
+        Args:
+            amount (int or float, optional): Non-negative increment. Defaults to 1.
+
+        Raises:
+            ValueError: If the amount is negative.
+        """
+        if amount < 0:
+            raise ValueError("Counters can only go up")
+        with self._lock:
+            self.value += amount
+
+    def reset(self) -> None:
+        with self._lock:
+            self.value = 0
+
+    def state(self):
+        return self.value
+
+    def merge(self, state) -> None:
+        self.inc(state)
+
+
+class _HistogramValue:
+    """Bucket counts, sum and count of a histogram for one set of label values."""
+
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: tuple) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value) -> None:
+        """
+        Record one observation.
+
+        Args:
+            value (int or float): Observed value, e.g. seconds for a timer.
+        """
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        """Observe the seconds spent in a with block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = [0] * (len(self.bounds) + 1)
+            self.sum = 0.0
+            self.count = 0
+
+    def state(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def merge(self, state) -> None:
+        counts, total, count = state
+        with self._lock:
+            self.counts = [mine + theirs for mine, theirs in zip(self.counts, counts)]
+            self.sum += total
+            self.count += count
+
+
+class _Metric:
+    """A named metric family with one value per set of label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names=()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """
+        Return the value for one set of label values, creating it on first use.
+
+        Args:
+            *values: One value per label name, in declaration order.
+
+        Returns:
+            The counter or histogram value to update.
+
+        Raises:
+            ValueError: If the number of values does not match the label names.
+        """
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {values}")
+        key = tuple(str(value) for value in values)
+        value = self._values.get(key)
+        if value is None:
+            with self._lock:
+                value = self._values.setdefault(key, self._new_value())
+        return value
+
+    def reset(self) -> None:
+        """Set all values back to zero; values bound with labels() stay valid."""
+        for value in list(self._values.values()):
+            value.reset()
+
+    def _new_value(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        """Yield (name suffix, extra labels, label values, value) tuples."""
+        raise NotImplementedError
+
+    def render(self) -> list:
+        """Return the lines of this family in the Prometheus text format."""
+        help_text = self.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+        lines = [f"# HELP {self.name} {help_text}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, extra, values, value in self._samples():
+            names = self.label_names + tuple(name for name, _ in extra)
+            values = values + tuple(label for _, label in extra)
+            lines.append(f"{self.name}{suffix}{_label_text(names, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """A value that only goes up, such as rows read or commands served."""
+
+    kind = "counter"
+
+    def _new_value(self):
+        return _CounterValue()
+
+    def inc(self, amount=1) -> None:
+        """Add to a counter without labels."""
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for values, counter in sorted(self._values.items()):
+            yield "", (), values, counter.value
+
+
+class Histogram(_Metric):
+    """Observations counted into buckets, such as rows per file."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names=(), buckets=DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_value(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value) -> None:
+        """Record an observation of a histogram without labels."""
+        self.labels().observe(value)
+
+    def time(self):
+        """Observe the seconds spent in a with block, for a histogram without labels."""
+        return self.labels().time()
+
+    def _samples(self):
+        for values, histogram in sorted(self._values.items()):
+            counts, total, count = histogram.state()
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield "_bucket", (("le", _format_value(float(bound))),), values, cumulative
+            yield "_sum", (), values, total
+            yield "_count", (), values, count
+
+
+class Timer(Histogram):
+    """A histogram of durations in seconds, with buckets from 100 µs to 10 s."""
+
+    def __init__(self, name: str, documentation: str, label_names=(), buckets=LATENCY_BUCKETS) -> None:
+        super().__init__(name, documentation, label_names, buckets)
+
+
+class Registry:
+    """
+    A set of metrics that are exported together.
+
+    Attributes:
+        enabled (bool): Whether instrumented code should record anything;
+                        False until export() or the caller turns it on.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, label_names, **options):
+        """Return the metric of that name, declaring it on first use."""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, label_names, **options)
+            elif type(metric) is not cls or metric.label_names != tuple(label_names):
+                raise ValueError(f"Metric {name} is already declared as another {metric.kind} or labels")
+            return metric
+
+    def counter(self, name: str, documentation: str, label_names=()) -> Counter:
+        """
+        Declare a counter, or return the one already declared under that name.
+
+        Args:
+            name (str): Metric name, ending in _total by convention.
+            documentation (str): One line describing the metric.
+            label_names (optional): Names of the labels that split the metric.
+
+        Returns:
+            Counter: The counter.
+
+        Raises:
+            ValueError: If the name is taken by another kind of metric or labels.
+        """
+        return self._register(Counter, name, documentation, label_names)
+
+    def histogram(self, name: str, documentation: str, label_names=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        """Declare a histogram with the given bucket upper bounds, like counter()."""
+        return self._register(Histogram, name, documentation, label_names, buckets=buckets)
+
+    def timer(self, name: str, documentation: str, label_names=(), buckets=LATENCY_BUCKETS) -> Timer:
+        """Declare a timer, a histogram of seconds ending in _seconds by convention, like counter()."""
+        return self._register(Timer, name, documentation, label_names, buckets=buckets)
+
+    def get(self, name: str):
+        """Return the metric declared under a name, or None."""
+        return self._metrics.get(name)
+
+    def reset(self) -> None:
+        """Set every recorded value back to zero; the metrics stay declared."""
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+    def render(self) -> str:
+        """
+        Return all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Families in declaration order, ending with a newline.
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path) -> None:
+        """
+        Write the metrics to a file, e.g. for node_exporter's textfile collector.
+
+        The file is replaced atomically, so a scraper never sees half of it.
+
+        Args:
+            path (str or Path): File to write.
+        """
+        temporary = f"{os.fspath(path)}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(self.render())
+        os.replace(temporary, path)
+
+    def serve(self, port: int = 0, host: str = "127.0.0.1"):
+        """
+        Serve the metrics over HTTP at /metrics from a background thread.
+
+        Args:
+            port (int, optional): Port to bind, 0 picks a free one. Defaults to 0.
+            host (str, optional): Interface to bind. Defaults to "127.0.0.1".
+
+        Returns:
+            http.server.ThreadingHTTPServer: The running server; its
+            server_address holds the bound port, shutdown() stops it.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
+
+    def snapshot(self) -> dict:
+        """
+        Return the recorded values, to be merged into another process's registry.
+
+        Returns:
+            dict: Picklable {name: {label values: state}} mapping.
+        """
+        return {
+            name: {values: value.state() for values, value in list(metric._values.items())}
+            for name, metric in list(self._metrics.items())
+        }
+
+    def merge(self, snapshot: dict) -> None:
+        """
+        Add the values of a snapshot() taken in another process.
+
+        Args:
+            snapshot (dict): Result of snapshot() on a registry declaring the
+                             same metrics.
+        """
+        for name, values in snapshot.items():
+            metric = self._metrics.get(name)
+            if metric is None:
+                continue
+            for labels, state in values.items():
+                metric.labels(*labels).merge(state)
+
+
+METRICS = Registry()
+
+
+def add_arguments(parser) -> None:
+    """Add the --metrics-file and --metrics-port options to an argparse parser."""
+    parser.add_argument(
+        "--metrics-file", default=None, help="Write Prometheus metrics to this file on exit"
+    )
+    parser.add_argument(
+        "--metrics-port", type=int, default=None, help="Serve Prometheus metrics on this local port, 0 for any"
+    )
+
+
+@contextmanager
+def export(path=None, port=None, registry=METRICS):
+    """
+    Collect metrics for the duration of a with block and export them.
+
+    Nothing is enabled unless a file or a port is given. The previous enabled
+    state is restored afterwards, so exports can nest.
+
+    Args:
+        path (str, optional): File to write the metrics to when the block ends.
+        port (int, optional): Local port to serve /metrics on while the block
+                              runs, 0 for any free port; the address is
+                              announced on stderr.
+        registry (Registry, optional): Registry to export. Defaults to METRICS.
+
+    Yields:
+        ThreadingHTTPServer or None: The metrics server, if a port was given.
+    """
+    if path is None and port is None:
+        yield None
+        return
+    was_enabled = registry.enabled
+    registry.enabled = True
+    server = None
+    try:
+        if port is not None:
+            server = registry.serve(port)
+            host, bound_port = server.server_address[:2]
+            print(f"Metrics on http://{host}:{bound_port}/metrics", file=sys.stderr, flush=True)
+        yield server
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        if path is not None:
+            registry.write(path)
+        registry.enabled = was_enabled
+
+
+_ROWS_PARSED = METRICS.counter("tasks_rows_parsed_total", "Lines read from CSV files", ["task"])
+_ROWS_MALFORMED = METRICS.counter("tasks_rows_malformed_total", "Lines of CSV files skipped as malformed", ["task"])
+_BYTES_READ = METRICS.counter("tasks_bytes_read_total", "Bytes read from CSV files", ["task"])
+_FILE_SECONDS = METRICS.timer("tasks_file_read_seconds", "Time to read one CSV file", ["task"])
+
+
+def record_file_read(task: str, rows: int, malformed: int, size: int, seconds: float) -> None:
+    """
+    Record one CSV file read by a task, for the shared file metrics.
+
+    Args:
+        task (str): Task label, e.g. "salary" or "cats".
+        rows (int): Lines read.
+        malformed (int): Lines skipped as malformed.
+        size (int): Bytes read.
+        seconds (float): Time spent reading.
+    """
+    _ROWS_PARSED.labels(task).inc(rows)
+    _ROWS_MALFORMED.labels(task).inc(malformed)
+    _BYTES_READ.labels(task).inc(size)
+    _FILE_SECONDS.labels(task).observe(seconds)
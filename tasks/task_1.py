@@ -1,5 +1,9 @@
+import math
+import time
 from decimal import ROUND_HALF_UP, Decimal
 from pathlib import Path
+from file_cache import FileCache
+from metrics import METRICS, record_file_read
 
 
 def _format_number(value):
@@ -15,23 +19,32 @@ def _format_number(value):
     return Decimal(value).quantize(Decimal("0.00"), rounding=ROUND_HALF_UP)
 
 
-def _parse_salary_line(line, line_number):
+def _parse_salary_line(line, line_number, on_malformed=None):
     """
     Parse a single salary line from CSV format.
 
-    Expects format: "name,salary" where salary is a numeric value.
+    Expects format: "name,salary" where salary is a finite numeric value;
+    "nan" and "inf" are malformed, as they cannot be totalled.
 
     Args:
         line (str): CSV line to parse
         line_number (int): Line number for error reporting
+        on_malformed (optional): Called with the line number of a malformed
+                                 line instead of printing the error
 
     Returns:
         float or None: Salary value if valid, None if line is malformed
     """
     try:
         _, salary = line.strip().split(",")
-        return float(salary)
+        salary = float(salary)
+        if not math.isfinite(salary):
+            raise ValueError(salary)
+        return salary
     except ValueError:
+        if on_malformed is not None:
+            on_malformed(line_number)
+            return None
         print(
             f"Error: Line {line_number} is malformed or has wrong data, so ignored until it is fixed. "
             "Please check this line and fix its values to include them into processing."
@@ -39,6 +52,45 @@ def _parse_salary_line(line, line_number):
         return None
 
 
+def salary_stats(path, on_malformed=None):
+    """
+    Sum the valid salaries of a CSV file.
+
+    Reads a CSV file with format "name,salary". Invalid lines are reported
+    with their line numbers and skipped. The raw sum and count of several
+    files can be added up before rounding, e.g. by the unified CLI (cli.py)
+    aggregating many files in parallel. When metrics are enabled (see
+    metrics.py), the lines, malformed lines and bytes read are recorded.
+
+    Args:
+        path (str): Path to the CSV file containing salary data
+        on_malformed (optional): Called with the line number of each invalid
+                                 line instead of printing it, e.g. to report
+                                 it elsewhere
+
+    Returns:
+        tuple: (total, employees_count) of the valid salaries, total as a float
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    started = time.perf_counter()
+    total = 0
+    employees_count = 0
+    line_number = 0
+    with Path(path).open("r") as file:
+        for line_number, line in enumerate(file, start=1):
+            salary = _parse_salary_line(line, line_number, on_malformed)
+            if salary is not None:
+                total += salary
+                employees_count += 1
+        if METRICS.enabled:
+            record_file_read(
+                "salary", line_number, line_number - employees_count, file.buffer.tell(), time.perf_counter() - started
+            )
+    return total, employees_count
+
+
 def total_salary(path):
     """
     Calculate total and average salary from a CSV file.
@@ -57,21 +109,34 @@ def total_salary(path):
         tuple: (total_salary, average_salary) as Decimal values with 2 decimal places
                Returns (None, None) if file is not found
     """
-    total = 0
-    employees_count = 0
-
     try:
-        with Path(path).open("r") as file:
-            for line_number, line in enumerate(file, start=1):
-                salary = _parse_salary_line(line, line_number)
-                if salary is not None:
-                    total += salary
-                    employees_count += 1
-
-        if employees_count == 0:
-            return Decimal("0.00"), Decimal("0.00")
-
-        return _format_number(total), _format_number(total / employees_count)
+        total, employees_count = salary_stats(path)
     except FileNotFoundError:
         print(f"Error: File {path} was not found.")
         return None, None
+
+    if employees_count == 0:
+        return Decimal("0.00"), Decimal("0.00")
+
+    return _format_number(total), _format_number(total / employees_count)
+
+
+SALARY_CACHE = FileCache(total_salary, name="salary")
+
+
+def cached_total_salary(path):
+    """
+    Calculate total and average salary like total_salary, remembering the result.
+
+    Results are kept in SALARY_CACHE (see file_cache.py) and returned without
+    reading the file again until its size, modification time or inode
+    changes. Assign a FileCache with a directory to SALARY_CACHE to keep
+    results across restarts.
+
+    Args:
+        path (str): Path to the CSV file containing salary data
+
+    Returns:
+        tuple: (total_salary, average_salary) as from total_salary
+    """
+    return SALARY_CACHE.get(path)
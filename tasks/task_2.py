@@ -1,7 +1,10 @@
+import time
 from pathlib import Path
+from file_cache import FileCache
+from metrics import METRICS, record_file_read
 
 
-def _parse_cat_line(line, line_number):
+def _parse_cat_line(line, line_number, on_malformed=None):
     """
     Parse a single cat record line from CSV format.
 
@@ -10,6 +13,8 @@ def _parse_cat_line(line, line_number):
     Args:
         line (str): CSV line to parse
         line_number (int): Line number for error reporting
+        on_malformed (optional): Called with the line number of a malformed
+                                 line instead of printing the error
 
     Returns:
         dict or None: Dictionary with keys 'id', 'name', 'age' if valid,
@@ -19,6 +24,9 @@ def _parse_cat_line(line, line_number):
         id, name, age = line.strip().split(",")
         return {"id": id, "name": name, "age": int(age)}
     except ValueError:
+        if on_malformed is not None:
+            on_malformed(line_number)
+            return None
         print(
             f"Error: Line {line_number} is malformed or has wrong data, so ignored until it is fixed. "
             "Please check this line and fix its values to include them into processing."
@@ -26,6 +34,45 @@ def _parse_cat_line(line, line_number):
         return None
 
 
+def iter_cats(path, on_malformed=None):
+    """
+    Stream cat records from a CSV file.
+
+    Reads a CSV file with format "id,name,age" one line at a time, so large
+    files are never held in memory. Invalid lines are reported with their
+    line numbers and skipped. When metrics are enabled (see metrics.py), the
+    lines, malformed lines and bytes read are recorded once the file is
+    done with, even if the caller stops early.
+
+    Args:
+        path (str): Path to the CSV file containing cat data
+        on_malformed (optional): Called with the line number of each invalid
+                                 line instead of printing it, e.g. to report
+                                 it elsewhere
+
+    Yields:
+        dict: Cat record with 'id', 'name', and 'age' keys
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    started = time.perf_counter()
+    line_number = 0
+    cats_count = 0
+    with Path(path).open("r") as file:
+        try:
+            for line_number, line in enumerate(file, start=1):
+                cat = _parse_cat_line(line, line_number, on_malformed)
+                if cat:
+                    cats_count += 1
+                    yield cat
+        finally:
+            if METRICS.enabled:
+                record_file_read(
+                    "cats", line_number, line_number - cats_count, file.buffer.tell(), time.perf_counter() - started
+                )
+
+
 def get_cats_info(path):
     """
     Read cat information from a CSV file and return as a list of dictionaries.
@@ -40,15 +87,33 @@ def get_cats_info(path):
         list: List of dictionaries, each containing 'id', 'name', and 'age' keys.
               Returns empty list if file is not found or no valid records exist.
     """
-    cats = []
     try:
-        with Path(path).open("r") as file:
-            for line_number, line in enumerate(file, start=1):
-                cat = _parse_cat_line(line, line_number)
-                if cat:
-                    cats.append(cat)
-        return cats
+        return list(iter_cats(path))
     except FileNotFoundError:
         print(f"Error: File {path} was not found.")
-        return cats
-    
\ No newline at end of file
+        return []
+
+
+def _copy_cats(cats):
+    """Copy a cached list of cat records so callers cannot change the cached one."""
+    return [dict(cat) for cat in cats]
+
+
+CATS_CACHE = FileCache(get_cats_info, copy=_copy_cats, name="cats")
+
+
+def cached_cats_info(path):
+    """
+    Read cat information like get_cats_info, remembering the result.
+
+    Results are kept in CATS_CACHE (see file_cache.py) and returned without
+    reading the file again until its size, modification time or inode
+    changes. Every call gets its own copy of the records.
+
+    Args:
+        path (str): Path to the CSV file containing cat data
+
+    Returns:
+        list: List of dictionaries, as from get_cats_info
+    """
+    return CATS_CACHE.get(path)
@@ -4,63 +4,816 @@ Directory Tree Visualizer
 This module provides functionality to recursively display a directory structure
 in a color-coded tree format. Directories are shown in green and files in red.
 
+In watch mode the tree is rendered once and kept in memory; filesystem change
+notifications (inotify on Linux, directory mtime polling elsewhere) are applied
+to that model and only the changed subtrees are printed again.
+
+Modules only some runs need (argparse, shlex, heapq for --stats, and ctypes,
+struct and select for inotify) are imported on first use, so importing this
+module stays cheap. Colors are used only when output goes to a terminal.
+
 Usage:
-    python task_3.py <directory_path>
+    python task_3.py [directory_path] [--watch] [--interval SECONDS] [--stats]
+                    [--resume-from PATH] [--metrics-file FILE] [--metrics-port PORT]
 """
 
-from pathlib import Path
+import os
 import sys
-from colorama import Fore
+import time
+from pathlib import Path
+from console_colors import CYAN, GREEN, RED, init_console
+from metrics import METRICS, add_arguments as add_metrics_arguments, export as export_metrics
+
+_ENTRIES = METRICS.counter("tasks_tree_entries_total", "Directory entries walked")
+_DIRECTORIES = METRICS.counter("tasks_tree_directories_total", "Directories listed")
+_ERRORS = METRICS.counter("tasks_tree_errors_total", "Directories that could not be listed", ["error"])
+_WALK_SECONDS = METRICS.timer("tasks_tree_walk_seconds", "Time of one tree walk")
+
+DIR_COLOR = GREEN
+FILE_COLOR = RED
+CHANGE_COLOR = CYAN
+
+
+def set_colors(enabled: bool) -> None:
+    """
+    Turn colored output on or off.
+
+    Args:
+        enabled (bool): False to print plain text, e.g. when output is not a terminal.
+    """
+    global DIR_COLOR, FILE_COLOR, CHANGE_COLOR
+    DIR_COLOR = GREEN if enabled else ""
+    FILE_COLOR = RED if enabled else ""
+    CHANGE_COLOR = CYAN if enabled else ""
+
 
+def _print_entry(name: str, is_dir: bool, indent: str) -> None:
+    """
+    Print a single tree entry, directories in green and files in red.
 
-def iterate_dir(path: Path, indent: str = "") -> None:
+    Args:
+        name (str): Entry name to print.
+        is_dir (bool): True if the entry is a directory.
+        indent (str): Indentation prefix for the entry's depth.
+    """
+    print(DIR_COLOR if is_dir else FILE_COLOR, indent, "", name)
+
+
+class TraversalInterrupted(KeyboardInterrupt):
+    """
+    Raised when a walk is interrupted, carrying the path to resume from.
+
+    Attributes:
+        path (str): Entry that was being processed when the walk stopped.
+    """
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        self.path = path
+
+
+def iterate_dir(path: Path, indent: str = "", stats=None, resume_from=None) -> list:
     """
     Recursively iterate through a directory and print its structure.
 
     This function walks through all entries in the given directory path,
     printing directories in green and files in red with appropriate indentation
-    to represent the tree structure.
+    to represent the tree structure. Entries are visited in name order.
+
+    Subdirectories that cannot be read (permission denied, removed during the
+    walk, ...) are skipped and reported in the returned list instead of
+    aborting the whole walk.
+
+    When metrics are enabled (see metrics.py), the walk is instrumented and
+    its counts are recorded there too.
 
     Args:
         path (Path): The directory path to iterate through.
         indent (str, optional): String used for indentation to show hierarchy.
                                Defaults to empty string. Each level adds "."
+        stats (TraversalStats, optional): Collects syscall counts and per-directory
+                               timings. When omitted the uninstrumented walk runs.
+        resume_from (str or Path, optional): Entry to continue an interrupted
+                               walk from, absolute or relative to path. Entries
+                               ordered before it are skipped.
 
     Returns:
-        None
+        list: (directory, OSError) tuples for every skipped subdirectory.
 
     Raises:
-        PermissionError: If access to a directory is denied.
-        OSError: For other file system related errors.
+        FileNotFoundError: If the root directory does not exist.
+        PermissionError: If access to the root directory is denied.
+        TraversalInterrupted: If the walk is interrupted with Ctrl+C.
+    """
+    root = os.fspath(path)
+    if stats is None and METRICS.enabled:
+        stats = TraversalStats()
+    walk = _walk if stats is None else _walk_instrumented
+    errors = []
+    if stats is not None:
+        before = stats.counts()
+        stats.start()
+    try:
+        if resume_from is None:
+            walk(root, indent, errors, stats, strict=True)
+        else:
+            _resume_walk(root, indent, _resume_parts(path, resume_from), walk, errors, stats)
+    finally:
+        if stats is not None:
+            stats.stop()
+            if METRICS.enabled:
+                _record_walk(stats, before)
+    return errors
+
+
+def _record_walk(stats, before: tuple) -> None:
+    """Add what one walk counted, the stats minus their counts() before it, to the tree metrics."""
+    entries, directories, errors, elapsed = before
+    _record_tree(
+        stats.entries - entries,
+        stats.scandir_calls - directories,
+        {name: count - errors.get(name, 0) for name, count in stats.errors.items()},
+        stats.elapsed - elapsed,
+    )
+
+
+def _record_tree(entries: int, directories: int, errors: dict, seconds: float) -> None:
+    """Record one tree walk in the tree metrics."""
+    _ENTRIES.inc(entries)
+    _DIRECTORIES.inc(directories)
+    for name, count in errors.items():
+        if count:
+            _ERRORS.labels(name).inc(count)
+    _WALK_SECONDS.observe(seconds)
+
+
+def _resume_parts(path: Path, resume_from) -> tuple:
+    """Split a resume path into name components relative to the walk root."""
+    resume_from = Path(resume_from)
+    try:
+        return resume_from.relative_to(path).parts
+    except ValueError:
+        return resume_from.parts
+
+
+def _entry_name(entry: os.DirEntry) -> str:
+    """Sort key for directory entries."""
+    return entry.name
+
+
+def _interrupted(interrupt: KeyboardInterrupt, path: str) -> TraversalInterrupted:
+    """Attach the innermost path being walked to a keyboard interrupt."""
+    if isinstance(interrupt, TraversalInterrupted):
+        return interrupt
+    return TraversalInterrupted(path)
+
+
+def _walk(path: str, indent: str, errors: list, stats=None, strict: bool = False) -> None:
+    """Print a directory subtree using scandir's cached entry types."""
+    current = path
+    try:
+        try:
+            with os.scandir(path) as iterator:
+                entries = sorted(iterator, key=_entry_name)
+        except OSError as error:
+            if strict:
+                raise
+            errors.append((path, error))
+            return
+        for entry in entries:
+            current = entry.path
+            if entry.is_dir():
+                _print_entry(entry.name, True, indent)
+                _walk(entry.path, indent + ".", errors)
+            elif entry.is_file():
+                _print_entry(entry.name, False, indent)
+    except KeyboardInterrupt as interrupt:
+        raise _interrupted(interrupt, current)
+
+
+def _walk_instrumented(path: str, indent: str, errors: list, stats, strict: bool = False) -> None:
+    """Same walk as _walk, recording calls and self-time for every directory."""
+    current = path
+    try:
+        started = time.perf_counter()
+        stats.scandir_calls += 1
+        try:
+            with os.scandir(path) as iterator:
+                entries = sorted(iterator, key=_entry_name)
+        except OSError as error:
+            stats.record_error(path, error)
+            if strict:
+                raise
+            errors.append((path, error))
+            return
+        elapsed = time.perf_counter() - started
+
+        for entry in entries:
+            current = entry.path
+            started = time.perf_counter()
+            stats.stat_calls += 1
+            is_dir = entry.is_dir()
+            is_file = False
+            if not is_dir:
+                stats.stat_calls += 1
+                is_file = entry.is_file()
+            elapsed += time.perf_counter() - started
+            stats.entries += 1
+            if is_dir:
+                _print_entry(entry.name, True, indent)
+                _walk_instrumented(entry.path, indent + ".", errors, stats)
+            elif is_file:
+                _print_entry(entry.name, False, indent)
+
+        stats.record_dir(path, elapsed)
+    except KeyboardInterrupt as interrupt:
+        raise _interrupted(interrupt, current)
+
+
+def _resume_walk(path: str, indent: str, parts: tuple, walk, errors: list, stats, strict: bool = True) -> None:
+    """
+    Walk only the part of a tree ordered after the resume path.
+
+    Directories on the way to the resume path were printed by the interrupted
+    run, so they are descended into without being printed again.
+    """
+    if not parts:
+        walk(path, indent, errors, stats, strict=strict)
+        return
+    head, rest = parts[0], parts[1:]
+    current = path
+    try:
+        if stats is not None:
+            stats.scandir_calls += 1
+        try:
+            with os.scandir(path) as iterator:
+                entries = sorted(iterator, key=_entry_name)
+        except OSError as error:
+            if stats is not None:
+                stats.record_error(path, error)
+            if strict:
+                raise
+            errors.append((path, error))
+            return
+        for entry in entries:
+            if entry.name < head:
+                continue
+            current = entry.path
+            is_dir = entry.is_dir()
+            if entry.name == head and rest and is_dir:
+                _resume_walk(entry.path, indent + ".", rest, walk, errors, stats, strict=False)
+                continue
+            if stats is not None:
+                stats.entries += 1
+            if is_dir:
+                _print_entry(entry.name, True, indent)
+                walk(entry.path, indent + ".", errors, stats)
+            elif entry.is_file():
+                _print_entry(entry.name, False, indent)
+    except KeyboardInterrupt as interrupt:
+        raise _interrupted(interrupt, current)
+
+
+def walk_tree(path, errors=None):
+    """
+    Lazily walk a directory tree in the order iterate_dir prints it.
+
+    Nothing is printed: entries are yielded one at a time, so a consumer
+    such as a pipeline stage of the unified CLI (cli.py) can start on the
+    first files while the rest of the tree is still being read. The walk
+    keeps one sorted directory listing per level, like iterate_dir, and
+    uses an explicit stack instead of recursion. When metrics are enabled
+    (see metrics.py), the walk is recorded once it ends or is closed.
+
+    Args:
+        path (str or Path): The directory to walk.
+        errors (list, optional): Receives (directory, OSError) tuples for
+                                 subdirectories that cannot be read; they
+                                 are skipped either way.
+
+    Yields:
+        tuple: (path, name, depth, is_dir) of every directory and file,
+               depth 0 for the entries of the root.
+
+    Raises:
+        FileNotFoundError: If the root directory does not exist.
+        PermissionError: If access to the root directory is denied.
+    """
+    started = time.perf_counter()
+    with os.scandir(path) as iterator:
+        stack = [(iter(sorted(iterator, key=_entry_name)), 0)]
+    entries_count = 0
+    scandir_calls = 1
+    failures = {}
+    try:
+        while stack:
+            entries, depth = stack[-1]
+            entry = next(entries, None)
+            if entry is None:
+                stack.pop()
+                continue
+            entries_count += 1
+            if entry.is_dir():
+                yield entry.path, entry.name, depth, True
+                scandir_calls += 1
+                try:
+                    with os.scandir(entry.path) as iterator:
+                        stack.append((iter(sorted(iterator, key=_entry_name)), depth + 1))
+                except OSError as error:
+                    failures[type(error).__name__] = failures.get(type(error).__name__, 0) + 1
+                    if errors is not None:
+                        errors.append((entry.path, error))
+            elif entry.is_file():
+                yield entry.path, entry.name, depth, False
+    finally:
+        if METRICS.enabled:
+            _record_tree(entries_count, scandir_calls, failures, time.perf_counter() - started)
+
+
+class TraversalStats:
+    """
+    Counters and timings collected by an instrumented iterate_dir run.
+
+    Type checks go through os.DirEntry, which answers from the directory
+    listing when the filesystem provides entry types and falls back to a
+    stat() call otherwise, so stat_calls is an upper bound of real syscalls.
+
+    Attributes:
+        scandir_calls (int): Number of directories listed.
+        stat_calls (int): Number of entry type checks.
+        entries (int): Number of entries seen.
+        errors (dict): Error counts keyed by exception class name.
+        elapsed (float): Wall time of the run in seconds.
+    """
+
+    def __init__(self, top: int = 10) -> None:
+        self.top = top
+        self.scandir_calls = 0
+        self.stat_calls = 0
+        self.entries = 0
+        self.errors = {}
+        self.elapsed = 0.0
+        self._slowest = []
+        self._started = None
+
+    def start(self) -> None:
+        """Mark the beginning of a run."""
+        self._started = time.perf_counter()
+
+    def stop(self) -> None:
+        """Mark the end of a run and accumulate its wall time."""
+        if self._started is not None:
+            self.elapsed += time.perf_counter() - self._started
+            self._started = None
+
+    def counts(self) -> tuple:
+        """Return (entries, scandir_calls, errors, elapsed), to tell what a later run added."""
+        return self.entries, self.scandir_calls, dict(self.errors), self.elapsed
+
+    def record_dir(self, path: str, seconds: float) -> None:
+        """Keep the directory if it is among the slowest seen so far."""
+        import heapq
+
+        item = (seconds, path)
+        if len(self._slowest) < self.top:
+            heapq.heappush(self._slowest, item)
+        elif item > self._slowest[0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def record_error(self, path: str, error: OSError) -> None:
+        """Count an error raised while listing a directory."""
+        name = type(error).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def slowest_dirs(self) -> list:
+        """
+        Return the slowest directories, slowest first.
+
+        Returns:
+            list: (seconds, path) tuples measured without their subdirectories.
+        """
+        return sorted(self._slowest, reverse=True)
+
+    def entries_per_second(self) -> float:
+        """Return traversal throughput, 0.0 before anything was timed."""
+        return self.entries / self.elapsed if self.elapsed else 0.0
+
+    def report(self) -> str:
+        """
+        Format a human-readable summary of the run.
+
+        Returns:
+            str: Multi-line report with totals, errors and slowest directories.
+        """
+        lines = [
+            f"Entries: {self.entries} in {self.elapsed:.3f}s ({self.entries_per_second():.0f} entries/s)",
+            f"scandir calls: {self.scandir_calls}, stat calls: {self.stat_calls}",
+        ]
+        if self.errors:
+            lines.append(
+                "Errors: " + ", ".join(f"{name}={count}" for name, count in sorted(self.errors.items()))
+            )
+        lines.append("Slowest directories:")
+        for seconds, path in self.slowest_dirs():
+            lines.append(f"  {seconds * 1000:9.3f} ms  {path}")
+        return "\n".join(lines)
+
+
+class TreeNode:
+    """
+    In-memory model of a directory entry used by watch mode.
+
+    Attributes:
+        name (str): Entry name.
+        is_dir (bool): True for directories.
+        children (dict): Child nodes keyed by name (empty for files).
+    """
+
+    __slots__ = ("name", "is_dir", "children")
+
+    def __init__(self, name: str, is_dir: bool) -> None:
+        self.name = name
+        self.is_dir = is_dir
+        self.children = {}
+
+
+def build_tree(path: Path) -> TreeNode:
     """
+    Walk a directory once and build its in-memory tree model.
 
-    for entry in path.iterdir():
+    Children are kept in name order, the order iterate_dir prints them in.
+    Unreadable subdirectories are loaded as empty directories.
+
+    Args:
+        path (Path): Directory to load.
+
+    Returns:
+        TreeNode: Root node with all nested entries loaded.
+    """
+    node = TreeNode(path.name, True)
+    with os.scandir(path) as iterator:
+        entries = sorted(iterator, key=_entry_name)
+    for entry in entries:
         if entry.is_dir():
-            print(Fore.GREEN, indent, "", entry.name)
-            iterate_dir(entry, indent + ".")
-        if entry.is_file():
-            print(Fore.RED, indent, "", entry.name)
+            try:
+                node.children[entry.name] = build_tree(Path(entry.path))
+            except OSError:
+                node.children[entry.name] = TreeNode(entry.name, True)
+        elif entry.is_file():
+            node.children[entry.name] = TreeNode(entry.name, False)
+    return node
+
+
+def render_tree(node: TreeNode, indent: str = "") -> None:
+    """
+    Print the children of a tree node in the same format as iterate_dir.
+
+    Args:
+        node (TreeNode): Directory node whose contents are printed.
+        indent (str, optional): Indentation prefix. Defaults to empty string.
+    """
+    for child in node.children.values():
+        _print_entry(child.name, child.is_dir, indent)
+        if child.is_dir:
+            render_tree(child, indent + ".")
+
+
+def _iter_subdirs(node: TreeNode, path: Path):
+    """Yield the paths of all directories in a subtree, including its root."""
+    yield path
+    for child in node.children.values():
+        if child.is_dir:
+            yield from _iter_subdirs(child, path / child.name)
+
+
+class PollingWatcher:
+    """
+    Portable watcher that detects changes by polling directory mtimes.
+
+    Only directories are stat-ed: creating, deleting or renaming an entry
+    updates the mtime of its parent directory, which is all the tree needs.
+    """
+
+    def __init__(self, interval: float = 1.0) -> None:
+        self.interval = interval
+        self._mtimes = {}
+
+    def add(self, path: Path) -> None:
+        """Start watching a directory."""
+        try:
+            self._mtimes[path] = path.stat().st_mtime_ns
+        except OSError:
+            self._mtimes.pop(path, None)
+
+    def remove(self, path: Path) -> None:
+        """Stop watching a directory."""
+        self._mtimes.pop(path, None)
+
+    def poll(self, timeout: float = None) -> set:
+        """
+        Wait up to one polling interval and report changed directories.
+
+        Args:
+            timeout (float, optional): Maximum wait in seconds. Defaults to
+                                       the watcher interval.
+
+        Returns:
+            set: Paths of directories whose listing changed.
+        """
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        changed = set()
+        for path, mtime in list(self._mtimes.items()):
+            try:
+                current = path.stat().st_mtime_ns
+            except OSError:
+                current = None
+            if current != mtime:
+                changed.add(path)
+                if current is None:
+                    del self._mtimes[path]
+                else:
+                    self._mtimes[path] = current
+        return changed
+
+    def close(self) -> None:
+        """Release watcher resources."""
+        self._mtimes.clear()
+
+
+class InotifyWatcher:
+    """
+    Linux watcher built on inotify through ctypes, without extra dependencies.
+
+    Raises:
+        OSError: If inotify is not available on this platform.
+    """
+
+    _MASK = (
+        0x00000040  # IN_MOVED_FROM
+        | 0x00000080  # IN_MOVED_TO
+        | 0x00000100  # IN_CREATE
+        | 0x00000200  # IN_DELETE
+        | 0x00000400  # IN_DELETE_SELF
+        | 0x00000800  # IN_MOVE_SELF
+        | 0x01000000  # IN_ONLYDIR
+    )
+    _IN_Q_OVERFLOW = 0x00004000
+    _IN_IGNORED = 0x00008000
+
+    def __init__(self, root: Path) -> None:
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        import ctypes
+        import ctypes.util
+        import struct
+
+        self._event = struct.Struct("iIII")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._root = root
+        self._paths = {}
+        self._wds = {}
+
+    def add(self, path: Path) -> None:
+        """Start watching a directory."""
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self._MASK)
+        if wd >= 0:
+            self._paths[wd] = path
+            self._wds[path] = wd
+
+    def remove(self, path: Path) -> None:
+        """Stop watching a directory."""
+        wd = self._wds.pop(path, None)
+        if wd is not None:
+            self._paths.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def poll(self, timeout: float = None) -> set:
+        """
+        Block until events arrive (or timeout) and report changed directories.
+
+        Args:
+            timeout (float, optional): Maximum wait in seconds, None waits forever.
+
+        Returns:
+            set: Paths of directories whose listing changed.
+        """
+        import select
+
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = self._event.unpack_from(data, offset)
+            offset += self._event.size + name_len
+            if mask & self._IN_Q_OVERFLOW:
+                changed.add(self._root)
+            elif mask & self._IN_IGNORED:
+                path = self._paths.pop(wd, None)
+                if path is not None and self._wds.get(path) == wd:
+                    del self._wds[path]
+            elif wd in self._paths:
+                changed.add(self._paths[wd])
+        return changed
+
+    def close(self) -> None:
+        """Release the inotify file descriptor."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(root: Path, interval: float = 1.0):
+    """
+    Create the best available watcher, falling back to polling.
+
+    Args:
+        root (Path): Root directory being watched.
+        interval (float, optional): Polling interval for the fallback watcher.
+
+    Returns:
+        InotifyWatcher or PollingWatcher
+    """
+    try:
+        return InotifyWatcher(root)
+    except (OSError, AttributeError):
+        return PollingWatcher(interval)
+
+
+def _refresh_dir(node: TreeNode, path: Path, watcher) -> bool:
+    """
+    Re-read one directory listing and apply the difference to its node.
+
+    Unchanged child nodes are kept as-is, new directories are loaded and
+    watched, removed directories stop being watched. Children stay in name
+    order.
+
+    Returns:
+        bool: True if the listing differs from the model.
+    """
+    children = {}
+    try:
+        with os.scandir(path) as iterator:
+            entries = sorted(iterator, key=_entry_name)
+    except OSError:
+        entries = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+            if not is_dir and not entry.is_file():
+                continue
+        except OSError:
+            continue
+        old = node.children.get(entry.name)
+        if old is not None and old.is_dir == is_dir:
+            children[entry.name] = old
+        elif is_dir:
+            child_path = Path(entry.path)
+            try:
+                children[entry.name] = build_tree(child_path)
+            except OSError:
+                continue
+            for subdir in _iter_subdirs(children[entry.name], child_path):
+                watcher.add(subdir)
+        else:
+            children[entry.name] = TreeNode(entry.name, False)
+
+    for name, old in node.children.items():
+        if old.is_dir and children.get(name) is not old:
+            for subdir in _iter_subdirs(old, path / name):
+                watcher.remove(subdir)
+
+    modified = children.keys() != node.children.keys() or any(
+        children[name] is not node.children[name] for name in children
+    )
+    node.children = children
+    return modified
+
+
+def _find_node(root: TreeNode, root_path: Path, path: Path):
+    """Return the model node for a directory path, or None if it is not loaded."""
+    try:
+        parts = path.relative_to(root_path).parts
+    except ValueError:
+        return None
+    node = root
+    for part in parts:
+        node = node.children.get(part)
+        if node is None or not node.is_dir:
+            return None
+    return node
+
+
+def watch_tree(path: Path, watcher=None, max_updates: int = None) -> None:
+    """
+    Render a directory tree once, then re-render only the subtrees that change.
+
+    Args:
+        path (Path): Root directory to watch.
+        watcher (optional): Object with add/remove/poll/close methods.
+                            Defaults to create_watcher(path).
+        max_updates (int, optional): Stop after this many rendered updates.
+                                     Defaults to watching until interrupted.
+
+    Raises:
+        FileNotFoundError: If the root directory does not exist.
+    """
+    watcher = watcher or create_watcher(path)
+    updates = 0
+    try:
+        root = build_tree(path)
+        render_tree(root)
+        for subdir in _iter_subdirs(root, path):
+            watcher.add(subdir)
+        while max_updates is None or updates < max_updates:
+            changed = watcher.poll()
+            for dir_path in sorted(changed, key=lambda p: len(p.parts)):
+                node = _find_node(root, path, dir_path)
+                if node is None or not _refresh_dir(node, dir_path, watcher):
+                    continue
+                depth = len(dir_path.relative_to(path).parts)
+                print(CHANGE_COLOR, f"Changed: {dir_path}")
+                render_tree(node, "." * depth)
+                updates += 1
+    finally:
+        watcher.close()
+
+
+def _report_skipped(errors: list) -> None:
+    """Print the directories a walk had to skip to stderr."""
+    if not errors:
+        return
+    print(f"Skipped {len(errors)} unreadable directories:", file=sys.stderr)
+    for path, error in errors:
+        print(f"  {path}: {error.strerror or error}", file=sys.stderr)
 
 
 def main() -> None:
     """
-    Main entry point for the directory tree visualizer. 
+    Main entry point for the directory tree visualizer.
 
-    Parses command-line arguments to get the directory path and initiates  
-    the directory iteration. Handles errors gracefully by displaying  
-    user-friendly error messages. 
+    Parses command-line arguments to get the directory path and initiates
+    the directory iteration. Handles errors gracefully by displaying
+    user-friendly error messages.
 
-    Command-line Arguments:   
-        argv[1] (str): Path to the directory to visualize, if not specified then current directory is used
+    Command-line Arguments:
+        path (str): Path to the directory to visualize, if not specified then current directory is used
+        --watch: Keep running and re-render subtrees as they change
+        --interval (float): Polling interval in seconds when inotify is unavailable
+        --stats: Print syscall counts, throughput and slowest directories to stderr
+        --resume-from (str): Continue an interrupted walk from this entry
+        --metrics-file (str): Write Prometheus metrics to this file on exit
+        --metrics-port (int): Serve Prometheus metrics on this local port
     """
-    if len(sys.argv) > 1:
-        path = Path(sys.argv[1])
-    else:
-        path = Path.cwd()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Display a directory tree.")
+    parser.add_argument("path", nargs="?", default=None)
+    parser.add_argument("--watch", action="store_true")
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--stats", action="store_true")
+    parser.add_argument("--resume-from", default=None)
+    add_metrics_arguments(parser)
+    options = parser.parse_args(sys.argv[1:])
+    set_colors(init_console())
+
+    path = Path(options.path) if options.path else Path.cwd()
+    stats = TraversalStats() if options.stats else None
+    with export_metrics(options.metrics_file, options.metrics_port):
+        _run(path, options, stats)
+    if stats is not None:
+        print(stats.report(), file=sys.stderr)
+
+
+def _run(path: Path, options, stats) -> None:
+    """Walk or watch the tree as main was asked to, reporting errors."""
     try:
-        iterate_dir(path)
+        if options.watch:
+            watch_tree(path, create_watcher(path, options.interval))
+        else:
+            errors = iterate_dir(path, stats=stats, resume_from=options.resume_from)
+            _report_skipped(errors)
     except FileNotFoundError:
         print(f"Error: Path {path} was not found.")
+    except PermissionError:
+        print(f"Error: Permission denied for path {path}.")
+    except TraversalInterrupted as interrupt:
+        import shlex
+
+        print(
+            f"Interrupted. Resume with: --resume-from {shlex.quote(interrupt.path)}",
+            file=sys.stderr,
+        )
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
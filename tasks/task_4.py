@@ -3,25 +3,112 @@ Contact Management Bot
 
 A simple command-line bot for managing contacts with phone numbers.
 Supports adding, updating, retrieving, and listing contacts with validation.
+A contact can have several phones; they are kept packed as integers in one
+array('Q') per contact (see contact_phones.py).
+
+Contacts are kept in memory by default; pass --db <file> to keep them in an
+on-disk store that survives restarts: a SQLite database, with --backend log
+an append-only log that is compacted into a snapshot, or with --backend
+snapshot a memory-mapped binary snapshot that opens without being read.
+The 'save' and 'load' commands write and open such snapshots at any time.
+Changes to contacts are journaled (see contact_journal.py), so 'undo' and
+'redo' can step back and forth through the last --history-size of them.
+Lookups in an on-disk store go through an LRU cache of --cache-size
+contacts; 'stats' shows how well it does. With --shards N the contacts are
+split across N worker processes (see contact_shards.py), so that very large
+books can use several cores.
+
+Handlers do not print: they return Result objects, and a renderer turns them
+into colored terminal text, JSON, or nothing at all. Colors are plain ANSI
+codes, used only when output goes to a terminal.
+
+The bot is started many times from scripts, so importing it stays cheap:
+modules needed by a few commands only (argparse, csv, json, sqlite3,
+cProfile, colorama) are imported when first used, and the help text is built
+on the first 'help'.
+
+Commands can also be run non-interactively from a script file or a pipe
+with --batch; output is buffered, plain text when not written to a terminal
+(or JSON / nothing with --output), and the exit code is 1 if any command
+failed.
+
+With --metrics-file or --metrics-port, the commands served and their
+latency are counted (see metrics.py) and exported in the Prometheus format.
+
+Usage:
+    python task_4.py [--db FILE] [--backend {sqlite,log,snapshot}] [--sync-interval SECONDS]
+                     [--cache-size CONTACTS] [--history-size CHANGES] [--shards N]
+                     [--batch [FILE]] [--output {terminal,json,silent}]
+                     [--metrics-file FILE] [--metrics-port PORT]
 """
-import re
-from colorama import Fore, Style
+import io
+import os
+import sys
+import time
+from array import array
+from functools import lru_cache
+from itertools import islice
+from console_colors import LIGHTGREEN, RED, RESET as RESET_COLOR, YELLOW, init_console
+from contact_index import KeyIndex, NameIndex, PhoneIndex, normalize_phone
+from contact_journal import DEFAULT_CAPACITY as DEFAULT_HISTORY_SIZE, ChangeJournal
+from contact_names import display_name, name_key
+from contact_phones import format_phones, pack_phone, pack_phones, unpack_phones
+from contact_profiler import MODES as PROFILE_MODES, Profiler
+from metrics import METRICS, add_arguments as add_metrics_arguments, export as export_metrics
+from contact_store import (
+    BACKENDS,
+    DEFAULT_CACHE_SIZE,
+    CachedStore,
+    MemoryStore,
+    SnapshotStore,
+    open_store,
+    save_snapshot,
+)
 
 IDENT = " "
-BOT_COLOR = Fore.YELLOW
-BOT_ERROR_COLOR = Fore.RED
-HELP_MAIN_TEXT=Fore.LIGHTGREEN_EX
-
-COMMANDS_HELP_INFO = {
-    "hello": f"{HELP_MAIN_TEXT}User format {BOT_COLOR}'hello' {HELP_MAIN_TEXT}just to get nice greeting :){Style.RESET_ALL}",
-    "add": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'add <username> <phone number>' {HELP_MAIN_TEXT}to add user with it's phone.'{Style.RESET_ALL}",
-    "change": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'change <username> <phone number>' {HELP_MAIN_TEXT}to update username's phone.'{Style.RESET_ALL}",
-    "phone": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'phone <username>' {HELP_MAIN_TEXT}to get phone of the user.{Style.RESET_ALL}",
-    "all": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'all' {HELP_MAIN_TEXT}to get get list of all users and their phones{Style.RESET_ALL}",
-    "exit or close": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'close' or 'exit' {HELP_MAIN_TEXT} to stop the assistant.{Style.RESET_ALL}",
-}
+BOT_COLOR = YELLOW
+BOT_ERROR_COLOR = RED
+HELP_MAIN_TEXT = LIGHTGREEN
+RESET = RESET_COLOR
+
+
+@lru_cache(maxsize=None)
+def _build_help():
+    """Build the help text with the current colors, on first use after each set_colors()."""
+    return {
+        "hello": f"{HELP_MAIN_TEXT}User format {BOT_COLOR}'hello' {HELP_MAIN_TEXT}just to get nice greeting :){RESET}",
+        "add": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'add <username> <phone number>' {HELP_MAIN_TEXT}to add user with it's phone.'{RESET}",
+        "change": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'change <username> <phone number>' {HELP_MAIN_TEXT}to replace all username's phones with one.'{RESET}",
+        "addphone": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'addphone <username> <phone number>' {HELP_MAIN_TEXT}to add another phone to the user.{RESET}",
+        "removephone": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'removephone <username> <phone number>' {HELP_MAIN_TEXT}to remove one of the user's phones.{RESET}",
+        "phone": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'phone <username>' {HELP_MAIN_TEXT}to get phones of the user.{RESET}",
+        "who": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'who <phone number>' {HELP_MAIN_TEXT}to find who owns the phone.{RESET}",
+        "search": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'search <name or prefix>' {HELP_MAIN_TEXT}to find users, typos are tolerated.{RESET}",
+        "import": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'import <file.csv|file.jsonl>' {HELP_MAIN_TEXT}to add or update users from a file.{RESET}",
+        "export": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'export <file.csv|file.jsonl>' {HELP_MAIN_TEXT}to save all users to a file.{RESET}",
+        "save": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'save <file>' {HELP_MAIN_TEXT}to save all users to a binary snapshot.{RESET}",
+        "load": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'load <file>' {HELP_MAIN_TEXT}to replace all users with the ones in a snapshot.{RESET}",
+        "all": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'all [page size] [after username]' {HELP_MAIN_TEXT}to get get list of all users and their phones page by page{RESET}",
+        "stats": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'stats' {HELP_MAIN_TEXT}to see the hits, misses and evictions of the lookup cache.{RESET}",
+        "undo": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'undo [steps]' {HELP_MAIN_TEXT}to revert the last changes to contacts.{RESET}",
+        "redo": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'redo [steps]' {HELP_MAIN_TEXT}to apply undone changes again.{RESET}",
+        "history": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'history <username>' {HELP_MAIN_TEXT}to see the recorded changes of the user.{RESET}",
+        "profile": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'profile start [cpu|memory]', 'profile stop' {HELP_MAIN_TEXT}to see where commands spend time or memory.{RESET}",
+        "exit or close": f"{HELP_MAIN_TEXT}Use format {BOT_COLOR}'close' or 'exit' {HELP_MAIN_TEXT} to stop the assistant.{RESET}",
+    }
 
-USERS = {}
+
+USERS = MemoryStore()
+PROFILER = Profiler()
+HISTORY_SIZE = DEFAULT_HISTORY_SIZE
+OUTPUT_BUFFER_SIZE = 64 * 1024
+SEARCH_LIMIT = 10
+PAGE_SIZE = 50
+IMPORT_BATCH_SIZE = 10_000
+MAX_REPORTED_ERRORS = 20
+FILE_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+COMMANDS_SERVED = METRICS.counter("tasks_commands_total", "Bot commands served", ["command", "outcome"])
+COMMAND_SECONDS = METRICS.timer("tasks_command_seconds", "Latency of bot commands", ["command"])
 
 
 def parse_input(user_input):
@@ -40,6 +127,107 @@ def parse_input(user_input):
     return cmd, args
 
 
+class Result:
+    """
+    Outcome of a command handler.
+
+    Handlers describe what happened and leave presentation to a renderer
+    (see RENDERERS). The message is formatted from its template only when a
+    renderer asks for it, so callers that just check ok pay nothing for it.
+
+    Attributes:
+        ok (bool): True if the command succeeded
+        code (str): Machine-readable outcome, e.g. "added" or "not_found"
+        template (str): str.format template of the message, may be empty
+        data (dict): Values for the template
+        rows (list): (label, value) pairs of a listing
+        warnings (list): Problems that did not stop the command
+        hint (str): Follow-up suggestion shown after the rows
+    """
+
+    __slots__ = ("ok", "code", "template", "data", "rows", "warnings", "hint")
+
+    def __init__(self, ok, code, template="", data=None, rows=(), warnings=(), hint=""):
+        self.ok = ok
+        self.code = code
+        self.template = template
+        self.data = data or {}
+        self.rows = rows
+        self.warnings = warnings
+        self.hint = hint
+
+    @property
+    def message(self):
+        """The formatted message."""
+        return self.template.format_map(self.data) if self.data else self.template
+
+    def __repr__(self):
+        return f"Result(ok={self.ok}, code={self.code!r}, data={self.data!r})"
+
+
+def _success(code, template="", **data):
+    """Build a successful Result."""
+    return Result(True, code, template, data)
+
+
+def _failure(code, template, **data):
+    """Build a failed Result."""
+    return Result(False, code, template, data)
+
+
+def render_terminal(result):
+    """
+    Render a result as colored text for the interactive bot.
+
+    Args:
+        result: Result of a handler
+
+    Returns:
+        str: Lines to print, without a trailing newline
+    """
+    lines = [f"{IDENT}{BOT_ERROR_COLOR}{warning}{RESET}" for warning in result.warnings]
+    if result.template:
+        color = BOT_COLOR if result.ok else BOT_ERROR_COLOR
+        lines.append(f"{IDENT}{color}{result.message}{RESET}")
+    lines.extend(f"{IDENT}{BOT_COLOR}{label}: {value}{RESET}" for label, value in result.rows)
+    if result.hint:
+        lines.append(f"{IDENT}{HELP_MAIN_TEXT}{result.hint}{RESET}")
+    return "\n".join(lines)
+
+
+def render_json(result):
+    """
+    Render a result as one JSON object for scripts.
+
+    Args:
+        result: Result of a handler
+
+    Returns:
+        str: JSON object with ok, code and message, plus data, rows,
+             warnings and hint when the result has them
+    """
+    record = {"ok": result.ok, "code": result.code, "message": result.message}
+    if result.data:
+        record["data"] = result.data
+    if result.rows:
+        record["rows"] = [list(row) for row in result.rows]
+    if result.warnings:
+        record["warnings"] = list(result.warnings)
+    if result.hint:
+        record["hint"] = result.hint
+    import json
+
+    return json.dumps(record, ensure_ascii=False)
+
+
+def render_silent(result):
+    """Render nothing; only the exit code reports failures."""
+    return ""
+
+
+RENDERERS = {"terminal": render_terminal, "json": render_json, "silent": render_silent}
+
+
 def print_error(message):
     """
     Print error message with consistent formatting.
@@ -47,7 +235,22 @@ def print_error(message):
     Args:
         message: Error message to display
     """
-    print(f"{IDENT}{BOT_ERROR_COLOR}{message}{Style.RESET_ALL}")
+    print(f"{IDENT}{BOT_ERROR_COLOR}{message}{RESET}")
+
+
+def set_colors(enabled: bool):
+    """
+    Turn colored output on or off.
+
+    Args:
+        enabled: False to print plain text, e.g. when output is not a terminal
+    """
+    global BOT_COLOR, BOT_ERROR_COLOR, HELP_MAIN_TEXT, RESET
+    BOT_COLOR = YELLOW if enabled else ""
+    BOT_ERROR_COLOR = RED if enabled else ""
+    HELP_MAIN_TEXT = LIGHTGREEN if enabled else ""
+    RESET = RESET_COLOR if enabled else ""
+    _build_help.cache_clear()
 
 
 def print_success(message):
@@ -57,58 +260,43 @@ def print_success(message):
     Args:
         message: Success message to display
     """
-    print(f"{IDENT}{BOT_COLOR}{message}{Style.RESET_ALL}")
+    print(f"{IDENT}{BOT_COLOR}{message}{RESET}")
 
 
-def validate_args_count(args, expected_count, error_message):
+def check_args_count(args, expected_count, usage):
     """
-    Validate that args list has exactly expected_count items.
+    Check that args list has exactly expected_count items.
 
     Args:
-        args: List of arguments to validate
+        args: List of arguments to check
         expected_count: Required number of arguments
-        error_message: Message to display if validation fails
+        usage: Command format to show if the check fails
 
     Returns:
-        bool: True if valid, False otherwise
+        Result: Failure to return from the handler, or None if args are valid
     """
     if len(args) != expected_count:
-        print_error(error_message)
-        return False
-    return True
+        return _failure("usage", "Command format: {usage}", usage=usage)
+    return None
 
 
-def validate_phone_with_error(phone):
+def check_phone(phone):
     """
-    Validate phone format and print error if invalid.
+    Check phone format.
 
     Args:
-        phone: Phone number string to validate
+        phone: Phone number string to check
 
     Returns:
-        bool: True if valid, False otherwise
+        Result: Failure to return from the handler, or None if phone is valid
     """
     if not validate_phone(phone):
-        print_error(
-            f"Phone '{phone}' is not matching valid format. "
-            "Should be digits only, 10 to 15 length."
+        return _failure(
+            "invalid_phone",
+            "Phone '{phone}' is not matching valid format. Should be digits only, 10 to 15 length.",
+            phone=phone,
         )
-        return False
-    return True
-
-
-def print_dict_as_list(dictionary: dict):
-    """
-    Print dictionary items as a formatted list.
-
-    Args:
-        dictionary: Dictionary to display with key-value pairs
-    """
-    if not dictionary:
-        print_error(f"There is no records yet.")
-        return
-    for key, value in dictionary.items():
-        print_success(f"{key}: {value}")
+    return None
 
 
 def validate_phone(phone: str) -> bool:
@@ -124,8 +312,18 @@ def validate_phone(phone: str) -> bool:
     Returns:
         bool: True if phone format is valid, False otherwise
     """
-    cleaned = re.sub(r"[\s\-\(\)\+\.]", "", phone)
-    return cleaned.isdigit() and 10 <= len(cleaned) <= 15
+    cleaned = normalize_phone(phone)
+    return cleaned.isdecimal() and 10 <= len(cleaned) <= 15
+
+
+def _contact_name(name: str) -> str:
+    """Return the name a contact is stored under, or the display form of a new name."""
+    return USERS.index_for(KeyIndex).find(name) or display_name(name)
+
+
+def _journal():
+    """Return the change journal of the contact store, attaching one if needed."""
+    return USERS.index_for(ChangeJournal, capacity=HISTORY_SIZE)
 
 
 def add_contact(args):
@@ -133,123 +331,923 @@ def add_contact(args):
     Add a new contact to the database.
 
     Validates phone format and prevents duplicate usernames.
-    Username is case-insensitive (stored capitalized).
+    Usernames match regardless of case and Unicode spelling, and a new
+    contact keeps the name as entered (see contact_names.py). If the phone
+    already belongs to other contacts the contact is still added and they
+    are named.
 
     Args:
         args: List with [username, phone]
 
     Returns:
-        Success message or None if validation fails
+        Result: "added" on success; "usage", "invalid_phone" or "exists"
     """
-    if not validate_args_count(args, 2, "Command format: 'add <username> <phone>'"):
-        return
+    failure = check_args_count(args, 2, "'add <username> <phone>'") or check_phone(args[1])
+    if failure:
+        return failure
 
-    username = args[0].capitalize()
     phone = args[1]
 
-    if not validate_phone_with_error(phone):
-        return
-
-    # Check if user already exists
-    if username in USERS:
-        print_error(
-            f"User '{username}' already exists with phone {USERS[username]}. "
-            f"Use 'change {username} <new_phone>' to update, or use a different username."
+    owners = USERS.index_for(PhoneIndex).owners(phone)
+    _journal()  # attached before the first change, so that it can be undone
+    # Resolve, check and insert in one step, so concurrent adds cannot overwrite
+    # each other or add one name twice in two spellings
+    with USERS.locked():
+        username = _contact_name(args[0])
+        existing = USERS.insert_if_absent(username, pack_phones([phone]))
+    if existing is not None:
+        return _failure(
+            "exists",
+            "User '{name}' already exists with phone {phone}. "
+            "Use 'addphone {name} <phone>' to add another number, 'change {name} <new_phone>' to replace it, "
+            "or use a different username.",
+            name=username,
+            phone=format_phones(existing),
         )
-        return
 
-    USERS[username] = phone
-    return f"{IDENT}{BOT_COLOR}Contact added.{Style.RESET_ALL}"
+    if owners:
+        return _success(
+            "added",
+            "Contact added. Note: phone {phone} is also saved for {owners}.",
+            name=username,
+            phone=phone,
+            owners=", ".join(owners),
+        )
+    return _success("added", "Contact added.", name=username, phone=phone)
 
 
 def update_contact(args):
     """
-    Update existing contact's phone number.
+    Replace all of an existing contact's phone numbers with one.
 
     Validates that user exists before updating.
-    Username is case-insensitive (stored capitalized).
+    Username matches regardless of case and Unicode spelling.
 
     Args:
         args: List with [username, new_phone]
 
     Returns:
-        Success message or None if validation fails
+        Result: "updated" on success; "usage", "invalid_phone" or "not_found"
+    """
+    failure = check_args_count(args, 2, "'change <username> <phone>'") or check_phone(args[1])
+    if failure:
+        return failure
+
+    username = _contact_name(args[0])
+    phone = args[1]
+
+    _journal()
+    if USERS.update_if_present(username, pack_phones([phone])) is None:
+        return _failure("not_found", "User with username '{name}' doesn't exist", name=username)
+
+    return _success("updated", "Contact updated.", name=username, phone=phone)
+
+
+def add_phone(args):
+    """
+    Add another phone number to an existing contact.
+
+    The number is appended to the contact's phones in one atomic step, so
+    concurrent changes to the same contact are not lost.
+
+    Args:
+        args: List with [username, phone]
+
+    Returns:
+        Result: "phone_added" on success; "usage", "invalid_phone",
+                "not_found" or "duplicate_phone"
     """
-    if not validate_args_count(args, 2, "Command format: 'change <username> <phone>'"):
-        return
+    failure = check_args_count(args, 2, "'addphone <username> <phone>'") or check_phone(args[1])
+    if failure:
+        return failure
 
-    username = args[0].capitalize()
+    username = _contact_name(args[0])
     phone = args[1]
+    code = pack_phone(phone)
+
+    def append(phones):
+        return phones if code in phones else phones + array("Q", (code,))
 
-    if not validate_phone_with_error(phone):
-        return
+    _journal()
+    previous = USERS.compute_if_present(username, append)
+    if previous is None:
+        return _failure("not_found", "User with username '{name}' doesn't exist", name=username)
+    if code in previous:
+        return _failure("duplicate_phone", "User '{name}' already has phone {phone}.", name=username, phone=phone)
 
-    if username not in USERS:
-        print_error(f"User with username '{username}' doesn't exist")
-        return
+    return _success("phone_added", "Phone added.", name=username, phone=phone, count=len(previous) + 1)
 
-    USERS[username] = phone
-    return f"{IDENT}{BOT_COLOR}Contact updated.{Style.RESET_ALL}"
+
+def remove_phone(args):
+    """
+    Remove one phone number from an existing contact.
+
+    The number is matched regardless of formatting. A contact keeps at least
+    one phone; use 'change' to replace the last one.
+
+    Args:
+        args: List with [username, phone]
+
+    Returns:
+        Result: "phone_removed" on success; "usage", "invalid_phone",
+                "not_found", "unknown_phone" or "last_phone"
+    """
+    failure = check_args_count(args, 2, "'removephone <username> <phone>'") or check_phone(args[1])
+    if failure:
+        return failure
+
+    username = _contact_name(args[0])
+    phone = args[1]
+    code = pack_phone(phone)
+
+    def remove(phones):
+        if code not in phones or len(phones) == 1:
+            return phones
+        return array("Q", (other for other in phones if other != code))
+
+    _journal()
+    previous = USERS.compute_if_present(username, remove)
+    if previous is None:
+        return _failure("not_found", "User with username '{name}' doesn't exist", name=username)
+    if code not in previous:
+        return _failure("unknown_phone", "User '{name}' has no phone {phone}.", name=username, phone=phone)
+    if len(previous) == 1:
+        return _failure(
+            "last_phone",
+            "Phone {phone} is the only phone of '{name}'. Use 'change {name} <new_phone>' to replace it.",
+            name=username,
+            phone=phone,
+        )
+
+    return _success("phone_removed", "Phone removed.", name=username, phone=phone, count=len(previous) - 1)
 
 
 def get_users_phone(args: list):
     """
     Get phone number for a specific user.
 
-    Username is case-insensitive for lookup.
+    Username matches regardless of case and Unicode spelling.
 
     Args:
         args: List with [username]
 
     Returns:
-        Formatted phone number message or None if user not found
+        Result: "phone" with the numbers; "usage" or "not_found"
+    """
+    failure = check_args_count(args, 1, "'phone <username>'")
+    if failure:
+        return failure
+
+    username = _contact_name(args[0])
+    phones = USERS.get(username)
+
+    if not phones:
+        return _failure("not_found", "User with username '{name}' doesn't exist.", name=username)
+
+    phones = unpack_phones(phones)
+    if len(phones) == 1:
+        return _success("phone", "{name}'s phone is {phone}", name=username, phone=phones[0], phones=phones)
+    return _success(
+        "phone", "{name}'s phones are {phone}", name=username, phone="; ".join(phones), phones=phones
+    )
+
+
+def find_phone_owner(args: list):
+    """
+    Find the contacts that use a phone number.
+
+    The number is matched regardless of formatting through the phone index,
+    without scanning all contacts.
+
+    Args:
+        args: List with [phone]
+
+    Returns:
+        Result: "owners" listing the names; "usage", "invalid_phone" or "not_found"
     """
-    if not validate_args_count(args, 1, "Command format: 'phone <username>'"):
-        return
+    failure = check_args_count(args, 1, "'who <phone>'") or check_phone(args[0])
+    if failure:
+        return failure
+
+    phone = args[0]
+    owners = USERS.index_for(PhoneIndex).owners(phone)
+    if not owners:
+        return _failure("not_found", "Nobody has phone {phone}.", phone=phone)
 
-    username = args[0].capitalize()
-    phone = USERS.get(username)
+    return _success("owners", "Phone {phone} belongs to {owners}", phone=phone, owners=", ".join(owners))
 
-    if not phone:
-        print_error(f"User with username '{username}' doesn't exist.")
-        return
 
-    return f"{IDENT}{BOT_COLOR}{username}'s phone is {phone}{Style.RESET_ALL}"
+def search_contacts(args: list):
+    """
+    Find contacts by name prefix, falling back to typo-tolerant matches.
+
+    The name index is built on the first search and kept up to date by the
+    store afterwards, so searches do not scan all contacts.
+
+    Args:
+        args: List with [query]
+
+    Returns:
+        Result: "found" with (name, phone) rows; "usage" or "not_found"
+    """
+    failure = check_args_count(args, 1, "'search <name or prefix>'")
+    if failure:
+        return failure
+
+    query = args[0]
+    names = USERS.index_for(NameIndex).search(query, SEARCH_LIMIT)
+
+    if not names:
+        return _failure("not_found", "No users match '{query}'.", query=query)
+
+    return Result(True, "found", rows=[(name, format_phones(USERS[name])) for name in names])
+
+
+def list_contacts(args: list):
+    """
+    List contacts in name order, one page at a time.
+
+    Pages are read from the store's ordered index starting after a cursor
+    name, so each page costs the same regardless of the book size.
+
+    Args:
+        args: List with optional [page size] and [after username]
+
+    Returns:
+        Result: "page" with (name, phone) rows and a next-page hint when
+                more contacts follow; "usage", "empty" or "end"
+    """
+    if len(args) > 2:
+        return _failure("usage", "Command format: 'all [page size] [after username]'")
+
+    limit = PAGE_SIZE
+    if args:
+        if not args[0].isdecimal() or int(args[0]) == 0:
+            return _failure("usage", "Page size should be a positive number, got '{size}'.", size=args[0])
+        limit = int(args[0])
+    after = _contact_name(args[1]) if len(args) == 2 else None
+
+    contacts = USERS.page(after, limit + 1)
+    if not contacts:
+        if after is None:
+            return _failure("empty", "There is no records yet.")
+        return _failure("end", "There are no more records.")
+
+    result = Result(True, "page", rows=[(name, format_phones(phones)) for name, phones in contacts[:limit]])
+    if len(contacts) > limit:
+        result.hint = f"Next page: all {limit} {contacts[limit - 1][0]}"
+    return result
+
+
+def _file_format(path: str):
+    """Return "csv" or "jsonl" for a contacts file path, None if unsupported."""
+    for suffix, file_format in FILE_FORMATS.items():
+        if path.lower().endswith(suffix):
+            return file_format
+    return None
+
+
+def _read_contact_rows(path: str, file_format: str):
+    """
+    Stream raw records from a contacts file.
+
+    CSV files hold "name,phone" rows with an optional header row, several
+    phones of a contact separated by ";" in the phone field. JSON Lines files
+    hold one {"name": ..., "phones": [...]} or {"name": ..., "phone": ...}
+    object per line.
+
+    Yields:
+        tuple: (line_number, name, phones), with name and phones set to None
+               for records that cannot be parsed
+    """
+    import csv
+    import json
+
+    with open(path, "r", newline="", encoding="utf-8") as file:
+        if file_format == "csv":
+            reader = csv.reader(file)
+            for row in reader:
+                if not row:
+                    continue
+                if reader.line_num == 1 and [field.strip().lower() for field in row] == ["name", "phone"]:
+                    continue
+                if len(row) != 2:
+                    yield reader.line_num, None, None
+                else:
+                    yield reader.line_num, row[0].strip(), [phone.strip() for phone in row[1].split(";")]
+        else:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    phones = record["phones"] if "phones" in record else [record["phone"]]
+                    if not isinstance(phones, list):
+                        raise TypeError("phones should be a list")
+                    yield line_number, str(record["name"]).strip(), [str(phone).strip() for phone in phones]
+                except (ValueError, KeyError, TypeError):
+                    yield line_number, None, None
+
+
+def _valid_contacts(rows, report: dict):
+    """
+    Validate raw records batch by batch and yield the valid contacts.
+
+    Invalid records are counted in report["skipped"]; the first
+    MAX_REPORTED_ERRORS are described in report["errors"]. Names are
+    resolved like typed ones, and every spelling of a name in the file is
+    stored under the first.
+
+    Yields:
+        tuple: (username, phones) ready to be stored, phones packed
+    """
+    usernames = {}
+    while True:
+        batch = list(islice(rows, IMPORT_BATCH_SIZE))
+        if not batch:
+            return
+        for line_number, name, phones in batch:
+            invalid = None if phones is None else next((phone for phone in phones if not validate_phone(phone)), None)
+            if name is None:
+                problem = "is malformed"
+            elif not name or len(name.split()) != 1:
+                problem = f"has invalid username '{name}', it should be one word"
+            elif invalid is not None:
+                problem = f"has invalid phone '{invalid}'"
+            else:
+                key = name_key(name)
+                username = usernames.get(key)
+                if username is None:
+                    username = usernames[key] = _contact_name(name)
+                yield username, array("Q", dict.fromkeys(map(pack_phone, phones)))
+                continue
+            report["skipped"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append(f"Line {line_number} {problem}.")
 
 
-def main():
+def import_contacts(args: list):
+    """
+    Add or update contacts from a CSV or JSON Lines file.
+
+    The file is streamed and validated in batches; valid contacts are
+    written to the store in one transaction and invalid rows are listed in a
+    single summary. Existing users get the phone from the file. The whole
+    import is a single step for 'undo'.
+
+    Args:
+        args: List with [file path]
+
+    Returns:
+        Result: "imported" with the skipped rows as warnings; "usage",
+                "unsupported", "not_found" or "io_error"
+    """
+    import csv
+
+    failure = check_args_count(args, 1, "'import <file.csv|file.jsonl>'")
+    if failure:
+        return failure
+
+    path = args[0]
+    file_format = _file_format(path)
+    if file_format is None:
+        return _failure("unsupported", "File {path} is not supported. Use a .csv or .jsonl file.", path=path)
+
+    report = {"skipped": 0, "errors": []}
+    try:
+        with _journal().step():
+            imported = USERS.bulk_update(_valid_contacts(_read_contact_rows(path, file_format), report))
+    except FileNotFoundError:
+        return _failure("not_found", "File {path} was not found.", path=path)
+    except (OSError, UnicodeDecodeError, csv.Error) as error:
+        return _failure("io_error", "Import from {path} failed, nothing was saved: {error}", path=path, error=str(error))
+
+    result = _success("imported", "Imported {count} contacts.", count=imported, skipped=report["skipped"])
+    if report["skipped"]:
+        warnings = [f"Skipped {report['skipped']} invalid rows:"]
+        warnings.extend(f"{IDENT}{error}" for error in report["errors"])
+        if report["skipped"] > len(report["errors"]):
+            warnings.append(f"{IDENT}... and {report['skipped'] - len(report['errors'])} more.")
+        result.warnings = warnings
+    return result
+
+
+def export_contacts(args: list):
+    """
+    Save all contacts to a CSV or JSON Lines file.
+
+    Contacts are streamed from the store, so the whole book is never held
+    in memory at once.
+
+    Args:
+        args: List with [file path]
+
+    Returns:
+        Result: "exported"; "usage", "unsupported" or "io_error"
+    """
+    import csv
+    import json
+
+    failure = check_args_count(args, 1, "'export <file.csv|file.jsonl>'")
+    if failure:
+        return failure
+
+    path = args[0]
+    file_format = _file_format(path)
+    if file_format is None:
+        return _failure("unsupported", "File {path} is not supported. Use a .csv or .jsonl file.", path=path)
+
+    try:
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            if file_format == "csv":
+                writer = csv.writer(file)
+                writer.writerow(["name", "phone"])
+                writer.writerows((name, format_phones(phones, ";")) for name, phones in USERS.items())
+            else:
+                file.writelines(
+                    json.dumps({"name": name, "phones": unpack_phones(phones)}, ensure_ascii=False) + "\n"
+                    for name, phones in USERS.items()
+                )
+    except OSError as error:
+        return _failure("io_error", "Export to {path} failed: {error}", path=path, error=str(error))
+
+    return _success("exported", "Exported {count} contacts to {path}.", count=len(USERS), path=path)
+
+
+def save_contacts(args: list):
+    """
+    Save all contacts to a binary snapshot file (see contact_snapshot.py).
+
+    The snapshot is written next to the destination and renamed over it, so
+    an interrupted save leaves the previous file intact.
+
+    Args:
+        args: List with [file path]
+
+    Returns:
+        Result: "saved"; "usage" or "io_error"
+    """
+    failure = check_args_count(args, 1, "'save <file>'")
+    if failure:
+        return failure
+
+    path = args[0]
+    try:
+        count = save_snapshot(path, USERS.items())
+    except (OSError, ValueError) as error:
+        return _failure("io_error", "Save to {path} failed: {error}", path=path, error=str(error))
+    return _success("saved", "Saved {count} contacts to {path}.", count=count, path=path)
+
+
+def load_contacts(args: list):
+    """
+    Replace all contacts with the ones in a binary snapshot file.
+
+    An in-memory book is swapped for a SnapshotStore over the file, so
+    loading is immediate and contacts are read as they are looked up;
+    changes stay in memory until the next 'save'. A persistent store (--db)
+    or a sharded one (--shards) has its contacts replaced by the snapshot's
+    in one step instead (replace_all), so it keeps its backend and its
+    shards, and a failed load leaves the old contacts. Either way the undo
+    history starts over.
+
+    Args:
+        args: List with [file path]
+
+    Returns:
+        Result: "loaded"; "usage", "not_found" or "io_error"
+    """
+    global USERS
+    failure = check_args_count(args, 1, "'load <file>'")
+    if failure:
+        return failure
+
+    path = args[0]
+    if not os.path.isfile(path):
+        return _failure("not_found", "File {path} was not found.", path=path)
+    try:
+        store = SnapshotStore(path, autosave=False)
+    except (OSError, ValueError) as error:
+        return _failure("io_error", "Load from {path} failed: {error}", path=path, error=str(error))
+
+    if USERS.persistent or not isinstance(USERS, (MemoryStore, SnapshotStore)):
+        try:
+            USERS.replace_all(store.items())
+        except (OSError, ValueError) as error:
+            return _failure("io_error", "Load from {path} failed: {error}", path=path, error=str(error))
+        finally:
+            store.close()
+        _journal().reset()
+    else:
+        USERS.close()
+        USERS = store
+    return _success("loaded", "Loaded {count} contacts from {path}.", count=len(USERS), path=path)
+
+
+def _describe_change(old, new):
+    """Describe a contact's phones going from old to new, None meaning no contact."""
+    old_text = "(none)" if old is None else format_phones(old)
+    new_text = "(none)" if new is None else format_phones(new)
+    return f"{old_text} -> {new_text}"
+
+
+def _journal_steps(args: list, command: str):
+    """Parse the optional step count of undo/redo; return (steps, failure)."""
+    if len(args) > 1 or (args and not (args[0].isdecimal() and int(args[0]) > 0)):
+        return 0, _failure("usage", "Command format: '{command} [steps]', steps a positive number", command=command)
+    return (int(args[0]) if args else 1), None
+
+
+def undo_changes(args: list):
+    """
+    Revert the last changes to contacts.
+
+    One step is one command: an add, change, addphone or removephone, or a
+    whole import. A step with more changes than --history-size, such as a
+    large import, is not kept, and neither is anything before it.
+
+    Args:
+        args: List with [] or [steps]
+
+    Returns:
+        Result: "undone" with (name, "after -> before") rows; "usage",
+                "nothing_to_undo" or "history_overflow"
+    """
+    steps, failure = _journal_steps(args, "undo")
+    if failure:
+        return failure
+    journal = _journal()
+    changes = journal.undo(USERS, steps)
+    if not changes:
+        if journal.overflowed:
+            return _failure(
+                "history_overflow",
+                "Cannot undo further: a step changed more than {capacity} contacts, which the history "
+                "does not keep. Use --history-size to keep more.",
+                capacity=journal.capacity,
+            )
+        return _failure("nothing_to_undo", "Nothing to undo.")
+    result = _success("undone", "Undid {count} changes:", count=len(changes))
+    result.rows = [(name, _describe_change(after, before)) for name, before, after in changes]
+    result.hint = "Use 'redo' to apply them again."
+    return result
+
+
+def redo_changes(args: list):
+    """
+    Apply undone changes to contacts again.
+
+    Args:
+        args: List with [] or [steps]
+
+    Returns:
+        Result: "redone" with (name, "before -> after") rows; "usage" or
+                "nothing_to_redo"
+    """
+    steps, failure = _journal_steps(args, "redo")
+    if failure:
+        return failure
+    changes = _journal().redo(USERS, steps)
+    if not changes:
+        return _failure("nothing_to_redo", "Nothing to redo.")
+    result = _success("redone", "Redid {count} changes:", count=len(changes))
+    result.rows = [(name, _describe_change(before, after)) for name, before, after in changes]
+    return result
+
+
+def show_history(args: list):
+    """
+    Show the recorded changes of one contact, most recent first.
+
+    Only the last --history-size changes to all contacts are kept.
+
+    Args:
+        args: List with [username]
+
+    Returns:
+        Result: "history" with ("#step", "before -> after") rows; "usage"
+    """
+    failure = check_args_count(args, 1, "'history <username>'")
+    if failure:
+        return failure
+
+    username = _contact_name(args[0])
+    changes = _journal().history(username)
+    if not changes:
+        return _success("history", "No recorded changes of '{name}'.", name=username, count=0)
+    result = _success("history", "Changes of '{name}', most recent first:", name=username, count=len(changes))
+    result.rows = [(f"#{step}", _describe_change(before, after)) for step, before, after in changes]
+    return result
+
+
+def show_stats(args: list):
+    """
+    Show the counters of the lookup cache in front of the contact store.
+
+    Args:
+        args: Empty list
+
+    Returns:
+        Result: "stats" with the counters in data and the event counts as
+                rows, or "no_cache" when lookups are not cached; "usage"
+    """
+    failure = check_args_count(args, 0, "'stats'")
+    if failure:
+        return failure
+    if not isinstance(USERS, CachedStore):
+        return _success("no_cache", "Lookups are not cached; the cache is used with --db.")
+
+    stats = USERS.stats()
+    result = _success("stats", "Cache holds {size} of {capacity} contacts, {hit_rate:.1%} hit rate:", **stats)
+    result.rows = [(counter, stats[counter]) for counter in ("hits", "misses", "evictions", "invalidations")]
+    return result
+
+
+def profile_commands(args: list):
+    """
+    Start or stop profiling the commands that follow.
+
+    'profile start cpu' runs each command under cProfile, 'profile start
+    memory' traces allocations with tracemalloc; 'profile stop' reports the
+    most expensive functions or source lines. 'profile' shows the status.
+
+    Args:
+        args: List with [] or ["start"] or ["start", mode] or ["stop"]
+
+    Returns:
+        Result: "profile_started", "profile_report" with (location, statistic)
+                rows, or "profile_status"; "usage" or "profile_state"
+    """
+    if not args:
+        if PROFILER.mode is None:
+            return _success("profile_status", "No profile is running.")
+        return _success(
+            "profile_status",
+            "Profiling {mode} for {commands} commands so far.",
+            mode=PROFILER.mode,
+            commands=PROFILER.commands,
+        )
+
+    action, *rest = args
+    if action == "start" and len(rest) <= 1:
+        mode = rest[0].lower() if rest else "cpu"
+        if mode not in PROFILE_MODES:
+            return _failure(
+                "usage", "Profile mode should be one of {modes}, got '{mode}'.", modes=", ".join(PROFILE_MODES), mode=mode
+            )
+        try:
+            PROFILER.start(mode)
+        except RuntimeError as error:
+            return _failure("profile_state", "{error}.", error=str(error))
+        return _success("profile_started", "Profiling {mode} of the following commands.", mode=mode)
+
+    if action == "stop" and not rest:
+        mode, commands, elapsed = PROFILER.mode, PROFILER.commands, PROFILER.elapsed()
+        try:
+            rows = PROFILER.stop()
+        except RuntimeError as error:
+            return _failure("profile_state", "{error}.", error=str(error))
+        result = _success(
+            "profile_report",
+            "Profiled {mode} of {commands} commands over {seconds:.1f} s:",
+            mode=mode,
+            commands=commands,
+            seconds=elapsed,
+        )
+        result.rows = rows
+        return result
+
+    return _failure("usage", "Command format: 'profile [start [cpu|memory] | stop]'")
+
+
+COMMANDS = {
+    "hello": lambda args: _success("hello", "How can I help you?"),
+    "add": add_contact,
+    "change": update_contact,
+    "addphone": add_phone,
+    "removephone": remove_phone,
+    "phone": get_users_phone,
+    "who": find_phone_owner,
+    "search": search_contacts,
+    "import": import_contacts,
+    "export": export_contacts,
+    "all": list_contacts,
+    "save": save_contacts,
+    "load": load_contacts,
+    "undo": undo_changes,
+    "redo": redo_changes,
+    "history": show_history,
+    "stats": show_stats,
+    "profile": profile_commands,
+    "help": lambda args: Result(True, "help", rows=list(_build_help().items())),
+}
+
+
+def dispatch(command, args):
+    """
+    Run one command through the COMMANDS table without printing anything.
+
+    Args:
+        command: Lowercase command name from parse_input
+        args: Command arguments
+
+    Returns:
+        Result: The handler's result, or an "invalid_command" failure
+    """
+    handler = COMMANDS.get(command)
+    if handler is None:
+        if METRICS.enabled:
+            COMMANDS_SERVED.labels("invalid", "error").inc()
+        return _failure(
+            "invalid_command", "Invalid command '{command}'. Use 'help' to see the list of commands.", command=command
+        )
+    if METRICS.enabled:
+        return _measured_call(command, handler, args)
+    if PROFILER.mode is not None and handler is not profile_commands:
+        return PROFILER.call(handler, args)
+    return handler(args)
+
+
+def _measured_call(command, handler, args):
+    """Run a handler as dispatch does, recording it in the command metrics."""
+    started = time.perf_counter()
+    if PROFILER.mode is not None and handler is not profile_commands:
+        result = PROFILER.call(handler, args)
+    else:
+        result = handler(args)
+    COMMAND_SECONDS.labels(command).observe(time.perf_counter() - started)
+    COMMANDS_SERVED.labels(command, "ok" if result.ok else "error").inc()
+    return result
+
+
+def execute(command, args, render=render_terminal):
+    """
+    Run one command and print its rendered result.
+
+    Args:
+        command: Lowercase command name from parse_input
+        args: Command arguments
+        render: Renderer from RENDERERS. Defaults to render_terminal
+
+    Returns:
+        bool: True if the command succeeded
+    """
+    result = dispatch(command, args)
+    text = render(result)
+    if text:
+        print(text)
+    return result.ok
+
+
+def run_batch(lines, output=None, render=render_terminal):
+    """
+    Execute commands from an iterable of lines without prompting.
+
+    Output is collected in memory and written in large blocks. Blank lines
+    and lines starting with '#' are skipped; 'exit' or 'close' stops early.
+
+    Args:
+        lines: Iterable of command lines, e.g. an open file
+        output: Stream to write to. Defaults to sys.stdout
+        render: Renderer from RENDERERS. Defaults to render_terminal
+
+    Returns:
+        int: Number of commands that failed
+    """
+    output = output or sys.stdout
+    buffer = io.StringIO()
+    failures = 0
+    try:
+        for line in lines:
+            command, args = parse_input(line)
+            if not command or command.startswith("#"):
+                continue
+            if command in ["close", "exit"]:
+                break
+            result = dispatch(command, args)
+            if not result.ok:
+                failures += 1
+            text = render(result)
+            if text:
+                buffer.write(text)
+                buffer.write("\n")
+                if buffer.tell() >= OUTPUT_BUFFER_SIZE:
+                    output.write(buffer.getvalue())
+                    buffer.seek(0)
+                    buffer.truncate()
+    finally:
+        output.write(buffer.getvalue())
+        output.flush()
+    return failures
+
+
+def main(argv=None, commands=None):
     """
     Main application loop for the contact management bot.
 
     Handles user input, routes commands, and provides interactive feedback.
+    With --batch, commands are read from a file or stdin instead and the
+    exit code is 1 if any of them failed.
+
+    Args:
+        argv (list, optional): Command-line arguments. Defaults to sys.argv[1:]
+        commands (optional): Iterable of command lines to run as a batch
+                             instead of prompting or reading --batch, e.g.
+                             the records of a pipeline stage (cli.py)
+
+    Command-line Arguments:
+        --db (str): File to load contacts from and save them to
+        --backend (str): On-disk store format, "sqlite" (default), "log" or
+                         "snapshot"
+        --sync-interval (float): Group-commit fsync interval of the log backend
+        --cache-size (int): Contacts kept in the LRU lookup cache in front
+                            of the on-disk store, 0 to disable it
+        --history-size (int): Changes kept for 'undo', 1000 by default
+        --shards (int): Worker processes to split the contacts across, 1
+                        (the default) to keep them in this process
+        --batch (str): Run commands from this file, or from stdin if no file
+                       or "-" is given
+        --output (str): Batch output format, "terminal" (default), "json"
+                        for one JSON object per command, or "silent"
+        --metrics-file (str): Write Prometheus metrics to this file on exit
+        --metrics-port (int): Serve Prometheus metrics on this local port
+
+    Returns:
+        int: Process exit code
     """
-    print(f"{BOT_COLOR}Welcome to the assistant bot!{Style.RESET_ALL}")
+    import argparse
 
-    # Command dictionary for cleaner routing
-    commands = {
-        "hello": lambda args: print_success("How can I help you?"),
-        "add": add_contact,
-        "change": update_contact,
-        "phone": get_users_phone,
-        "all": lambda args: print_dict_as_list(USERS),
-        "help": lambda args: print_dict_as_list(COMMANDS_HELP_INFO),
-    }
+    global USERS, HISTORY_SIZE
+    parser = argparse.ArgumentParser(description="Contact management bot.")
+    parser.add_argument("--db", default=None)
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="sqlite")
+    parser.add_argument("--sync-interval", type=float, default=None)
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE)
+    parser.add_argument("--history-size", type=int, default=DEFAULT_HISTORY_SIZE)
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--batch", nargs="?", const="-", default=None)
+    parser.add_argument("--output", choices=sorted(RENDERERS), default="terminal")
+    add_metrics_arguments(parser)
+    options = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    if options.history_size < 1:
+        parser.error("--history-size should be at least 1")
+    if options.shards < 1:
+        parser.error("--shards should be at least 1")
+    HISTORY_SIZE = options.history_size
+    if options.db is not None or options.shards > 1:
+        store_options = {}
+        if options.backend == "log" and options.sync_interval is not None:
+            store_options["sync_interval"] = options.sync_interval
+        USERS = open_store(
+            options.db, options.backend, cache_size=options.cache_size, shards=options.shards, **store_options
+        )
+
+    try:
+        with export_metrics(options.metrics_file, options.metrics_port):
+            return _run(options, commands)
+    finally:
+        USERS.close()
+
+
+def _run(options, commands):
+    """Run the interactive loop or a batch of commands for main, returning the exit code."""
+    if options.batch is None and commands is None:
+        set_colors(init_console())
+        _run_loop()
+        return 0
+    render = RENDERERS[options.output]
+    set_colors(render is render_terminal and init_console())
+    if commands is not None:
+        failures = run_batch(commands, render=render)
+    elif options.batch == "-":
+        failures = run_batch(sys.stdin, render=render)
+    else:
+        try:
+            with open(options.batch, "r", encoding="utf-8") as script:
+                failures = run_batch(script, render=render)
+        except OSError as error:
+            print_error(f"Cannot read commands from {options.batch}: {error}")
+            return 2
+    return 1 if failures else 0
+
+
+def _run_loop():
+    """Read commands from the user and dispatch them until exit."""
+    print(f"{BOT_COLOR}Welcome to the assistant bot!{RESET}")
 
     while True:
         user_input = input("Enter a command: ").strip()
         command, args = parse_input(user_input)
 
         if command in ["close", "exit"]:
-            print(f"{BOT_COLOR}Good bye!{Style.RESET_ALL}")
+            print(f"{BOT_COLOR}Good bye!{RESET}")
             break
-        elif command in commands:
-            result = commands[command](args)
-            if result:
-                print(result)
+        elif command in COMMANDS:
+            execute(command, args)
         elif command:  # Only show error if command was entered and it's invalid
             print_error("Invalid command. Please use one of the list below:")
-            print_dict_as_list(COMMANDS_HELP_INFO)
+            execute("help", [])
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
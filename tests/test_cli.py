@@ -0,0 +1,216 @@
+"""
+Tests for cli.py - Unified Command-Line Interface
+
+Tests cover:
+- Splitting arguments into pipeline stages
+- Tree, salary and cats stages alone and chained with '::'
+- Parallel salary totals in input order
+- Reading paths from stdin
+- Importing upstream files into the contact bot
+- Errors, usage errors and exit codes
+- Malformed line warnings on stderr
+- Output formatting
+- Metrics of parallel stages
+"""
+import io
+import json
+import pytest
+from pathlib import Path
+import sys
+
+# Add parent directory to path to import cli
+sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
+import task_4
+from metrics import METRICS
+from cli import SalaryReport, TreeEntry, format_record, main, ordered_map, split_stages
+
+
+@pytest.fixture
+def data(tmp_path):
+    """Create a directory with two salary files, one in a subdirectory, and a text file."""
+    (tmp_path / "a.csv").write_text("Alice,1000\nBob,2000\n")
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "nested" / "b.csv").write_text("Carol,3000\n")
+    (tmp_path / "notes.txt").write_text("not a csv\n")
+    return tmp_path
+
+
+def _square(number):
+    """Square a number, failing for negative ones (module level so it pickles)."""
+    if number < 0:
+        raise ValueError("negative")
+    return number * number
+
+
+class TestSplitStages:
+    """Test splitting arguments at '::'."""
+
+    def test_single_stage(self):
+        """Test that arguments without '::' are one stage."""
+        assert split_stages(["tree", "data"]) == [["tree", "data"]]
+
+    def test_pipeline(self):
+        """Test that '::' separates the stages."""
+        assert split_stages(["tree", "data", "::", "salary", "--jobs", "2"]) == [
+            ["tree", "data"],
+            ["salary", "--jobs", "2"],
+        ]
+
+
+class TestOrderedMap:
+    """Test the ordered_map helper."""
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_results_in_input_order(self, jobs):
+        """Test that results come in input order, errors alongside their item."""
+        results = list(ordered_map(_square, [3, -1, 2, 1], jobs))
+        assert [(item, result) for item, result, _ in results] == [(3, 9), (-1, None), (2, 4), (1, 1)]
+        assert isinstance(results[1][2], ValueError)
+        assert [error for _, _, error in results if error is None] == [None, None, None]
+
+    def test_reads_input_lazily(self):
+        """Test that the first result comes before the whole input is read."""
+        def numbers():
+            yield 2
+            raise AssertionError("read too far")
+
+        assert next(ordered_map(_square, numbers(), 1)) == (2, 4, None)
+
+
+class TestStages:
+    """Test running stages through main."""
+
+    def test_tree_with_pattern(self, data, capsys):
+        """Test that the tree lists directories and the files matching the pattern."""
+        assert main(["tree", str(data), "--pattern", "*.csv"]) == 0
+        assert capsys.readouterr().out.splitlines() == ["  a.csv", "  nested", ".  b.csv"]
+
+    @pytest.mark.parametrize("jobs", ["1", "2"])
+    def test_tree_into_salary(self, data, capsys, jobs):
+        """Test that salary sums the files found by the tree, in order, with any number of jobs."""
+        assert main(["tree", str(data), "--pattern", "*.csv", "::", "salary", "--jobs", jobs]) == 0
+        assert capsys.readouterr().out.splitlines() == [
+            f"{data / 'a.csv'}: total 3000.00, average 1500.00 (2 employees)",
+            f"{data / 'nested' / 'b.csv'}: total 3000.00, average 3000.00 (1 employees)",
+            "Total of all files: total 6000.00, average 2000.00 (3 employees)",
+        ]
+
+    def test_salary_total_only(self, data, capsys):
+        """Test that --total-only reports just the total of all files."""
+        assert main(["salary", str(data / "a.csv"), str(data / "nested" / "b.csv"), "--total-only"]) == 0
+        assert capsys.readouterr().out.splitlines() == [
+            "Total of all files: total 6000.00, average 2000.00 (3 employees)",
+        ]
+
+    def test_cats_from_stdin(self, tmp_path, capsys, monkeypatch):
+        """Test that '-' reads the paths from stdin."""
+        cats = tmp_path / "cats.csv"
+        cats.write_text("1,Tayson,3\n2,Vika,1\n")
+        monkeypatch.setattr(sys, "stdin", io.StringIO(f"{cats}\n\n"))
+        assert main(["cats", "-"]) == 0
+        assert capsys.readouterr().out.splitlines() == ["1,Tayson,3", "2,Vika,1"]
+
+    def test_tree_into_contacts(self, tmp_path, capsys, monkeypatch):
+        """Test that contacts imports every file of the stage before it."""
+        # main of the bot rebinds its store and history size; restore them afterwards
+        monkeypatch.setattr(task_4, "USERS", task_4.USERS)
+        monkeypatch.setattr(task_4, "HISTORY_SIZE", task_4.HISTORY_SIZE)
+        exports = tmp_path / "exports"
+        exports.mkdir()
+        (exports / "book.csv").write_text("name,phone\nAlice,1111111111\nBob,2222222222\n")
+        db = str(tmp_path / "contacts.db")
+
+        argv = ["tree", str(exports), "--pattern", "*.csv", "::", "contacts", "--db", db, "--output", "json"]
+        assert main(argv) == 0
+        record = json.loads(capsys.readouterr().out)
+        assert record["ok"] is True
+
+        assert task_4.main(["--db", db, "--output", "json"], commands=["phone Bob"]) == 0
+        assert "2222222222" in capsys.readouterr().out
+
+
+class TestMetrics:
+    """Test exporting the metrics of a pipeline."""
+
+    @pytest.mark.parametrize("jobs", ["1", "2"])
+    def test_worker_metrics_are_merged(self, data, tmp_path, capsys, jobs):
+        """Test that the rows read by salary workers reach the exported metrics."""
+        METRICS.reset()
+        path = tmp_path / "cli.prom"
+        argv = ["--metrics-file", str(path), "tree", str(data), "--pattern", "*.csv", "::", "salary", "--jobs", jobs]
+        assert main(argv) == 0
+        text = path.read_text()
+        assert 'tasks_rows_parsed_total{task="salary"} 3' in text
+        assert 'tasks_file_read_seconds_count{task="salary"} 2' in text
+        assert "tasks_tree_entries_total 4" in text
+        assert METRICS.enabled is False
+
+
+class TestErrors:
+    """Test error reporting and exit codes."""
+
+    def test_missing_file_fails(self, data, capsys):
+        """Test that a missing file is reported and the other files still count."""
+        assert main(["salary", str(data / "missing.csv"), str(data / "a.csv"), "--total-only"]) == 1
+        captured = capsys.readouterr()
+        assert "missing.csv" in captured.err
+        assert "total 3000.00" in captured.out
+
+    @pytest.mark.parametrize("jobs", ["1", "2"])
+    def test_malformed_lines_warn_on_stderr(self, data, capfd, jobs):
+        """Test that malformed salary and cat lines are warned about on stderr with their file."""
+        (data / "bad.csv").write_text("Dave,4000\nbroken\n")
+        assert main(["salary", str(data / "bad.csv"), "--jobs", jobs, "--total-only"]) == 0
+        assert main(["cats", str(data / "bad.csv")]) == 0
+        captured = capfd.readouterr()
+        assert captured.out.splitlines() == ["Total of all files: total 4000.00, average 4000.00 (1 employees)"]
+        warning = f"Warning: {data / 'bad.csv'}: line {{}} is malformed, skipped"
+        assert captured.err.splitlines() == [warning.format(2), warning.format(1), warning.format(2)]
+
+    def test_wrong_records_fail(self, data, capsys):
+        """Test that a stage refuses records it cannot read."""
+        assert main(["salary", str(data / "a.csv"), "::", "cats"]) == 1
+        assert "cats reads paths" in capsys.readouterr().err
+
+    def test_paths_and_upstream_conflict(self, data, capsys):
+        """Test that a stage after another takes no paths of its own."""
+        assert main(["tree", str(data), "::", "salary", str(data / "a.csv")]) == 1
+        assert "either from arguments" in capsys.readouterr().err
+
+    def test_contacts_must_be_last(self, capsys):
+        """Test that contacts cannot feed another stage."""
+        with pytest.raises(SystemExit) as exit_info:
+            main(["contacts", "::", "salary"])
+        assert exit_info.value.code == 2
+        assert "must be the last stage" in capsys.readouterr().err
+
+    def test_jobs_must_be_positive(self, data):
+        """Test that salary needs at least one job."""
+        with pytest.raises(SystemExit):
+            main(["salary", str(data / "a.csv"), "--jobs", "0"])
+
+
+class TestFormatRecord:
+    """Test rendering records as lines."""
+
+    def test_tree_entry(self):
+        """Test that tree entries are indented like task_3."""
+        assert format_record(TreeEntry("a/b", "b", 2, False)) == "..  b"
+
+    def test_tree_entry_colors(self):
+        """Test that colored entries are green for directories and red for files."""
+        from console_colors import GREEN, RED
+
+        assert format_record(TreeEntry("a", "a", 0, True), colors=True).startswith(GREEN)
+        assert format_record(TreeEntry("b", "b", 0, False), colors=True).startswith(RED)
+
+    def test_salary_report(self):
+        """Test per-file and total salary lines."""
+        line = format_record(SalaryReport("a.csv", "10.00", "5.00", 2))
+        assert line == "a.csv: total 10.00, average 5.00 (2 employees)"
+        assert format_record(SalaryReport(None, "0.00", "0.00", 0)).startswith("Total of all files:")
+
+    def test_dict_and_text(self):
+        """Test that dicts are comma-separated values and anything else is str()."""
+        assert format_record({"id": "1", "name": "Tayson", "age": 3}) == "1,Tayson,3"
+        assert format_record("line") == "line"
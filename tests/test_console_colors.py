@@ -0,0 +1,67 @@
+"""
+Tests for console_colors.py - Console Colors
+
+Tests cover:
+- Color codes matching colorama's
+- Terminal detection
+- Windows console setup only for terminals
+"""
+import io
+import types
+import pytest
+from pathlib import Path
+import sys
+from colorama import Fore, Style
+
+# Add parent directory to path to import console_colors
+sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
+import console_colors
+from console_colors import init_console
+
+
+class FakeTerminal(io.StringIO):
+    """StringIO that claims to be a terminal."""
+
+    def isatty(self):
+        return True
+
+
+class TestColorCodes:
+    """Test the ANSI constants."""
+
+    def test_match_colorama(self):
+        """Test that the literal codes are the ones colorama prints."""
+        assert console_colors.RED == Fore.RED
+        assert console_colors.GREEN == Fore.GREEN
+        assert console_colors.YELLOW == Fore.YELLOW
+        assert console_colors.CYAN == Fore.CYAN
+        assert console_colors.LIGHTGREEN == Fore.LIGHTGREEN_EX
+        assert console_colors.RESET == Style.RESET_ALL
+
+
+class TestInitConsole:
+    """Test the init_console function."""
+
+    def test_terminal(self):
+        """Test that a terminal gets colors."""
+        assert init_console(FakeTerminal()) is True
+
+    def test_pipe_or_file(self):
+        """Test that other streams do not."""
+        assert init_console(io.StringIO()) is False
+
+    def test_closed_stream(self):
+        """Test that a closed stream does not."""
+        stream = io.StringIO()
+        stream.close()
+        assert init_console(stream) is False
+
+    @pytest.mark.parametrize("stream, calls", [(FakeTerminal(), 1), (io.StringIO(), 0)])
+    def test_windows_console_fixed_for_terminals_only(self, monkeypatch, stream, calls):
+        """Test that colorama is only set up on Windows when writing to a terminal."""
+        fixed = []
+        fake = types.SimpleNamespace(just_fix_windows_console=lambda: fixed.append(True))
+        monkeypatch.setattr(sys, "platform", "win32")
+        monkeypatch.setitem(sys.modules, "colorama", fake)
+        init_console(stream)
+        assert len(fixed) == calls
@@ -0,0 +1,262 @@
+"""
+Tests for contact_index.py - Contact Search Indexes
+
+Tests cover:
+- Bounded edit distance
+- Prefix search over the sorted name array
+- Fuzzy search through the trigram index, including repeated trigrams
+- Incremental updates from an attached store
+- Lookup of stored names by name key
+- Phone normalization and reverse phone lookup
+"""
+import pytest
+from pathlib import Path
+import sys
+
+# Add parent directory to path to import contact_index
+sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
+from contact_index import KeyIndex, NameIndex, PhoneIndex, levenshtein, normalize_phone
+from contact_phones import pack_phones
+from contact_store import MemoryStore, SQLiteStore
+
+NAMES = ["Alice", "Alicia", "Alex", "Bob", "Bobby", "Charlie", "Charlotte"]
+
+
+@pytest.fixture
+def index():
+    """Return an index loaded with a few names."""
+    index = NameIndex()
+    index.rebuild((name, "1234567890") for name in NAMES)
+    return index
+
+
+class TestLevenshtein:
+    """Test the edit distance helper."""
+
+    def test_identical(self):
+        """Test that equal strings have distance 0."""
+        assert levenshtein("alice", "alice", 2) == 0
+
+    def test_single_edits(self):
+        """Test substitution, insertion and deletion."""
+        assert levenshtein("alice", "alize", 2) == 1
+        assert levenshtein("alice", "alicee", 2) == 1
+        assert levenshtein("alice", "alce", 2) == 1
+
+    def test_limit_cuts_off(self):
+        """Test that distances past the limit are reported as limit + 1."""
+        assert levenshtein("alice", "charlotte", 2) == 3
+        assert levenshtein("a", "abcdef", 2) == 3
+
+
+class TestPrefixSearch:
+    """Test prefix queries."""
+
+    def test_prefix_matches_in_order(self, index):
+        """Test that all names with the prefix are returned alphabetically."""
+        assert index.prefix("al") == ["Alex", "Alice", "Alicia"]
+
+    def test_prefix_is_case_insensitive(self, index):
+        """Test that prefix matching ignores case."""
+        assert index.prefix("BOB") == ["Bob", "Bobby"]
+
+    def test_prefix_limit(self, index):
+        """Test that results are capped."""
+        assert index.prefix("a", limit=2) == ["Alex", "Alice"]
+
+    def test_prefix_no_match(self, index):
+        """Test a prefix no name starts with."""
+        assert index.prefix("zed") == []
+
+
+class TestPaging:
+    """Test ordered paging over the name index."""
+
+    def test_first_page(self, index):
+        """Test that pages start from the first name."""
+        assert index.page(limit=3) == ["Alex", "Alice", "Alicia"]
+
+    def test_page_after_cursor(self, index):
+        """Test that a page continues after the cursor name."""
+        assert index.page("Alicia", limit=2) == ["Bob", "Bobby"]
+
+    def test_last_page(self, index):
+        """Test that paging past the end returns nothing."""
+        assert index.page("Charlotte") == []
+
+
+class TestFuzzySearch:
+    """Test typo-tolerant queries."""
+
+    def test_single_typo(self, index):
+        """Test that a one-letter typo still finds the name."""
+        assert index.fuzzy("Alise")[0] == "Alice"
+
+    def test_closest_first(self, index):
+        """Test that results are ordered by distance."""
+        assert index.fuzzy("Bobb") == ["Bob", "Bobby"]
+
+    def test_too_many_typos(self, index):
+        """Test that names further than the allowed distance are not returned."""
+        assert index.fuzzy("Xyzzy") == []
+
+    def test_repeated_trigrams(self):
+        """Test that names whose trigrams repeat are found within the allowed typos."""
+        index = NameIndex()
+        index.rebuild((name, "1234567890") for name in ["Aaaa", "Aaaaa", "Abababab"])
+        assert index.fuzzy("baaaa") == ["Aaaa", "Aaaaa"]
+        assert index.fuzzy("babababab") == ["Abababab"]
+
+    def test_search_prefers_prefix_matches(self, index):
+        """Test that search lists prefix matches before typo matches."""
+        assert index.search("Charl") == ["Charlie", "Charlotte"]
+        assert index.search("Chralie")[0] == "Charlie"
+
+
+class TestIncrementalUpdates:
+    """Test that attached indexes follow store changes."""
+
+    @pytest.fixture(params=["memory", "sqlite"])
+    def store(self, request, tmp_path):
+        if request.param == "memory":
+            store = MemoryStore()
+        else:
+            store = SQLiteStore(str(tmp_path / "contacts.db"))
+        store["Alice"] = "1111111111"
+        yield store
+        store.close()
+
+    def test_attach_builds_from_contents(self, store):
+        """Test that attaching loads existing contacts."""
+        index = store.index_for(NameIndex)
+        assert index.prefix("a") == ["Alice"]
+        assert store.index_for(NameIndex) is index
+
+    def test_added_names_are_indexed(self, store):
+        """Test that new contacts are searchable without a rebuild."""
+        index = store.index_for(NameIndex)
+        store["Albert"] = "2222222222"
+        store["Alice"] = "3333333333"
+        assert index.prefix("al") == ["Albert", "Alice"]
+        assert index.fuzzy("Alberd") == ["Albert"]
+
+    def test_deleted_names_are_removed(self, store):
+        """Test that removed contacts disappear from both searches."""
+        index = store.index_for(NameIndex)
+        del store["Alice"]
+        assert index.prefix("al") == []
+        assert index.fuzzy("Alice") == []
+
+        store["Alice"] = "1111111111"
+        assert index.fuzzy("Alice") == ["Alice"]
+
+    def test_clear_empties_index(self, store):
+        """Test that clearing the store clears the index."""
+        index = store.index_for(NameIndex)
+        store.clear()
+        assert len(index) == 0
+
+    def test_every_phone_of_a_contact_is_indexed(self, store):
+        """Test that contacts with several packed phones are found by each."""
+        index = store.index_for(PhoneIndex)
+        store["Dave"] = pack_phones(["3333333333", "0444444444"])
+        assert index.owners("333-333-3333") == ["Dave"]
+        assert index.owners("0444444444") == ["Dave"]
+        store["Dave"] = pack_phones(["0444444444"])
+        assert index.owners("3333333333") == []
+        assert index.owners("044 444 4444") == ["Dave"]
+
+
+class TestKeyIndex:
+    """Test finding stored names from any spelling."""
+
+    def test_find_any_spelling(self):
+        """Test that case and Unicode spelling variants find the stored name."""
+        store = MemoryStore({"McDonald": "1234567890", "Straße": "1234567891"})
+        keys = store.index_for(KeyIndex)
+        assert keys.find("mcdonald") == "McDonald"
+        assert keys.find("STRASSE") == "Straße"
+        assert keys.find("Nobody") is None
+
+    def test_follows_store_changes(self):
+        """Test that added and removed contacts are found and forgotten."""
+        store = MemoryStore()
+        keys = store.index_for(KeyIndex)
+        store["O'Brien"] = "1234567890"
+        store["O'Brien"] = "1234567891"
+        assert keys.find("o'brien") == "O'Brien"
+        assert len(keys) == 1
+        del store["O'Brien"]
+        assert keys.find("o'brien") is None
+        store["Alice"] = "1234567890"
+        store.clear()
+        assert len(keys) == 0
+
+    def test_first_of_shared_key_is_kept(self):
+        """Test that removing another name with the same key keeps the first one found."""
+        store = MemoryStore({"Alice": "1234567890", "ALICE": "1234567891"})
+        keys = store.index_for(KeyIndex)
+        found = keys.find("alice")
+        other = "ALICE" if found == "Alice" else "Alice"
+        del store[other]
+        assert keys.find("alice") == found
+
+
+class TestNormalizePhone:
+    """Test the phone normalization helper."""
+
+    def test_strips_formatting(self):
+        """Test that formatting characters are removed."""
+        assert normalize_phone("+1 (234) 567-8900") == "12345678900"
+        assert normalize_phone("123.456.7890") == "1234567890"
+
+    def test_keeps_other_characters(self):
+        """Test that invalid characters are left for validation to reject."""
+        assert normalize_phone("12345abcde#") == "12345abcde#"
+
+
+class TestPhoneIndex:
+    """Test the reverse phone lookup index."""
+
+    @pytest.fixture
+    def store(self):
+        store = MemoryStore()
+        store["Alice"] = "123-456-7890"
+        store["Bob"] = "(123) 456 7890"
+        store["Charlie"] = "2222222222"
+        return store
+
+    def test_lookup_ignores_formatting(self, store):
+        """Test that all spellings of a number find the same owners."""
+        index = store.index_for(PhoneIndex)
+        assert index.owners("1234567890") == ["Alice", "Bob"]
+        assert index.owners("+2 222 222 222") == ["Charlie"]
+
+    def test_unknown_number(self, store):
+        """Test a number nobody has."""
+        assert store.index_for(PhoneIndex).owners("9999999999") == []
+
+    def test_change_moves_owner(self, store):
+        """Test that changing a phone updates the reverse lookup."""
+        index = store.index_for(PhoneIndex)
+        store["Alice"] = "9999999999"
+        assert index.owners("1234567890") == ["Bob"]
+        assert index.owners("9999999999") == ["Alice"]
+
+    def test_delete_and_clear(self, store):
+        """Test that removed contacts no longer own their numbers."""
+        index = store.index_for(PhoneIndex)
+        del store["Charlie"]
+        assert index.owners("2222222222") == []
+        store.clear()
+        assert len(index) == 0
+
+    def test_every_phone_of_a_contact_is_indexed(self, store):
+        """Test that contacts with several packed phones are found by each."""
+        index = store.index_for(PhoneIndex)
+        store["Dave"] = pack_phones(["3333333333", "0444444444"])
+        assert index.owners("333-333-3333") == ["Dave"]
+        assert index.owners("0444444444") == ["Dave"]
+        store["Dave"] = pack_phones(["0444444444"])
+        assert index.owners("3333333333") == []
+        assert index.owners("044 444 4444") == ["Dave"]
@@ -0,0 +1,191 @@
+"""
+Tests for contact_journal.py - Contact Change Journal
+
+Tests cover:
+- Undo and redo of added, changed and deleted contacts
+- Steps grouping several changes
+- The capacity bound by whole steps, steps too large to keep, and clearing
+  of the redo side
+- Starting over on clear
+- Per-contact history
+- Journaling on the in-memory, SQLite and cached stores
+"""
+import pytest
+from pathlib import Path
+import sys
+
+# Add parent directory to path to import contact_journal
+sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
+from contact_index import PhoneIndex
+from contact_journal import ChangeJournal
+from contact_store import open_store
+
+
+@pytest.fixture(params=["memory", "sqlite", "cached"])
+def store(request, tmp_path):
+    """Yield an empty store of each kind."""
+    path = None if request.param == "memory" else str(tmp_path / "contacts.db")
+    store = open_store(path, cache_size=10 if request.param == "cached" else 0)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def journal(store):
+    """Attach a journal to the store."""
+    return store.index_for(ChangeJournal, capacity=5)
+
+
+class TestUndoRedo:
+    """Test reverting and reapplying changes."""
+
+    def test_undo_change(self, store, journal):
+        """Test that undo restores the previous phone."""
+        store["Alice"] = "1111111111"
+        store["Alice"] = "2222222222"
+
+        assert journal.undo(store) == [("Alice", "1111111111", "2222222222")]
+        assert store["Alice"] == "1111111111"
+
+    def test_undo_add_and_delete(self, store, journal):
+        """Test that undoing an add removes the contact and undoing a delete restores it."""
+        store["Alice"] = "1111111111"
+        store["Bob"] = "2222222222"
+        del store["Alice"]
+
+        journal.undo(store)
+        assert store["Alice"] == "1111111111"
+        journal.undo(store, 2)
+        assert "Alice" not in store
+        assert "Bob" not in store
+        assert journal.undo(store) == []
+
+    def test_redo(self, store, journal):
+        """Test that redo reapplies undone changes in their original order."""
+        store["Alice"] = "1111111111"
+        store["Alice"] = "2222222222"
+        journal.undo(store, 2)
+
+        assert journal.redo(store, 5) == [
+            ("Alice", None, "1111111111"),
+            ("Alice", "1111111111", "2222222222"),
+        ]
+        assert store["Alice"] == "2222222222"
+        assert journal.redo(store) == []
+
+    def test_new_change_clears_redo(self, store, journal):
+        """Test that undone changes cannot be redone after a new change."""
+        store["Alice"] = "1111111111"
+        journal.undo(store)
+        store["Bob"] = "2222222222"
+        assert journal.redo(store) == []
+        assert journal.stats() == {"undo": 1, "redo": 0, "capacity": 5}
+
+    def test_undo_keeps_indexes_current(self, store, journal):
+        """Test that undone changes reach the other indexes too."""
+        phones = store.index_for(PhoneIndex)
+        store["Alice"] = "1111111111"
+        store["Alice"] = "2222222222"
+        journal.undo(store)
+        assert phones.owners("1111111111") == ["Alice"]
+        assert phones.owners("2222222222") == []
+
+
+class TestSteps:
+    """Test grouping changes into steps."""
+
+    def test_step_is_undone_at_once(self, store, journal):
+        """Test that changes inside step() are undone together."""
+        store["Alice"] = "1111111111"
+        with journal.step():
+            store["Alice"] = "2222222222"
+            store["Bob"] = "3333333333"
+
+        assert len(journal.undo(store)) == 2
+        assert store["Alice"] == "1111111111"
+        assert "Bob" not in store
+
+    def test_bulk_update_in_a_step(self, store, journal):
+        """Test that a bulk update can be undone as one step where the store reports it."""
+        store["Alice"] = "1111111111"
+        with journal.step():
+            store.bulk_update([("Alice", "2222222222"), ("Bob", "3333333333")])
+        journal.undo(store)
+        if journal.stats()["redo"]:
+            assert dict(store.items()) == {"Alice": "1111111111"}
+        else:
+            # SQLite rebuilds its indexes after a bulk write: the history starts over
+            assert len(journal) == 0
+
+
+class TestBounds:
+    """Test the memory bound and resets."""
+
+    def test_capacity(self, store, journal):
+        """Test that only the most recent changes are kept."""
+        for i in range(8):
+            store["Alice"] = str(1000000000 + i)
+        assert len(journal) == 5
+        assert len(journal.undo(store, 10)) == 5
+        assert store["Alice"] == "1000000002"
+
+    def test_capacity_drops_whole_steps(self, store, journal):
+        """Test that a step is dropped completely once it no longer fits."""
+        with journal.step():
+            for name in ("Alice", "Bob", "Carol"):
+                store[name] = "1111111111"
+        store["Dave"] = "2222222222"
+        store["Erin"] = "3333333333"
+        store["Frank"] = "4444444444"
+
+        assert len(journal) == 3
+        assert len(journal.undo(store, 10)) == 3
+        assert sorted(store) == ["Alice", "Bob", "Carol"]
+
+    def test_step_larger_than_capacity(self, store, journal):
+        """Test that a step too large to keep is not half undone and marks the overflow."""
+        store["Keeper"] = "1111111111"
+        with journal.step():
+            for i in range(10):
+                store[f"User{i}"] = "2222222222"
+
+        assert journal.overflowed
+        assert journal.undo(store) == []
+        assert len(store) == 11
+        store["Alice"] = "3333333333"
+        assert journal.undo(store) == [("Alice", None, "3333333333")]
+        store.clear()
+        assert not journal.overflowed
+
+    def test_clear_starts_over(self, store, journal):
+        """Test that clearing the store forgets the history."""
+        store["Alice"] = "1111111111"
+        store.clear()
+        assert len(journal) == 0
+        assert journal.undo(store) == []
+
+    def test_invalid_capacity(self):
+        """Test that the journal keeps at least one change."""
+        with pytest.raises(ValueError):
+            ChangeJournal(capacity=0)
+
+
+class TestHistory:
+    """Test the per-contact history."""
+
+    def test_history_of_one_contact(self, store, journal):
+        """Test that history lists one contact's changes, most recent first."""
+        store["Alice"] = "1111111111"
+        store["Bob"] = "2222222222"
+        store["Alice"] = "3333333333"
+
+        assert journal.history("Alice") == [(3, "1111111111", "3333333333"), (1, None, "1111111111")]
+        assert journal.history("Alice", limit=1) == [(3, "1111111111", "3333333333")]
+        assert journal.history("Carol") == []
+
+    def test_undone_changes_leave_history(self, store, journal):
+        """Test that undone changes are not listed."""
+        store["Alice"] = "1111111111"
+        store["Alice"] = "2222222222"
+        journal.undo(store)
+        assert journal.history("Alice") == [(1, None, "1111111111")]
@@ -0,0 +1,70 @@
+"""
+Tests for contact_names.py - Contact Names
+
+Tests cover:
+- Name keys across case, Unicode normalization and case folding
+- Caching and interning of keys
+- Display names
+"""
+import pytest
+from pathlib import Path
+import sys
+
+# Add parent directory to path to import contact_names
+sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
+from contact_names import display_name, name_key
+
+
+class TestNameKey:
+    """Test the name_key function."""
+
+    @pytest.mark.parametrize(
+        "first, second",
+        [
+            ("McDonald", "MCDONALD"),
+            ("O'Brien", "o'brien"),
+            ("Stra\u00dfe", "STRASSE"),
+            ("Ren\u00e9e", "Rene\u0301e"),  # precomposed and combining accent
+            ("\uff21lice", "alice"),  # full-width A
+            ("\ufb01ona", "Fiona"),  # fi ligature
+            ("\u03a3\u038a\u03a3\u03a5\u03a6\u039f\u03a3", "\u03c3\u03af\u03c3\u03c5\u03c6\u03bf\u03c2"),
+        ],
+    )
+    def test_spellings_share_a_key(self, first, second):
+        """Test that different spellings of one name get one key."""
+        assert name_key(first) == name_key(second)
+
+    def test_different_names_differ(self):
+        """Test that distinct names keep distinct keys."""
+        assert name_key("Anna") != name_key("Hanna")
+        assert name_key("Rene") != name_key("Ren\u00e9")
+
+    def test_keys_are_interned(self):
+        """Test that equal keys are one object, computed once per name."""
+        name_key.cache_clear()
+        first = name_key("".join(["Mc", "Donald"]))
+        second = name_key("".join(["MC", "DONALD"]))
+        name_key("".join(["Mc", "Donald"]))
+        assert first is second
+        assert name_key.cache_info().hits == 1
+
+
+class TestDisplayName:
+    """Test the display_name function."""
+
+    def test_keeps_capitals_as_entered(self):
+        """Test that mixed-case names are not flattened."""
+        assert display_name("McDonald") == "McDonald"
+        assert display_name("O'Brien") == "O'Brien"
+        assert display_name("ALICE") == "ALICE"
+
+    def test_capitalizes_lower_case_names(self):
+        """Test that names typed in lower case get a capital first letter."""
+        assert display_name("alice") == "Alice"
+        assert display_name("o'brien") == "O'brien"
+        assert display_name("\u00e9mile") == "\u00c9mile"
+
+    def test_normalizes(self):
+        """Test that display names are NFKC-normalized."""
+        assert display_name("Rene\u0301e") == "Ren\u00e9e"
+        assert display_name("\ufb01ona") == "Fiona"
@@ -0,0 +1,90 @@
+"""
+Tests for contact_phones.py - Packed Phone Numbers
+
+Tests cover:
+- Packing and unpacking single numbers, including leading zeros
+- Rejecting numbers that cannot be packed
+- Phone arrays and their byte encoding
+- Memory use compared to lists of strings
+"""
+import pytest
+import sys
+import tracemalloc
+from array import array
+from pathlib import Path
+
+# Add parent directory to path to import contact_phones
+sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
+from contact_phones import (
+    decode_phones,
+    encode_phones,
+    format_phones,
+    pack_phone,
+    pack_phones,
+    unpack_phone,
+    unpack_phones,
+)
+
+
+class TestPackPhone:
+    """Test packing single phone numbers."""
+
+    def test_round_trip(self):
+        """Test that packed numbers unpack to their digits."""
+        for phone in ("1234567890", "999999999999999", "0000000001"):
+            assert unpack_phone(pack_phone(phone)) == phone
+
+    def test_formatting_is_stripped(self):
+        """Test that spellings of one number pack to the same code."""
+        assert pack_phone("+1 (234) 567-8900") == pack_phone("12345678900")
+
+    def test_leading_zeros_are_kept(self):
+        """Test that numbers differing only in leading zeros stay distinct."""
+        assert pack_phone("0123456789") != pack_phone("123456789")
+        assert unpack_phone(pack_phone("0012345678")) == "0012345678"
+
+    def test_fits_in_64_bits(self):
+        """Test that the longest number fits in an array('Q') slot."""
+        array("Q", [pack_phone("9" * 15)])
+
+    @pytest.mark.parametrize("phone", ["", "12345abcde", "1" * 16, "+-()"])
+    def test_invalid_numbers(self, phone):
+        """Test that numbers that cannot be packed are rejected."""
+        with pytest.raises(ValueError):
+            pack_phone(phone)
+
+
+class TestPhoneArrays:
+    """Test arrays holding the phones of a contact."""
+
+    def test_pack_and_unpack(self):
+        """Test that a contact's phones keep their order."""
+        phones = pack_phones(["2222222222", "111-111-1111"])
+        assert phones.typecode == "Q"
+        assert unpack_phones(phones) == ["2222222222", "1111111111"]
+        assert format_phones(phones) == "2222222222; 1111111111"
+
+    def test_plain_string_is_one_phone(self):
+        """Test that string values from older stores are handled."""
+        assert unpack_phones("123-456-7890") == ["123-456-7890"]
+
+    def test_byte_encoding(self):
+        """Test that phones survive encoding to bytes."""
+        phones = pack_phones(["1234567890", "0987654321"])
+        data = encode_phones(phones)
+        assert len(data) == 16
+        assert decode_phones(data) == phones
+
+    def test_smaller_than_lists_of_strings(self):
+        """Test that packed phones take well under the memory of string lists."""
+        def measure(build):
+            tracemalloc.start()
+            values = [build(i) for i in range(2000)]
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del values
+            return size
+
+        strings = measure(lambda i: [str(1000000000 + i), str(2000000000 + i), str(3000000000 + i)])
+        packed = measure(lambda i: pack_phones([str(1000000000 + i), str(2000000000 + i), str(3000000000 + i)]))
+        assert packed < strings * 0.6
@@ -0,0 +1,74 @@
+"""
+Tests for contact_profiler.py - Command Profiler
+
+Tests cover:
+- CPU profiles of the commands run while profiling
+- Memory profiles of what the commands allocated
+- Starting and stopping in the wrong state
+"""
+import pytest
+from pathlib import Path
+import sys
+import tracemalloc
+
+# Add parent directory to path to import contact_profiler
+sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
+from contact_profiler import Profiler
+
+
+def busy_handler(args):
+    """Spend a little time so the handler shows up in a profile."""
+    return sum(range(10000))
+
+
+def allocating_handler(args):
+    """Allocate memory that outlives the call."""
+    args.append([0] * 100000)
+
+
+class TestProfiler:
+    """Test the Profiler class."""
+
+    def test_cpu_profile_reports_handlers(self):
+        """Test that profiled handlers appear in the report."""
+        profiler = Profiler()
+        profiler.start("cpu")
+        assert profiler.call(busy_handler, []) == sum(range(10000))
+        rows = profiler.stop()
+
+        assert profiler.mode is None
+        assert any(location.startswith("busy_handler") for location, _ in rows)
+        assert all("calls" in statistic for _, statistic in rows)
+
+    def test_memory_profile_reports_allocations(self):
+        """Test that retained allocations are attributed to their source line."""
+        profiler = Profiler()
+        kept = []
+        profiler.start("memory")
+        profiler.call(allocating_handler, kept)
+        rows = profiler.stop()
+
+        assert not tracemalloc.is_tracing()
+        assert rows[0][0].startswith("test_contact_profiler.py:")
+        assert "KiB" in rows[0][1]
+
+    def test_counts_commands(self):
+        """Test that every call is counted."""
+        profiler = Profiler()
+        profiler.start("cpu")
+        for _ in range(3):
+            profiler.call(busy_handler, [])
+        assert profiler.commands == 3
+        profiler.stop()
+
+    def test_invalid_states(self):
+        """Test starting twice, stopping when idle and unknown modes."""
+        profiler = Profiler()
+        with pytest.raises(RuntimeError):
+            profiler.stop()
+        with pytest.raises(ValueError):
+            profiler.start("disk")
+        profiler.start("cpu")
+        with pytest.raises(RuntimeError):
+            profiler.start("memory")
+        profiler.stop()
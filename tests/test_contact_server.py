@@ -0,0 +1,113 @@
+"""
+Tests for contact_server.py - Contact Service
+
+Tests cover:
+- Running protocol lines as bot commands
+- Pipelined requests on one connection
+- Concurrent clients sharing one store
+- Commands that are not served over the network
+"""
+import asyncio
+import json
+import pytest
+from pathlib import Path
+import sys
+
+# Add parent directory to path to import contact_server
+sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
+import task_4
+from contact_server import handle_line, start_server
+
+
+@pytest.fixture(autouse=True)
+def clear_users():
+    """Clear the shared store and use plain output like the server does."""
+    task_4.USERS.clear()
+    task_4.set_colors(False)
+    yield
+    task_4.USERS.clear()
+    task_4.set_colors(True)
+
+
+async def _exchange(port, lines):
+    """Send all lines at once and read one reply per line."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write("".join(f"{line}\n" for line in lines).encode())
+    await writer.drain()
+    replies = [json.loads(await reader.readline()) for _ in lines]
+    writer.close()
+    await writer.wait_closed()
+    return replies
+
+
+def _with_server(scenario):
+    """Run a coroutine function against a fresh server on a free port."""
+    async def run():
+        server = await start_server()
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await scenario(port)
+
+    return asyncio.run(run())
+
+
+class TestHandleLine:
+    """Test the handle_line function."""
+
+    def test_successful_command(self):
+        """Test that command output is returned with ok set."""
+        reply = handle_line("add Alice 1234567890")
+        assert reply == {"ok": True, "code": "added", "output": " Contact added."}
+
+    def test_failing_command(self):
+        """Test that errors are returned with ok unset."""
+        reply = handle_line("phone Bob")
+        assert reply["ok"] is False
+        assert reply["code"] == "not_found"
+        assert "doesn't exist" in reply["output"]
+
+    def test_local_only_command(self):
+        """Test that file commands are not served."""
+        reply = handle_line("export /tmp/contacts.csv")
+        assert reply == {"ok": False, "code": "invalid_command", "output": "Invalid command 'export'."}
+
+
+class TestServer:
+    """Test the asyncio server."""
+
+    def test_pipelined_requests_answered_in_order(self):
+        """Test that many requests sent at once get replies in order."""
+        lines = [f"add User{i} {1000000000 + i}" for i in range(50)] + ["phone user7"]
+        replies = _with_server(lambda port: _exchange(port, lines))
+
+        assert all(reply["ok"] for reply in replies)
+        assert replies[-1]["output"].strip() == "User7's phone is 1000000007"
+
+    def test_concurrent_clients_share_store(self):
+        """Test that writes from many clients are all applied."""
+        async def scenario(port):
+            await asyncio.gather(*(
+                _exchange(port, [f"add User{client}x{i} {1000000000 + i}" for i in range(20)])
+                for client in range(20)
+            ))
+            return await _exchange(port, ["all 1000"])
+
+        replies = _with_server(scenario)
+
+        assert len(task_4.USERS) == 400
+        assert "User19x19" in replies[0]["output"]
+
+    def test_exit_closes_connection(self):
+        """Test that 'exit' ends the session."""
+        async def scenario(port):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"hello\nexit\nhello\n")
+            await writer.drain()
+            first = await reader.readline()
+            rest = await reader.read()
+            writer.close()
+            return first, rest
+
+        first, rest = _with_server(scenario)
+        assert json.loads(first)["ok"] is True
+        assert rest == b""
@@ -0,0 +1,166 @@
+"""
+Tests for contact_shards.py - Sharded Contact Store
+
+Tests cover:
+- Stable routing of names to shards
+- One set of files per shard, persistence and the shard count check
+- Batched lookups and bulk updates across shards
+- Merged pages, name searches, name key lookups and phone owners
+- Errors raised in a worker
+- Router-side indexes such as the change journal
+"""
+import pytest
+from pathlib import Path
+import sqlite3
+import sys
+
+# Add parent directory to path to import contact_shards
+sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
+from contact_index import KeyIndex, NameIndex, PhoneIndex
+from contact_journal import ChangeJournal
+from contact_phones import pack_phones
+from contact_shards import ShardedStore, shard_of, shard_path
+from contact_store import MemoryStore, open_store
+
+NAMES = ["Alice", "Alicia", "Alina", "Bob", "Bobby", "Carol", "Caroline", "Dave", "Eve", "Mallory"]
+
+
+@pytest.fixture
+def store():
+    """Yield an in-memory store split into 3 shards."""
+    store = ShardedStore(3)
+    yield store
+    store.close()
+
+
+def fill(store):
+    """Store the NAMES, each with its own phone, plus one phone shared by Bob and Eve."""
+    store.bulk_update((name, pack_phones([str(1000000000 + i)])) for i, name in enumerate(NAMES))
+    store["Eve"] = pack_phones(["1000000003"])
+
+
+class TestRouting:
+    """Test assigning names to shards."""
+
+    def test_shard_is_stable(self):
+        """Test that a name maps to the same shard every time, within range."""
+        assert shard_of("Alice", 4) == shard_of("Alice", 4)
+        assert {shard_of(name, 4) for name in NAMES} <= {0, 1, 2, 3}
+        assert len({shard_of(name, 4) for name in NAMES}) > 1
+
+    def test_shard_path(self):
+        """Test that shard files carry the shard number and count."""
+        assert shard_path("book.db", 1, 4) == "book.db.1-of-4"
+        assert shard_path(None, 1, 4) is None
+
+    def test_invalid_shard_count(self):
+        """Test that a sharded store needs a shard."""
+        with pytest.raises(ValueError):
+            ShardedStore(0)
+
+
+class TestFanOut:
+    """Test operations that span several shards."""
+
+    def test_len_and_items(self, store):
+        """Test that counting and listing see every shard."""
+        fill(store)
+        assert len(store) == len(NAMES)
+        assert sorted(store) == sorted(NAMES)
+
+    def test_get_many_keeps_order(self, store):
+        """Test that batched lookups come back in request order, None for unknown names."""
+        fill(store)
+        assert store.get_many(["Eve", "Nobody", "Alice"]) == [
+            pack_phones(["1000000003"]),
+            None,
+            pack_phones(["1000000000"]),
+        ]
+
+    def test_page_merges_in_name_order(self, store):
+        """Test that pages are the first contacts of all shards in name order."""
+        fill(store)
+        names = []
+        after = None
+        while True:
+            page = store.page(after, 3)
+            if not page:
+                break
+            names.extend(name for name, _ in page)
+            after = page[-1][0]
+        assert names == sorted(NAMES)
+
+    def test_search_matches_single_index(self, store):
+        """Test that merged searches rank names as one NameIndex would."""
+        fill(store)
+        single = MemoryStore(store.items())
+        for query in ["ali", "Bob", "Carol", "Malory", "x"]:
+            assert store.index_for(NameIndex).search(query, 4) == single.index_for(NameIndex).search(query, 4)
+        assert store.index_for(NameIndex).prefix("car") == ["Carol", "Caroline"]
+        assert len(store.index_for(NameIndex)) == len(NAMES)
+
+    def test_owners_across_shards(self, store):
+        """Test that phone owners are collected from every shard."""
+        fill(store)
+        assert store.index_for(PhoneIndex).owners("1000000003") == ["Bob", "Eve"]
+        store["Bob"] = pack_phones(["2000000000"])
+        assert store.index_for(PhoneIndex).owners("1000000003") == ["Eve"]
+
+    def test_spellings_share_a_shard(self, store):
+        """Test that every spelling of a name routes to its shard, and lookups ask only that shard."""
+        assert shard_of("Zoë Smith", 4) == shard_of("ZOË SMITH", 4)
+        fill(store)
+        keys = store.index_for(KeyIndex)
+        store._fan_out = None
+        assert [keys.find(name.upper()) for name in NAMES] == NAMES
+        assert keys.find("Nobody") is None
+
+    def test_worker_errors_are_raised(self, store):
+        """Test that an exception in a worker reaches the caller and the store keeps working."""
+        with pytest.raises(AttributeError):
+            store.index_for(NameIndex)._query("no_such_method")
+        store["Alice"] = "1234567890"
+        assert store["Alice"] == "1234567890"
+
+
+class TestRouterIndexes:
+    """Test indexes kept by the router."""
+
+    def test_journal_undoes_changes(self, store):
+        """Test that the change journal works on a sharded store."""
+        journal = store.index_for(ChangeJournal)
+        store["Alice"] = "1111111111"
+        store["Alice"] = "2222222222"
+        del store["Alice"]
+        journal.undo(store, 2)
+        assert store["Alice"] == "1111111111"
+
+
+class TestShardedFiles:
+    """Test sharded on-disk stores."""
+
+    def test_contacts_survive_reopen(self, tmp_path):
+        """Test that every shard keeps its contacts in its own files."""
+        path = str(tmp_path / "contacts.db")
+        store = open_store(path, "sqlite", shards=2)
+        fill(store)
+        assert store.persistent is True
+        store.close()
+
+        assert sorted(entry.name for entry in tmp_path.iterdir()) == ["contacts.db.0-of-2", "contacts.db.1-of-2"]
+        reopened = open_store(path, "sqlite", shards=2)
+        assert sorted(reopened) == sorted(NAMES)
+        reopened.close()
+
+    def test_other_shard_count_is_refused(self, tmp_path):
+        """Test that a book cannot be reopened with another number of shards."""
+        path = str(tmp_path / "contacts.db")
+        open_store(path, "sqlite", shards=2).close()
+        with pytest.raises(ValueError):
+            open_store(path, "sqlite", shards=3)
+
+    def test_open_failure_is_raised(self, tmp_path):
+        """Test that a shard that cannot open its store fails the whole store."""
+        path = str(tmp_path / "missing" / "contacts.db")
+        with pytest.raises(sqlite3.OperationalError):
+            ShardedStore(2, path, "sqlite")
@@ -0,0 +1,183 @@
+"""
+Tests for contact_snapshot.py - Contact Snapshots
+
+Tests cover:
+- Writing and reading back contacts with packed and string phones
+- Binary search lookups, including names that sort around each other
+- Non-ASCII names
+- Lookups by name key and by phone, and version 1 files without them
+- Empty snapshots
+- Files that are not snapshots
+"""
+import pytest
+from pathlib import Path
+import sys
+
+# Add parent directory to path to import contact_snapshot
+sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
+from contact_phones import pack_phones, unpack_phones
+from contact_snapshot import HEADER, RECORD, Snapshot, write_snapshot
+
+
+def write(path, items):
+    """Write items to a snapshot file and return the number written."""
+    with open(path, "wb") as file:
+        return write_snapshot(file, items)
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    """Yield a snapshot of a few contacts."""
+    path = tmp_path / "contacts.snap"
+    write(
+        path,
+        [
+            ("Bob", pack_phones(["2222222222"])),
+            ("Alice", pack_phones(["1111111111", "0123456789"])),
+            ("Al", pack_phones(["3333333333"])),
+            ("Alicia", "+1 (444) 444-4444"),
+        ],
+    )
+    snapshot = Snapshot(path)
+    yield snapshot
+    snapshot.close()
+
+
+class TestWriteAndRead:
+    """Test round trips through a snapshot file."""
+
+    def test_count(self, snapshot):
+        """Test that every contact is written once."""
+        assert len(snapshot) == 4
+
+    def test_lookup(self, snapshot):
+        """Test looking up contacts by exact name."""
+        assert unpack_phones(snapshot.get("Alice")) == ["1111111111", "0123456789"]
+        assert unpack_phones(snapshot.get("Al")) == ["3333333333"]
+        assert unpack_phones(snapshot.get("Bob")) == ["2222222222"]
+
+    def test_string_phone_is_packed(self, snapshot):
+        """Test that a plain string value is stored as one packed phone."""
+        assert unpack_phones(snapshot.get("Alicia")) == ["14444444444"]
+
+    def test_missing_names(self, snapshot):
+        """Test lookups of names before, between and after the stored ones."""
+        for name in ["", "A", "Ali", "Alicib", "Bo", "Bobby", "Zed", "alice"]:
+            assert snapshot.get(name) is None
+            assert name not in snapshot
+        assert "Bob" in snapshot
+
+    def test_items_in_name_order(self, snapshot):
+        """Test that items are listed sorted by name."""
+        assert [name for name, _ in snapshot.items()] == ["Al", "Alice", "Alicia", "Bob"]
+
+    def test_non_ascii_names(self, tmp_path):
+        """Test names outside ASCII."""
+        path = tmp_path / "contacts.snap"
+        write(path, [("Ärger", pack_phones(["1234567890"])), ("Юрій", pack_phones(["0987654321"]))])
+        snapshot = Snapshot(path)
+        assert unpack_phones(snapshot.get("Юрій")) == ["0987654321"]
+        assert dict(snapshot.items()).keys() == {"Ärger", "Юрій"}
+        snapshot.close()
+
+    def test_many_contacts(self, tmp_path):
+        """Test lookups across a larger table."""
+        path = tmp_path / "contacts.snap"
+        count = write(path, ((f"User{i}", pack_phones([str(1000000000 + i)])) for i in range(5000)))
+        snapshot = Snapshot(path)
+        assert count == len(snapshot) == 5000
+        for i in range(0, 5000, 97):
+            assert unpack_phones(snapshot.get(f"User{i}")) == [str(1000000000 + i)]
+        assert snapshot.get("User5000") is None
+        snapshot.close()
+
+
+class TestKeyAndPhoneTables:
+    """Test lookups by name key and by phone."""
+
+    def test_find_key(self, tmp_path):
+        """Test that every spelling stored under a key is found, in name order."""
+        path = tmp_path / "contacts.snap"
+        write(path, [("bob", "1111111111"), ("Al", "2222222222"), ("BOB", "3333333333"), ("Zoë", "4444444444")])
+        snapshot = Snapshot(path)
+        assert snapshot.indexed
+        assert snapshot.find_key("bob") == ["BOB", "bob"]
+        assert snapshot.find_key("al") == ["Al"]
+        assert snapshot.find_key("zoë") == ["Zoë"]
+        for key in ["", "a", "alice", "bobby", "zz"]:
+            assert snapshot.find_key(key) == []
+        snapshot.close()
+
+    def test_owners(self, snapshot):
+        """Test that a phone's owners are found once each, in name order."""
+        code = pack_phones(["1111111111"])[0]
+        assert snapshot.owners(code) == ["Alice"]
+        assert snapshot.owners(pack_phones(["14444444444"])[0]) == ["Alicia"]
+        assert snapshot.owners(code + 1) == []
+        assert snapshot.owners("not a packed phone") == []
+
+    def test_shared_and_repeated_phones(self, tmp_path):
+        """Test a phone that several contacts, and one contact twice, have."""
+        path = tmp_path / "contacts.snap"
+        items = [(f"User{i}", pack_phones(["1000000000", str(2000000000 + i)])) for i in range(500)]
+        items.append(("Twice", pack_phones(["1000000000", "1000000000"])))
+        write(path, items)
+        snapshot = Snapshot(path)
+        assert snapshot.owners(pack_phones(["1000000000"])[0]) == sorted(name for name, _ in items)
+        assert snapshot.owners(pack_phones(["2000000123"])[0]) == ["User123"]
+        snapshot.close()
+
+    def test_version_1_file(self, tmp_path):
+        """Test that a version 1 file is read, without key and phone lookups."""
+        import struct
+
+        path = tmp_path / "contacts.snap"
+        code = pack_phones(["1111111111"])[0]
+        record = RECORD.pack(5, 1) + b"Alice" + struct.pack("<Q", code)
+        table = HEADER.size + len(record) + -len(record) % 8
+        path.write_bytes(
+            HEADER.pack(b"CSNP", 1, 0, 1, table)
+            + record.ljust(table - HEADER.size, b"\0")
+            + struct.pack("<Q", HEADER.size)
+        )
+        snapshot = Snapshot(path)
+        assert not snapshot.indexed
+        assert unpack_phones(snapshot.get("Alice")) == ["1111111111"]
+        assert [name for name, _ in snapshot.items()] == ["Alice"]
+        assert snapshot.find_key("alice") == snapshot.owners(code) == []
+        snapshot.close()
+
+
+class TestInvalidFiles:
+    """Test empty snapshots and files in other formats."""
+
+    def test_empty_snapshot(self, tmp_path):
+        """Test a snapshot without contacts."""
+        path = tmp_path / "contacts.snap"
+        assert write(path, []) == 0
+        snapshot = Snapshot(path)
+        assert len(snapshot) == 0
+        assert snapshot.get("Alice") is None
+        assert list(snapshot.items()) == []
+        snapshot.close()
+
+    @pytest.mark.parametrize("data", [b"", b"CSNP", b"NOPE" + bytes(HEADER.size)])
+    def test_not_a_snapshot(self, tmp_path, data):
+        """Test that empty, truncated and foreign files are rejected."""
+        path = tmp_path / "contacts.snap"
+        path.write_bytes(data)
+        with pytest.raises(ValueError):
+            Snapshot(path)
+
+    def test_truncated_table(self, tmp_path):
+        """Test that a snapshot cut short is rejected."""
+        path = tmp_path / "contacts.snap"
+        write(path, [("Alice", pack_phones(["1111111111"]))])
+        path.write_bytes(path.read_bytes()[:-4])
+        with pytest.raises(ValueError):
+            Snapshot(path)
+
+    def test_missing_file(self, tmp_path):
+        """Test that a missing file raises FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            Snapshot(tmp_path / "missing.snap")
@@ -0,0 +1,986 @@
+"""
+Tests for contact_store.py - Contact Storage Backends
+
+Tests cover:
+- Mapping behaviour shared by all backends
+- Batched writes in the SQLite backend
+- Persistence across reopening the SQLite backend
+- Log replay, torn writes, compaction and failed compactions in the log backend
+- Lazy lookups, autosave and saving elsewhere in the snapshot backend
+- LRU caching, invalidation and counters of the cached store
+- Replacing every contact in one step
+- Bulk updates in one transaction, reported to indexes change by change and
+  page by page, and indexes rebuilt when one fails
+- Name key and phone lookups, answered from the tables in the SQLite and
+  snapshot backends
+- Ordered paging
+- Atomic insert/update, the readers-writer lock and concurrent writers
+- Packed phone arrays as values
+- Store selection in open_store
+"""
+import pytest
+from pathlib import Path
+import sys
+
+# Add parent directory to path to import contact_store
+sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
+import json
+import threading
+from contact_index import KeyIndex, NameIndex, PhoneIndex
+from contact_journal import ChangeJournal
+from contact_phones import pack_phones, unpack_phones
+from contact_store import (
+    CachedStore,
+    LogStore,
+    MemoryStore,
+    RWLock,
+    SnapshotStore,
+    SQLiteStore,
+    open_store,
+    save_snapshot,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite", "log", "snapshot", "cached", "sharded"])
+def store(request, tmp_path):
+    """Yield an empty store for every backend, a small cache in front of SQLite and SQLite in 3 shards."""
+    path = None if request.param == "memory" else str(tmp_path / "contacts.db")
+    if request.param == "cached":
+        store = open_store(path, "sqlite", cache_size=2)
+    elif request.param == "sharded":
+        store = open_store(path, "sqlite", shards=3)
+    else:
+        store = open_store(path, request.param if path else "sqlite")
+    yield store
+    store.close()
+
+
+class TestStoreMapping:
+    """Test the mapping interface every backend provides."""
+
+    def test_set_and_get(self, store):
+        """Test storing and reading a contact."""
+        store["Alice"] = "1234567890"
+        assert store["Alice"] == "1234567890"
+        assert store.get("Alice") == "1234567890"
+        assert "Alice" in store
+
+    def test_missing_contact(self, store):
+        """Test lookups of a contact that does not exist."""
+        assert store.get("Bob") is None
+        assert "Bob" not in store
+        with pytest.raises(KeyError):
+            store["Bob"]
+
+    def test_overwrite(self, store):
+        """Test that setting an existing contact replaces its phone."""
+        store["Alice"] = "1234567890"
+        store["Alice"] = "9876543210"
+        assert store["Alice"] == "9876543210"
+        assert len(store) == 1
+
+    def test_delete(self, store):
+        """Test deleting a contact."""
+        store["Alice"] = "1234567890"
+        del store["Alice"]
+        assert "Alice" not in store
+        with pytest.raises(KeyError):
+            del store["Alice"]
+
+    def test_items_and_len(self, store):
+        """Test listing contacts."""
+        store["Bob"] = "2222222222"
+        store["Alice"] = "1111111111"
+        assert len(store) == 2
+        assert sorted(store.items()) == [("Alice", "1111111111"), ("Bob", "2222222222")]
+
+    def test_clear(self, store):
+        """Test removing all contacts."""
+        store["Alice"] = "1234567890"
+        store.flush()
+        store["Bob"] = "2222222222"
+        store.clear()
+        assert len(store) == 0
+        assert not store
+
+
+class TestBulkUpdate:
+    """Test writing many contacts at once."""
+
+    def test_bulk_update_stores_all(self, store):
+        """Test that every pair is stored and counted."""
+        store["Alice"] = "0000000000"
+        count = store.bulk_update((f"User{i}", f"{1000000000 + i}") for i in range(50))
+        store.bulk_update([("Alice", "1111111111")])
+
+        assert count == 50
+        assert len(store) == 51
+        assert store["User7"] == "1000000007"
+        assert store["Alice"] == "1111111111"
+
+    def test_bulk_update_is_all_or_nothing(self, store):
+        """Test that a failing source leaves the store unchanged."""
+        def items():
+            yield "Alice", "1111111111"
+            raise ValueError("broken source")
+
+        with pytest.raises(ValueError):
+            store.bulk_update(items())
+        assert "Alice" not in store
+
+    def test_bulk_update_keeps_indexes_current(self, store):
+        """Test that attached indexes see bulk-written contacts."""
+        from contact_index import NameIndex
+
+        index = store.index_for(NameIndex)
+        store.bulk_update([("Alice", "1111111111"), ("Albert", "2222222222")])
+        assert index.prefix("al") == ["Albert", "Alice"]
+
+    def test_failed_bulk_update_leaves_indexes_current(self, store):
+        """Test that indexes match the contacts left after a source fails past the first page."""
+        store["Alice"] = "1111111111"
+        names = store.index_for(NameIndex)
+        journal = store.index_for(ChangeJournal)
+
+        def items():
+            for i in range(2500):
+                yield f"User{i}", f"{1000000000 + i}"
+            raise ValueError("broken source")
+
+        with pytest.raises(ValueError):
+            store.bulk_update(items())
+        assert names.prefix("") == ["Alice"]
+        assert store.index_for(PhoneIndex).owners("1000000000") == []
+        assert journal.undo(store) == []
+
+    def test_bulk_update_reports_each_change(self, store):
+        """Test that indexes get every bulk-written contact with the value it replaced."""
+        class Recorder:
+            def __init__(self):
+                self.changes = []
+
+            def rebuild(self, items):
+                pass
+
+            def on_set(self, name, old, phone):
+                self.changes.append((name, old, phone))
+
+            def on_delete(self, name, old):
+                pass
+
+            def on_clear(self):
+                pass
+
+        store["Alice"] = "1111111111"
+        recorder = store.attach(Recorder())
+        store.bulk_update([("Alice", "2222222222"), ("Bob", "3333333333")])
+        assert recorder.changes == [("Alice", "1111111111", "2222222222"), ("Bob", None, "3333333333")]
+
+
+class TestReplaceAll:
+    """Test replacing every contact at once."""
+
+    def test_replace_all(self, store):
+        """Test that the old contacts are gone and the new ones stored."""
+        store["Alice"] = "1111111111"
+        assert store.replace_all([("Bob", "2222222222"), ("Carol", "3333333333")]) == 2
+        assert sorted(store) == ["Bob", "Carol"]
+        assert store.index_for(PhoneIndex).owners("1111111111") == []
+
+    def test_replace_all_is_all_or_nothing(self, store):
+        """Test that a source failing after more than a page of contacts leaves the old ones."""
+        store["Alice"] = "1111111111"
+
+        def items():
+            for i in range(2500):
+                yield f"User{i}", f"{1000000000 + i}"
+            raise ValueError("broken source")
+
+        with pytest.raises(ValueError):
+            store.replace_all(items())
+        assert list(store) == ["Alice"]
+
+
+class TestLookupIndexes:
+    """Test name key and phone lookups on every backend."""
+
+    def test_key_index_finds_any_spelling(self, store):
+        """Test that a name is found by its key until it is removed."""
+        keys = store.index_for(KeyIndex)
+        store["McDonald"] = "1111111111"
+        store.bulk_update([("Zoë", "2222222222")])
+        assert keys.find("mcdonald") == "McDonald"
+        assert keys.find("ZOË") == "Zoë"
+        del store["McDonald"]
+        assert keys.find("McDonald") is None
+
+    def test_phone_index_follows_changes(self, store):
+        """Test that phone owners follow sets, bulk updates, deletes and clear()."""
+        phones = store.index_for(PhoneIndex)
+        store["Alice"] = pack_phones(["111-111-1111", "2222222222"])
+        store.bulk_update([("Bob", "(222) 222-2222"), ("Alice", pack_phones(["3333333333"]))])
+        assert phones.owners("2222222222") == ["Bob"]
+        assert phones.owners("+3 333 333 333") == ["Alice"]
+        assert phones.owners("1111111111") == []
+        del store["Bob"]
+        assert phones.owners("2222222222") == []
+        store.clear()
+        assert phones.owners("3333333333") == []
+
+
+class TestPaging:
+    """Test reading contacts page by page."""
+
+    def test_pages_cover_all_contacts_in_order(self, store):
+        """Test that following the cursor visits every contact once, in order."""
+        names = [f"User{i:03d}" for i in range(25)]
+        store.bulk_update((name, "1234567890") for name in reversed(names))
+
+        seen = []
+        page = store.page(limit=10)
+        while page:
+            seen.extend(name for name, _ in page)
+            page = store.page(page[-1][0], 10)
+
+        assert seen == names
+
+    def test_pages_follow_name_keys(self, store):
+        """Test that every backend orders names by their case-folded key, not by code point."""
+        names = ["alice", "Bob", "McDonald", "MOLLY", "Straße", "Zoe"]
+        store.bulk_update((name, "1234567890") for name in reversed(names))
+        assert [name for name, _ in store.page()] == names
+        assert [name for name, _ in store.page("McDonald", 2)] == ["MOLLY", "Straße"]
+
+    def test_page_sees_new_contacts(self, store):
+        """Test that contacts added after the first page show up."""
+        store["Bob"] = "2222222222"
+        assert store.page() == [("Bob", "2222222222")]
+        store["Alice"] = "1111111111"
+        assert store.page(limit=1) == [("Alice", "1111111111")]
+
+
+class TestAtomicOperations:
+    """Test insert_if_absent and update_if_present."""
+
+    def test_insert_if_absent(self, store):
+        """Test that only the first insert of a name is stored."""
+        assert store.insert_if_absent("Alice", "1111111111") is None
+        assert store.insert_if_absent("Alice", "2222222222") == "1111111111"
+        assert store["Alice"] == "1111111111"
+
+    def test_update_if_present(self, store):
+        """Test that updates of missing contacts store nothing."""
+        assert store.update_if_present("Alice", "1111111111") is None
+        assert "Alice" not in store
+        store["Alice"] = "1111111111"
+        assert store.update_if_present("Alice", "2222222222") == "1111111111"
+        assert store["Alice"] == "2222222222"
+
+    def test_compute_if_present(self, store):
+        """Test that the new value is computed from the current one."""
+        assert store.compute_if_present("Alice", lambda phone: phone + "0") is None
+        assert "Alice" not in store
+        store["Alice"] = "111111111"
+        assert store.compute_if_present("Alice", lambda phone: phone + "1") == "111111111"
+        assert store["Alice"] == "1111111111"
+
+    def test_locked_holds_off_other_writers(self, store):
+        """Test that a write from another thread waits for the locked block to end."""
+        writer = threading.Thread(target=store.__setitem__, args=("Bob", "2222222222"))
+        with store.locked():
+            store["Alice"] = "1111111111"
+            writer.start()
+            writer.join(0.2)
+            assert writer.is_alive()
+            assert "Bob" not in store
+        writer.join()
+        assert store["Bob"] == "2222222222"
+
+
+class TestPackedPhones:
+    """Test stores holding packed phone arrays."""
+
+    def test_arrays_survive_reopen(self, tmp_path):
+        """Test that phone arrays are persisted by the on-disk backends."""
+        phones = pack_phones(["1234567890", "0987654321"])
+        for backend in ("sqlite", "log"):
+            path = str(tmp_path / f"contacts-{backend}")
+            store = open_store(path, backend)
+            store["Alice"] = phones
+            store["Bob"] = "1111111111"
+            store.bulk_update([("Carol", pack_phones(["2222222222"]))])
+            store.close()
+
+            reopened = open_store(path, backend)
+            assert reopened["Alice"] == phones
+            assert reopened["Alice"].typecode == "Q"
+            assert reopened["Bob"] == "1111111111"
+            assert unpack_phones(reopened.page()[-1][1]) == ["2222222222"]
+            reopened.close()
+
+
+class TestRWLock:
+    """Test the readers-writer lock."""
+
+    def test_readers_share_the_lock(self):
+        """Test that a second reader gets in while the first holds the lock."""
+        lock = RWLock()
+        inside = threading.Barrier(2, timeout=5)
+
+        def read():
+            with lock.read():
+                inside.wait()
+
+        threads = [threading.Thread(target=read) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_writer_excludes_readers(self):
+        """Test that a reader waits for the writer to release the lock."""
+        lock = RWLock()
+        events = []
+
+        def read():
+            with lock.read():
+                events.append("read")
+
+        lock.acquire_write()
+        reader = threading.Thread(target=read)
+        reader.start()
+        reader.join(0.1)
+        events.append("write done")
+        lock.release_write()
+        reader.join(5)
+        assert events == ["write done", "read"]
+
+    def test_writer_may_reenter_and_read(self):
+        """Test that the writing thread can take either side again."""
+        lock = RWLock()
+        with lock:
+            with lock:
+                with lock.read():
+                    pass
+        with lock.read():
+            pass
+
+
+class TestConcurrency:
+    """Stress the stores from many threads at once."""
+
+    THREADS = 8
+    NAMES = 200
+
+    def _run(self, target):
+        start = threading.Barrier(self.THREADS, timeout=10)
+        errors = []
+
+        def worker(number):
+            start.wait()
+            try:
+                target(number)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+
+    def test_each_name_is_inserted_once(self, store):
+        """Test that racing inserts of the same names have one winner each."""
+        winners = [[] for _ in range(self.THREADS)]
+
+        def insert(number):
+            for i in range(self.NAMES):
+                if store.insert_if_absent(f"User{i}", f"{number}{i:09d}") is None:
+                    winners[number].append(i)
+
+        self._run(insert)
+        won = sorted(i for names in winners for i in names)
+        assert won == list(range(self.NAMES))
+        for number, names in enumerate(winners):
+            for i in names:
+                assert store[f"User{i}"] == f"{number}{i:09d}"
+
+    def test_no_lost_writes_with_indexes(self, store):
+        """Test that concurrent writers and readers keep store and indexes in step."""
+        names = store.index_for(NameIndex)
+        phones = store.index_for(PhoneIndex)
+
+        def write(number):
+            for i in range(self.NAMES):
+                name = f"T{number}U{i}"
+                assert store.insert_if_absent(name, f"1{number}{i:08d}") is None
+                assert store.update_if_present(name, f"2{number}{i:08d}") == f"1{number}{i:08d}"
+                assert store.get(name) == f"2{number}{i:08d}"
+
+        self._run(write)
+        assert len(store) == self.THREADS * self.NAMES
+        assert len(names) == self.THREADS * self.NAMES
+        assert phones.owners("2300000007") == ["T3U7"]
+        assert phones.owners("1300000007") == []
+
+
+class TestSQLiteStore:
+    """Test behaviour specific to the on-disk backend."""
+
+    def test_writes_are_batched(self, tmp_path):
+        """Test that writes reach the database only when a batch is full."""
+        store = SQLiteStore(str(tmp_path / "contacts.db"), batch_size=3)
+        store["Alice"] = "1111111111"
+        store["Bob"] = "2222222222"
+
+        count = store._conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+        assert count == 0
+        assert store["Bob"] == "2222222222"
+
+        store["Charlie"] = "3333333333"
+        count = store._conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+        assert count == 3
+        store.close()
+
+    def test_contacts_survive_reopen(self, tmp_path):
+        """Test that contacts are persisted on close."""
+        path = str(tmp_path / "contacts.db")
+        store = SQLiteStore(path)
+        store["Alice"] = "1234567890"
+        store.close()
+
+        reopened = SQLiteStore(path)
+        assert reopened["Alice"] == "1234567890"
+        reopened.close()
+
+    def test_files_without_key_column_are_upgraded(self, tmp_path):
+        """Test that an older file, and rows other programs add, are paged in name key order."""
+        import sqlite3
+
+        path = str(tmp_path / "contacts.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE contacts (name TEXT PRIMARY KEY, phone TEXT NOT NULL) WITHOUT ROWID")
+        conn.executemany("INSERT INTO contacts VALUES (?, ?)", [("McDonald", "1111111111"), ("MOLLY", "2222222222")])
+        conn.commit()
+        conn.close()
+        SQLiteStore(path).close()
+
+        conn = sqlite3.connect(path)
+        conn.execute("INSERT INTO contacts (name, phone) VALUES ('alice', '3333333333')")
+        conn.commit()
+        conn.close()
+        store = SQLiteStore(path)
+        assert [name for name, _ in store.page()] == ["alice", "McDonald", "MOLLY"]
+        store.close()
+
+    def test_bulk_update_reports_changes_page_by_page(self, tmp_path):
+        """Test that indexes hear of each page of a bulk update before the next one is read."""
+        store = SQLiteStore(str(tmp_path / "contacts.db"))
+        names = store.index_for(NameIndex)
+        seen = []
+
+        def items():
+            for i in range(2500):
+                if i % store._ITER_PAGE_SIZE == 0:
+                    seen.append(len(names))
+                yield f"User{i}", f"{1000000000 + i}"
+
+        assert store.bulk_update(items()) == 2500
+        assert seen == [0, 1000, 2000]
+        assert len(names) == 2500
+        store.close()
+
+    def test_lookups_read_the_database(self, tmp_path):
+        """Test that key and phone lookups keep nothing in memory and see pending writes uncommitted."""
+        path = str(tmp_path / "contacts.db")
+        store = SQLiteStore(path, batch_size=100)
+        store["McDonald"] = pack_phones(["1111111111"])
+        store.flush()
+        store["Bob"] = "2222222222"
+        keys = store.index_for(KeyIndex)
+        phones = store.index_for(PhoneIndex)
+        assert store._indexes == []
+        assert keys.find("MCDONALD") == "McDonald"
+        assert phones.owners("2222222222") == ["Bob"]
+        assert store._pending == {"Bob": "2222222222"}
+
+        del store["McDonald"]
+        store["Bob"] = "3333333333"
+        assert keys.find("mcdonald") is None
+        assert phones.owners("1111111111") == []
+        assert phones.owners("2222222222") == []
+        assert phones.owners("3333333333") == ["Bob"]
+        store["McDonald"] = pack_phones(["1111111111"])
+        store.close()
+
+        store = SQLiteStore(path)
+        assert store.index_for(KeyIndex).find("mcdonald") == "McDonald"
+        assert store.index_for(PhoneIndex).owners("111 111 1111") == ["McDonald"]
+        store.close()
+
+    def test_files_without_phones_table_are_indexed(self, tmp_path):
+        """Test that an older file, and rows other programs change, get their phones indexed."""
+        import sqlite3
+
+        path = str(tmp_path / "contacts.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE contacts (name TEXT PRIMARY KEY, phone TEXT NOT NULL, key TEXT) WITHOUT ROWID")
+        conn.execute("INSERT INTO contacts VALUES ('Alice', '1111111111', 'alice')")
+        conn.commit()
+        conn.close()
+        store = SQLiteStore(path)
+        assert store.index_for(PhoneIndex).owners("1111111111") == ["Alice"]
+        store.close()
+
+        conn = sqlite3.connect(path)
+        conn.execute("UPDATE contacts SET phone = '2222222222', key = NULL WHERE name = 'Alice'")
+        conn.commit()
+        conn.close()
+        store = SQLiteStore(path)
+        phones = store.index_for(PhoneIndex)
+        assert phones.owners("1111111111") == []
+        assert phones.owners("2222222222") == ["Alice"]
+        store.close()
+
+    def test_pending_delete_hides_stored_contact(self, tmp_path):
+        """Test that a buffered delete is visible before it is committed."""
+        store = SQLiteStore(str(tmp_path / "contacts.db"))
+        store["Alice"] = "1234567890"
+        store.flush()
+        del store["Alice"]
+        assert store.get("Alice") is None
+        store.close()
+
+
+class TestLogStore:
+    """Test behaviour specific to the append-only log backend."""
+
+    def test_changes_are_replayed(self, tmp_path):
+        """Test that sets, deletes and clears survive a restart."""
+        path = tmp_path / "contacts"
+        store = LogStore(path, sync_interval=0)
+        store["Alice"] = "1111111111"
+        store["Bob"] = "2222222222"
+        store.clear()
+        store["Charlie"] = "3333333333"
+        store["Dave"] = "4444444444"
+        del store["Dave"]
+        store["Charlie"] = "5555555555"
+        store.close()
+
+        reopened = LogStore(path, sync_interval=0)
+        assert dict(reopened) == {"Charlie": "5555555555"}
+        reopened.close()
+
+    def test_bulk_update_is_replayed(self, tmp_path):
+        """Test that bulk-written contacts survive a restart."""
+        path = tmp_path / "contacts"
+        store = LogStore(path, sync_interval=0)
+        store.bulk_update([("Alice", "1111111111"), ("Bob", "2222222222")])
+        store.close()
+
+        reopened = LogStore(path, sync_interval=0)
+        assert dict(reopened) == {"Alice": "1111111111", "Bob": "2222222222"}
+        reopened.close()
+
+    def test_every_change_is_one_appended_record(self, tmp_path):
+        """Test that the log holds one JSON line per change."""
+        store = LogStore(tmp_path / "contacts", sync_interval=0)
+        store["Alice"] = "1111111111"
+        store["Alice"] = "2222222222"
+
+        lines = store.log_path.read_text().splitlines()
+        assert [json.loads(line) for line in lines] == [
+            ["set", "Alice", "1111111111"],
+            ["set", "Alice", "2222222222"],
+        ]
+        store.close()
+
+    def test_torn_last_record_is_ignored(self, tmp_path):
+        """Test that a partially written record left by a crash is skipped."""
+        path = tmp_path / "contacts"
+        store = LogStore(path, sync_interval=0)
+        store["Alice"] = "1111111111"
+        store.close()
+        with open(store.log_path, "a") as log:
+            log.write('["set", "Bob", "22')
+
+        reopened = LogStore(path, sync_interval=0)
+        assert dict(reopened) == {"Alice": "1111111111"}
+        reopened.close()
+
+    def test_group_commit_syncs_in_background(self, tmp_path):
+        """Test that buffered writes are synced without an explicit flush."""
+        import time
+
+        store = LogStore(tmp_path / "contacts", sync_interval=0.01)
+        store["Alice"] = "1111111111"
+        deadline = time.monotonic() + 2
+        while store._dirty and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert not store._dirty
+        assert "Alice" in store.log_path.read_text()
+        store.close()
+
+    def test_compaction_writes_snapshot(self, tmp_path):
+        """Test that a large log is compacted into a snapshot."""
+        path = tmp_path / "contacts"
+        store = LogStore(path, sync_interval=0, compact_threshold=200)
+        for i in range(20):
+            store[f"User{i % 3}"] = f"{1000000000 + i}"
+        store.close()
+
+        assert store.snapshot_path.exists()
+        assert not store.old_log_path.exists()
+        assert store.log_path.stat().st_size < 200
+
+        reopened = LogStore(path, sync_interval=0)
+        assert dict(reopened) == {
+            "User0": "1000000018",
+            "User1": "1000000019",
+            "User2": "1000000017",
+        }
+        reopened.close()
+
+    @pytest.mark.parametrize("write", ["set", "bulk_update"])
+    def test_write_that_triggers_compaction_survives(self, tmp_path, write):
+        """Test that the change which pushed the log over the threshold is in the snapshot."""
+        path = tmp_path / "contacts"
+        store = LogStore(path, sync_interval=0, compact_threshold=200)
+        expected = {}
+        for i in range(10):
+            name, phone = f"user{i}", f"{1000000000 + i}"
+            if write == "set":
+                store[name] = phone
+            else:
+                store.bulk_update([(name, phone)])
+            expected[name] = phone
+        store.close()
+
+        assert store.snapshot_path.exists()
+        reopened = LogStore(path, sync_interval=0)
+        assert dict(reopened) == expected
+        reopened.close()
+
+    def test_replace_all_survives_reopen(self, tmp_path):
+        """Test that a replacement is one log record that replay applies."""
+        path = tmp_path / "contacts"
+        store = LogStore(path, sync_interval=0)
+        store["Alice"] = "1111111111"
+        store.replace_all([("Bob", pack_phones(["2222222222"]))])
+        store.close()
+        assert len(store.log_path.read_text().splitlines()) == 2
+
+        reopened = LogStore(path, sync_interval=0)
+        assert list(reopened) == ["Bob"]
+        assert unpack_phones(reopened["Bob"]) == ["2222222222"]
+        reopened.close()
+
+    def test_failed_compaction_is_reported_and_retried(self, tmp_path, monkeypatch):
+        """Test that a snapshot write error is kept, no record is lost and compaction runs again."""
+        import errno
+
+        path = tmp_path / "contacts"
+        store = LogStore(path, sync_interval=0, compact_threshold=200)
+        write_snapshot = store._write_snapshot
+
+        def fail(contents):
+            raise OSError(errno.ENOSPC, "No space left on device")
+
+        monkeypatch.setattr(store, "_write_snapshot", fail)
+        expected = {}
+        for i in range(10):
+            store[f"user{i}"] = expected[f"user{i}"] = f"{1000000000 + i}"
+        compactor = store._compactor
+        if compactor is not None:
+            compactor.join()
+        assert store.compact_error.errno == errno.ENOSPC
+        assert store._compactor is None
+        assert store.old_log_path.exists()
+
+        monkeypatch.setattr(store, "_write_snapshot", write_snapshot)
+        for i in range(10, 20):
+            store[f"user{i}"] = expected[f"user{i}"] = f"{1000000000 + i}"
+        store.close()
+        assert store.compact_error is None
+        assert not store.old_log_path.exists()
+
+        reopened = LogStore(path, sync_interval=0)
+        assert dict(reopened) == expected
+        reopened.close()
+
+    def test_interrupted_compaction_is_recovered(self, tmp_path):
+        """Test startup when a rotated log was left behind by a crash."""
+        path = tmp_path / "contacts"
+        store = LogStore(path, sync_interval=0)
+        store["Alice"] = "1111111111"
+        store.close()
+        store.log_path.rename(store.old_log_path)
+        store.log_path.write_text(json.dumps(["set", "Bob", "2222222222"]) + "\n")
+
+        reopened = LogStore(path, sync_interval=0)
+        assert dict(reopened) == {"Alice": "1111111111", "Bob": "2222222222"}
+        assert not reopened.old_log_path.exists()
+        reopened.close()
+
+        again = LogStore(path, sync_interval=0)
+        assert dict(again) == {"Alice": "1111111111", "Bob": "2222222222"}
+        again.close()
+
+
+class TestSnapshotStore:
+    """Test behaviour specific to the memory-mapped snapshot backend."""
+
+    def test_contacts_survive_reopen(self, tmp_path):
+        """Test that changes are saved on close and looked up after reopening."""
+        path = str(tmp_path / "contacts.snap")
+        store = SnapshotStore(path)
+        store["Alice"] = pack_phones(["1234567890", "0987654321"])
+        store["Bob"] = pack_phones(["2222222222"])
+        store.close()
+
+        reopened = SnapshotStore(path)
+        assert len(reopened) == 2
+        assert unpack_phones(reopened["Alice"]) == ["1234567890", "0987654321"]
+        assert reopened.get("Carol") is None
+        reopened.close()
+
+    def test_overlay_on_top_of_snapshot(self, tmp_path):
+        """Test that changes shadow saved contacts until the next save."""
+        path = str(tmp_path / "contacts.snap")
+        save_snapshot(path, [("Alice", pack_phones(["1111111111"])), ("Bob", pack_phones(["2222222222"]))])
+        store = SnapshotStore(path)
+        store["Alice"] = pack_phones(["3333333333"])
+        del store["Bob"]
+        store["Carol"] = pack_phones(["4444444444"])
+
+        assert len(store) == 2
+        assert "Bob" not in store
+        assert sorted((name, unpack_phones(phones)) for name, phones in store.items()) == [
+            ("Alice", ["3333333333"]),
+            ("Carol", ["4444444444"]),
+        ]
+        store.close()
+
+    def test_without_autosave_file_is_untouched(self, tmp_path):
+        """Test that a store opened without autosave leaves its file as it was."""
+        path = str(tmp_path / "contacts.snap")
+        save_snapshot(path, [("Alice", pack_phones(["1111111111"]))])
+        store = SnapshotStore(path, autosave=False)
+        store.clear()
+        store["Bob"] = pack_phones(["2222222222"])
+        assert not store.persistent
+        store.close()
+
+        reopened = SnapshotStore(path)
+        assert list(reopened) == ["Alice"]
+        reopened.close()
+
+    def test_save_elsewhere(self, tmp_path):
+        """Test saving to another path keeps the store on its own file."""
+        store = SnapshotStore(str(tmp_path / "a.snap"), autosave=False)
+        store["Alice"] = pack_phones(["1111111111"])
+        assert store.save(str(tmp_path / "b.snap")) == 1
+
+        copy = SnapshotStore(str(tmp_path / "b.snap"))
+        assert unpack_phones(copy["Alice"]) == ["1111111111"]
+        copy.close()
+        store.close()
+        assert not (tmp_path / "a.snap").exists()
+
+    def test_lookups_read_the_snapshot(self, tmp_path, monkeypatch):
+        """Test that key and phone lookups search the snapshot's tables and the overlay, without listing it."""
+        path = str(tmp_path / "contacts.snap")
+        save_snapshot(path, [("McDonald", pack_phones(["1111111111"])), ("Bob", pack_phones(["2222222222"]))])
+        store = SnapshotStore(path)
+        monkeypatch.setattr(SnapshotStore, "items", None)
+        keys = store.index_for(KeyIndex)
+        phones = store.index_for(PhoneIndex)
+        assert store._indexes == []
+        assert keys.find("MCDONALD") == "McDonald"
+        assert phones.owners("222-222-2222") == ["Bob"]
+
+        del store["McDonald"]
+        store["Bob"] = "3333333333"
+        store["Carol"] = "1111111111"
+        assert keys.find("mcdonald") is None
+        assert phones.owners("1111111111") == ["Carol"]
+        assert phones.owners("2222222222") == []
+        assert phones.owners("3333333333") == ["Bob"]
+        monkeypatch.undo()
+        store.close()
+
+        store = SnapshotStore(path)
+        assert store.index_for(KeyIndex).find("CAROL") == "Carol"
+        assert store.index_for(PhoneIndex).owners("3333333333") == ["Bob"]
+        store.clear()
+        assert store.index_for(KeyIndex).find("carol") is None
+        store.close()
+
+    def test_version_1_files_are_indexed_in_memory(self, tmp_path):
+        """Test that a snapshot without key and phone tables still answers key and phone lookups."""
+        import struct
+
+        path = tmp_path / "contacts.snap"
+        record = struct.pack("<HH", 5, 1) + b"Alice" + struct.pack("<Q", pack_phones(["1111111111"])[0])
+        table = 24 + len(record) + -len(record) % 8
+        path.write_bytes(
+            struct.pack("<4sHHQQ", b"CSNP", 1, 0, 1, table) + record.ljust(table - 24, b"\0") + struct.pack("<Q", 24)
+        )
+        store = SnapshotStore(str(path))
+        assert store.index_for(KeyIndex).find("ALICE") == "Alice"
+        assert store.index_for(PhoneIndex).owners("1111111111") == ["Alice"]
+        assert len(store._indexes) == 2
+        store.close()
+
+    def test_rejects_other_files(self, tmp_path):
+        """Test that a file that is not a snapshot is refused."""
+        path = tmp_path / "contacts.db"
+        path.write_bytes(b"not a snapshot at all, just some bytes")
+        with pytest.raises(ValueError):
+            SnapshotStore(str(path))
+
+
+class TestCachedStore:
+    """Test the LRU lookup cache in front of a store."""
+
+    @pytest.fixture
+    def backend(self):
+        """Return an in-memory store with three contacts."""
+        return MemoryStore(Alice="1111111111", Bob="2222222222", Carol="3333333333")
+
+    def test_repeated_lookups_hit(self, backend):
+        """Test that only the first lookup of a name reaches the store."""
+        cache = CachedStore(backend, capacity=10)
+        for _ in range(3):
+            assert cache["Alice"] == "1111111111"
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (2, 1, 1)
+        assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+    def test_missing_names_are_cached(self, backend):
+        """Test that lookups of absent names are cached too."""
+        cache = CachedStore(backend, capacity=10)
+        assert cache.get("Dave") is None
+        assert "Dave" not in cache
+        assert cache.stats()["hits"] == 1
+
+    def test_name_keys_are_cached_and_invalidated(self, backend):
+        """Test that key lookups are answered by the cache until a write changes the answer."""
+        cache = CachedStore(backend, capacity=10)
+        keys = cache.index_for(KeyIndex)
+        calls = []
+        find = backend.index_for(KeyIndex).find
+        backend.index_for(KeyIndex).find = lambda name: calls.append(name) or find(name)
+
+        assert keys.find("ALICE") == keys.find("alice") == "Alice"
+        assert keys.find("dave") is None
+        assert len(calls) == 2
+
+        cache["Dave"] = "4444444444"
+        assert keys.find("DAVE") == "Dave"
+        del cache["Alice"]
+        assert keys.find("alice") is None
+        cache.clear()
+        assert keys.find("bob") is None
+        assert len(calls) == 5
+
+    def test_least_recently_used_is_evicted(self, backend):
+        """Test that a full cache drops the entry unused for longest."""
+        cache = CachedStore(backend, capacity=2)
+        cache["Alice"], cache["Bob"], cache["Alice"], cache["Carol"]
+
+        assert cache.stats()["evictions"] == 1
+        assert list(cache._cache) == ["Alice", "Carol"]
+
+    def test_writes_invalidate(self, backend):
+        """Test that changed and deleted contacts are read again."""
+        cache = CachedStore(backend, capacity=10)
+        cache["Alice"], cache["Bob"], cache.get("Dave")
+
+        cache["Alice"] = "9999999999"
+        del cache["Bob"]
+        assert cache.insert_if_absent("Dave", "4444444444") is None
+
+        assert cache["Alice"] == backend["Alice"] == "9999999999"
+        assert "Bob" not in cache
+        assert cache["Dave"] == "4444444444"
+        assert cache.stats()["invalidations"] == 3
+
+    def test_bulk_update_and_clear_empty_the_cache(self, backend):
+        """Test that bulk writes drop every cached entry."""
+        cache = CachedStore(backend, capacity=10)
+        cache["Alice"]
+        cache.bulk_update([("Alice", "5555555555")])
+        assert cache["Alice"] == "5555555555"
+        cache.clear()
+        assert cache.get("Alice") is None
+        assert len(cache) == 0
+
+    def test_miss_racing_a_write_is_not_cached(self, backend):
+        """Test that a value read before a concurrent write is not kept."""
+        cache = CachedStore(backend, capacity=10)
+        read = backend.get
+
+        def racing_get(name, default=None):
+            value = read(name, default)
+            cache["Alice"] = "2222222222"  # lands between the read and the fill
+            return value
+
+        backend.get = racing_get
+        assert cache["Alice"] == "1111111111"
+        backend.get = read
+        assert cache["Alice"] == "2222222222"
+
+    def test_indexes_and_paging_use_the_store(self, backend):
+        """Test that indexes are attached to the wrapped store."""
+        cache = CachedStore(backend, capacity=10)
+        assert cache.index_for(NameIndex) is backend.index_for(NameIndex)
+        assert [name for name, _ in cache.page(limit=2)] == ["Alice", "Bob"]
+
+    def test_invalid_capacity(self, backend):
+        """Test that a cache must hold at least one entry."""
+        with pytest.raises(ValueError):
+            CachedStore(backend, capacity=0)
+
+
+class TestOpenStore:
+    """Test backend selection."""
+
+    def test_default_is_memory(self):
+        """Test that no path opens the in-memory store."""
+        assert isinstance(open_store(), MemoryStore)
+
+    def test_path_opens_sqlite(self, tmp_path):
+        """Test that a path opens the on-disk store."""
+        store = open_store(str(tmp_path / "contacts.db"))
+        assert isinstance(store, SQLiteStore)
+        store.close()
+
+    def test_log_backend(self, tmp_path):
+        """Test that the log backend can be selected by name."""
+        store = open_store(str(tmp_path / "contacts"), "log")
+        assert isinstance(store, LogStore)
+        store.close()
+
+    def test_cache_size_wraps_store(self, tmp_path):
+        """Test that a cache size puts a CachedStore in front of the backend."""
+        store = open_store(str(tmp_path / "contacts.db"), cache_size=100)
+        assert isinstance(store, CachedStore)
+        assert isinstance(store.store, SQLiteStore)
+        assert store.persistent
+        store.close()
+        assert isinstance(open_store(cache_size=100), MemoryStore)
+
+    def test_snapshot_backend(self, tmp_path):
+        """Test that the snapshot backend can be selected by name."""
+        store = open_store(str(tmp_path / "contacts.snap"), "snapshot")
+        assert isinstance(store, SnapshotStore)
+        store.close()
+
+    def test_unknown_backend(self, tmp_path):
+        """Test that an unknown backend name is rejected."""
+        with pytest.raises(ValueError):
+            open_store(str(tmp_path / "contacts"), "csv")
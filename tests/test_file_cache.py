@@ -0,0 +1,229 @@
+"""
+Tests for file_cache.py - File Result Cache
+
+Tests cover:
+- File fingerprints
+- Hits until a file changes: rewritten, touched or replaced
+- Missing files are never cached
+- LRU eviction in memory
+- The on-disk layer: sharing between caches, stale and corrupt pickles, its bound
+- Copies of mutable results
+- Invalidation and statistics
+"""
+import os
+import pytest
+from pathlib import Path
+import sys
+
+# Add parent directory to path to import file_cache
+sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
+from file_cache import FileCache, fingerprint
+
+
+class CountingLoader:
+    """Loader that returns a file's text and counts how often it ran."""
+
+    def __init__(self):
+        self.calls = 0
+        self.__name__ = "text"
+
+    def __call__(self, path):
+        self.calls += 1
+        try:
+            return Path(path).read_text()
+        except FileNotFoundError:
+            return None
+
+
+@pytest.fixture
+def loader():
+    """Return a fresh counting loader."""
+    return CountingLoader()
+
+
+@pytest.fixture
+def data(tmp_path):
+    """Create a small file to cache the contents of."""
+    path = tmp_path / "data.csv"
+    path.write_text("Alice,1000\n")
+    return path
+
+
+def bump_mtime(path, seconds=10):
+    """Move a file's modification time forward without changing its size."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10**9))
+
+
+class TestFingerprint:
+    """Test identifying file contents."""
+
+    def test_fields(self, data):
+        """Test that the fingerprint is the absolute path, size, mtime and inode."""
+        stat = os.stat(data)
+        assert fingerprint(data) == (str(data), stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def test_missing_file(self, tmp_path):
+        """Test that a missing file cannot be fingerprinted."""
+        with pytest.raises(FileNotFoundError):
+            fingerprint(tmp_path / "missing.csv")
+
+
+class TestMemoryCache:
+    """Test the in-memory layer."""
+
+    def test_hit_until_changed(self, data, loader):
+        """Test that the loader runs once while the file is unchanged."""
+        cache = FileCache(loader)
+        assert cache.get(data) == cache.get(data) == "Alice,1000\n"
+        assert loader.calls == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    @pytest.mark.parametrize("change", ["rewrite", "touch", "replace"])
+    def test_change_reloads(self, data, loader, change):
+        """Test that new contents, a new mtime or a new inode all load the file again."""
+        cache = FileCache(loader)
+        cache.get(data)
+        if change == "rewrite":
+            data.write_text("Bob,2000,extra\n")
+        elif change == "touch":
+            bump_mtime(data)
+        else:
+            replacement = data.with_name("new.csv")
+            replacement.write_text("Eve,3000\n")
+            os.replace(replacement, data)
+        assert cache.get(data) == data.read_text()
+        assert loader.calls == 2
+        assert cache.invalidations == 1
+        assert len(cache) == 1
+
+    def test_missing_file_not_cached(self, tmp_path, loader):
+        """Test that missing files go to the loader every time."""
+        cache = FileCache(loader)
+        assert cache.get(tmp_path / "missing.csv") is None
+        assert cache.get(tmp_path / "missing.csv") is None
+        assert loader.calls == 2
+        assert len(cache) == 0
+
+    def test_relative_and_absolute_paths_share_entry(self, data, loader, monkeypatch):
+        """Test that one file is one entry however its path is written."""
+        cache = FileCache(loader)
+        cache.get(data)
+        monkeypatch.chdir(data.parent)
+        cache.get("data.csv")
+        assert loader.calls == 1
+
+    def test_lru_eviction(self, tmp_path, loader):
+        """Test that the least recently used result is evicted beyond capacity."""
+        paths = []
+        for name in "abc":
+            paths.append(tmp_path / f"{name}.csv")
+            paths[-1].write_text(name)
+        cache = FileCache(loader, capacity=2)
+        cache.get(paths[0])
+        cache.get(paths[1])
+        cache.get(paths[0])
+        cache.get(paths[2])
+        assert cache.evictions == 1
+        cache.get(paths[0])
+        assert loader.calls == 3
+        cache.get(paths[1])
+        assert loader.calls == 4
+
+    def test_invalid_capacity(self, loader):
+        """Test that a cache needs room for a result."""
+        with pytest.raises(ValueError):
+            FileCache(loader, capacity=0)
+
+    def test_copies_results(self, data):
+        """Test that callers changing their result leave the cached one alone."""
+        cache = FileCache(lambda path: [{"name": "Alice"}], copy=lambda rows: [dict(row) for row in rows])
+        first = cache.get(data)
+        first[0]["name"] = "Mallory"
+        first.append({})
+        assert cache.get(data) == [{"name": "Alice"}]
+
+    def test_change_during_load_not_cached(self, data):
+        """Test that a file changed while it was loaded is loaded again next time."""
+        calls = []
+
+        def loader(path):
+            calls.append(path)
+            if len(calls) == 1:
+                bump_mtime(path)
+            return len(calls)
+
+        cache = FileCache(loader)
+        assert cache.get(data) == 1
+        assert cache.get(data) == 2
+        assert cache.get(data) == 2
+
+    def test_invalidate_and_stats(self, data, loader):
+        """Test dropping results and the reported statistics."""
+        cache = FileCache(loader)
+        cache.get(data)
+        cache.get(data)
+        cache.invalidate(data)
+        cache.get(data)
+        cache.invalidate()
+        assert len(cache) == 0
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 2)
+        assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+
+class TestDiskCache:
+    """Test the on-disk layer."""
+
+    def test_shared_between_caches(self, data, loader, tmp_path):
+        """Test that a result pickled by one cache is a disk hit for another."""
+        directory = tmp_path / "cache"
+        FileCache(loader, directory=directory).get(data)
+        other = FileCache(loader, directory=directory)
+        assert other.get(data) == "Alice,1000\n"
+        assert loader.calls == 1
+        assert other.disk_hits == 1
+        other.get(data)
+        assert other.hits == 1
+
+    def test_stale_pickle_is_replaced(self, data, loader, tmp_path):
+        """Test that a pickle of an older version of the file is not used."""
+        directory = tmp_path / "cache"
+        FileCache(loader, directory=directory).get(data)
+        data.write_text("Bob,2000\n")
+        assert FileCache(loader, directory=directory).get(data) == "Bob,2000\n"
+        assert loader.calls == 2
+        assert len(list(directory.iterdir())) == 1
+
+    def test_corrupt_pickle_is_ignored(self, data, loader, tmp_path):
+        """Test that an unreadable pickle counts as a miss."""
+        directory = tmp_path / "cache"
+        FileCache(loader, directory=directory).get(data)
+        for entry in directory.iterdir():
+            entry.write_bytes(b"not a pickle")
+        assert FileCache(loader, directory=directory).get(data) == "Alice,1000\n"
+        assert loader.calls == 2
+
+    def test_disk_capacity(self, tmp_path, loader):
+        """Test that the directory keeps at most disk_capacity results, the most recent ones."""
+        directory = tmp_path / "cache"
+        cache = FileCache(loader, directory=directory, disk_capacity=2)
+        for name in "abc":
+            path = tmp_path / f"{name}.csv"
+            path.write_text(name)
+            cache.get(path)
+            # Age the pickles written so far, so the first one is the least recently read
+            for entry in directory.iterdir():
+                bump_mtime(entry, -10)
+        assert len(list(directory.iterdir())) == 2
+        fresh = FileCache(loader, directory=directory)
+        fresh.get(tmp_path / "c.csv")
+        assert fresh.disk_hits == 1
+
+    def test_invalidate_all_clears_directory(self, data, loader, tmp_path):
+        """Test that invalidating everything removes the pickles too."""
+        directory = tmp_path / "cache"
+        cache = FileCache(loader, directory=directory)
+        cache.get(data)
+        cache.invalidate()
+        assert list(directory.iterdir()) == []
@@ -0,0 +1,150 @@
+"""
+Tests for metrics.py - Runtime Metrics
+
+Tests cover:
+- Counters, histograms and timers, with and without labels
+- Declaring a metric twice
+- Prometheus text rendering and label escaping
+- Writing to a file and serving over HTTP
+- Merging snapshots from other processes
+- Enabling collection only while exporting
+"""
+import pytest
+from pathlib import Path
+import sys
+import urllib.error
+import urllib.request
+
+# Add parent directory to path to import metrics
+sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
+from metrics import METRICS, Registry, export
+
+
+@pytest.fixture
+def registry():
+    """Return an empty registry."""
+    return Registry()
+
+
+class TestMetrics:
+    """Test recording values."""
+
+    def test_counter_with_labels(self, registry):
+        """Test that each set of label values counts on its own."""
+        counter = registry.counter("rows_total", "Rows", ["task"])
+        counter.labels("salary").inc(3)
+        counter.labels("salary").inc()
+        counter.labels("cats").inc(2)
+        assert counter.labels("salary").value == 4
+        assert counter.labels("cats").value == 2
+
+    def test_counter_cannot_go_down(self, registry):
+        """Test that negative increments are refused."""
+        with pytest.raises(ValueError):
+            registry.counter("rows_total", "Rows").inc(-1)
+
+    def test_wrong_label_count(self, registry):
+        """Test that label values must match the label names."""
+        with pytest.raises(ValueError):
+            registry.counter("rows_total", "Rows", ["task"]).labels()
+
+    def test_histogram_buckets(self, registry):
+        """Test that observations land in the first bucket they fit."""
+        histogram = registry.histogram("size", "Size", buckets=[1, 10])
+        for value in [0.5, 1, 5, 50]:
+            histogram.observe(value)
+        assert histogram.labels().state() == ([2, 1, 1], 56.5, 4)
+
+    def test_timer(self, registry):
+        """Test that a timer observes the duration of a with block."""
+        timer = registry.timer("walk_seconds", "Walk")
+        with timer.time():
+            pass
+        counts, total, count = timer.labels().state()
+        assert count == 1
+        assert 0 <= total < 1
+
+    def test_declaring_twice(self, registry):
+        """Test that a name gives back the same metric, and only of the same kind."""
+        counter = registry.counter("rows_total", "Rows", ["task"])
+        assert registry.counter("rows_total", "Rows", ["task"]) is counter
+        with pytest.raises(ValueError):
+            registry.timer("rows_total", "Rows", ["task"])
+        with pytest.raises(ValueError):
+            registry.counter("rows_total", "Rows", ["other"])
+
+    def test_reset_keeps_bound_values(self, registry):
+        """Test that values bound before a reset keep counting into the registry."""
+        bound = registry.counter("rows_total", "Rows", ["task"]).labels("salary")
+        bound.inc(5)
+        registry.reset()
+        bound.inc()
+        assert 'rows_total{task="salary"} 1' in registry.render()
+
+
+class TestExport:
+    """Test the Prometheus exports."""
+
+    def test_render(self, registry):
+        """Test the text format of counters and histograms."""
+        registry.counter("rows_total", "Rows read", ["task"]).labels('a "b"\\').inc(2)
+        registry.histogram("size", "Size", buckets=[1]).observe(0.5)
+        assert registry.render().splitlines() == [
+            "# HELP rows_total Rows read",
+            "# TYPE rows_total counter",
+            'rows_total{task="a \\"b\\"\\\\"} 2',
+            "# HELP size Size",
+            "# TYPE size histogram",
+            'size_bucket{le="1"} 1',
+            'size_bucket{le="+Inf"} 1',
+            "size_sum 0.5",
+            "size_count 1",
+        ]
+
+    def test_write(self, registry, tmp_path):
+        """Test that the metrics are written to a file, with no temporary left behind."""
+        registry.counter("rows_total", "Rows").inc()
+        registry.write(tmp_path / "metrics.prom")
+        assert "rows_total 1" in (tmp_path / "metrics.prom").read_text()
+        assert [entry.name for entry in tmp_path.iterdir()] == ["metrics.prom"]
+
+    def test_serve(self, registry):
+        """Test that /metrics serves the current values and other paths are not found."""
+        counter = registry.counter("rows_total", "Rows")
+        server = registry.serve()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+            counter.inc(7)
+            with urllib.request.urlopen(f"{url}/metrics") as response:
+                assert "rows_total 7" in response.read().decode()
+                assert response.headers["Content-Type"].startswith("text/plain")
+            with pytest.raises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"{url}/other")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_merge_snapshot(self, registry):
+        """Test that a snapshot from another registry adds up with the local values."""
+        other = Registry()
+        for target in (registry, other):
+            target.counter("rows_total", "Rows", ["task"]).labels("salary").inc(2)
+            target.histogram("size", "Size", buckets=[1]).observe(3)
+        registry.merge(other.snapshot())
+        assert registry.get("rows_total").labels("salary").value == 4
+        assert registry.get("size").labels().state() == ([0, 2], 6.0, 2)
+
+    def test_export_enables_while_running(self, registry, tmp_path):
+        """Test that export() enables collection, restores it and writes the file."""
+        path = tmp_path / "metrics.prom"
+        with export(path, registry=registry):
+            assert registry.enabled is True
+            registry.counter("rows_total", "Rows").inc()
+        assert registry.enabled is False
+        assert "rows_total 1" in path.read_text()
+
+    def test_export_without_target(self):
+        """Test that nothing is enabled when there is nowhere to export to."""
+        with export() as server:
+            assert server is None
+            assert METRICS.enabled is False
@@ -0,0 +1,487 @@
+"""
+Scaled tests - large randomized inputs for every task
+
+Each case generates a large random dataset from a seed and checks that the
+optimized engines agree with plain reference implementations written here,
+and that they stay within time and memory budgets. The cases run in
+parallel: all selected cases are submitted to a pool of worker processes
+when the first one is needed, and every test waits for its own result.
+
+The tier is opt-in, as its datasets take a while and its time budgets
+depend on the machine: it is skipped unless TASKS_TEST_SCALE is set.
+
+Environment variables:
+    TASKS_TEST_SCALE: dataset size multiplier; unset or 0 skips the tier
+    TASKS_TEST_SEED: first random seed, 0 by default; failures name their seed
+    TASKS_TEST_SEEDS: number of seeds per case, 2 by default
+    TASKS_TEST_JOBS: worker processes, one per core by default
+
+For example, a run at the base size, then a larger one with fresh data:
+    TASKS_TEST_SCALE=1 python -m pytest tests/test_scaled.py
+    TASKS_TEST_SCALE=10 TASKS_TEST_SEED=$RANDOM python -m pytest tests/test_scaled.py
+
+Tests cover:
+- Salary CSVs with mixed malformed rows: total_salary, salary_stats,
+  cached_total_salary and the parallel CLI stage against a Decimal reference
+- Cat CSVs with mixed malformed rows: get_cats_info, iter_cats,
+  cached_cats_info and the CLI stage against a csv module reference
+- Streaming readers keeping memory flat however large the file
+- Deep and wide directory trees: iterate_dir, its instrumented walk,
+  walk_tree and the watch mode tree model against an os.listdir reference
+- Long bot scripts: every store backend, the lookup cache and shards give
+  the same replies and contents as the in-memory store
+- Name and phone searches against brute force over all contacts
+"""
+import csv
+import io
+import json
+import os
+import random
+import time
+import tracemalloc
+from argparse import Namespace
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+import sys
+
+import pytest
+
+# Add parent directory to path to import the tasks
+sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
+import cli
+import task_1
+import task_2
+import task_3
+import task_4
+from contact_index import NameIndex, PhoneIndex
+from contact_names import name_key
+from contact_phones import pack_phones, unpack_phones
+from contact_shards import ShardedStore
+from contact_store import MemoryStore, open_store
+from file_cache import FileCache
+
+SCALE = int(os.environ.get("TASKS_TEST_SCALE", "0"))
+FIRST_SEED = int(os.environ.get("TASKS_TEST_SEED", "0"))
+SEEDS = int(os.environ.get("TASKS_TEST_SEEDS", "2"))
+JOBS = int(os.environ.get("TASKS_TEST_JOBS", "0")) or os.cpu_count() or 1
+
+# Budgets are loose on purpose: they catch an engine turning quadratic or
+# buffering a whole file, not a slow machine.
+ROW_SECONDS = 20e-6
+ENTRY_SECONDS = 200e-6
+COMMAND_SECONDS = 10e-3
+STREAM_PEAK_BYTES = 1024 * 1024
+
+pytestmark = pytest.mark.skipif(SCALE < 1, reason="set TASKS_TEST_SCALE to run the scaled tier")
+
+LETTERS = "abcdefghijklmnopqrstuvwxyzéöçßÆ"
+UNICODE_NAMES = ["Straße", "STRASSE", "José", "José", "Ｆｕｌｌ", "ﬁona", "O'Brien", "McDonald"]
+
+
+@contextmanager
+def _quiet():
+    """Send the warnings the readers print about malformed lines nowhere."""
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+        yield
+
+
+def _timed(function, *args):
+    """Return function(*args) and the seconds it took."""
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def _peak_memory(function, *args) -> int:
+    """Return the peak bytes traced while function(*args) ran."""
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _random_name(rng) -> str:
+    """Return a random contact name, sometimes a tricky Unicode spelling."""
+    if rng.random() < 0.05:
+        return rng.choice(UNICODE_NAMES)
+    name = "".join(rng.choice(LETTERS) for _ in range(rng.randint(3, 10)))
+    return name.title() if rng.random() < 0.5 else name
+
+
+# Salaries
+
+
+def _salary_line(rng) -> str:
+    """Return one salary line: mostly valid, in several spellings, else malformed."""
+    name = _random_name(rng)
+    kind = rng.random()
+    if kind < 0.6:
+        return f"{name},{rng.randint(0, 200_000)}"
+    if kind < 0.75:
+        return f"{name},{rng.randint(0, 200_000)}.{rng.randint(0, 99):02d}"
+    if kind < 0.8:
+        return rng.choice([f" {name} , {rng.randint(1, 9)}.5e3 ", f"{name},{rng.randint(1, 99)}_000"])
+    return rng.choice(
+        [name, f"{name},", f"{name},{rng.randint(1, 9)},1", f"{name},n/a", f"{name},nan", f"{name},-inf", ""]
+    )
+
+
+def _reference_salaries(path) -> tuple:
+    """Return the exact (total, count) of a salary file, parsing with Decimal."""
+    total = Decimal(0)
+    count = 0
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            fields = line.strip().split(",")
+            if len(fields) != 2:
+                continue
+            try:
+                salary = Decimal(fields[1])
+            except InvalidOperation:
+                continue
+            if salary.is_finite():
+                total += salary
+                count += 1
+    return total, count
+
+
+def check_salary(seed: int, directory: str) -> None:
+    """Compare every salary engine with the reference on random files."""
+    rng = random.Random(seed)
+    rows = 30_000 * SCALE
+    paths = []
+    for index in range(3):
+        path = os.path.join(directory, f"salaries-{index}.csv")
+        with open(path, "w", encoding="utf-8") as file:
+            file.writelines(_salary_line(rng) + "\n" for _ in range(rows // 3))
+        paths.append(path)
+
+    cache = FileCache(task_1.total_salary)
+    grand_total, grand_count = Decimal(0), 0
+    for path in paths:
+        expected_total, expected_count = _reference_salaries(path)
+        grand_total += expected_total
+        grand_count += expected_count
+        with _quiet():
+            (total, average), elapsed = _timed(task_1.total_salary, path)
+            raw_total, count = task_1.salary_stats(path)
+            assert cache.get(path) == cache.get(path) == (total, average)
+            peak = _peak_memory(task_1.salary_stats, path)
+
+        assert count == expected_count
+        # total_salary adds floats, so allow the last cent to differ
+        assert abs(total - expected_total) <= Decimal("0.01")
+        assert abs(Decimal(raw_total) - expected_total) <= Decimal("0.01")
+        assert abs(average - expected_total / expected_count) <= Decimal("0.01")
+        assert elapsed <= rows // 3 * ROW_SECONDS, f"total_salary took {elapsed:.2f}s"
+        assert peak <= STREAM_PEAK_BYTES, f"salary_stats peaked at {peak} bytes"
+    assert cache.hits == len(paths)
+
+    errors = []
+    options = Namespace(paths=paths, jobs=2, total_only=False)
+    with _quiet():
+        reports = list(cli.run_salary(options, None, errors))
+    assert errors == []
+    assert [report.path for report in reports] == paths + [None]
+    assert reports[-1].count == grand_count
+    assert abs(reports[-1].total - grand_total) <= Decimal("0.01")
+
+
+# Cats
+
+
+def _cat_line(rng) -> str:
+    """Return one cat line: mostly valid, else with missing, extra or bad fields."""
+    cat_id = f"{rng.getrandbits(96):024x}"
+    name = _random_name(rng).replace("'", "")
+    kind = rng.random()
+    if kind < 0.8:
+        return f"{cat_id},{name},{rng.choice([rng.randint(0, 25), ' 7', '+3', '-1'])}"
+    return rng.choice(
+        [f"{cat_id},{name}", f"{cat_id},{name},3,extra", f"{cat_id},{name},three", f"{cat_id},{name},2.5", ""]
+    )
+
+
+def _reference_cats(path) -> list:
+    """Return the cat records of a file, parsed with the csv module."""
+    cats = []
+    with open(path, newline="", encoding="utf-8") as file:
+        for row in csv.reader(file):
+            if len(row) != 3:
+                continue
+            try:
+                age = int(row[2])
+            except ValueError:
+                continue
+            cats.append({"id": row[0], "name": row[1], "age": age})
+    return cats
+
+
+def _drain(records) -> None:
+    """Consume an iterator without keeping its items."""
+    for _ in records:
+        pass
+
+
+def check_cats(seed: int, directory: str) -> None:
+    """Compare every cat reader with the reference on a random file."""
+    rng = random.Random(seed)
+    rows = 30_000 * SCALE
+    path = os.path.join(directory, "cats.csv")
+    with open(path, "w", encoding="utf-8") as file:
+        file.writelines(_cat_line(rng) + "\n" for _ in range(rows))
+    expected = _reference_cats(path)
+
+    cache = FileCache(task_2.get_cats_info, copy=task_2._copy_cats)
+    with _quiet():
+        cats, elapsed = _timed(task_2.get_cats_info, path)
+        assert list(task_2.iter_cats(path)) == expected
+        assert cache.get(path) == cache.get(path) == expected
+        assert list(cli.run_cats(Namespace(paths=[path]), None, [])) == expected
+        peak = _peak_memory(_drain, task_2.iter_cats(path))
+
+    assert cats == expected
+    assert elapsed <= rows * ROW_SECONDS, f"get_cats_info took {elapsed:.2f}s"
+    assert peak <= STREAM_PEAK_BYTES, f"iter_cats peaked at {peak} bytes"
+    assert os.path.getsize(path) > STREAM_PEAK_BYTES
+
+
+# Directory trees
+
+
+def _build_tree(rng, root: str) -> None:
+    """Create a tree with one deep chain, wide directories and odd names."""
+    depth = min(150 * SCALE, 400)
+    chain = root
+    for level in range(depth):
+        chain = os.path.join(chain, "d" if level % 7 else f"level {level}")
+        os.mkdir(chain)
+        if level % 10 == 0:
+            Path(chain, f"file{level}.txt").write_text("x")
+
+    directories = [root]
+    for index in range(200 * SCALE):
+        parent = rng.choice(directories)
+        path = os.path.join(parent, f"{_random_name(rng)}{index}")
+        os.mkdir(path)
+        directories.append(path)
+    for index in range(2000 * SCALE):
+        name = rng.choice([f"{_random_name(rng)}{index}.csv", f".hidden{index}", f"Ünïcode {index}", f"{index}"])
+        Path(rng.choice(directories), name).write_text("x")
+    os.symlink(os.path.join(root, "missing"), os.path.join(root, "broken link"))
+
+
+def _reference_tree(path: str, depth: int = 0) -> list:
+    """Return (name, depth, is_dir) of every directory and file, in iterate_dir order."""
+    entries = []
+    for name in sorted(os.listdir(path)):
+        full = os.path.join(path, name)
+        if os.path.isdir(full):
+            entries.append((name, depth, True))
+            entries.extend(_reference_tree(full, depth + 1))
+        elif os.path.isfile(full):
+            entries.append((name, depth, False))
+    return entries
+
+
+def _printed(function, *args) -> list:
+    """Return the lines a tree printer printed."""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        function(*args)
+    return output.getvalue().splitlines()
+
+
+def check_tree(seed: int, directory: str) -> None:
+    """Compare every tree walker with the reference on a random tree."""
+    rng = random.Random(seed)
+    root = os.path.join(directory, "tree")
+    os.mkdir(root)
+    _build_tree(rng, root)
+    expected = _reference_tree(root)
+    expected_lines = [
+        f"{task_3.GREEN if is_dir else task_3.RED} {'.' * depth}  {name}" for name, depth, is_dir in expected
+    ]
+
+    lines, elapsed = _timed(_printed, task_3.iterate_dir, root)
+    assert lines == expected_lines
+    assert elapsed <= len(expected) * ENTRY_SECONDS, f"iterate_dir took {elapsed:.2f}s"
+
+    stats = task_3.TraversalStats()
+    assert _printed(task_3.iterate_dir, root, "", stats) == expected_lines
+    assert stats.entries == len(expected) + 1
+
+    walked = [(name, depth, is_dir) for _, name, depth, is_dir in task_3.walk_tree(root)]
+    assert walked == expected
+    cli_lines = [cli.format_record(record) for record in cli.run_tree(Namespace(paths=[root], pattern=None), None, [])]
+    assert cli_lines == [f"{'.' * depth}  {name}" for name, depth, _ in expected]
+
+    # The watch mode model keeps directory order, so compare the lines as a multiset
+    model_lines = _printed(task_3.render_tree, task_3.build_tree(Path(root)))
+    assert sorted(model_lines) == sorted(expected_lines)
+
+
+# Bot scripts
+
+
+def _bot_script(rng, count: int) -> list:
+    """Return a random bot script over a small pool of names and phones, so commands collide."""
+    names = [_random_name(rng) for _ in range(max(50, count // 20))] + UNICODE_NAMES
+    phones = [f"{rng.randint(10**9, 10**10 - 1)}" for _ in range(max(30, count // 30))]
+
+    def name():
+        chosen = rng.choice(names)
+        return chosen.upper() if rng.random() < 0.1 else chosen
+
+    commands = [
+        (0.25, lambda: f"add {name()} {rng.choice(phones)}"),
+        (0.1, lambda: f"change {name()} {rng.choice(phones)}"),
+        (0.1, lambda: f"addphone {name()} {rng.choice(phones)}"),
+        (0.08, lambda: f"removephone {name()} {rng.choice(phones)}"),
+        (0.15, lambda: f"phone {name()}"),
+        (0.06, lambda: f"who {rng.choice(phones)}"),
+        (0.06, lambda: f"search {name()[:rng.randint(1, 6)]}"),
+        (0.04, lambda: f"all {rng.randint(1, 20)}"),
+        (0.05, lambda: f"undo {rng.randint(1, 3)}"),
+        (0.04, lambda: f"redo {rng.randint(1, 3)}"),
+        (0.03, lambda: f"history {name()}"),
+        (0.04, lambda: rng.choice(["add", "phone", "add Bob 12ab", "change Nobody 1234567890", "nonsense"])),
+    ]
+    weights = [weight for weight, _ in commands]
+    makers = [maker for _, maker in commands]
+    return [rng.choices(makers, weights)[0]() for _ in range(count)]
+
+
+def _run_script(store, script: list) -> tuple:
+    """Run a script on a store and return the JSON replies, the contents and the seconds taken."""
+    task_4.USERS = store
+    task_4.HISTORY_SIZE = 100
+    output = io.StringIO()
+    try:
+        _, elapsed = _timed(task_4.run_batch, script, output, task_4.render_json)
+        contents = {name: unpack_phones(phones) for name, phones in store.items()}
+    finally:
+        store.close()
+        task_4.USERS = MemoryStore()
+    return [json.loads(line) for line in output.getvalue().splitlines()], contents, elapsed
+
+
+def check_bot(seed: int, directory: str) -> None:
+    """Run one random script on every backend and compare with the in-memory store."""
+    rng = random.Random(seed)
+    script = _bot_script(rng, 1500 * SCALE)
+    expected_replies, expected_contents, _ = _run_script(MemoryStore(), script)
+    assert any(reply["ok"] for reply in expected_replies)
+    assert any(not reply["ok"] for reply in expected_replies)
+
+    engines = {
+        "sqlite": lambda path: open_store(path, "sqlite"),
+        "log": lambda path: open_store(path, "log"),
+        "snapshot": lambda path: open_store(path, "snapshot"),
+        "cached": lambda path: open_store(path, "sqlite", cache_size=16),
+        "sharded": lambda path: ShardedStore(2, path, "sqlite"),
+    }
+    for engine, opener in engines.items():
+        replies, contents, elapsed = _run_script(opener(os.path.join(directory, f"{engine}.db")), script)
+        for command, reply, expected in zip(script, replies, expected_replies):
+            assert reply == expected, f"{engine} differs on {command!r}"
+        assert contents == expected_contents, engine
+        assert elapsed <= len(script) * COMMAND_SECONDS, f"{engine} took {elapsed:.2f}s"
+
+
+# Indexes
+
+
+def _edit_distance(a: str, b: str) -> int:
+    """Return the full edit distance between two strings."""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def _reference_search(names: list, query: str, limit: int) -> list:
+    """Search like NameIndex.search by scanning every name."""
+    folded = name_key(query)
+    keyed = sorted((name_key(name), name) for name in names)
+    found = [name for key, name in keyed if key.startswith(folded)][:limit]
+    allowed = min(2, len(folded) // 3)
+    typos = sorted(
+        (distance, key, name)
+        for key, name in keyed
+        for distance in [_edit_distance(folded, key)]
+        if distance <= allowed
+    )
+    for _, _, name in typos:
+        if len(found) == limit:
+            break
+        if name not in found:
+            found.append(name)
+    return found
+
+
+def check_indexes(seed: int, directory: str) -> None:
+    """Compare name and phone searches, unsharded and sharded, with brute force."""
+    rng = random.Random(seed)
+    # A small alphabet makes typo matches and repeated trigrams common
+    names = sorted({"".join(rng.choice("abcde") for _ in range(rng.randint(2, 9))).title() for _ in range(1500 * SCALE)})
+    phones = [f"{rng.randint(10**9, 10**10 - 1)}" for _ in range(len(names) // 4)]
+    book = {name: rng.sample(phones, rng.randint(1, 3)) for name in names}
+    queries = [rng.choice(names)[: rng.randint(1, 9)] for _ in range(40)]
+    queries += ["".join(rng.choice("abcdef") for _ in range(rng.randint(1, 9))) for _ in range(40)]
+
+    single = MemoryStore((name, pack_phones(numbers)) for name, numbers in book.items())
+    sharded = ShardedStore(3)
+    try:
+        sharded.bulk_update(single.items())
+        for store in (single, sharded):
+            index = store.index_for(NameIndex)
+            for query in queries:
+                assert index.search(query, 10) == _reference_search(names, query, 10), query
+            owners = store.index_for(PhoneIndex)
+            for phone in rng.sample(phones, 50):
+                assert owners.owners(phone) == sorted(name for name, numbers in book.items() if phone in numbers)
+    finally:
+        sharded.close()
+
+
+CASES = {
+    "salary": check_salary,
+    "cats": check_cats,
+    "tree": check_tree,
+    "bot": check_bot,
+    "indexes": check_indexes,
+}
+CASE_IDS = [f"{name}-seed{seed}" for name in CASES for seed in range(FIRST_SEED, FIRST_SEED + SEEDS)]
+
+
+def _run_case(case_id: str, directory: str) -> None:
+    """Run one case in a worker process; failures are raised in the test that waits for it."""
+    name, seed = case_id.rsplit("-seed", 1)
+    CASES[name](int(seed), directory)
+
+
+@pytest.fixture(scope="module")
+def outcomes(request, tmp_path_factory):
+    """Submit every selected case to a process pool at once and yield their futures."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    selected = [
+        item.callspec.params["case_id"]
+        for item in request.session.items
+        if item.module is request.module and hasattr(item, "callspec")
+    ]
+    with ProcessPoolExecutor(max_workers=min(JOBS, len(selected))) as pool:
+        yield {case_id: pool.submit(_run_case, case_id, str(tmp_path_factory.mktemp(case_id))) for case_id in selected}
+
+
+@pytest.mark.parametrize("case_id", CASE_IDS)
+def test_scaled(outcomes, case_id):
+    """Test that the engines agree with the references and keep to the budgets on one dataset."""
+    outcomes[case_id].result()
@@ -7,6 +7,9 @@ Tests cover:
 - Malformed data handling
 - Empty file handling
 - Edge cases (single employee, zero salaries)
+- Raw sums for aggregating several files
+- Metrics of the lines and bytes read
+- Cached results until the file changes
 """
 import pytest
 from decimal import Decimal
@@ -15,7 +18,8 @@ import sys
 
 # Add parent directory to path to import task_1
 sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
-from task_1 import total_salary, _format_number, _parse_salary_line
+from metrics import METRICS
+from task_1 import total_salary, cached_total_salary, salary_stats, _format_number, _parse_salary_line
 
 
 class TestFormatNumber:
@@ -73,6 +77,12 @@ class TestParseSalaryLine:
         captured = capsys.readouterr()
         assert "Line 3" in captured.out
 
+    @pytest.mark.parametrize("salary", ["nan", "inf", "-Infinity"])
+    def test_parse_non_finite_salary(self, capsys, salary):
+        """Test that salaries which cannot be totalled are malformed."""
+        assert _parse_salary_line(f"Bob,{salary}", 4) is None
+        assert "Line 4" in capsys.readouterr().out
+
 
 class TestTotalSalary:
     """Test the main total_salary function."""
@@ -179,3 +189,54 @@ class TestTotalSalary:
         # Should handle whitespace gracefully
         assert total == Decimal("5000.00")
         assert average == Decimal("2500.00")
+
+
+class TestSalaryStats:
+    """Test the salary_stats function."""
+
+    def test_raw_total_and_count(self, tmp_path):
+        """Test that the unrounded sum and count of valid lines are returned."""
+        path = tmp_path / "salaries.csv"
+        path.write_text("Alice,1000.125\nBob,2000\nbroken line\n")
+        assert salary_stats(path) == (3000.125, 2)
+
+    def test_missing_file_raises(self, tmp_path):
+        """Test that a missing file is left to the caller."""
+        with pytest.raises(FileNotFoundError):
+            salary_stats(tmp_path / "missing.csv")
+
+    def test_records_metrics(self, tmp_path, monkeypatch):
+        """Test that lines, malformed lines and bytes are counted when metrics are enabled."""
+        path = tmp_path / "salaries.csv"
+        path.write_text("Alice,1000\nbroken line\n")
+        METRICS.reset()
+        monkeypatch.setattr(METRICS, "enabled", True)
+        salary_stats(path)
+        assert METRICS.get("tasks_rows_parsed_total").labels("salary").value == 2
+        assert METRICS.get("tasks_rows_malformed_total").labels("salary").value == 1
+        assert METRICS.get("tasks_bytes_read_total").labels("salary").value == 23
+        assert METRICS.get("tasks_file_read_seconds").labels("salary").count == 1
+
+
+class TestCachedTotalSalary:
+    """Test the cached_total_salary function."""
+
+    def test_cached_until_changed(self, tmp_path, capsys):
+        """Test that a file is read once while unchanged, then again after a change."""
+        import task_1
+
+        path = tmp_path / "salaries.csv"
+        path.write_text("Alice,1000\nBob,2000\nbroken line\n")
+        assert cached_total_salary(path) == (Decimal("3000.00"), Decimal("1500.00"))
+        assert cached_total_salary(path) == (Decimal("3000.00"), Decimal("1500.00"))
+        assert capsys.readouterr().out.count("malformed") == 1
+
+        path.write_text("Alice,1000\nBob,2000\nCarol,6000\n")
+        assert cached_total_salary(path) == (Decimal("9000.00"), Decimal("3000.00"))
+        assert task_1.SALARY_CACHE.invalidations >= 1
+
+    def test_missing_file(self, tmp_path, capsys):
+        """Test that a missing file is reported every time, like total_salary."""
+        assert cached_total_salary(tmp_path / "missing.csv") == (None, None)
+        assert cached_total_salary(tmp_path / "missing.csv") == (None, None)
+        assert capsys.readouterr().out.count("was not found") == 2
@@ -7,6 +7,9 @@ Tests cover:
 - Malformed data handling
 - Empty file handling
 - Edge cases (various age values, special characters)
+- Streaming records one at a time
+- Metrics of the lines and bytes read
+- Cached results until the file changes
 """
 import pytest
 from pathlib import Path
@@ -14,7 +17,8 @@ import sys
 
 # Add parent directory to path to import task_2
 sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
-from task_2 import get_cats_info, _parse_cat_line
+from metrics import METRICS
+from task_2 import get_cats_info, cached_cats_info, iter_cats, _parse_cat_line
 
 
 class TestParseCatLine:
@@ -207,3 +211,49 @@ class TestGetCatsInfo:
         assert isinstance(cat["id"], str)
         assert isinstance(cat["name"], str)
         assert isinstance(cat["age"], int)
+
+
+class TestIterCats:
+    """Test the iter_cats generator."""
+
+    def test_yields_records_lazily(self, tmp_path):
+        """Test that records come one at a time, invalid lines skipped."""
+        path = tmp_path / "cats.csv"
+        path.write_text("1,Tayson,3\nbroken\n2,Vika,1\n")
+        cats = iter_cats(path)
+        assert next(cats) == {"id": "1", "name": "Tayson", "age": 3}
+        assert list(cats) == [{"id": "2", "name": "Vika", "age": 1}]
+
+    def test_missing_file_raises(self, tmp_path):
+        """Test that a missing file is left to the caller."""
+        with pytest.raises(FileNotFoundError):
+            list(iter_cats(tmp_path / "missing.csv"))
+
+    def test_records_metrics_when_closed_early(self, tmp_path, monkeypatch):
+        """Test that a file the caller stops reading is still counted, up to where it stopped."""
+        path = tmp_path / "cats.csv"
+        path.write_text("1,Tayson,3\nbroken\n2,Vika,1\n3,Barsik,7\n")
+        METRICS.reset()
+        monkeypatch.setattr(METRICS, "enabled", True)
+        cats = iter_cats(path)
+        next(cats)
+        next(cats)
+        cats.close()
+        assert METRICS.get("tasks_rows_parsed_total").labels("cats").value == 3
+        assert METRICS.get("tasks_rows_malformed_total").labels("cats").value == 1
+        assert METRICS.get("tasks_bytes_read_total").labels("cats").value > 0
+
+
+class TestCachedCatsInfo:
+    """Test the cached_cats_info function."""
+
+    def test_cached_until_changed(self, tmp_path):
+        """Test that records are cached while the file is unchanged and reloaded after."""
+        path = tmp_path / "cats.csv"
+        path.write_text("1,Tayson,3\n")
+        first = cached_cats_info(path)
+        first[0]["age"] = 99
+        assert cached_cats_info(path) == [{"id": "1", "name": "Tayson", "age": 3}]
+
+        path.write_text("1,Tayson,3\n2,Vika,1\n")
+        assert len(cached_cats_info(path)) == 2
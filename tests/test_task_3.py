@@ -7,7 +7,14 @@ Tests cover:
 - Nested directories
 - Empty directories
 - Color output verification
+- Traversal instrumentation
+- Error tolerance and resuming interrupted walks
+- Watch mode tree model and incremental re-rendering
+- Lazy tree walks without output
+- Metrics of the entries walked
+- Cheap startup: lazy imports, colors only on a terminal
 """
+import os
 import pytest
 from pathlib import Path
 import sys
@@ -15,7 +22,8 @@ from colorama import Fore
 
 # Add parent directory to path to import task_3
 sys.path.insert(0, str(Path(__file__).parent.parent / "tasks"))
-from task_3 import iterate_dir
+from metrics import METRICS
+from task_3 import iterate_dir, walk_tree, build_tree, TraversalStats, TraversalInterrupted, render_tree, watch_tree, PollingWatcher
 
 
 class TestIterateDir:
@@ -246,3 +254,405 @@ class TestMainFunction:
 
         # Should show the file from current directory
         assert "test.txt" in captured.out
+
+    def test_no_colors_when_not_a_terminal(self, capsys, monkeypatch, tmp_path):
+        """Test that the tree is printed as plain text into a pipe."""
+        import task_3
+
+        (tmp_path / "dir").mkdir()
+        (tmp_path / "test.txt").write_text("content")
+        monkeypatch.setattr(sys, "argv", ["task_3.py", str(tmp_path)])
+        try:
+            task_3.main()
+        finally:
+            task_3.set_colors(True)
+
+        captured = capsys.readouterr()
+        assert "test.txt" in captured.out
+        assert "\033[" not in captured.out
+
+
+class TestTraversalStats:
+    """Test the optional instrumentation of iterate_dir."""
+
+    def test_counts_directories_and_entries(self, tmp_path, capsys):
+        """Test that scandir calls and entries are counted."""
+        (tmp_path / "file1.txt").write_text("content")
+        sub = tmp_path / "sub"
+        sub.mkdir()
+        (sub / "file2.txt").write_text("content")
+
+        stats = TraversalStats()
+        iterate_dir(tmp_path, stats=stats)
+
+        assert stats.scandir_calls == 2
+        assert stats.entries == 3
+        assert stats.stat_calls >= 3
+        assert stats.elapsed > 0
+        assert {path for _, path in stats.slowest_dirs()} == {str(tmp_path), str(sub)}
+
+    def test_instrumented_output_matches_plain_walk(self, tmp_path, capsys):
+        """Test that instrumentation does not change what is printed."""
+        (tmp_path / "a.txt").write_text("content")
+        (tmp_path / "dir").mkdir()
+        (tmp_path / "dir" / "b.txt").write_text("content")
+
+        iterate_dir(tmp_path)
+        plain = capsys.readouterr().out
+        iterate_dir(tmp_path, stats=TraversalStats())
+        assert capsys.readouterr().out == plain
+
+    def test_slowest_dirs_are_bounded(self, tmp_path, capsys):
+        """Test that only the configured number of slow directories is kept."""
+        for i in range(5):
+            (tmp_path / f"dir{i}").mkdir()
+
+        stats = TraversalStats(top=2)
+        iterate_dir(tmp_path, stats=stats)
+
+        slowest = stats.slowest_dirs()
+        assert len(slowest) == 2
+        assert slowest[0][0] >= slowest[1][0]
+
+    def test_errors_are_counted(self, tmp_path):
+        """Test that a failing directory is reported in the error counts."""
+        stats = TraversalStats()
+        with pytest.raises(FileNotFoundError):
+            iterate_dir(tmp_path / "missing", stats=stats)
+
+        assert stats.errors == {"FileNotFoundError": 1}
+        assert "FileNotFoundError=1" in stats.report()
+
+    def test_main_prints_report_to_stderr(self, tmp_path, capsys, monkeypatch):
+        """Test that --stats keeps the tree on stdout and the report on stderr."""
+        from task_3 import main
+
+        (tmp_path / "file.txt").write_text("content")
+        monkeypatch.setattr(sys, "argv", ["task_3.py", str(tmp_path), "--stats"])
+
+        main()
+        captured = capsys.readouterr()
+
+        assert "file.txt" in captured.out
+        assert "entries/s" in captured.err
+        assert "Slowest directories" in captured.err
+
+
+def _deny(monkeypatch, denied):
+    """Make os.scandir raise PermissionError for the given directory."""
+    real_scandir = os.scandir
+
+    def scandir(path):
+        if os.fspath(path) == str(denied):
+            raise PermissionError(13, "Permission denied", str(denied))
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", scandir)
+
+
+class TestErrorTolerance:
+    """Test that unreadable subdirectories do not abort the walk."""
+
+    def test_unreadable_directory_is_skipped(self, tmp_path, capsys, monkeypatch):
+        """Test that the walk continues past a directory it cannot read."""
+        locked = tmp_path / "a_locked"
+        locked.mkdir()
+        (tmp_path / "b_open").mkdir()
+        (tmp_path / "b_open" / "visible.txt").write_text("content")
+        _deny(monkeypatch, locked)
+
+        errors = iterate_dir(tmp_path)
+        captured = capsys.readouterr()
+
+        assert "a_locked" in captured.out
+        assert "visible.txt" in captured.out
+        assert len(errors) == 1
+        assert errors[0][0] == str(locked)
+        assert isinstance(errors[0][1], PermissionError)
+
+    def test_unreadable_directory_is_counted_in_stats(self, tmp_path, capsys, monkeypatch):
+        """Test that skipped directories show up in the instrumentation report."""
+        locked = tmp_path / "locked"
+        locked.mkdir()
+        _deny(monkeypatch, locked)
+
+        stats = TraversalStats()
+        errors = iterate_dir(tmp_path, stats=stats)
+
+        assert len(errors) == 1
+        assert stats.errors == {"PermissionError": 1}
+
+    def test_unreadable_root_still_raises(self, tmp_path, monkeypatch):
+        """Test that failing to read the root directory is reported to the caller."""
+        _deny(monkeypatch, tmp_path)
+        with pytest.raises(PermissionError):
+            iterate_dir(tmp_path)
+
+    def test_main_lists_skipped_directories(self, tmp_path, capsys, monkeypatch):
+        """Test that main reports skipped directories on stderr."""
+        from task_3 import main
+
+        locked = tmp_path / "locked"
+        locked.mkdir()
+        _deny(monkeypatch, locked)
+        monkeypatch.setattr(sys, "argv", ["task_3.py", str(tmp_path)])
+
+        main()
+        captured = capsys.readouterr()
+
+        assert "Skipped 1 unreadable directories" in captured.err
+        assert str(locked) in captured.err
+
+
+class TestResume:
+    """Test resuming an interrupted walk."""
+
+    def _make_tree(self, root):
+        for name in ("a", "b", "c"):
+            (root / name).mkdir()
+            (root / name / f"{name}1.txt").write_text("content")
+            (root / name / f"{name}2.txt").write_text("content")
+
+    def test_resume_skips_completed_subtrees(self, tmp_path, capsys):
+        """Test that entries ordered before the resume path are not walked again."""
+        self._make_tree(tmp_path)
+
+        iterate_dir(tmp_path, resume_from=tmp_path / "b" / "b2.txt")
+        captured = capsys.readouterr()
+
+        assert "a1.txt" not in captured.out
+        assert "b1.txt" not in captured.out
+        assert "b2.txt" in captured.out
+        assert "c1.txt" in captured.out
+        assert "c2.txt" in captured.out
+
+    def test_resume_path_relative_to_root(self, tmp_path, capsys):
+        """Test that a resume path relative to the root is accepted."""
+        self._make_tree(tmp_path)
+
+        iterate_dir(tmp_path, resume_from="c")
+        captured = capsys.readouterr()
+
+        assert "b1.txt" not in captured.out
+        assert "c1.txt" in captured.out
+
+    def test_interrupt_reports_resume_path(self, tmp_path, capsys, monkeypatch):
+        """Test that Ctrl+C carries the path the walk stopped at."""
+        import task_3
+
+        self._make_tree(tmp_path)
+        real_print_entry = task_3._print_entry
+
+        def print_entry(name, is_dir, indent):
+            if name == "b1.txt":
+                raise KeyboardInterrupt
+            real_print_entry(name, is_dir, indent)
+
+        monkeypatch.setattr(task_3, "_print_entry", print_entry)
+        with pytest.raises(TraversalInterrupted) as interrupt:
+            iterate_dir(tmp_path)
+        assert interrupt.value.path == str(tmp_path / "b" / "b1.txt")
+
+        monkeypatch.setattr(task_3, "_print_entry", real_print_entry)
+        capsys.readouterr()
+        iterate_dir(tmp_path, resume_from=interrupt.value.path)
+        captured = capsys.readouterr()
+        assert "a1.txt" not in captured.out
+        assert "b1.txt" in captured.out
+        assert "c2.txt" in captured.out
+
+
+class TestTreeModel:
+    """Test the in-memory tree model used by watch mode."""
+
+    def test_render_tree_matches_iterate_dir(self, tmp_path, capsys):
+        """Test that rendering the model prints the same lines as iterate_dir."""
+        (tmp_path / "file1.txt").write_text("content")
+        nested = tmp_path / "dir1" / "dir2"
+        nested.mkdir(parents=True)
+        (nested / "deep.txt").write_text("content")
+
+        (tmp_path / "dir1" / "beta").mkdir()
+        for name in ["zeta.txt", "alpha.txt", "Omega.txt"]:
+            (tmp_path / "dir1" / name).write_text("content")
+
+        iterate_dir(tmp_path)
+        expected = capsys.readouterr().out.splitlines()
+        render_tree(build_tree(tmp_path))
+        assert capsys.readouterr().out.splitlines() == expected
+
+    def test_refreshed_listing_keeps_name_order(self, tmp_path, capsys):
+        """Test that entries added while watching are rendered where iterate_dir puts them."""
+        for name in ["b.txt", "d.txt"]:
+            (tmp_path / name).write_text("content")
+
+        class ScriptedWatcher(PollingWatcher):
+            def poll(self, timeout=None):
+                for name in ["e.txt", "c.txt", "a.txt"]:
+                    (tmp_path / name).write_text("content")
+                return {tmp_path}
+
+        watch_tree(tmp_path, ScriptedWatcher(interval=0), max_updates=1)
+        update = capsys.readouterr().out.split("Changed:")[1].splitlines()[1:]
+        iterate_dir(tmp_path)
+        assert update == capsys.readouterr().out.splitlines()
+
+    def test_build_tree_nonexistent_path(self, tmp_path):
+        """Test that loading a missing directory raises FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            build_tree(tmp_path / "missing")
+
+
+class TestWatchTree:
+    """Test watch mode with the polling watcher."""
+
+    def test_polling_watcher_reports_changed_directory(self, tmp_path):
+        """Test that adding a file marks its parent directory as changed."""
+        watcher = PollingWatcher(interval=0)
+        watcher.add(tmp_path)
+        assert watcher.poll() == set()
+
+        (tmp_path / "new.txt").write_text("content")
+        os.utime(tmp_path, ns=(0, 0))
+        assert watcher.poll() == {tmp_path}
+
+    def test_only_changed_subtree_is_rendered(self, tmp_path, capsys):
+        """Test that an update prints the changed directory, not the whole tree."""
+        (tmp_path / "untouched.txt").write_text("content")
+        build = tmp_path / "build"
+        build.mkdir()
+
+        class ScriptedWatcher(PollingWatcher):
+            def poll(self, timeout=None):
+                (build / "artifact.bin").write_text("data")
+                return {build}
+
+        watch_tree(tmp_path, ScriptedWatcher(interval=0), max_updates=1)
+        initial, update = capsys.readouterr().out.split("Changed:")
+
+        assert "untouched.txt" in initial
+        assert "artifact.bin" in update
+        assert "untouched.txt" not in update
+
+    def test_new_subdirectory_is_watched(self, tmp_path, capsys):
+        """Test that directories created while watching are watched as well."""
+        watcher = PollingWatcher(interval=0)
+        events = iter([{tmp_path}, {tmp_path / "sub"}])
+
+        def poll(timeout=None):
+            changed = next(events)
+            if changed == {tmp_path}:
+                (tmp_path / "sub").mkdir()
+            else:
+                (tmp_path / "sub" / "inner.txt").write_text("content")
+            return changed
+
+        watcher.poll = poll
+        watch_tree(tmp_path, watcher, max_updates=2)
+        captured = capsys.readouterr()
+
+        assert "inner.txt" in captured.out.split("Changed:")[-1]
+
+
+class TestWalkTree:
+    """Test the walk_tree generator."""
+
+    def test_order_matches_iterate_dir(self, tmp_path, capsys):
+        """Test that entries come in the order and depth iterate_dir prints them."""
+        (tmp_path / "b_dir" / "inner").mkdir(parents=True)
+        (tmp_path / "b_dir" / "inner" / "deep.txt").write_text("content")
+        (tmp_path / "b_dir" / "file.txt").write_text("content")
+        (tmp_path / "a.txt").write_text("content")
+
+        entries = list(walk_tree(tmp_path))
+        iterate_dir(tmp_path)
+        printed = [line for line in capsys.readouterr().out.splitlines() if line.strip()]
+
+        assert [(name, depth, is_dir) for _, name, depth, is_dir in entries] == [
+            ("a.txt", 0, False),
+            ("b_dir", 0, True),
+            ("file.txt", 1, False),
+            ("inner", 1, True),
+            ("deep.txt", 2, False),
+        ]
+        assert entries[-1][0] == str(tmp_path / "b_dir" / "inner" / "deep.txt")
+        assert len(printed) == len(entries)
+        assert all(name in line for (_, name, _, _), line in zip(entries, printed))
+
+    def test_unreadable_directory_is_reported(self, tmp_path, monkeypatch):
+        """Test that a directory that cannot be read is listed, skipped and reported."""
+        locked = tmp_path / "a_locked"
+        locked.mkdir()
+        (tmp_path / "b.txt").write_text("content")
+        _deny(monkeypatch, locked)
+
+        errors = []
+        names = [name for _, name, _, _ in walk_tree(tmp_path, errors)]
+
+        assert names == ["a_locked", "b.txt"]
+        assert errors[0][0] == str(locked)
+        assert isinstance(errors[0][1], PermissionError)
+
+    def test_missing_root_raises(self, tmp_path):
+        """Test that a missing root is left to the caller."""
+        with pytest.raises(FileNotFoundError):
+            list(walk_tree(tmp_path / "missing"))
+
+
+class TestMetrics:
+    """Test the tree metrics."""
+
+    def test_iterate_dir_records_walk(self, tmp_path, capsys, monkeypatch):
+        """Test that an enabled registry gets the entries, directories and errors of a walk."""
+        locked = tmp_path / "a_locked"
+        locked.mkdir()
+        (tmp_path / "b_dir").mkdir()
+        (tmp_path / "b_dir" / "file.txt").write_text("content")
+        _deny(monkeypatch, locked)
+        METRICS.reset()
+        monkeypatch.setattr(METRICS, "enabled", True)
+
+        stats = TraversalStats()
+        iterate_dir(tmp_path, stats=stats)
+        iterate_dir(tmp_path, stats=stats)
+
+        assert METRICS.get("tasks_tree_entries_total").labels().value == 6
+        assert METRICS.get("tasks_tree_directories_total").labels().value == 6
+        assert METRICS.get("tasks_tree_errors_total").labels("PermissionError").value == 2
+        assert METRICS.get("tasks_tree_walk_seconds").labels().count == 2
+
+    def test_walk_tree_matches_iterate_dir(self, tmp_path, capsys, monkeypatch):
+        """Test that walk_tree counts a tree as iterate_dir does."""
+        (tmp_path / "dir" / "inner").mkdir(parents=True)
+        (tmp_path / "dir" / "file.txt").write_text("content")
+        METRICS.reset()
+        monkeypatch.setattr(METRICS, "enabled", True)
+
+        entries = METRICS.get("tasks_tree_entries_total").labels()
+        directories = METRICS.get("tasks_tree_directories_total").labels()
+        iterate_dir(tmp_path)
+        walked = entries.value, directories.value
+        list(walk_tree(tmp_path))
+        assert (entries.value, directories.value) == (2 * walked[0], 2 * walked[1]) == (6, 6)
+
+    def test_disabled_walk_is_not_instrumented(self, tmp_path, capsys):
+        """Test that nothing is recorded while metrics are disabled."""
+        (tmp_path / "file.txt").write_text("content")
+        METRICS.reset()
+        iterate_dir(tmp_path)
+        list(walk_tree(tmp_path))
+        assert METRICS.get("tasks_tree_entries_total").labels().value == 0
+
+
+class TestStartup:
+    """Test what importing the visualizer costs."""
+
+    def test_import_defers_optional_modules(self):
+        """Test that importing the visualizer loads none of the modules only some runs need."""
+        import subprocess
+
+        deferred = ["argparse", "ctypes", "select", "struct", "shlex", "heapq", "colorama"]
+        code = f"import sys, task_3; print(','.join(m for m in {deferred!r} if m in sys.modules))"
+        tasks = Path(__file__).parent.parent / "tasks"
+        completed = subprocess.run([sys.executable, "-c", code], cwd=tasks, capture_output=True, text=True, check=True)
+        assert completed.stdout.strip() == ""
@@ -7,10 +7,25 @@ Tests cover:
 - Adding contacts
 - Updating contacts
 - Retrieving phone numbers
+- Searching contacts by name
+- Contacts with several phones
+- Reverse phone lookup and duplicate phone detection
+- Bulk import and export
+- Saving and loading binary snapshots
+- Paginated listing
+- Batch mode
+- Structured results and their terminal, JSON and silent renderers
+- Profiling commands at runtime
+- Command metrics and their export
+- Lookup cache statistics
+- Undo, redo and per-contact history
 - Duplicate prevention
 - Error handling
 - Helper functions
+- Persistence through the on-disk store, batched commits and cached lookups
+- Cheap startup: lazy imports and help text, colors only on a terminal
 """
+import io
 import pytest
 from pathlib import Path
 import sys
@@ -22,14 +37,43 @@ from task_4 import (
     parse_input,
     print_error,
     print_success,
-    validate_args_count,
-    validate_phone_with_error,
+    check_args_count,
+    check_phone,
     validate_phone,
     add_contact,
+    add_phone,
+    remove_phone,
     update_contact,
     get_users_phone,
+    search_contacts,
+    find_phone_owner,
+    import_contacts,
+    export_contacts,
+    save_contacts,
+    load_contacts,
+    list_contacts,
+    run_batch,
+    set_colors,
+    Result,
+    dispatch,
+    render_json,
+    render_silent,
+    render_terminal,
+    profile_commands,
+    show_stats,
+    undo_changes,
+    redo_changes,
+    show_history,
     USERS,
 )
+from contact_phones import pack_phones, unpack_phones
+from contact_store import MemoryStore
+from metrics import METRICS
+
+
+def phones_of(name):
+    """Return the phones stored for a contact as digit strings."""
+    return unpack_phones(USERS[name])
 
 
 @pytest.fixture(autouse=True)
@@ -129,49 +173,46 @@ class TestValidatePhone:
         assert validate_phone("") is False
 
 
-class TestValidateArgsCount:
-    """Test the validate_args_count helper."""
+class TestCheckArgsCount:
+    """Test the check_args_count helper."""
 
     def test_valid_args_count(self):
         """Test with correct number of arguments."""
-        result = validate_args_count(["arg1", "arg2"], 2, "Error message")
-        assert result is True
+        assert check_args_count(["arg1", "arg2"], 2, "'usage'") is None
 
-    def test_invalid_args_count_too_few(self, capsys):
+    def test_invalid_args_count_too_few(self):
         """Test with too few arguments."""
-        result = validate_args_count(["arg1"], 2, "Need 2 args")
-        assert result is False
-        captured = capsys.readouterr()
-        assert "Need 2 args" in captured.out
+        result = check_args_count(["arg1"], 2, "'need 2 args'")
+        assert result.ok is False
+        assert result.code == "usage"
+        assert result.message == "Command format: 'need 2 args'"
 
-    def test_invalid_args_count_too_many(self, capsys):
+    def test_invalid_args_count_too_many(self):
         """Test with too many arguments."""
-        result = validate_args_count(["a", "b", "c"], 2, "Need 2 args")
-        assert result is False
-        captured = capsys.readouterr()
-        assert "Need 2 args" in captured.out
+        result = check_args_count(["a", "b", "c"], 2, "'need 2 args'")
+        assert result.ok is False
 
-    def test_empty_args_list(self, capsys):
+    def test_empty_args_list(self):
         """Test with empty args list."""
-        result = validate_args_count([], 1, "Need 1 arg")
-        assert result is False
+        result = check_args_count([], 1, "'need 1 arg'")
+        assert result.ok is False
 
 
-class TestValidatePhoneWithError:
-    """Test the validate_phone_with_error helper."""
+class TestCheckPhone:
+    """Test the check_phone helper."""
 
-    def test_valid_phone_returns_true(self):
+    def test_valid_phone_returns_none(self):
         """Test with valid phone number."""
-        result = validate_phone_with_error("1234567890")
-        assert result is True
+        assert check_phone("1234567890") is None
 
-    def test_invalid_phone_returns_false_and_prints(self, capsys):
-        """Test with invalid phone number."""
-        result = validate_phone_with_error("123")
-        assert result is False
-        captured = capsys.readouterr()
-        assert "not matching valid format" in captured.out
-        assert "123" in captured.out
+    def test_invalid_phone_returns_failure(self, capsys):
+        """Test with invalid phone number, which is reported without printing."""
+        result = check_phone("123")
+        assert result.ok is False
+        assert result.code == "invalid_phone"
+        assert "not matching valid format" in result.message
+        assert "123" in result.message
+        assert capsys.readouterr().out == ""
 
 
 class TestAddContact:
@@ -180,9 +221,9 @@ class TestAddContact:
     def test_add_valid_contact(self):
         """Test adding a valid contact."""
         result = add_contact(["Alice", "1234567890"])
-        assert "Contact added" in result
+        assert "Contact added" in result.message
         assert "Alice" in USERS
-        assert USERS["Alice"] == "1234567890"
+        assert phones_of("Alice") == ["1234567890"]
 
     def test_add_contact_capitalization(self):
         """Test that username is capitalized."""
@@ -190,50 +231,61 @@ class TestAddContact:
         assert "Alice" in USERS
         assert "alice" not in USERS
 
-    def test_add_contact_invalid_phone(self, capsys):
+    def test_add_contact_keeps_name_as_entered(self):
+        """Test that mixed-case and non-ASCII names are stored as entered."""
+        add_contact(["McDonald", "1234567890"])
+        add_contact(["O'Brien", "1234567891"])
+        add_contact(["Zo\u00eb", "1234567892"])
+        assert sorted(USERS) == ["McDonald", "O'Brien", "Zo\u00eb"]
+
+    def test_add_contact_other_spelling_exists(self):
+        """Test that another spelling of an existing name is a duplicate."""
+        add_contact(["Stra\u00dfe", "1234567890"])
+        result = add_contact(["STRASSE", "1234567891"])
+        assert result.code == "exists"
+        assert result.data["name"] == "Stra\u00dfe"
+        assert list(USERS) == ["Stra\u00dfe"]
+
+    def test_add_contact_invalid_phone(self):
         """Test adding contact with invalid phone."""
         result = add_contact(["Bob", "123"])
-        assert result is None
+        assert result.ok is False
         assert "Bob" not in USERS
-        captured = capsys.readouterr()
-        assert "not matching valid format" in captured.out
+        assert "not matching valid format" in result.message
 
-    def test_add_contact_no_args(self, capsys):
+    def test_add_contact_no_args(self):
         """Test adding contact without arguments."""
         result = add_contact([])
-        assert result is None
-        captured = capsys.readouterr()
-        assert "Command format" in captured.out
+        assert result.ok is False
+        assert "Command format" in result.message
 
-    def test_add_contact_one_arg(self, capsys):
+    def test_add_contact_one_arg(self):
         """Test adding contact with only one argument."""
         result = add_contact(["Alice"])
-        assert result is None
-        captured = capsys.readouterr()
-        assert "Command format" in captured.out
+        assert result.ok is False
+        assert "Command format" in result.message
 
-    def test_add_contact_too_many_args(self, capsys):
+    def test_add_contact_too_many_args(self):
         """Test adding contact with too many arguments."""
         result = add_contact(["Alice", "123", "extra"])
-        assert result is None
+        assert result.ok is False
 
-    def test_add_duplicate_contact(self, capsys):
+    def test_add_duplicate_contact(self):
         """Test adding a contact that already exists."""
         add_contact(["Alice", "1234567890"])
         result = add_contact(["Alice", "9999999999"])
 
         # Should fail and show error
-        assert result is None
-        assert USERS["Alice"] == "1234567890"  # Original unchanged
-        captured = capsys.readouterr()
-        assert "already exists" in captured.out
-        assert "1234567890" in captured.out  # Shows current phone
-        assert "change" in captured.out.lower()  # Suggests change command
+        assert result.ok is False
+        assert phones_of("Alice") == ["1234567890"]  # Original unchanged
+        assert "already exists" in result.message
+        assert "1234567890" in result.message  # Shows current phone
+        assert "change" in result.message.lower()  # Suggests change command
 
     def test_add_contact_with_formatted_phone(self):
         """Test adding contact with formatted phone number."""
         result = add_contact(["Bob", "+1-234-567-8900"])
-        assert "Contact added" in result
+        assert "Contact added" in result.message
         assert "Bob" in USERS
 
 
@@ -242,48 +294,51 @@ class TestUpdateContact:
 
     def test_update_existing_contact(self):
         """Test updating an existing contact."""
-        USERS["Alice"] = "1234567890"
+        USERS["Alice"] = pack_phones(["1234567890"])
         result = update_contact(["Alice", "9876543210"])
 
-        assert "Contact updated" in result
-        assert USERS["Alice"] == "9876543210"
+        assert "Contact updated" in result.message
+        assert phones_of("Alice") == ["9876543210"]
 
     def test_update_contact_capitalization(self):
         """Test that username lookup is case-insensitive."""
-        USERS["Alice"] = "1234567890"
+        USERS["Alice"] = pack_phones(["1234567890"])
         update_contact(["alice", "9999999999"])
-        assert USERS["Alice"] == "9999999999"
+        assert phones_of("Alice") == ["9999999999"]
+
+    def test_update_contact_unicode_spelling(self):
+        """Test that a decomposed accent finds a contact stored precomposed."""
+        USERS["Ren\u00e9e"] = pack_phones(["1234567890"])
+        assert update_contact(["RENE\u0301E", "9999999999"]).data["name"] == "Ren\u00e9e"
+        assert phones_of("Ren\u00e9e") == ["9999999999"]
 
-    def test_update_nonexistent_contact(self, capsys):
+    def test_update_nonexistent_contact(self):
         """Test updating a contact that doesn't exist."""
         result = update_contact(["Bob", "1234567890"])
 
-        assert result is None
+        assert result.ok is False
         assert "Bob" not in USERS
-        captured = capsys.readouterr()
-        assert "doesn't exist" in captured.out
+        assert "doesn't exist" in result.message
 
-    def test_update_contact_invalid_phone(self, capsys):
+    def test_update_contact_invalid_phone(self):
         """Test updating with invalid phone."""
-        USERS["Alice"] = "1234567890"
+        USERS["Alice"] = pack_phones(["1234567890"])
         result = update_contact(["Alice", "123"])
 
-        assert result is None
-        assert USERS["Alice"] == "1234567890"  # Unchanged
-        captured = capsys.readouterr()
-        assert "not matching valid format" in captured.out
+        assert result.ok is False
+        assert phones_of("Alice") == ["1234567890"]  # Unchanged
+        assert "not matching valid format" in result.message
 
-    def test_update_contact_no_args(self, capsys):
+    def test_update_contact_no_args(self):
         """Test updating without arguments."""
         result = update_contact([])
-        assert result is None
-        captured = capsys.readouterr()
-        assert "Command format" in captured.out
+        assert result.ok is False
+        assert "Command format" in result.message
 
-    def test_update_contact_one_arg(self, capsys):
+    def test_update_contact_one_arg(self):
         """Test updating with only one argument."""
         result = update_contact(["Alice"])
-        assert result is None
+        assert result.ok is False
 
 
 class TestGetUsersPhone:
@@ -291,43 +346,501 @@ class TestGetUsersPhone:
 
     def test_get_existing_phone(self):
         """Test getting phone for existing user."""
-        USERS["Alice"] = "1234567890"
+        USERS["Alice"] = pack_phones(["1234567890"])
         result = get_users_phone(["Alice"])
 
-        assert "Alice" in result
-        assert "1234567890" in result
+        assert "Alice" in result.message
+        assert "1234567890" in result.message
 
     def test_get_phone_case_insensitive(self):
         """Test that username lookup is case-insensitive (bug fix test)."""
-        USERS["Alice"] = "1234567890"
+        USERS["Alice"] = pack_phones(["1234567890"])
         result = get_users_phone(["alice"])
 
-        assert result is not None
-        assert "Alice" in result
-        assert "1234567890" in result
+        assert result.ok
+        assert "Alice" in result.message
+        assert "1234567890" in result.message
 
-    def test_get_nonexistent_user(self, capsys):
+    def test_get_nonexistent_user(self):
         """Test getting phone for non-existent user."""
         result = get_users_phone(["Bob"])
 
-        assert result is None
-        captured = capsys.readouterr()
-        assert "doesn't exist" in captured.out or "no user" in captured.out.lower()
-        assert "Bob" in captured.out
+        assert result.ok is False
+        assert "doesn't exist" in result.message or "no user" in result.message.lower()
+        assert "Bob" in result.message
 
-    def test_get_phone_no_args(self, capsys):
+    def test_get_phone_no_args(self):
         """Test getting phone without arguments."""
         result = get_users_phone([])
-        assert result is None
-        captured = capsys.readouterr()
-        assert "Command format" in captured.out
+        assert result.ok is False
+        assert "Command format" in result.message
 
-    def test_get_phone_too_many_args(self, capsys):
+    def test_get_phone_too_many_args(self):
         """Test getting phone with too many arguments."""
         result = get_users_phone(["Alice", "Bob"])
-        assert result is None
-        captured = capsys.readouterr()
-        assert "Command format" in captured.out
+        assert result.ok is False
+        assert "Command format" in result.message
+
+
+class TestMultiplePhones:
+    """Test the add_phone and remove_phone functions."""
+
+    def test_add_phone(self):
+        """Test that phones are appended to a contact."""
+        add_contact(["Alice", "1111111111"])
+        result = add_phone(["alice", "222-222-2222"])
+
+        assert result.ok
+        assert result.data["count"] == 2
+        assert phones_of("Alice") == ["1111111111", "2222222222"]
+        assert get_users_phone(["Alice"]).message == "Alice's phones are 1111111111; 2222222222"
+
+    def test_add_duplicate_phone(self):
+        """Test that a number the contact has is not added twice."""
+        add_contact(["Alice", "1111111111"])
+        result = add_phone(["Alice", "(111) 111-1111"])
+
+        assert result.code == "duplicate_phone"
+        assert phones_of("Alice") == ["1111111111"]
+
+    def test_add_phone_to_missing_contact(self):
+        """Test that phones can only be added to existing contacts."""
+        result = add_phone(["Bob", "1111111111"])
+        assert result.code == "not_found"
+        assert "Bob" not in USERS
+
+    def test_remove_phone(self):
+        """Test that one phone is removed and the others kept."""
+        add_contact(["Alice", "1111111111"])
+        add_phone(["Alice", "2222222222"])
+        add_phone(["Alice", "3333333333"])
+
+        result = remove_phone(["Alice", "222.222.2222"])
+
+        assert result.ok
+        assert phones_of("Alice") == ["1111111111", "3333333333"]
+
+    def test_remove_unknown_and_last_phone(self):
+        """Test that a contact keeps at least one phone."""
+        add_contact(["Alice", "1111111111"])
+
+        assert remove_phone(["Alice", "2222222222"]).code == "unknown_phone"
+        result = remove_phone(["Alice", "1111111111"])
+        assert result.code == "last_phone"
+        assert "change" in result.message
+        assert phones_of("Alice") == ["1111111111"]
+
+    def test_every_phone_finds_the_owner(self):
+        """Test the reverse lookup for all phones of a contact."""
+        add_contact(["Alice", "1111111111"])
+        add_phone(["Alice", "2222222222"])
+        assert "Alice" in find_phone_owner(["2222222222"]).message
+        remove_phone(["Alice", "2222222222"])
+        assert find_phone_owner(["2222222222"]).ok is False
+
+    def test_change_replaces_all_phones(self):
+        """Test that change leaves the contact with only the new phone."""
+        add_contact(["Alice", "1111111111"])
+        add_phone(["Alice", "2222222222"])
+        update_contact(["Alice", "3333333333"])
+        assert phones_of("Alice") == ["3333333333"]
+
+    def test_listing_shows_all_phones(self):
+        """Test that search and list show every phone."""
+        add_contact(["Alice", "1111111111"])
+        add_phone(["Alice", "2222222222"])
+        assert list_contacts([]).rows == [("Alice", "1111111111; 2222222222")]
+        assert search_contacts(["ali"]).rows == [("Alice", "1111111111; 2222222222")]
+
+
+class TestFindPhoneOwner:
+    """Test the find_phone_owner function."""
+
+    def test_find_owner(self):
+        """Test finding who owns a number."""
+        add_contact(["Alice", "1234567890"])
+        result = find_phone_owner(["1234567890"])
+        assert "belongs to Alice" in result.message
+
+    def test_find_owner_any_formatting(self):
+        """Test that formatting does not matter for the lookup."""
+        add_contact(["Bob", "+1-234-567-8900"])
+        result = find_phone_owner(["1 (234) 567.8900"])
+        assert "Bob" in result.message
+
+    def test_find_owner_after_change(self):
+        """Test that the lookup follows phone changes."""
+        add_contact(["Alice", "1234567890"])
+        update_contact(["Alice", "9999999999"])
+        assert find_phone_owner(["1234567890"]).ok is False
+        assert "Alice" in find_phone_owner(["9999999999"]).message
+
+    def test_unknown_number(self):
+        """Test a number nobody has."""
+        result = find_phone_owner(["1234567890"])
+        assert result.ok is False
+        assert result.code == "not_found"
+        assert "Nobody has phone 1234567890" in result.message
+
+    def test_invalid_number(self):
+        """Test that invalid numbers are rejected."""
+        result = find_phone_owner(["123"])
+        assert result.ok is False
+        assert "not matching valid format" in result.message
+
+    def test_duplicate_phone_is_reported_on_add(self):
+        """Test that adding a number someone else has names the other owner."""
+        add_contact(["Alice", "1234567890"])
+        result = add_contact(["Bob", "123-456-7890"])
+
+        assert "Contact added" in result.message
+        assert "also saved for Alice" in result.message
+        assert phones_of("Bob") == ["1234567890"]
+
+
+class TestListContacts:
+    """Test the list_contacts function."""
+
+    def test_list_all_on_one_page(self):
+        """Test listing a small book."""
+        add_contact(["Bob", "2222222222"])
+        add_contact(["Alice", "1111111111"])
+
+        result = list_contacts([])
+
+        assert result.rows == [("Alice", "1111111111"), ("Bob", "2222222222")]
+        assert result.hint == ""
+
+    def test_paging_with_cursor(self):
+        """Test that the next-page hint continues where the page stopped."""
+        for name in ("Alice", "Bob", "Charlie"):
+            add_contact([name, "1234567890"])
+
+        first = list_contacts(["2"])
+        assert [name for name, _ in first.rows] == ["Alice", "Bob"]
+        assert first.hint == "Next page: all 2 Bob"
+
+        second = list_contacts(["2", "bob"])
+        assert [name for name, _ in second.rows] == ["Charlie"]
+        assert second.hint == ""
+
+    def test_empty_book(self):
+        """Test listing when there are no contacts."""
+        result = list_contacts([])
+        assert result.ok is False
+        assert "There is no records yet" in result.message
+
+    def test_past_last_page(self):
+        """Test a cursor after the last contact."""
+        add_contact(["Alice", "1111111111"])
+        result = list_contacts(["10", "Zed"])
+        assert result.ok is False
+        assert "no more records" in result.message
+
+    def test_invalid_page_size(self):
+        """Test that the page size must be a positive number."""
+        assert list_contacts(["zero"]).ok is False
+        result = list_contacts(["0"])
+        assert result.ok is False
+        assert "Page size should be a positive number" in result.message
+
+    @pytest.mark.parametrize("size", ["²", "½", "-3"])
+    def test_page_size_that_is_not_decimal(self, size):
+        """Test that digit-like characters int() cannot read are refused, not raised."""
+        assert list_contacts([size]).code == "usage"
+        assert dispatch("all", [size]).ok is False
+
+
+class TestImportExport:
+    """Test the import_contacts and export_contacts functions."""
+
+    def test_import_csv(self, tmp_path):
+        """Test importing a CSV file with a header row."""
+        source = tmp_path / "contacts.csv"
+        source.write_text("name,phone\nalice,1111111111\nBob,+1-222-222-2222\n")
+
+        result = import_contacts([str(source)])
+
+        assert "Imported 2 contacts" in result.message
+        assert phones_of("Alice") == ["1111111111"]
+        assert phones_of("Bob") == ["12222222222"]
+
+    def test_import_jsonl(self, tmp_path):
+        """Test importing a JSON Lines file."""
+        source = tmp_path / "contacts.jsonl"
+        source.write_text('{"name": "alice", "phone": "1111111111"}\n\n{"name": "bob", "phone": "2222222222"}\n')
+
+        result = import_contacts([str(source)])
+
+        assert "Imported 2 contacts" in result.message
+        assert phones_of("Bob") == ["2222222222"]
+
+    def test_import_updates_existing_contacts(self, tmp_path):
+        """Test that imported phones replace existing ones."""
+        add_contact(["Alice", "1111111111"])
+        source = tmp_path / "contacts.csv"
+        source.write_text("Alice,9999999999\n")
+
+        import_contacts([str(source)])
+        assert phones_of("Alice") == ["9999999999"]
+
+    def test_import_matches_name_spellings(self, tmp_path):
+        """Test that any spelling of a name in the file updates one contact."""
+        add_contact(["McDonald", "1111111111"])
+        source = tmp_path / "contacts.csv"
+        source.write_text("MCDONALD,2222222222\no'brien,3333333333\nO'BRIEN,4444444444\n")
+
+        import_contacts([str(source)])
+        assert sorted(USERS) == ["McDonald", "O'brien"]
+        assert phones_of("McDonald") == ["2222222222"]
+        assert phones_of("O'brien") == ["4444444444"]
+
+    def test_import_reports_all_errors_once(self, tmp_path):
+        """Test that invalid rows are skipped and summarised together."""
+        source = tmp_path / "contacts.csv"
+        source.write_text("Alice,1111111111\nBob,123\nbroken line\nJohn Doe,2222222222\nCharlie,3333333333\n")
+
+        result = import_contacts([str(source)])
+        warnings = "\n".join(result.warnings)
+
+        assert "Imported 2 contacts" in result.message
+        assert result.data["skipped"] == 3
+        assert "Skipped 3 invalid rows" in warnings
+        assert "Line 2 has invalid phone '123'" in warnings
+        assert "Line 3 is malformed" in warnings
+        assert "Line 4 has invalid username" in warnings
+        assert "Bob" not in USERS
+
+    def test_import_error_summary_is_capped(self, tmp_path):
+        """Test that a file full of errors does not flood the output."""
+        source = tmp_path / "contacts.csv"
+        source.write_text("".join(f"User{i},123\n" for i in range(30)))
+
+        result = import_contacts([str(source)])
+
+        assert "Skipped 30 invalid rows" in result.warnings[0]
+        assert "... and 10 more" in result.warnings[-1]
+        assert len(result.warnings) == 22
+
+    def test_import_missing_file(self, tmp_path):
+        """Test importing a file that does not exist."""
+        result = import_contacts([str(tmp_path / "missing.csv")])
+        assert result.ok is False
+        assert "was not found" in result.message
+
+    def test_import_unsupported_format(self, tmp_path):
+        """Test that only CSV and JSON Lines files are accepted."""
+        result = import_contacts([str(tmp_path / "contacts.txt")])
+        assert result.ok is False
+        assert "not supported" in result.message
+
+    def test_import_several_phones(self, tmp_path):
+        """Test importing contacts with several phones from both formats."""
+        source = tmp_path / "contacts.csv"
+        source.write_text("Alice,1111111111;222-222-2222;1111111111\nBob,3333333333;123\n")
+        result = import_contacts([str(source)])
+        assert result.data == {"count": 1, "skipped": 1}
+        assert phones_of("Alice") == ["1111111111", "2222222222"]
+        assert "has invalid phone '123'" in result.warnings[1]
+
+        source = tmp_path / "contacts.jsonl"
+        source.write_text('{"name": "carol", "phones": ["4444444444", "5555555555"]}\n{"name": "dave", "phones": "x"}\n')
+        result = import_contacts([str(source)])
+        assert phones_of("Carol") == ["4444444444", "5555555555"]
+        assert "Line 2 is malformed" in result.warnings[1]
+
+    def test_export_and_import_round_trip(self, tmp_path):
+        """Test that exported files can be imported again."""
+        add_contact(["Alice", "1111111111"])
+        add_contact(["Bob", "2222222222"])
+        add_phone(["Bob", "0333333333"])
+
+        for name in ("contacts.csv", "contacts.jsonl"):
+            target = tmp_path / name
+            assert "Exported 2 contacts" in export_contacts([str(target)]).message
+            USERS.clear()
+            import_contacts([str(target)])
+            assert {name: unpack_phones(phones) for name, phones in USERS.items()} == {
+                "Alice": ["1111111111"],
+                "Bob": ["2222222222", "0333333333"],
+            }
+
+
+class TestSaveLoad:
+    """Test the save_contacts and load_contacts functions."""
+
+    @pytest.fixture(autouse=True)
+    def restore_users(self, monkeypatch):
+        """Put the original store back after load rebinds USERS."""
+        import task_4
+
+        monkeypatch.setattr(task_4, "USERS", USERS)
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        """Test that a saved book is loaded back lazily."""
+        import task_4
+
+        add_contact(["Alice", "1111111111"])
+        add_contact(["Bob", "2222222222"])
+        add_phone(["Bob", "0333333333"])
+        target = str(tmp_path / "contacts.snap")
+
+        assert save_contacts([target]).message == f"Saved 2 contacts to {target}."
+        USERS.clear()
+        result = load_contacts([target])
+
+        assert result.ok is True
+        assert result.data["count"] == 2
+        assert not task_4.USERS.persistent
+        assert unpack_phones(task_4.USERS["Bob"]) == ["2222222222", "0333333333"]
+        assert dispatch("who", ["0333333333"]).message == "Phone 0333333333 belongs to Bob"
+
+    def test_changes_after_load_need_save(self, tmp_path):
+        """Test that a loaded snapshot is only rewritten by 'save'."""
+        import task_4
+
+        add_contact(["Alice", "1111111111"])
+        target = str(tmp_path / "contacts.snap")
+        save_contacts([target])
+        load_contacts([target])
+        add_contact(["Carol", "4444444444"])
+        load_contacts([target])
+        assert "Carol" not in task_4.USERS
+
+        add_contact(["Carol", "4444444444"])
+        save_contacts([target])
+        load_contacts([target])
+        assert sorted(task_4.USERS) == ["Alice", "Carol"]
+
+    def test_load_into_persistent_store(self, tmp_path, monkeypatch):
+        """Test that loading into an on-disk store replaces its contents."""
+        import task_4
+        from contact_store import SQLiteStore
+
+        target = str(tmp_path / "contacts.snap")
+        add_contact(["Alice", "1111111111"])
+        save_contacts([target])
+        store = SQLiteStore(str(tmp_path / "contacts.db"))
+        store["Bob"] = pack_phones(["2222222222"])
+        monkeypatch.setattr(task_4, "USERS", store)
+
+        assert load_contacts([target]).ok is True
+        assert task_4.USERS is store
+        assert list(store) == ["Alice"]
+        store.close()
+
+    def test_failed_load_keeps_persistent_contacts(self, tmp_path, monkeypatch):
+        """Test that a load failing part way through leaves an on-disk book as it was."""
+        import task_4
+        from contact_store import SnapshotStore, SQLiteStore
+
+        target = str(tmp_path / "contacts.snap")
+        for i in range(3000):
+            task_4.USERS[f"User{i}"] = pack_phones([f"{1000000000 + i}"])
+        save_contacts([target])
+        store = SQLiteStore(str(tmp_path / "contacts.db"))
+        store["Bob"] = pack_phones(["2222222222"])
+        monkeypatch.setattr(task_4, "USERS", store)
+        items = SnapshotStore.items
+
+        def failing_items(self):
+            for count, item in enumerate(items(self)):
+                if count == 2500:
+                    raise OSError("read error")
+                yield item
+
+        monkeypatch.setattr(SnapshotStore, "items", failing_items)
+        try:
+            assert load_contacts([target]).code == "io_error"
+            assert list(store) == ["Bob"]
+        finally:
+            store.close()
+
+    def test_load_keeps_shards(self, tmp_path, monkeypatch):
+        """Test that loading into an in-memory sharded book keeps the shards."""
+        import task_4
+        from contact_shards import ShardedStore
+
+        target = str(tmp_path / "contacts.snap")
+        add_contact(["Alice", "1111111111"])
+        save_contacts([target])
+        store = ShardedStore(2)
+        store["Bob"] = pack_phones(["2222222222"])
+        monkeypatch.setattr(task_4, "USERS", store)
+        try:
+            assert load_contacts([target]).ok is True
+            assert task_4.USERS is store
+            assert list(store) == ["Alice"]
+        finally:
+            store.close()
+
+    def test_load_missing_file(self, tmp_path):
+        """Test loading a file that does not exist."""
+        result = load_contacts([str(tmp_path / "missing.snap")])
+        assert result.code == "not_found"
+
+    def test_load_invalid_file(self, tmp_path):
+        """Test that a file in another format is refused and the book is kept."""
+        add_contact(["Alice", "1111111111"])
+        source = tmp_path / "contacts.csv"
+        source.write_text("name,phone\nBob,2222222222\n")
+
+        result = load_contacts([str(source)])
+
+        assert result.code == "io_error"
+        assert "not a contact snapshot" in result.message
+        assert phones_of("Alice") == ["1111111111"]
+
+    def test_save_to_missing_directory(self, tmp_path):
+        """Test that a failed save is reported."""
+        result = save_contacts([str(tmp_path / "missing" / "contacts.snap")])
+        assert result.code == "io_error"
+
+    def test_usage(self):
+        """Test that both commands need exactly one path."""
+        assert save_contacts([]).code == "usage"
+        assert load_contacts(["a", "b"]).code == "usage"
+
+
+class TestSearchContacts:
+    """Test the search_contacts function."""
+
+    def test_search_by_prefix(self):
+        """Test finding contacts by name prefix."""
+        add_contact(["Alice", "1111111111"])
+        add_contact(["Alex", "2222222222"])
+        add_contact(["Bob", "3333333333"])
+
+        result = search_contacts(["al"])
+
+        assert ("Alice", "1111111111") in result.rows
+        assert ("Alex", "2222222222") in result.rows
+        assert len(result.rows) == 2
+
+    def test_search_with_typo(self):
+        """Test that a misspelled name is still found."""
+        add_contact(["Charlie", "1111111111"])
+        result = search_contacts(["Chralie"])
+        assert result.rows == [("Charlie", "1111111111")]
+
+    def test_search_sees_contacts_added_later(self):
+        """Test that the index is updated when contacts are added."""
+        add_contact(["Alice", "1111111111"])
+        search_contacts(["al"])
+        add_contact(["Albert", "2222222222"])
+        assert ("Albert", "2222222222") in search_contacts(["al"]).rows
+
+    def test_search_no_match(self):
+        """Test searching for a name nobody has."""
+        result = search_contacts(["Zed"])
+        assert result.ok is False
+        assert "No users match 'Zed'" in result.message
+
+    def test_search_no_args(self):
+        """Test searching without a query."""
+        result = search_contacts([])
+        assert result.ok is False
+        assert "Command format" in result.message
 
 
 class TestPrintHelpers:
@@ -352,6 +865,268 @@ class TestPrintHelpers:
         assert Style.RESET_ALL in captured.out
 
 
+class TestResultsAndRenderers:
+    """Test the Result objects and the renderers that present them."""
+
+    def test_handlers_do_not_print(self, capsys):
+        """Test that handlers report through their result only."""
+        add_contact(["Alice", "123"])
+        add_contact(["Alice", "1234567890"])
+        get_users_phone(["Bob"])
+        assert capsys.readouterr().out == ""
+
+    def test_message_is_formatted_lazily(self):
+        """Test that the template is only formatted when the message is read."""
+        class Exploding:
+            def __format__(self, spec):
+                raise AssertionError("formatted")
+
+        result = Result(True, "test", "Value {value}", {"value": Exploding()})
+        assert render_silent(result) == ""
+        with pytest.raises(AssertionError):
+            result.message
+
+    def test_dispatch_unknown_command(self):
+        """Test that unknown commands become failed results."""
+        result = dispatch("frobnicate", [])
+        assert result.ok is False
+        assert result.code == "invalid_command"
+
+    def test_render_terminal(self):
+        """Test colored rendering of successes and failures."""
+        assert render_terminal(add_contact(["Alice", "1234567890"])) == (
+            f" {Fore.YELLOW}Contact added.{Style.RESET_ALL}"
+        )
+        assert render_terminal(get_users_phone(["Bob"])).startswith(f" {Fore.RED}")
+
+    def test_render_terminal_rows_and_hint(self):
+        """Test that listings render one line per row and the hint last."""
+        set_colors(False)
+        try:
+            add_contact(["Alice", "1111111111"])
+            add_contact(["Bob", "2222222222"])
+            text = render_terminal(list_contacts(["1"]))
+        finally:
+            set_colors(True)
+        assert text == " Alice: 1111111111\n Next page: all 1 Alice"
+
+    def test_render_json(self):
+        """Test that JSON output carries the code, message and data."""
+        import json
+
+        record = json.loads(render_json(get_users_phone(["Bob"])))
+        assert record == {
+            "ok": False,
+            "code": "not_found",
+            "message": "User with username 'Bob' doesn't exist.",
+            "data": {"name": "Bob"},
+        }
+        add_contact(["Alice", "1111111111"])
+        record = json.loads(render_json(search_contacts(["al"])))
+        assert record["rows"] == [["Alice", "1111111111"]]
+
+
+class TestStatsCommand:
+    """Test the show_stats function."""
+
+    def test_without_cache(self):
+        """Test that an uncached store is reported as such."""
+        result = show_stats([])
+        assert result.ok is True
+        assert result.code == "no_cache"
+
+    def test_counts_lookups(self, monkeypatch):
+        """Test that phone lookups show up as cache hits and misses."""
+        import task_4
+        from contact_store import CachedStore
+
+        monkeypatch.setattr(task_4, "USERS", CachedStore(USERS, capacity=10))
+        add_contact(["Alice", "1111111111"])
+        get_users_phone(["Alice"])
+        get_users_phone(["Alice"])
+        update_contact(["Alice", "2222222222"])
+        assert get_users_phone(["Alice"]).message == "Alice's phone is 2222222222"
+
+        result = show_stats([])
+
+        assert result.code == "stats"
+        assert result.data["hits"] >= 1
+        assert result.data["invalidations"] >= 1
+        assert dict(result.rows)["misses"] == result.data["misses"]
+        assert "hit rate" in result.message
+
+    def test_usage(self):
+        """Test that stats takes no arguments."""
+        assert show_stats(["now"]).code == "usage"
+
+
+class TestUndoRedo:
+    """Test the undo_changes, redo_changes and show_history functions."""
+
+    def test_undo_update(self):
+        """Test that undo restores the previous phone and redo applies the new one again."""
+        add_contact(["Alice", "1111111111"])
+        update_contact(["Alice", "2222222222"])
+
+        result = undo_changes([])
+        assert result.code == "undone"
+        assert result.rows == [("Alice", "2222222222 -> 1111111111")]
+        assert phones_of("Alice") == ["1111111111"]
+
+        assert redo_changes([]).code == "redone"
+        assert phones_of("Alice") == ["2222222222"]
+
+    def test_undo_several_steps(self):
+        """Test that undo takes a number of steps."""
+        add_contact(["Alice", "1111111111"])
+        add_phone(["Alice", "2222222222"])
+        add_contact(["Bob", "3333333333"])
+
+        assert undo_changes(["2"]).data["count"] == 2
+        assert "Bob" not in USERS
+        assert phones_of("Alice") == ["1111111111"]
+
+    def test_import_is_one_step(self, tmp_path):
+        """Test that a whole import is undone at once."""
+        path = tmp_path / "contacts.csv"
+        path.write_text("name,phone\nAlice,1111111111\nBob,2222222222\n")
+        add_contact(["Carol", "3333333333"])
+        import_contacts([str(path)])
+
+        assert undo_changes([]).data["count"] == 2
+        assert list(USERS) == ["Carol"]
+
+    def test_import_larger_than_history(self, tmp_path, monkeypatch):
+        """Test that an import too large for the history is reported, not half undone."""
+        import task_4
+
+        monkeypatch.setattr(task_4, "USERS", MemoryStore())
+        monkeypatch.setattr(task_4, "HISTORY_SIZE", 5)
+        path = tmp_path / "contacts.csv"
+        path.write_text("name,phone\n" + "".join(f"User{i},{1000000000 + i}\n" for i in range(10)))
+        add_contact(["Keeper", "1111111111"])
+        import_contacts([str(path)])
+
+        result = undo_changes([])
+        assert result.code == "history_overflow"
+        assert result.data["capacity"] == 5
+        assert len(task_4.USERS) == 11
+
+    def test_nothing_to_undo(self):
+        """Test undo and redo with an empty history."""
+        assert undo_changes([]).code == "nothing_to_undo"
+        assert redo_changes([]).code == "nothing_to_redo"
+
+    def test_usage(self):
+        """Test that the step count must be a positive number."""
+        assert undo_changes(["x"]).code == "usage"
+        assert undo_changes(["0"]).code == "usage"
+        assert redo_changes(["1", "2"]).code == "usage"
+
+    def test_history(self):
+        """Test that history lists one contact's changes, most recent first."""
+        add_contact(["Alice", "1111111111"])
+        add_contact(["Bob", "3333333333"])
+        update_contact(["Alice", "2222222222"])
+
+        result = show_history(["alice"])
+
+        assert result.code == "history"
+        assert result.data["count"] == 2
+        assert [text for _, text in result.rows] == ["1111111111 -> 2222222222", "(none) -> 1111111111"]
+        assert show_history(["Dave"]).data["count"] == 0
+        assert show_history([]).code == "usage"
+
+
+class TestProfileCommand:
+    """Test the profile command."""
+
+    def test_cpu_profile_of_following_commands(self):
+        """Test that commands run between start and stop are profiled."""
+        assert dispatch("profile", ["start"]).code == "profile_started"
+        dispatch("add", ["Alice", "1234567890"])
+        dispatch("phone", ["Alice"])
+        assert dispatch("profile", []).data == {"mode": "cpu", "commands": 2}
+
+        result = dispatch("profile", ["stop"])
+
+        assert result.ok
+        assert result.data["commands"] == 2
+        assert any(location.startswith("add_contact") for location, _ in result.rows)
+        assert dispatch("profile", []).message == "No profile is running."
+
+    def test_memory_profile(self):
+        """Test that a memory profile reports source lines."""
+        profile_commands(["start", "memory"])
+        for i in range(50):
+            dispatch("add", [f"User{i}", "1234567890"])
+        result = profile_commands(["stop"])
+
+        assert result.ok
+        assert result.rows
+        assert all(":" in location for location, _ in result.rows)
+
+    def test_profile_errors(self):
+        """Test wrong modes, stopping when idle and starting twice."""
+        assert profile_commands(["stop"]).code == "profile_state"
+        assert profile_commands(["start", "disk"]).code == "usage"
+        assert profile_commands(["restart"]).code == "usage"
+        profile_commands(["start"])
+        try:
+            assert profile_commands(["start", "memory"]).code == "profile_state"
+        finally:
+            profile_commands(["stop"])
+
+
+class TestCommandMetrics:
+    """Test counting commands in the shared metrics."""
+
+    def test_commands_are_counted(self, monkeypatch):
+        """Test that served commands are counted by outcome and timed."""
+        METRICS.reset()
+        monkeypatch.setattr(METRICS, "enabled", True)
+        dispatch("add", ["Alice", "1234567890"])
+        dispatch("phone", ["Alice"])
+        dispatch("phone", ["Nobody"])
+        dispatch("nonsense", [])
+
+        served = METRICS.get("tasks_commands_total")
+        assert served.labels("add", "ok").value == 1
+        assert served.labels("phone", "ok").value == 1
+        assert served.labels("phone", "error").value == 1
+        assert served.labels("invalid", "error").value == 1
+        assert METRICS.get("tasks_command_seconds").labels("phone").count == 2
+
+    def test_profiled_commands_are_counted(self, monkeypatch):
+        """Test that commands are counted while a profile runs too."""
+        METRICS.reset()
+        monkeypatch.setattr(METRICS, "enabled", True)
+        profile_commands(["start"])
+        try:
+            dispatch("add", ["Alice", "1234567890"])
+        finally:
+            result = profile_commands(["stop"])
+        assert result.data["commands"] == 1
+        assert METRICS.get("tasks_commands_total").labels("add", "ok").value == 1
+
+    def test_disabled_metrics_count_nothing(self):
+        """Test that nothing is recorded while metrics are disabled."""
+        METRICS.reset()
+        dispatch("add", ["Alice", "1234567890"])
+        assert METRICS.get("tasks_commands_total").labels("add", "ok").value == 0
+
+    def test_metrics_file_written_on_exit(self, tmp_path, monkeypatch, capsys):
+        """Test that --metrics-file exports the commands of a batch run."""
+        import task_4
+
+        monkeypatch.setattr(task_4, "HISTORY_SIZE", task_4.HISTORY_SIZE)
+        METRICS.reset()
+        path = tmp_path / "bot.prom"
+        assert task_4.main(["--metrics-file", str(path)], commands=["add Bob 1234567890", "phone Bob"]) == 0
+        assert 'tasks_commands_total{command="phone",outcome="ok"} 1' in path.read_text()
+        assert METRICS.enabled is False
+
+
 class TestIntegrationScenarios:
     """Integration tests for complete workflows."""
 
@@ -359,21 +1134,21 @@ class TestIntegrationScenarios:
         """Test a complete add-update-get workflow."""
         # Add contact
         result = add_contact(["Alice", "1234567890"])
-        assert "Contact added" in result
-        assert USERS["Alice"] == "1234567890"
+        assert "Contact added" in result.message
+        assert phones_of("Alice") == ["1234567890"]
 
         # Get contact
         result = get_users_phone(["Alice"])
-        assert "1234567890" in result
+        assert "1234567890" in result.message
 
         # Update contact
         result = update_contact(["Alice", "9876543210"])
-        assert "Contact updated" in result
-        assert USERS["Alice"] == "9876543210"
+        assert "Contact updated" in result.message
+        assert phones_of("Alice") == ["9876543210"]
 
         # Get updated contact
         result = get_users_phone(["Alice"])
-        assert "9876543210" in result
+        assert "9876543210" in result.message
 
     def test_multiple_contacts(self):
         """Test managing multiple contacts."""
@@ -382,9 +1157,9 @@ class TestIntegrationScenarios:
         add_contact(["Charlie", "3333333333"])
 
         assert len(USERS) == 3
-        assert USERS["Alice"] == "1111111111"
-        assert USERS["Bob"] == "2222222222"
-        assert USERS["Charlie"] == "3333333333"
+        assert phones_of("Alice") == ["1111111111"]
+        assert phones_of("Bob") == ["2222222222"]
+        assert phones_of("Charlie") == ["3333333333"]
 
     def test_case_insensitivity_workflow(self):
         """Test that all operations are case-insensitive."""
@@ -393,13 +1168,13 @@ class TestIntegrationScenarios:
 
         # Get with different case
         result = get_users_phone(["ALICE"])
-        assert "1234567890" in result
+        assert "1234567890" in result.message
 
         # Update with different case
         update_contact(["Alice", "9999999999"])
-        assert USERS["Alice"] == "9999999999"
+        assert phones_of("Alice") == ["9999999999"]
 
-    def test_error_recovery(self, capsys):
+    def test_error_recovery(self):
         """Test that errors don't corrupt state."""
         # Try to add with invalid phone
         add_contact(["Alice", "123"])
@@ -407,5 +1182,187 @@ class TestIntegrationScenarios:
 
         # Add with valid phone should work
         result = add_contact(["Alice", "1234567890"])
-        assert "Contact added" in result
-        assert USERS["Alice"] == "1234567890"
+        assert "Contact added" in result.message
+        assert phones_of("Alice") == ["1234567890"]
+
+
+class TestBatchMode:
+    """Test running commands without prompting."""
+
+    def test_run_batch_executes_commands(self):
+        """Test that every line is dispatched through the command table."""
+        output = io.StringIO()
+        failures = run_batch(["add Alice 1234567890\n", "\n", "# comment\n", "phone alice\n"], output)
+
+        assert failures == 0
+        assert "Contact added" in output.getvalue()
+        assert "Alice's phone is 1234567890" in output.getvalue()
+
+    def test_run_batch_counts_failures(self):
+        """Test that invalid commands and failing handlers are counted."""
+        output = io.StringIO()
+        failures = run_batch(["add Alice 123", "phone Bob", "frobnicate", "hello"], output)
+
+        assert failures == 3
+        assert "Invalid command 'frobnicate'" in output.getvalue()
+
+    def test_run_batch_stops_at_exit(self):
+        """Test that 'exit' ends the script."""
+        output = io.StringIO()
+        run_batch(["add Alice 1234567890", "exit", "add Bob 2222222222"], output)
+        assert "Bob" not in USERS
+
+    def test_plain_output_without_colors(self):
+        """Test that colors can be turned off for non-terminal output."""
+        output = io.StringIO()
+        set_colors(False)
+        try:
+            run_batch(["add Alice 1234567890", "phone Bob"], output)
+        finally:
+            set_colors(True)
+
+        assert "\x1b[" not in output.getvalue()
+        assert "Contact added" in output.getvalue()
+
+    def test_run_batch_json_and_silent(self):
+        """Test batch output with the JSON and silent renderers."""
+        import json
+
+        output = io.StringIO()
+        failures = run_batch(["add Alice 1234567890", "phone Bob"], output, render=render_json)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert failures == 1
+        assert [record["code"] for record in records] == ["added", "not_found"]
+
+        output = io.StringIO()
+        assert run_batch(["phone Alice", "phone Bob"], output, render=render_silent) == 1
+        assert output.getvalue() == ""
+
+    def test_main_batch_exit_code(self, tmp_path, monkeypatch, capsys):
+        """Test that main runs a script file and reports failures in its exit code."""
+        import task_4
+
+        script = tmp_path / "commands.txt"
+        script.write_text("add Alice 1234567890\nphone Alice\n")
+        monkeypatch.setattr(sys, "argv", ["task_4.py", "--batch", str(script)])
+        try:
+            assert task_4.main() == 0
+            script.write_text("phone Bob\n")
+            assert task_4.main() == 1
+        finally:
+            set_colors(True)
+
+        captured = capsys.readouterr()
+        assert "Alice's phone is 1234567890" in captured.out
+        assert "Enter a command" not in captured.out
+
+
+class TestMainWithStore:
+    """Test running the bot on top of an on-disk store."""
+
+    def test_contacts_persist_between_runs(self, tmp_path, monkeypatch, capsys):
+        """Test that contacts added in one run are found in the next."""
+        import task_4
+
+        # main rebinds USERS to the opened store; restore it afterwards
+        monkeypatch.setattr(task_4, "USERS", USERS)
+        db = str(tmp_path / "contacts.db")
+        monkeypatch.setattr(sys, "argv", ["task_4.py", "--db", db])
+
+        inputs = iter(["add Alice 1234567890", "exit"])
+        monkeypatch.setattr("builtins.input", lambda prompt: next(inputs))
+        task_4.main()
+
+        inputs = iter(["phone alice", "exit"])
+        monkeypatch.setattr("builtins.input", lambda prompt: next(inputs))
+        task_4.main()
+
+        captured = capsys.readouterr()
+        assert "Alice's phone is 1234567890" in captured.out
+
+    def test_adds_are_committed_in_batches(self, tmp_path, monkeypatch):
+        """Test that resolving names and phone owners does not commit the pending adds."""
+        import task_4
+        from contact_store import open_store
+
+        store = open_store(str(tmp_path / "contacts.db"))
+        monkeypatch.setattr(task_4, "USERS", store)
+        statements = []
+        store._conn.set_trace_callback(statements.append)
+        try:
+            for i in range(20):
+                assert add_contact([f"user{i}", f"{1000000000 + i}"]).ok is True
+            assert add_contact(["USER7", "2000000000"]).code == "exists"
+            assert find_phone_owner(["1000000003"]).data["owners"] == "User3"
+            assert statements.count("COMMIT") == 0
+        finally:
+            store.close()
+        assert statements.count("COMMIT") == 1
+
+    def test_cached_lookups_skip_the_database(self, tmp_path, monkeypatch):
+        """Test that a repeated lookup is answered by the cache without any query."""
+        import task_4
+        from contact_store import open_store
+
+        store = open_store(str(tmp_path / "contacts.db"), cache_size=10)
+        monkeypatch.setattr(task_4, "USERS", store)
+        try:
+            add_contact(["Alice", "1234567890"])
+            store.flush()
+            assert get_users_phone(["alice"]).ok is True
+            statements = []
+            store.store._conn.set_trace_callback(statements.append)
+            for _ in range(5):
+                assert get_users_phone(["ALICE"]).data["phones"] == ["1234567890"]
+            assert statements == []
+
+            update_contact(["alice", "0987654321"])
+            assert get_users_phone(["Alice"]).data["phones"] == ["0987654321"]
+        finally:
+            store.close()
+
+
+class TestStartup:
+    """Test what importing and starting the bot costs."""
+
+    def test_import_defers_optional_modules(self):
+        """Test that importing the bot loads none of the modules only some commands need."""
+        import subprocess
+
+        deferred = [
+            "re", "json", "csv", "sqlite3", "argparse", "colorama",
+            "cProfile", "tracemalloc", "pathlib", "multiprocessing", "unicodedata",
+        ]
+        code = f"import sys, task_4; print(','.join(m for m in {deferred!r} if m in sys.modules))"
+        tasks = Path(__file__).parent.parent / "tasks"
+        completed = subprocess.run([sys.executable, "-c", code], cwd=tasks, capture_output=True, text=True, check=True)
+        assert completed.stdout.strip() == ""
+
+    def test_help_follows_colors(self):
+        """Test that the lazily built help text is rebuilt when colors change."""
+        def help_text():
+            return "".join(text for _, text in dispatch("help", []).rows)
+
+        try:
+            set_colors(False)
+            assert "\033[" not in help_text()
+        finally:
+            set_colors(True)
+        assert Fore.LIGHTGREEN_EX in help_text()
+
+    def test_no_colors_when_not_a_terminal(self, monkeypatch, capsys):
+        """Test that the interactive bot prints plain text into a pipe."""
+        import task_4
+
+        monkeypatch.setattr(task_4, "USERS", USERS)
+        monkeypatch.setattr(sys, "argv", ["task_4.py"])
+        inputs = iter(["hello", "exit"])
+        monkeypatch.setattr("builtins.input", lambda prompt: next(inputs))
+        try:
+            task_4.main()
+        finally:
+            set_colors(True)
+
+        captured = capsys.readouterr()
+        assert "How can I help you?" in captured.out
+        assert "\033[" not in captured.out